@@ -0,0 +1,218 @@
+"""
+Query latency of the hot database lookups before and after the index migration
+
+Seeds a scratch PostgreSQL database with synthetic hypotheses, alphas and
+backtest results at the baseline schema (migration 0001), times the lookups
+the operations modules issue, then upgrades to the latest migration and times
+them again. Rows are generated server side with ``generate_series`` and
+threads are interleaved the way concurrent runs write them.
+
+Usage:
+    POSTGRES_HOST=localhost python benchmarks/db_indexes.py \\
+        --threads 2000 --iterations 250 --alphas 4 --output indexes.json
+
+The scratch database (``--database``) is dropped and recreated on every run.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from agent.database.models import Alpha, BacktestResult, Hypothesis
+from agent.database.operations.db_connection import get_db_url, upgrade_database
+
+
+def create_database(name: str) -> str:
+    """Drop and recreate the scratch database; return its URL"""
+    url = make_url(get_db_url())
+    admin = create_engine(url, isolation_level="AUTOCOMMIT")
+    with admin.connect() as conn:
+        conn.execute(text(f'DROP DATABASE IF EXISTS "{name}"'))
+        conn.execute(text(f'CREATE DATABASE "{name}"'))
+    admin.dispose()
+    return url.set(database=name).render_as_string(hide_password=False)
+
+
+def seed(engine, threads: int, iterations: int, alphas: int) -> Dict[str, int]:
+    """Insert the synthetic rows and return the row counts"""
+    hypotheses = threads * iterations
+    params = {"n": hypotheses, "total": hypotheses * alphas, "threads": threads, "k": alphas}
+    statements = [
+        # Hypothesis g belongs to thread g % threads, at iteration g / threads + 1
+        """
+        INSERT INTO hypotheses (id, thread_id, checkpoint_id, trading_idea, hypothesis,
+                                reason, iteration, created_at)
+        SELECT g + 1, 'thread-' || (g % :threads), 'checkpoint-' || g, 'Momentum idea',
+               'Hypothesis ' || g, repeat('reason ', 20), g / :threads + 1, now()
+        FROM generate_series(0, :n - 1) AS g
+        """,
+        """
+        INSERT INTO alphas (id, thread_id, checkpoint_id, hypothesis_id, alpha_id,
+                            expression, description, code, created_at)
+        SELECT g + 1, 'thread-' || ((g / :k) % :threads), 'checkpoint-' || (g / :k), g / :k + 1,
+               'alpha_' || ((g / :k) / :threads % 50) || '_' || (g % :k),
+               'rank(ts_delta(close, 5))', 'Short-term reversal',
+               repeat('# generated code' || chr(10), 30), now()
+        FROM generate_series(0, :total - 1) AS g
+        """,
+        """
+        INSERT INTO backtest_results (id, thread_id, checkpoint_id, alpha_id, is_sota,
+                                      information_ratio, annualized_return, max_drawdown, ic,
+                                      backtest_data, created_at)
+        SELECT g + 1, 'thread-' || ((g / :k) % :threads), 'checkpoint-' || (g / :k), g + 1,
+               g % 7 = 0, random(), random() / 5, -random() / 3, random() / 10,
+               '{"sharpe": 1.2, "turnover": 0.3}'::json, now()
+        FROM generate_series(0, :total - 1) AS g
+        """,
+    ]
+    with engine.begin() as conn:
+        for statement in statements:
+            conn.execute(text(statement), params)
+        for table in ("hypotheses", "alphas", "backtest_results"):
+            conn.execute(
+                text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))")
+            )
+    analyze(engine)
+    return {"hypotheses": hypotheses, "alphas": hypotheses * alphas, "backtest_results": hypotheses * alphas}
+
+
+def analyze(engine) -> None:
+    """Refresh planner statistics"""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE hypotheses, alphas, backtest_results"))
+
+
+def lookups(threads: int, iterations: int, alphas: int) -> Dict[str, Callable[[random.Random], Any]]:
+    """Statement builders of the hot lookups, keyed by name"""
+
+    def hypothesis_id(rng: random.Random) -> int:
+        return rng.randrange(threads * iterations) + 1
+
+    def thread(rng: random.Random) -> str:
+        return f"thread-{rng.randrange(threads)}"
+
+    def alpha_keys(rng: random.Random) -> List[str]:
+        return [f"alpha_{rng.randrange(min(iterations, 50))}_{i}" for i in range(alphas)]
+
+    return {
+        # save_hypothesis: the hypothesis already saved at a checkpoint
+        "hypothesis_at_checkpoint": lambda rng: (
+            lambda g: select(Hypothesis).filter_by(
+                thread_id=f"thread-{g % threads}", checkpoint_id=f"checkpoint-{g}"
+            )
+        )(hypothesis_id(rng) - 1),
+        # save_hypothesis: the latest iteration of a thread
+        "latest_iteration": lambda rng: select(Hypothesis.iteration)
+        .filter_by(thread_id=thread(rng))
+        .order_by(Hypothesis.iteration.desc())
+        .limit(1),
+        # get_hypothesis_history / get_thread_history
+        "thread_history": lambda rng: select(Hypothesis)
+        .filter_by(thread_id=thread(rng))
+        .order_by(Hypothesis.iteration),
+        # get_alphas_for_hypothesis
+        "alphas_for_hypothesis": lambda rng: select(Alpha).filter_by(hypothesis_id=hypothesis_id(rng)),
+        # save_backtest_results: the latest row of each alpha in a thread
+        "alphas_in_thread": lambda rng: select(Alpha.alpha_id, func.max(Alpha.id))
+        .where(Alpha.thread_id == thread(rng), Alpha.alpha_id.in_(alpha_keys(rng)))
+        .group_by(Alpha.alpha_id),
+        # get_backtest_results_for_alpha
+        "backtests_for_alpha": lambda rng: select(BacktestResult).filter_by(
+            alpha_id=rng.randrange(threads * iterations * alphas) + 1
+        ),
+    }
+
+
+def scan_nodes(session: Session, statement) -> str:
+    """Scan nodes of the query plan, e.g. ``Index Scan on hypotheses``"""
+    compiled = statement.compile(session.bind, compile_kwargs={"literal_binds": True})
+    plan = session.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar()
+    nodes = []
+
+    def walk(node: Dict[str, Any]) -> None:
+        if "Relation Name" in node:
+            nodes.append(f"{node['Node Type']} on {node['Relation Name']}")
+        for child in node.get("Plans", ()):
+            walk(child)
+
+    walk(plan[0]["Plan"])
+    return ", ".join(nodes)
+
+
+def measure(engine, builders, samples: int, seed_value: int) -> Dict[str, Dict[str, Any]]:
+    """p50/p99 latency in milliseconds and the plan of every lookup"""
+    results = {}
+    with Session(engine) as session:
+        for name, build in builders.items():
+            rng = random.Random(seed_value)
+            for _ in range(5):
+                session.execute(build(rng)).all()
+            rng = random.Random(seed_value)
+            timings = []
+            for _ in range(samples):
+                statement = build(rng)
+                start = time.perf_counter()
+                session.execute(statement).all()
+                timings.append((time.perf_counter() - start) * 1000)
+            results[name] = {
+                "p50_ms": round(float(np.percentile(timings, 50)), 3),
+                "p99_ms": round(float(np.percentile(timings, 99)), 3),
+                "plan": scan_nodes(session, build(random.Random(seed_value))),
+            }
+    return results
+
+
+def main(argv=None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--database", default="alphagpt_bench", help="Scratch database (recreated)")
+    parser.add_argument("--threads", type=int, default=2000)
+    parser.add_argument("--iterations", type=int, default=250, help="Hypotheses per thread")
+    parser.add_argument("--alphas", type=int, default=4, help="Alphas (and backtests) per hypothesis")
+    parser.add_argument("--samples", type=int, default=200, help="Timed executions per lookup")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    engine = create_engine(create_database(args.database))
+    upgrade_database(engine, "0001")
+    started = time.perf_counter()
+    rows = seed(engine, args.threads, args.iterations, args.alphas)
+    print(f"Seeded {rows} in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    builders = lookups(args.threads, args.iterations, args.alphas)
+    before = measure(engine, builders, args.samples, args.seed)
+    upgrade_database(engine)
+    analyze(engine)
+    after = measure(engine, builders, args.samples, args.seed)
+    engine.dispose()
+
+    report = {
+        "rows": rows,
+        "samples": args.samples,
+        "lookups": {name: {"before": before[name], "after": after[name]} for name in builders},
+    }
+    for name, result in report["lookups"].items():
+        print(
+            f"{name:26s} p50 {result['before']['p50_ms']:9.3f} -> {result['after']['p50_ms']:7.3f} ms"
+            f"   p99 {result['before']['p99_ms']:9.3f} -> {result['after']['p99_ms']:7.3f} ms",
+            file=sys.stderr,
+        )
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return report
+
+
+if __name__ == "__main__":
+    main()
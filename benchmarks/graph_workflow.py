@@ -0,0 +1,390 @@
+"""
+Latency, throughput, database traffic and memory of the full graph, offline
+
+Runs the compiled graph (user_input -> hypothesis_generator -> alpha_generator
+-> alpha_coder -> backtest -> evolution) on synthetic market data, with every
+chat model replaced by ``FakeChatModel``. Its responses are deterministic
+and valid: a hypothesis, a factor object (mostly DSL expressions, some that
+need coding) and pandas code. It waits ``--latency`` seconds per request
+and streams at ``--tokens-per-second``, so nothing leaves the machine and
+no API key is needed.
+
+For every concurrency level the same number of runs is started through
+``run_batch``, and the report has:
+
+* throughput (runs per second) and run latency percentiles
+* latency percentiles of every node, from LangGraph's callbacks
+* chat model requests, and database statements per run: those of the
+  LangGraph checkpointer (psycopg) and of the application tables
+  (SQLAlchemy), with ``--checkpointer postgres``
+* peak traced Python memory of one run, and the peak RSS of the process
+
+With ``--checkpointer memory`` the graph uses ``MemorySaver``, and the
+hypothesis history that the hypothesis generator reads from the database is
+empty. With ``--checkpointer postgres`` the scratch database ``--database``
+is dropped and recreated (connection settings from the ``POSTGRES_*``
+variables).
+
+Usage:
+    python benchmarks/graph_workflow.py --concurrency 1 4 16 --runs 16 \\
+        --latency 0.5 --output graph.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+import numpy as np
+from langchain_core.callbacks import BaseCallbackHandler
+
+NODES = (
+    "user_input",
+    "hypothesis_generator",
+    "alpha_generator",
+    "alpha_coder",
+    "backtest",
+    "evolution",
+)
+
+IDEAS = (
+    "Short-term reversal after volume spikes",
+    "Momentum in low-volatility stocks",
+    "Mean reversion of intraday ranges",
+    "Breakouts from narrow trading ranges",
+)
+
+
+def create_database(name: str) -> None:
+    """Drop and recreate the scratch database, and point POSTGRES_DB at it
+
+    Runs before ``agent`` is imported (which connects to POSTGRES_DB), so the
+    server URL is built here from the same variables.
+    """
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.engine import URL
+
+    url = URL.create(
+        "postgresql",
+        username=os.environ.get("POSTGRES_USER", "postgres"),
+        password=os.environ.get("POSTGRES_PASSWORD", "postgres"),
+        host=os.environ.get("POSTGRES_HOST", "localhost"),
+        port=int(os.environ.get("POSTGRES_PORT", "5432")),
+        database="postgres",
+    )
+    admin = create_engine(url, isolation_level="AUTOCOMMIT")
+    with admin.connect() as conn:
+        conn.execute(text(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)'))
+        conn.execute(text(f'CREATE DATABASE "{name}"'))
+    admin.dispose()
+    os.environ["POSTGRES_DB"] = name
+
+
+def write_market_data(path: str, dates: int, instruments: int, seed: int) -> str:
+    """Write a synthetic market data store; return its path"""
+    from agent.market_data import write_store
+
+    rng = np.random.default_rng(seed)
+    close = 100 * np.cumprod(1 + rng.normal(0, 0.01, (dates, instruments)), axis=0)
+    fields = {
+        "open": close * rng.uniform(0.99, 1.01, close.shape),
+        "high": close * 1.01,
+        "low": close * 0.99,
+        "close": close,
+        "volume": rng.lognormal(10, 1, close.shape),
+    }
+    write_store(path, np.arange(dates), [f"S{i:04d}" for i in range(instruments)], fields)
+    return path
+
+
+class MemoryHistory:
+    """Stand-in for the checkpoint manager's history queries without a database"""
+
+    async def aget_hypothesis_history(self, thread_id: str) -> List[Dict[str, Any]]:
+        return []
+
+    async def aget_alphas_for_hypothesis(self, hypothesis_id: int) -> List[Dict[str, Any]]:
+        return []
+
+    async def aget_backtest_results_for_alpha(self, alpha_id: int) -> List[Dict[str, Any]]:
+        return []
+
+
+class NodeTimer(BaseCallbackHandler):
+    """Collect the wall time of every graph node run"""
+
+    run_inline = True
+
+    def __init__(self) -> None:
+        self.started: Dict[UUID, Any] = {}
+        self.timings: Dict[str, List[float]] = defaultdict(list)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs) -> None:
+        node = (metadata or {}).get("langgraph_node")
+        if node in NODES and kwargs.get("name") == node:
+            self.started[run_id] = (node, time.perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs) -> None:
+        started = self.started.pop(run_id, None)
+        if started is not None:
+            node, start = started
+            self.timings[node].append(time.perf_counter() - start)
+
+    def on_chain_error(self, error, *, run_id, **kwargs) -> None:
+        self.started.pop(run_id, None)
+
+
+class QueryCounter:
+    """Count the statements sent by the checkpointer and by SQLAlchemy
+
+    The checkpointer's ``PostgresSaver`` runs on psycopg cursors, whose
+    ``execute``/``executemany`` are wrapped while counting. The application
+    tables are written through SQLAlchemy, counted with an event listener on
+    every ``Engine`` (its synchronous engine uses psycopg2, so nothing is
+    counted twice).
+    """
+
+    def __init__(self) -> None:
+        self.checkpointer = 0
+        self.application = 0
+        self._patched: Dict[str, Any] = {}
+
+    def _on_execute(self, *args, **kwargs) -> None:
+        self.application += 1
+
+    def __enter__(self) -> "QueryCounter":
+        import psycopg
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+
+        for name in ("execute", "executemany"):
+            original = getattr(psycopg.Cursor, name)
+            self._patched[name] = original
+
+            def counted(cursor, *args, _original=original, **kwargs):
+                self.checkpointer += 1
+                return _original(cursor, *args, **kwargs)
+
+            setattr(psycopg.Cursor, name, counted)
+        event.listen(Engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        import psycopg
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+
+        for name, original in self._patched.items():
+            setattr(psycopg.Cursor, name, original)
+        event.remove(Engine, "before_cursor_execute", self._on_execute)
+
+
+def percentiles(values: List[float], scale: float = 1000.0) -> Dict[str, Any]:
+    """Count, mean and p50/p95/p99 of durations in seconds, scaled (to ms by default)"""
+    if not values:
+        return {"count": 0}
+    array = np.asarray(values) * scale
+    return {
+        "count": len(values),
+        "mean": round(float(array.mean()), 3),
+        "p50": round(float(np.percentile(array, 50)), 3),
+        "p95": round(float(np.percentile(array, 95)), 3),
+        "p99": round(float(np.percentile(array, 99)), 3),
+    }
+
+
+def max_rss_mb() -> Dict[str, float]:
+    """Peak resident memory of this process and of its finished children"""
+    return {
+        "process": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+    }
+
+
+def install_model(model) -> None:
+    """Make every graph node use ``model``"""
+    from agent.agents import alpha_coder_agent, alpha_generator_agent, hypothesis_agent
+
+    for module in (hypothesis_agent, alpha_generator_agent, alpha_coder_agent):
+        module.get_chat_model = lambda node, configuration, **kwargs: model
+
+
+async def run_level(
+    graph, concurrency: int, runs: int, iterations: int, configurable: Dict[str, Any], model
+) -> Dict[str, Any]:
+    """Run ``runs`` threads for ``iterations`` iterations each, ``concurrency`` at a time"""
+    from agent.services import run_batch
+
+    timer = NodeTimer()
+    timed_graph = graph.with_config(callbacks=[timer])
+    calls_before = model.calls
+    durations: List[float] = []
+    errors: List[str] = []
+    thread_ids: List[Optional[str]] = [None] * runs
+
+    with QueryCounter() as queries:
+        start = time.perf_counter()
+        for iteration in range(iterations):
+            batch = [
+                {"thread_id": thread_ids[i]} if iteration else IDEAS[i % len(IDEAS)]
+                for i in range(runs)
+            ]
+            async for result in run_batch(
+                batch, max_concurrency=concurrency, configurable=configurable, graph=timed_graph
+            ):
+                thread_ids[result.index] = result.thread_id
+                durations.append(result.duration)
+                if not result.ok:
+                    errors.append(result.error)
+        wall = time.perf_counter() - start
+
+    completed = runs * iterations
+    calls = {k: v - calls_before.get(k, 0) for k, v in model.calls.items()}
+    return {
+        "concurrency": concurrency,
+        "runs": completed,
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:3],
+        "wall_s": round(wall, 3),
+        "runs_per_s": round(completed / wall, 3),
+        "run_latency_ms": percentiles(durations),
+        "node_latency_ms": {node: percentiles(timer.timings[node]) for node in NODES},
+        "llm_requests_per_run": {k: round(v / completed, 2) for k, v in sorted(calls.items())},
+        "db_statements_per_run": {
+            "checkpointer": round(queries.checkpointer / completed, 1),
+            "application": round(queries.application / completed, 1),
+        },
+    }
+
+
+async def traced_run(graph, configurable: Dict[str, Any]) -> Dict[str, float]:
+    """Peak and retained Python memory of one run, traced with tracemalloc"""
+    from agent.services import run_batch
+
+    tracemalloc.start()
+    try:
+        async for result in run_batch([IDEAS[0]], configurable=configurable, graph=graph):
+            pass
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"peak_mb": round(peak / 2**20, 2), "retained_mb": round(current / 2**20, 2)}
+
+
+async def benchmark(args, workdir: str) -> Dict[str, Any]:
+    from agent.database.checkpointer_api import get_checkpoint_manager
+    from agent.graph import graph
+    from agent.llm import FakeChatModel
+
+    model = FakeChatModel(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second or None,
+        code_fraction=args.code_fraction,
+        seed=args.seed,
+        cache=False,
+    )
+    install_model(model)
+    if args.checkpointer == "memory":
+        from agent.agents import hypothesis_agent
+
+        hypothesis_agent.get_checkpoint_manager = MemoryHistory
+
+    data_path = write_market_data(
+        os.path.join(workdir, "market"), args.dates, args.instruments, args.seed
+    )
+    configurable = {
+        "market_data_path": data_path,
+        "llm_cache_backend": None,
+        "retrieval_index_path": None,
+        "factor_cache_path": os.path.join(workdir, "factors") if args.factor_cache else None,
+        "evolution_generations": args.evolution_generations,
+        "evolution_population": args.evolution_population,
+        "evolution_workers": args.evolution_workers,
+        "execution_workers": args.execution_workers,
+    }
+
+    # Worker pools, market data and imports are warmed up outside the timings
+    warmup = await run_level(graph, 1, 1, 1, configurable, model)
+    if warmup["errors"]:
+        raise RuntimeError(f"Warm-up run failed: {warmup['error_samples']}")
+
+    levels = []
+    for concurrency in args.concurrency:
+        level = await run_level(
+            graph, concurrency, max(args.runs, concurrency), args.iterations, configurable, model
+        )
+        levels.append(level)
+        print(
+            f"concurrency {concurrency:3d}: {level['runs_per_s']:7.3f} runs/s, "
+            f"p50 {level['run_latency_ms']['p50']:9.1f} ms, "
+            f"{level['db_statements_per_run']['checkpointer']} + "
+            f"{level['db_statements_per_run']['application']} statements/run, "
+            f"{level['errors']} errors",
+            file=sys.stderr,
+        )
+
+    memory = await traced_run(graph, configurable)
+    memory["max_rss_mb"] = max_rss_mb()
+
+    if args.checkpointer == "postgres":
+        get_checkpoint_manager().close()
+
+    return {"levels": levels, "memory": memory}
+
+
+def main(argv=None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--checkpointer", choices=("memory", "postgres"), default="memory")
+    parser.add_argument("--database", default="alphagpt_graph_bench", help="Scratch database (recreated)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--runs", type=int, default=16, help="Threads per concurrency level")
+    parser.add_argument("--iterations", type=int, default=1, help="Graph runs per thread")
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds to the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0, help="0 for instant responses")
+    parser.add_argument("--code-fraction", type=float, default=0.2, help="Factors that need coding")
+    parser.add_argument("--dates", type=int, default=500)
+    parser.add_argument("--instruments", type=int, default=200)
+    parser.add_argument("--evolution-generations", type=int, default=2)
+    parser.add_argument("--evolution-population", type=int, default=50)
+    parser.add_argument("--evolution-workers", type=int, default=0, help="0 scores in process")
+    parser.add_argument("--execution-workers", type=int, default=1)
+    parser.add_argument("--factor-cache", action="store_true", help="Enable the factor value cache")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    # The graph is compiled with this checkpointer when agent is first imported
+    os.environ["USE_POSTGRES_CHECKPOINT"] = str(args.checkpointer == "postgres").lower()
+    if args.checkpointer == "postgres":
+        create_database(args.database)
+
+    # Progress printed by the nodes goes to stderr, so stdout is only the report
+    with tempfile.TemporaryDirectory() as workdir, contextlib.redirect_stdout(sys.stderr):
+        results = asyncio.run(benchmark(args, workdir))
+
+    report = {
+        "settings": {
+            key: value for key, value in vars(args).items() if key not in ("output",)
+        },
+        **results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return report
+
+
+if __name__ == "__main__":
+    main()
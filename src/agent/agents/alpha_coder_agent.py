@@ -1,7 +1,19 @@
 # src/agent/agents/alpha_coder_agent.py
-from typing import Any, Dict, List
+import asyncio
+import random
+from contextlib import AsyncExitStack
+from typing import Any, Dict, List, Optional
 from langchain_core.runnables import RunnableConfig
 from langchain_openai import ChatOpenAI
+from agent.configuration import Configuration
+from agent.factors import DSLError, dsl_code, to_node
+from agent.llm import get_chat_model
+from agent.services.dedup_service import (
+    alpha_fingerprint,
+    alookup_known_alphas,
+    arecord_alphas,
+    dedup_enabled,
+)
 from agent.state import State
 from agent.prompts.alpha_coder_prompts import (
     ALPHA_CODER_SYSTEM_PROMPT,
@@ -9,49 +21,171 @@ from agent.prompts.alpha_coder_prompts import (
 )
 
 
-async def alpha_coder_agent(state: State, config: RunnableConfig) -> Dict[str, Any]:
-    """Generate Python code for the seed alpha factors."""
+def extract_code(content: str) -> str:
+    """Extract the Python code block from an LLM response."""
+    code_start = content.find("```python")
+    code_end = content.rfind("```")
 
-    # Initialize LLM
-    llm = ChatOpenAI(model="gpt-4o", temperature=0.1)
+    if code_start >= 0 and code_end > code_start:
+        return content[code_start + 9 : code_end].strip()
+    return content
 
-    # Process each alpha and generate code
-    coded_alphas = []
 
-    for alpha in state.seed_alphas:
-        try:
-            # Format prompt with alpha details
-            user_prompt = ALPHA_CODER_USER_PROMPT.format(
-                alpha_id=alpha["alphaID"],
-                expression=alpha["expr"],
-                description=alpha["desc"],
-            )
+def get_coder_llm(configuration: Configuration) -> ChatOpenAI:
+    """Return the chat model used to code alphas."""
+    return get_chat_model(
+        "alpha_coder", configuration, model="gpt-4o", temperature=0.1
+    )
 
-            # Generate code
-            response = await llm.ainvoke(
-                [
-                    {"role": "system", "content": ALPHA_CODER_SYSTEM_PROMPT},
-                    {"role": "user", "content": user_prompt},
-                ]
-            )
 
-            # Extract code from the response
-            content = response.content
-            code_start = content.find("```python")
-            code_end = content.rfind("```")
+def reuse_code(alpha: Dict[str, Any], source: Dict[str, Any]) -> Dict[str, Any]:
+    """Code an alpha with the code of an equivalent, already coded alpha."""
+    coded_alpha = alpha.copy()
+    for key in ("code", "dsl", "engine"):
+        if key in source:
+            coded_alpha[key] = source[key]
+    return coded_alpha
 
-            if code_start >= 0 and code_end > code_start:
-                code = content[code_start + 9 : code_end].strip()
-            else:
-                code = content
+
+async def code_alpha(
+    llm: ChatOpenAI,
+    alpha: Dict[str, Any],
+    configuration: Configuration,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    known: Optional[Dict[str, Any]] = None,
+) -> Optional[Dict[str, Any]]:
+    """Generate code for a single alpha with per-attempt timeout and retries.
+
+    Alphas whose expression is valid in the built-in DSL are bound to the
+    vectorized engine directly and skip the LLM, and so do alphas whose
+    code is already in the dedup index (``known``). The semaphore is only held
+    while a request is in flight, so an alpha waiting out its backoff does
+    not block the others.
+
+    Returns:
+        The alpha with a ``code`` field, or None if every attempt failed
+    """
+    try:
+        node = to_node(alpha.get("dsl") or alpha.get("expr", ""))
+    except DSLError:
+        node = None
+
+    if node is not None:
+        coded_alpha = alpha.copy()
+        coded_alpha["dsl"] = node.to_text()
+        coded_alpha["code"] = dsl_code(alpha["alphaID"], node)
+        coded_alpha["engine"] = "dsl"
+        return coded_alpha
+
+    if known and known.get("code"):
+        return reuse_code(alpha, known)
+
+    # Format prompt with alpha details
+    user_prompt = ALPHA_CODER_USER_PROMPT.format(
+        alpha_id=alpha["alphaID"],
+        expression=alpha["expr"],
+        description=alpha["desc"],
+    )
+    messages = [
+        {"role": "system", "content": ALPHA_CODER_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt},
+    ]
+
+    attempts = max(0, configuration.coder_max_retries) + 1
+    for attempt in range(attempts):
+        try:
+            async with AsyncExitStack() as stack:
+                if semaphore is not None:
+                    await stack.enter_async_context(semaphore)
+                response = await asyncio.wait_for(
+                    llm.ainvoke(messages), timeout=configuration.coder_timeout
+                )
 
             # Add code to the alpha information
             coded_alpha = alpha.copy()
-            coded_alpha["code"] = code
-            coded_alphas.append(coded_alpha)
+            coded_alpha["code"] = extract_code(response.content)
+            return coded_alpha
 
         except Exception as e:
-            print(f"Error coding alpha {alpha.get('alphaID')}: {str(e)}")
+            reason = "timed out" if isinstance(e, asyncio.TimeoutError) else str(e)
+            print(
+                f"Error coding alpha {alpha.get('alphaID')} "
+                f"(attempt {attempt + 1}/{attempts}): {reason}"
+            )
+            if attempt + 1 < attempts:
+                delay = configuration.coder_retry_backoff * (2**attempt)
+                await asyncio.sleep(delay + random.uniform(0, delay))
+
+    return None
+
+
+async def alpha_coder_agent(state: State, config: RunnableConfig) -> Dict[str, Any]:
+    """Generate Python code for the seed alpha factors.
+
+    Alphas already coded while the generator was streaming are kept; the
+    remaining seed alphas are coded concurrently, bounded by
+    ``Configuration.coder_max_concurrency``. Results keep the order of
+    ``state.seed_alphas``; alphas that fail after all retries are dropped.
+    """
+    configuration = Configuration.from_runnable_config(config)
+
+    coded_ids = {alpha["alphaID"] for alpha in state.coded_alphas}
+    pending = [a for a in state.seed_alphas if a["alphaID"] not in coded_ids]
+
+    # Alphas with the same canonical expression are coded once; an alpha
+    # matching one coded earlier (here or in another thread) reuses its code
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    reused: Dict[str, Dict[str, Any]] = {}
+    known: Dict[str, Dict[str, Any]] = {}
+    if dedup_enabled(configuration):
+        coded_by_digest = {
+            alpha_fingerprint(alpha).digest: alpha for alpha in state.coded_alphas
+        }
+        for alpha in pending:
+            digest = alpha_fingerprint(alpha).digest
+            if digest in coded_by_digest:
+                reused[alpha["alphaID"]] = coded_by_digest[digest]
+            else:
+                groups.setdefault(digest, []).append(alpha)
+        known = await alookup_known_alphas(group[0] for group in groups.values())
+    else:
+        groups = {alpha["alphaID"]: [alpha] for alpha in pending}
+
+    results: List[Optional[Dict[str, Any]]] = []
+    if groups:
+        # Initialize LLM
+        llm = get_coder_llm(configuration)
+
+        semaphore = asyncio.Semaphore(max(1, configuration.coder_max_concurrency))
+
+        # Process all alphas concurrently
+        results = await asyncio.gather(
+            *(
+                code_alpha(
+                    llm, group[0], configuration, semaphore, known.get(group[0]["alphaID"])
+                )
+                for group in groups.values()
+            )
+        )
+
+    coded = {alpha["alphaID"]: alpha for alpha in state.coded_alphas}
+    for group, result in zip(groups.values(), results):
+        if result is not None:
+            coded[result["alphaID"]] = result
+            reused.update({alpha["alphaID"]: result for alpha in group[1:]})
+    for alpha in pending:
+        if alpha["alphaID"] in reused:
+            coded[alpha["alphaID"]] = reuse_code(alpha, reused[alpha["alphaID"]])
+
+    coded_alphas: List[Dict[str, Any]] = [
+        coded[alpha["alphaID"]]
+        for alpha in state.seed_alphas
+        if alpha["alphaID"] in coded
+    ]
+
+    if dedup_enabled(configuration):
+        thread_id = (config or {}).get("configurable", {}).get("thread_id")
+        await arecord_alphas([r for r in results if r is not None], thread_id)
 
     # Return coded alphas
     return {"coded_alphas": coded_alphas}
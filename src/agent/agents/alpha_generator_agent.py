@@ -1,7 +1,19 @@
 # src/agent/agents/alpha_generator_agent.py
+import asyncio
 from typing import Any, Dict, List, Optional
 from langchain_core.runnables import RunnableConfig
-from langchain_openai import ChatOpenAI
+from agent.agents.alpha_coder_agent import code_alpha, get_coder_llm
+from agent.configuration import Configuration
+from agent.llm import get_chat_model
+from agent.llm.streaming import JSONObjectStream, astream_text
+from agent.factors import DSLError, to_node
+from agent.retrieval import asearch_prior_attempts, format_prior_attempts
+from agent.services.dedup_service import (
+    alpha_fingerprint,
+    alookup_known_alphas,
+    arecord_alphas,
+    dedup_enabled,
+)
 from agent.state import State
 from agent.prompts.alpha_prompts import (
     ALPHA_SYSTEM_PROMPT,
@@ -12,6 +24,40 @@ from agent.prompts.alpha_prompts import (
 import json
 
 
+def parse_factors(content: str) -> Dict[str, Any]:
+    """Parse the factor JSON object from a complete LLM response."""
+    # Extract JSON if embedded in text
+    json_start = content.find("{")
+    json_end = content.rfind("}") + 1
+
+    if json_start >= 0 and json_end > json_start:
+        json_str = content[json_start:json_end]
+        return json.loads(json_str)
+
+    # Fallback if JSON brackets not cleanly found
+    return json.loads(content)
+
+
+def factor_to_seed_alpha(factor_name: str, factor_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert one generated factor to the seed_alphas format."""
+    seed_alpha = {
+        "alphaID": factor_name,
+        "expr": factor_data["formulation"],
+        "desc": factor_data["description"],
+        "variables": factor_data["variables"],
+    }
+
+    # Keep the canonical DSL form when the factor fits the operator set
+    try:
+        seed_alpha["dsl"] = to_node(
+            factor_data.get("expression") or factor_data["formulation"]
+        ).to_text()
+    except DSLError:
+        pass
+
+    return seed_alpha
+
+
 async def alpha_generator_agent(state: State, config: RunnableConfig) -> Dict[str, Any]:
     """Generate alpha factors based on the trading hypothesis.
 
@@ -20,10 +66,17 @@ async def alpha_generator_agent(state: State, config: RunnableConfig) -> Dict[st
     2. Generates mathematically formulated alpha factors
     3. Provides descriptions and variable definitions
     4. Returns factors in a structured JSON format
+
+    The response is streamed, and each factor starts coding as soon as it
+    is complete (see ``Configuration.stream_factors``).
     """
 
+    configuration = Configuration.from_runnable_config(config)
+
     # Initialize LLM
-    llm = ChatOpenAI(model="gpt-4o", temperature=0.4)
+    llm = get_chat_model(
+        "alpha_generator", configuration, model="gpt-4o", temperature=0.4
+    )
 
     # Determine if this is the first iteration or a refinement
     is_first_iteration = not state.sota_alphas or len(state.sota_alphas) == 0
@@ -56,48 +109,81 @@ async def alpha_generator_agent(state: State, config: RunnableConfig) -> Dict[st
             output_format=ALPHA_OUTPUT_FORMAT,
         )
 
+    # Show the most similar factors already tried, with their metrics
+    thread_id = (config or {}).get("configurable", {}).get("thread_id")
+    prior_attempts = format_prior_attempts(
+        await asearch_prior_attempts(
+            state.hypothesis, configuration, kind="alpha", exclude_thread=thread_id
+        )
+    )
+    if prior_attempts:
+        user_prompt += "\n\n" + prior_attempts
+
+    messages = [
+        {"role": "system", "content": ALPHA_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt},
+    ]
+
+    # Each factor is handed to the coder as soon as its JSON object closes,
+    # so coding overlaps with the rest of the generation
+    coder_llm = get_coder_llm(configuration) if configuration.stream_factors else None
+    semaphore = asyncio.Semaphore(max(1, configuration.coder_max_concurrency))
+    seed_alphas: List[Dict[str, Any]] = []
+    coding_tasks: List[asyncio.Task] = []
+    dedup = dedup_enabled(configuration)
+    dispatched = set()
+
+    async def code_streamed(seed_alpha: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # Check the dedup index before spending an LLM call on the factor
+        known = await alookup_known_alphas([seed_alpha]) if dedup else {}
+        return await code_alpha(
+            coder_llm, seed_alpha, configuration, semaphore,
+            known.get(seed_alpha["alphaID"]),
+        )
+
+    def dispatch(factor_name: str, factor_data: Any) -> None:
+        try:
+            seed_alpha = factor_to_seed_alpha(factor_name, factor_data)
+        except (KeyError, TypeError) as e:
+            print(f"Skipping malformed factor {factor_name}: {e}")
+            return
+        seed_alphas.append(seed_alpha)
+        if coder_llm is None:
+            return
+        if dedup:
+            # Repeats within the response are left to the alpha_coder node,
+            # which reuses the code of the first occurrence
+            digest = alpha_fingerprint(seed_alpha).digest
+            if digest in dispatched:
+                return
+            dispatched.add(digest)
+        coding_tasks.append(asyncio.create_task(code_streamed(seed_alpha)))
+
     # Generate alpha factors
+    parser = JSONObjectStream()
     try:
-        response = await llm.ainvoke(
-            [
-                {"role": "system", "content": ALPHA_SYSTEM_PROMPT},
-                {"role": "user", "content": user_prompt},
-            ]
-        )
+        async for text in astream_text(llm, messages):
+            for factor_name, factor_data in parser.feed(text):
+                dispatch(factor_name, factor_data)
+
+        if not seed_alphas:
+            # Streaming parse found nothing usable; parse the whole response
+            for factor_name, factor_data in parse_factors(parser.text).items():
+                dispatch(factor_name, factor_data)
 
-        # Parse JSON response
-        content = response.content
-
-        # Extract JSON if embedded in text
-        json_start = content.find("{")
-        json_end = content.rfind("}") + 1
-
-        if json_start >= 0 and json_end > json_start:
-            json_str = content[json_start:json_end]
-            factors_dict = json.loads(json_str)
-        else:
-            # Fallback if JSON brackets not cleanly found
-            factors_dict = json.loads(content)
-
-        # Convert to seed_alphas format
-        seed_alphas = []
-        for factor_name, factor_data in factors_dict.items():
-            seed_alphas.append(
-                {
-                    "alphaID": factor_name,
-                    "expr": factor_data["formulation"],
-                    "desc": factor_data["description"],
-                    "variables": factor_data["variables"],
-                }
-            )
-
-        return {"seed_alphas": seed_alphas}
+        results = await asyncio.gather(*coding_tasks)
+        coded_alphas = [r for r in results if r is not None]
+        if dedup:
+            await arecord_alphas(coded_alphas, thread_id)
+
+        # Alphas not coded here are picked up by the alpha_coder node
+        return {"seed_alphas": seed_alphas, "coded_alphas": coded_alphas}
 
     except Exception as e:
+        for task in coding_tasks:
+            task.cancel()
         print(f"Error generating alpha factors: {str(e)}")
-        print(
-            f"Raw response: {response.content if 'response' in locals() else 'No response'}"
-        )
+        print(f"Raw response: {parser.text or 'No response'}")
 
         # Return empty list to avoid breaking the flow
-        return {"seed_alphas": []}
+        return {"seed_alphas": [], "coded_alphas": []}
@@ -0,0 +1,288 @@
+# src/agent/agents/backtest_agent.py
+import asyncio
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.runnables import RunnableConfig
+
+from agent.backtesting import BacktestSettings, batch_backtest, forward_returns
+from agent.configuration import Configuration
+from agent.execution import ExecutionLimits, get_execution_pool
+from agent.factors import (
+    DSLError,
+    canonicalize,
+    evaluate_batch,
+    factor_key,
+    get_factor_cache,
+    to_node,
+)
+from agent.market_data import MarketPanel, data_version, load_panel
+from agent.retrieval import schedule_retrieval_sync
+from agent.services.dedup_service import (
+    alookup_known_alphas,
+    arecord_alphas,
+    dedup_enabled,
+    metrics_version,
+)
+from agent.state import State
+
+
+def format_performance(metrics: Dict[str, Any]) -> str:
+    """Summarize backtest metrics for prompts."""
+    parts = []
+    for key, label in (
+        ("information_ratio", "IR"),
+        ("annualized_return", "Ann. return"),
+        ("max_drawdown", "Max DD"),
+        ("ic", "IC"),
+    ):
+        value = metrics.get(key)
+        parts.append(f"{label}={value:.4f}" if value is not None else f"{label}=N/A")
+    return ", ".join(parts)
+
+
+def _evaluate_expressions(
+    expressions: Dict[str, Any], panel: MarketPanel
+) -> Dict[str, np.ndarray]:
+    """Evaluate DSL alphas as one batch, falling back to one at a time.
+
+    One failing alpha (a field missing from the panel, say) fails the whole
+    batch; it is then evaluated again alpha by alpha and only the failing ones
+    are left out.
+    """
+    try:
+        return evaluate_batch(expressions, panel.fields)
+    except Exception:
+        pass
+    # Find the failing expressions one by one
+    values: Dict[str, np.ndarray] = {}
+    for alpha_id, node in expressions.items():
+        try:
+            values.update(evaluate_batch({alpha_id: node}, panel.fields))
+        except Exception as e:
+            print(f"Error evaluating alpha {alpha_id}: {e}")
+    return values
+
+
+def _compute_factor_values(
+    alphas: List[Dict[str, Any]],
+    panel: MarketPanel,
+    data_path: str,
+    configuration: Configuration,
+    version: Optional[str] = None,
+) -> Dict[str, np.ndarray]:
+    """Compute the (date, instrument) panels of coded alphas (blocking).
+
+    Panels already in the factor value cache for this data version are read
+    back memory-mapped. Of the rest, all DSL-expressible alphas are evaluated
+    as one batch (on their canonical forms, so subexpressions written
+    differently are still shared), and the others run their generated code
+    in the resource-limited execution pool. New panels are added to the cache.
+
+    Returns:
+        Mapping of alphaID to factor values; alphas that fail are left out
+    """
+    cache = get_factor_cache(configuration)
+    if cache is not None and version is None:
+        version = data_version(data_path)
+
+    values: Dict[str, np.ndarray] = {}
+    keys: Dict[str, str] = {}
+    expressions = {}
+    programs = []
+    for alpha in alphas:
+        alpha_id = alpha["alphaID"]
+        try:
+            node = canonicalize(to_node(alpha.get("dsl") or alpha.get("expr", "")))
+        except DSLError:
+            node = None
+            if not alpha.get("code") or configuration.execution_workers <= 0:
+                print(f"Skipping backtest of alpha {alpha_id}: not in the DSL")
+                continue
+
+        if cache is not None:
+            key = (
+                factor_key(version, expression=node)
+                if node is not None
+                else factor_key(version, code=alpha["code"])
+            )
+            cached = cache.get(key)
+            if cached is not None:
+                values[alpha_id] = cached
+                continue
+            keys[alpha_id] = key
+
+        if node is not None:
+            expressions[alpha_id] = node
+        else:
+            programs.append((alpha_id, alpha["code"]))
+
+    if expressions:
+        values.update(_evaluate_expressions(expressions, panel))
+
+    if programs:
+        limits = ExecutionLimits(
+            cpu_seconds=configuration.execution_cpu_seconds,
+            wall_seconds=configuration.execution_wall_seconds,
+            memory_mb=configuration.execution_memory_mb,
+        )
+        pool = get_execution_pool(data_path, configuration.execution_workers, limits)
+        for result in pool.map(programs):
+            if result.ok:
+                values[result.alpha_id] = result.values
+            else:
+                print(f"Error executing alpha {result.alpha_id}: {result.error}")
+
+    if cache is not None:
+        for alpha_id, key in keys.items():
+            if alpha_id in values:
+                try:
+                    cache.put(key, values[alpha_id])
+                except OSError as e:
+                    print(f"Error caching values of alpha {alpha_id}: {e}")
+
+    # Keep the order of the input alphas
+    return {a["alphaID"]: values[a["alphaID"]] for a in alphas if a["alphaID"] in values}
+
+
+async def compute_factor_values(
+    alphas: List[Dict[str, Any]],
+    panel: MarketPanel,
+    data_path: str,
+    configuration: Configuration,
+    version: Optional[str] = None,
+) -> Dict[str, np.ndarray]:
+    """Compute the (date, instrument) panels of coded alphas in a worker thread.
+
+    See ``_compute_factor_values``; evaluation and cache IO stay off the
+    event loop, so concurrent graph runs keep going meanwhile.
+    """
+    return await asyncio.to_thread(
+        _compute_factor_values, alphas, panel, data_path, configuration, version
+    )
+
+
+def _score_alphas(
+    alphas: List[Dict[str, Any]],
+    data_path: str,
+    configuration: Configuration,
+    version: str,
+) -> Dict[str, Dict[str, Any]]:
+    """Load the panel, compute the factor values and backtest them (blocking).
+
+    Returns:
+        Mapping of alphaID to backtest metrics, in the order of ``alphas``
+    """
+    panel = load_panel(data_path)
+    factor_values = _compute_factor_values(
+        alphas, panel, data_path, configuration, version=version
+    )
+    if not factor_values:
+        return {}
+
+    fwd = forward_returns(panel.fields["close"], configuration.backtest_horizon)
+    settings = BacktestSettings(
+        quantile=configuration.backtest_quantile,
+        horizon=configuration.backtest_horizon,
+    )
+    metrics = batch_backtest(
+        list(factor_values.values()), fwd, settings, dates=panel.dates
+    )
+    return dict(zip(factor_values.keys(), metrics))
+
+
+def history_record(alpha: Dict[str, Any]) -> Dict[str, Any]:
+    """Compact ``alpha_history`` entry of a scored alpha, without the series."""
+    metrics = alpha.get("backtest_results") or {}
+    return {
+        "id": alpha["id"],
+        "expression": alpha.get("expression", ""),
+        "dsl": alpha.get("dsl", ""),
+        "backtest_results": {k: v for k, v in metrics.items() if k != "series"},
+    }
+
+
+def _sort_key(alpha: Dict[str, Any]) -> float:
+    """Rank SOTA candidates by information ratio, missing values last."""
+    value = alpha.get("backtest_results", {}).get("information_ratio")
+    return value if value is not None else float("-inf")
+
+
+async def backtest_agent(state: State, config: RunnableConfig) -> Dict[str, Any]:
+    """Backtest the coded alphas and update the SOTA alphas.
+
+    Factor values come from ``_compute_factor_values`` (cached, batched DSL
+    evaluation, or the resource-limited execution pool) and are scored together
+    against the same forward returns, in a worker thread. Alphas whose metrics for the same data
+    and settings are already in the dedup index are not evaluated again.
+    """
+    configuration = Configuration.from_runnable_config(config)
+    data_path = configuration.market_data_path or os.environ.get("MARKET_DATA_PATH")
+
+    if not data_path:
+        print("Skipping backtest: no market data configured")
+        return {}
+
+    results: Dict[str, Dict[str, Any]] = {}
+    current_version = await asyncio.to_thread(data_version, data_path)
+    dedup = dedup_enabled(configuration)
+    version = metrics_version(current_version, configuration)
+    if dedup:
+        known = await alookup_known_alphas(state.coded_alphas)
+        results = {
+            alpha_id: entry["metrics"]
+            for alpha_id, entry in known.items()
+            if entry.get("metrics") and entry.get("metrics_version") == version
+        }
+
+    pending = [a for a in state.coded_alphas if a["alphaID"] not in results]
+    if pending:
+        # Evaluation and scoring are CPU bound; they run in a worker thread so
+        # that one backtest does not stall the other graph runs
+        fresh = await asyncio.to_thread(
+            _score_alphas, pending, data_path, configuration, current_version
+        )
+        results.update(fresh)
+
+        if dedup and fresh:
+            thread_id = (config or {}).get("configurable", {}).get("thread_id")
+            await arecord_alphas(
+                [a for a in state.coded_alphas if a["alphaID"] in fresh],
+                thread_id,
+                metrics=fresh,
+                version=version,
+            )
+
+        # Index the alphas and results stored since the last sync
+        schedule_retrieval_sync(configuration)
+
+    if not results:
+        return {}
+
+    scored: List[Dict[str, Any]] = []
+    for alpha in state.coded_alphas:
+        if alpha["alphaID"] not in results:
+            continue
+        backtest_results = results[alpha["alphaID"]]
+        scored.append(
+            {
+                "id": alpha["alphaID"],
+                "name": alpha["alphaID"],
+                "description": alpha.get("desc", ""),
+                "expression": alpha.get("expr", ""),
+                "dsl": alpha.get("dsl", ""),
+                "performance": format_performance(backtest_results),
+                "backtest_results": backtest_results,
+            }
+        )
+
+    # Keep the best alphas across iterations, newest version of each id first
+    candidates = {a["id"]: a for a in state.sota_alphas}
+    candidates.update({a["id"]: a for a in scored})
+    sota_alphas = sorted(candidates.values(), key=_sort_key, reverse=True)
+
+    return {
+        "sota_alphas": sota_alphas[: configuration.sota_size],
+        "alpha_history": [history_record(alpha) for alpha in scored],
+    }
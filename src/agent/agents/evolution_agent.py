@@ -0,0 +1,188 @@
+# src/agent/agents/evolution_agent.py
+import asyncio
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.runnables import RunnableConfig
+
+from agent.agents.backtest_agent import _sort_key, format_performance, history_record
+from agent.configuration import Configuration
+from agent.evolution import (
+    EvolutionSettings,
+    FitnessEvaluator,
+    Individual,
+    evolve,
+    get_fitness_evaluator,
+)
+from agent.market_data import data_version
+from agent.retrieval import schedule_retrieval_sync
+from agent.state import State
+
+
+def evolution_seeds(state: State) -> List[str]:
+    """DSL expressions of the seed and SOTA alphas, without duplicates."""
+    seeds = []
+    for alpha in state.seed_alphas:
+        seeds.append(alpha.get("dsl") or alpha.get("expr", ""))
+    for alpha in state.sota_alphas:
+        seeds.append(alpha.get("dsl") or alpha.get("expression", ""))
+    return list(dict.fromkeys(seed for seed in seeds if seed))
+
+
+def _evolve_and_release(
+    seeds: List[str],
+    incumbents: List[str],
+    evaluator: FitnessEvaluator,
+    settings: EvolutionSettings,
+    stop: threading.Event,
+) -> Tuple[List[Individual], List[Optional[Dict[str, Any]]]]:
+    """Run ``evolve`` and score the incumbent SOTA expressions (blocking).
+
+    The incumbents are scored by the same evaluator, so their metrics cover
+    the same training and held-out dates as the hall of fame. The evaluator
+    is shared with concurrent runs, so only its lease is given back, and from
+    the worker thread: a cancelled run stops the search after the current
+    generation, and the evaluator must stay open until then.
+    """
+    try:
+        hall_of_fame = evolve(seeds, evaluator, settings, stop=stop)
+        return hall_of_fame, evaluator.score(incumbents)
+    finally:
+        evaluator.release()
+
+
+def _rank_sota(
+    incumbents: List[Dict[str, Any]],
+    evolved: List[Dict[str, Any]],
+    holdout_metrics: List[Optional[Dict[str, Any]]],
+    size: int,
+) -> List[Dict[str, Any]]:
+    """Rank the incumbent SOTA and evolved alphas on their held-out IR.
+
+    ``holdout_metrics`` are the incumbents' metrics from the fitness
+    evaluator. Incumbents it cannot score (code-only alphas) have no IR on the
+    held-out dates to compare; they stay in the SOTA, listed first, and the
+    others compete for the remaining slots.
+    """
+    holdout_ir: Dict[str, Optional[float]] = {}
+    kept = []
+    for alpha, metrics in zip(incumbents, holdout_metrics):
+        validation = (metrics or {}).get("validation")
+        if validation:
+            holdout_ir[alpha["id"]] = validation.get("information_ratio")
+        else:
+            kept.append(alpha)
+    for alpha in evolved:
+        holdout_ir[alpha["id"]] = alpha["backtest_results"].get("information_ratio")
+
+    candidates = {a["id"]: a for a in incumbents if a["id"] in holdout_ir}
+    candidates.update({a["id"]: a for a in evolved})
+    kept = [a for a in kept if a["id"] not in candidates]
+
+    def key(alpha: Dict[str, Any]) -> float:
+        value = holdout_ir.get(alpha["id"])
+        return value if value is not None else float("-inf")
+
+    ranked = sorted(candidates.values(), key=key, reverse=True)
+    return kept + ranked[: max(0, size - len(kept))]
+
+
+async def evolution_agent(state: State, config: RunnableConfig) -> Dict[str, Any]:
+    """Evolve the seed and SOTA alphas with genetic programming.
+
+    The population is scored in parallel on the shared market panel (see
+    ``agent.evolution``), on all but the latest ``evolution_holdout`` dates.
+    The best evolved alphas compete with the current SOTA alphas on their
+    information ratio over those held-out dates, which the search never saw;
+    the SOTA alphas are scored again on the same dates for the comparison.
+    """
+    configuration = Configuration.from_runnable_config(config)
+    data_path = configuration.market_data_path or os.environ.get("MARKET_DATA_PATH")
+
+    if configuration.evolution_generations <= 0:
+        return {}
+    if not data_path:
+        print("Skipping evolution: no market data configured")
+        return {}
+
+    seeds = evolution_seeds(state)
+    if not seeds:
+        print("Skipping evolution: no seed alphas")
+        return {}
+
+    # Evaluators memoize fitness, so they are scoped to one data version
+    version = await asyncio.to_thread(data_version, data_path)
+    evaluator = await asyncio.to_thread(
+        get_fitness_evaluator,
+        data_path,
+        version,
+        configuration.evolution_workers,
+        configuration.backtest_horizon,
+        configuration.backtest_quantile,
+        configuration.evolution_memo_mb,
+        configuration.evolution_holdout,
+    )
+    settings = EvolutionSettings(
+        population_size=configuration.evolution_population,
+        generations=configuration.evolution_generations,
+        hall_of_fame=configuration.sota_size,
+    )
+    # The search runs in a worker thread; if the run is cancelled (e.g. by a
+    # batch deadline), the thread stops after the current generation
+    stop = threading.Event()
+    try:
+        hall_of_fame, incumbent_metrics = await asyncio.to_thread(
+            _evolve_and_release,
+            seeds,
+            [a.get("dsl") or a.get("expression", "") for a in state.sota_alphas],
+            evaluator,
+            settings,
+            stop,
+        )
+    except asyncio.CancelledError:
+        stop.set()
+        raise
+
+    evolved = []
+    for individual in hall_of_fame:
+        metrics = individual.metrics
+        if configuration.evolution_holdout > 0:
+            # Admission to SOTA is judged on the held-out dates only
+            metrics = metrics.get("validation")
+            if not metrics:
+                continue
+        alpha_id = f"evolved_{individual.digest[:12]}"
+        evolved.append(
+            {
+                "id": alpha_id,
+                "name": alpha_id,
+                "description": (
+                    f"Evolved by genetic programming (generation {individual.generation}) "
+                    f"on market data {version}"
+                ),
+                "expression": individual.expression,
+                "dsl": individual.expression,
+                "origin": "evolution",
+                "performance": format_performance(metrics),
+                "backtest_results": metrics,
+            }
+        )
+    if not evolved:
+        return {}
+    schedule_retrieval_sync(configuration)
+
+    if configuration.evolution_holdout > 0:
+        sota_alphas = _rank_sota(
+            state.sota_alphas, evolved, incumbent_metrics, configuration.sota_size
+        )
+    else:
+        candidates = {a["id"]: a for a in state.sota_alphas}
+        candidates.update({a["id"]: a for a in evolved})
+        sota_alphas = sorted(candidates.values(), key=_sort_key, reverse=True)
+        sota_alphas = sota_alphas[: configuration.sota_size]
+
+    return {
+        "sota_alphas": sota_alphas,
+        "alpha_history": [history_record(alpha) for alpha in evolved],
+    }
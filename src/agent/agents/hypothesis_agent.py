@@ -1,9 +1,12 @@
 # src/agent/agents/hypothesis_agent.py
 from typing import Any, Dict
+import asyncio
 import json
 
 from langchain_core.runnables import RunnableConfig
-from langchain_openai import ChatOpenAI
+from agent.configuration import Configuration
+from agent.llm import get_chat_model
+from agent.retrieval import asearch_prior_attempts, format_prior_attempts
 
 from agent.state import State
 from agent.prompts.hypothesis_prompts import (
@@ -14,19 +17,35 @@ from agent.prompts.hypothesis_prompts import (
 )
 from agent.database.checkpointer_api import get_checkpoint_manager
 
+# Fields of each hypothesis_history record
+HISTORY_FIELDS = (
+    "iteration",
+    "trading_idea",
+    "hypothesis",
+    "reason",
+    "concise_reason",
+    "concise_observation",
+    "concise_justification",
+    "concise_knowledge",
+)
+
 
 async def hypothesis_agent(state: State, config: RunnableConfig) -> Dict[str, Any]:
     """Generate or refine a trading hypothesis."""
 
+    configuration = Configuration.from_runnable_config(config)
+
     # Initialize LLM
-    llm = ChatOpenAI(model="gpt-4o", temperature=0.3)
+    llm = get_chat_model(
+        "hypothesis_generator", configuration, model="gpt-4o", temperature=0.3
+    )
 
-    # Get checkpoint manager
-    checkpointer = get_checkpoint_manager()
+    # Get checkpoint manager (created on first use, which connects to the database)
+    checkpointer = await asyncio.to_thread(get_checkpoint_manager)
 
     # Get latest hypothesis history from checkpointer
     thread_id = config.get("configurable", {}).get("thread_id", "default")
-    hypothesis_history = checkpointer.get_hypothesis_history(thread_id)
+    hypothesis_history = await checkpointer.aget_hypothesis_history(thread_id)
 
     # Determine if this is the first hypothesis or an iteration
     is_first_iteration = not hypothesis_history
@@ -47,13 +66,15 @@ async def hypothesis_agent(state: State, config: RunnableConfig) -> Dict[str, An
 
         if latest_hypothesis and latest_hypothesis.get("id"):
             # Get alphas for this hypothesis
-            alphas = checkpointer.get_alphas_for_hypothesis(latest_hypothesis["id"])
+            alphas = await checkpointer.aget_alphas_for_hypothesis(
+                latest_hypothesis["id"]
+            )
             if alphas:
                 # Get the first alpha
                 alpha_data = alphas[0]
                 # Get backtest results for this alpha
                 if alpha_data and alpha_data.get("id"):
-                    backtest_data = checkpointer.get_backtest_results_for_alpha(
+                    backtest_data = await checkpointer.aget_backtest_results_for_alpha(
                         alpha_data["id"]
                     )
 
@@ -94,6 +115,18 @@ async def hypothesis_agent(state: State, config: RunnableConfig) -> Dict[str, An
         )
         iteration = len(hypothesis_history) + 1
 
+    # Show the most similar attempts from other threads, with their metrics
+    query = state.trading_idea
+    if not is_first_iteration and hypothesis_history[0].get("hypothesis"):
+        query = hypothesis_history[0]["hypothesis"]
+    prior_attempts = format_prior_attempts(
+        await asearch_prior_attempts(
+            query, configuration, kind="hypothesis", exclude_thread=thread_id
+        )
+    )
+    if prior_attempts:
+        user_prompt += "\n\n" + prior_attempts
+
     # Generate hypothesis
     response = await llm.ainvoke(
         [
@@ -117,6 +150,11 @@ async def hypothesis_agent(state: State, config: RunnableConfig) -> Dict[str, An
     hypothesis_data["trading_idea"] = state.trading_idea
     hypothesis_data["iteration"] = iteration
 
+    # Only the new record is written; the history channel is append-only
+    hypothesis_data["hypothesis_history"] = [
+        {key: hypothesis_data.get(key) for key in HISTORY_FIELDS}
+    ]
+
     # The hypothesis is saved automatically via the checkpointer
     # The checkpoint callback in graph.py will handle saving to the database
     # We don't need to explicitly save it here as the checkpointer captures the state
@@ -0,0 +1,20 @@
+"""
+Backtesting package for AlphaGPT
+
+This package contains the vectorized batch backtester used to score alphas.
+"""
+from agent.backtesting.backtester import (
+    METRICS_REVISION,
+    BacktestSettings,
+    batch_backtest,
+    date_labels,
+    forward_returns,
+)
+
+__all__ = [
+    "METRICS_REVISION",
+    "BacktestSettings",
+    "batch_backtest",
+    "date_labels",
+    "forward_returns",
+]
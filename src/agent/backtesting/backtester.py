@@ -0,0 +1,311 @@
+"""
+Vectorized batch backtester for alpha factors
+
+All candidate factors in a batch are scored together as one
+``(factor, date, instrument)`` array against a shared forward-return panel.
+There is no per-factor loop. For each factor it computes the daily rank IC
+and a daily long-short quantile portfolio, plus the summary metrics stored on
+``BacktestResult``.
+
+With forward returns over ``horizon`` periods, consecutive daily returns
+overlap. Return and IR are annualized with ``periods_per_year / horizon``
+holding periods, and the drawdown compounds only non-overlapping returns.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from agent.factors.operators import rank
+
+# Rough ceiling on the size of one (factor, date, instrument) block, in
+# float64 elements; larger batches are processed in chunks of factors, and
+# panels too large for one factor per block in windows of dates.
+_MAX_BLOCK_ELEMENTS = 1 << 26
+
+# Midnight time of day, as numpy and pandas print it
+_MIDNIGHT = re.compile(r"[T ]00:00:00(\.0+)?$")
+
+METRICS_REVISION = 2
+"""Revision of the metric definitions; stored metrics of older revisions are stale"""
+
+
+@dataclass(kw_only=True)
+class BacktestSettings:
+    """Parameters for the long-short quantile backtest"""
+
+    quantile: float = 0.2
+    """Fraction of instruments held long (top) and short (bottom) each day."""
+
+    periods_per_year: int = 252
+    """Number of rebalancing periods per year, used for annualization."""
+
+    horizon: int = 1
+    """Periods covered by each forward return (see ``forward_returns``)."""
+
+    include_series: bool = True
+    """Whether to return the per-date IC, return and turnover series."""
+
+
+def forward_returns(close: np.ndarray, horizon: int = 1) -> np.ndarray:
+    """
+    Simple forward returns over ``horizon`` periods
+
+    Row ``t`` holds the return from ``t`` to ``t + horizon``; the last
+    ``horizon`` rows are NaN.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    out = np.full_like(close, np.nan)
+    if horizon < len(close):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[:-horizon] = close[horizon:] / close[:-horizon] - 1.0
+    out[~np.isfinite(out)] = np.nan
+    return out
+
+
+def _nanmean(x: np.ndarray, axis: int) -> np.ndarray:
+    """Mean ignoring NaNs; NaN (without a warning) for all-NaN slices"""
+    valid = ~np.isnan(x)
+    count = valid.sum(axis=axis)
+    total = np.where(valid, x, 0.0).sum(axis=axis)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, total / np.maximum(count, 1), np.nan)
+
+
+def _nanstd(x: np.ndarray, axis: int) -> np.ndarray:
+    """Sample standard deviation ignoring NaNs"""
+    mean = np.expand_dims(_nanmean(x, axis), axis)
+    valid = ~np.isnan(x)
+    count = valid.sum(axis=axis)
+    squares = np.where(valid, (x - mean) ** 2, 0.0).sum(axis=axis)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 1, np.sqrt(squares / np.maximum(count - 1, 1)), np.nan)
+
+
+def _cross_sectional_corr(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Pearson correlation across the last axis, NaNs already aligned"""
+    xm = x - _nanmean(x, axis=-1)[..., None]
+    ym = y - _nanmean(y, axis=-1)[..., None]
+    cov = np.nansum(xm * ym, axis=-1)
+    denom = np.sqrt(np.nansum(xm * xm, axis=-1) * np.nansum(ym * ym, axis=-1))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        corr = cov / denom
+    counts = (~np.isnan(x)).sum(axis=-1)
+    return np.where((counts > 2) & (denom > 0), corr, np.nan)
+
+
+def _max_drawdown(returns: np.ndarray, horizon: int = 1) -> np.ndarray:
+    """
+    Maximum drawdown of compounded returns along the last axis (negative)
+
+    Returns over ``horizon`` periods overlap, so only every ``horizon``-th one
+    is compounded. Each starting offset gives one such path; the drawdown is
+    averaged over them.
+    """
+    drawdowns = []
+    for offset in range(min(max(1, horizon), max(1, returns.shape[-1]))):
+        wealth = np.cumprod(1.0 + np.nan_to_num(returns[..., offset::horizon]), axis=-1)
+        peak = np.maximum.accumulate(np.maximum(wealth, 1.0), axis=-1)
+        drawdowns.append((wealth / peak - 1.0).min(axis=-1, initial=0.0))
+    return np.mean(drawdowns, axis=0)
+
+
+def _daily_series(
+    factors: np.ndarray,
+    fwd: np.ndarray,
+    fwd_rank: np.ndarray,
+    settings: BacktestSettings,
+    previous: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+    """
+    Daily IC, long-short return and turnover of a ``(k, date, instrument)`` block
+
+    ``previous`` holds the portfolio weights and active flags of the date
+    before the block, for the turnover on its first date when a panel is
+    scored in windows of dates.
+
+    Returns:
+        The ``(k, date)`` IC, return and turnover series, and the weights and
+        active flags of the last date
+    """
+    k, n_dates, n_instruments = factors.shape
+    fwd_valid = np.isfinite(fwd)
+    valid = np.isfinite(factors) & fwd_valid[None]
+    f = np.where(valid, factors, np.nan)
+    r = np.where(valid, fwd[None], np.nan)
+
+    # Ranks on the jointly valid set of each factor, all factors at once.
+    # Forward returns only need re-ranking on dates where a factor is
+    # missing values the returns have.
+    f_rank = rank(f.reshape(k * n_dates, n_instruments)).reshape(f.shape)
+    r_rank = np.repeat(fwd_rank[None], k, axis=0)
+    rerank = (valid != fwd_valid[None]).any(axis=-1) & valid.any(axis=-1)
+    if rerank.any():
+        r_rank[rerank] = rank(r[rerank])
+    r_rank[~valid] = np.nan
+
+    ic = _cross_sectional_corr(f_rank, r_rank)
+
+    # Equal-weighted long top / short bottom quantile portfolios
+    long_leg = f_rank > 1.0 - settings.quantile
+    short_leg = f_rank <= settings.quantile
+    n_long = long_leg.sum(axis=-1)
+    n_short = short_leg.sum(axis=-1)
+    fwd_filled = np.nan_to_num(r)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        weights = long_leg / np.maximum(n_long, 1)[..., None] - short_leg / np.maximum(
+            n_short, 1
+        )[..., None]
+    active = (n_long > 0) & (n_short > 0)
+    weights[~active] = 0.0
+    ls_return = np.where(active, (weights * fwd_filled).sum(axis=-1), np.nan)
+
+    all_weights, all_active = weights, active
+    if previous is not None:
+        all_weights = np.concatenate([previous[0][:, None], weights], axis=1)
+        all_active = np.concatenate([previous[1][:, None], active], axis=1)
+    turnover = np.full((k, n_dates), np.nan)
+    if all_weights.shape[1] > 1:
+        changes = np.abs(np.diff(all_weights, axis=1)).sum(axis=-1) / 2.0
+        changes[~(all_active[:, 1:] & all_active[:, :-1])] = np.nan
+        turnover[:, n_dates - changes.shape[1] :] = changes
+
+    return ic, ls_return, turnover, (weights[:, -1], active[:, -1])
+
+
+def _summarize(
+    ic: np.ndarray,
+    ls_return: np.ndarray,
+    turnover: np.ndarray,
+    settings: BacktestSettings,
+) -> Dict[str, np.ndarray]:
+    """Summary metrics of ``(k, date)`` IC, return and turnover series"""
+    # Holding periods per year; daily returns over longer horizons overlap
+    horizon = max(1, settings.horizon)
+    periods = settings.periods_per_year / horizon
+    mean_return = _nanmean(ls_return, axis=-1)
+    std_return = _nanstd(ls_return, axis=-1)
+    ic_mean = _nanmean(ic, axis=-1)
+    ic_std = _nanstd(ic, axis=-1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        information_ratio = np.where(
+            std_return > 0, mean_return / std_return * np.sqrt(periods), np.nan
+        )
+        icir = np.where(ic_std > 0, ic_mean / ic_std, np.nan)
+
+    return {
+        "ic": ic_mean,
+        "icir": icir,
+        "annualized_return": mean_return * periods,
+        "information_ratio": information_ratio,
+        "max_drawdown": _max_drawdown(ls_return, horizon),
+        "turnover": _nanmean(turnover, axis=-1),
+        "n_periods": (~np.isnan(ls_return)).sum(axis=-1),
+        "ic_series": ic,
+        "return_series": ls_return,
+        "turnover_series": turnover,
+    }
+
+
+def date_labels(dates: Sequence[Any]) -> List[str]:
+    """
+    String labels of dates, with ISO dates (``2020-01-05``) for daily datetimes
+
+    Labels are compared as strings (e.g. to slice stored series by date), so
+    a midnight time of day is dropped: ``"2020-01-05T00:00:00.000000"`` would
+    sort after an inclusive end date ``"2020-01-05"``.
+    """
+    array = np.asarray(dates)
+    if np.issubdtype(array.dtype, np.datetime64):
+        labels = np.datetime_as_string(array).tolist()
+    else:
+        labels = [str(d) for d in dates]
+    return [_MIDNIGHT.sub("", label) for label in labels]
+
+
+def _to_float(value: Any) -> Optional[float]:
+    """Convert a numpy scalar to a JSON-friendly float (None for NaN)"""
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+
+def _series(values: np.ndarray) -> List[Optional[float]]:
+    """Convert a 1-D array to a JSON-friendly list"""
+    return [_to_float(v) for v in values]
+
+
+def batch_backtest(
+    factors: Sequence[np.ndarray],
+    fwd_returns: np.ndarray,
+    settings: Optional[BacktestSettings] = None,
+    dates: Optional[Sequence[Any]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Score many factor panels against shared forward returns
+
+    Args:
+        factors: Sequence of ``(date, instrument)`` factor arrays, or one
+            stacked ``(factor, date, instrument)`` array
+        fwd_returns: ``(date, instrument)`` forward returns aligned with the factors
+        settings: Backtest parameters
+        dates: Optional date labels attached to the returned series
+
+    Returns:
+        One metrics dictionary per factor, in input order, with the keys
+        ``information_ratio``, ``annualized_return``, ``max_drawdown``, ``ic``,
+        ``icir``, ``turnover``, ``n_periods`` and (optionally) ``series``
+    """
+    settings = settings or BacktestSettings()
+    fwd = np.asarray(fwd_returns, dtype=np.float64)
+    if len(factors) == 0:
+        return []
+
+    n_dates, n_instruments = fwd.shape
+    fwd_rank = rank(fwd)
+    labels = date_labels(dates) if dates is not None and settings.include_series else None
+    # Several temporaries of the block size are alive at once
+    rows = max(1, _MAX_BLOCK_ELEMENTS // (8 * max(1, n_instruments)))
+    chunk = max(1, rows // max(1, n_dates))
+    window = min(n_dates, rows)
+
+    results: List[Dict[str, Any]] = []
+    for start in range(0, len(factors), chunk):
+        members = factors[start : start + chunk]
+        series = []
+        previous = None
+        for first in range(0, n_dates, window):
+            last = first + window
+            block = np.stack(
+                [np.asarray(f, dtype=np.float64)[first:last] for f in members]
+            )
+            *daily, previous = _daily_series(
+                block, fwd[first:last], fwd_rank[first:last], settings, previous
+            )
+            series.append(daily)
+        scores = _summarize(
+            *(np.concatenate(parts, axis=1) for parts in zip(*series)), settings
+        )
+
+        for i in range(len(members)):
+            metrics: Dict[str, Any] = {
+                "information_ratio": _to_float(scores["information_ratio"][i]),
+                "annualized_return": _to_float(scores["annualized_return"][i]),
+                "max_drawdown": _to_float(scores["max_drawdown"][i]),
+                "ic": _to_float(scores["ic"][i]),
+                "icir": _to_float(scores["icir"][i]),
+                "turnover": _to_float(scores["turnover"][i]),
+                "n_periods": int(scores["n_periods"][i]),
+            }
+            if settings.include_series:
+                metrics["series"] = {
+                    "dates": labels,
+                    "ic": _series(scores["ic_series"][i]),
+                    "long_short_return": _series(scores["return_series"][i]),
+                    "turnover": _series(scores["turnover_series"][i]),
+                }
+            results.append(metrics)
+
+    return results
@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, fields
-from typing import Optional
+from typing import Optional, Tuple
 
 from langchain_core.runnables import RunnableConfig
 
@@ -13,6 +13,118 @@ class Configuration:
     """The configuration for the agent."""
 
     embedding_model: str = "text-embedding-ada-002"
+    """Embedding model of the retrieval index over past hypotheses and alphas."""
+
+    # Retrieval of similar prior attempts
+    retrieval_index_path: Optional[str] = ".cache/retrieval"
+    """Directory of the FAISS index over past hypotheses and alphas (None disables)."""
+
+    retrieval_top_k: int = 5
+    """Number of similar prior attempts shown to the hypothesis and alpha generators."""
+
+    # Shared LLM client
+    llm_rpm: Optional[int] = 500
+    """Requests per minute allowed per model across all threads (None for no limit)."""
+
+    llm_tpm: Optional[int] = 30_000
+    """Tokens per minute allowed per model across all threads (None for no limit)."""
+
+    llm_max_connections: int = 20
+    """Size of the shared keep-alive HTTP connection pool."""
+
+    llm_max_retries: int = 4
+    """Retries of a failed LLM request (429s wait for the server's reset time)."""
+
+    # LLM response cache
+    llm_cache_backend: Optional[str] = "sqlite"
+    """Where LLM responses are cached: "sqlite", "postgres", or None to disable."""
+
+    llm_cache_path: str = ".cache/llm_cache.sqlite"
+    """Cache file used by the sqlite backend."""
+
+    llm_cache_ttl: Optional[float] = 7 * 24 * 3600
+    """Seconds a cached response stays valid (None keeps responses forever)."""
+
+    llm_cache_max_entries: Optional[int] = 50_000
+    """Least recently used responses are evicted beyond this many entries."""
+
+    llm_cache_max_mb: Optional[float] = 512.0
+    """Least recently used responses are evicted beyond this total size."""
+
+    llm_cache_nodes: Tuple[str, ...] = (
+        "hypothesis_generator",
+        "alpha_generator",
+        "alpha_coder",
+    )
+    """Graph nodes whose LLM calls use the cache."""
+
+    # Alpha generation
+    stream_factors: bool = True
+    """Start coding each factor as soon as the generator has streamed it."""
+
+    dedup_alphas: bool = True
+    """Reuse the code and metrics of alphas whose canonical expression was seen before."""
+
+    # Alpha coder fan-out
+    coder_max_concurrency: int = 5
+    """Maximum number of seed alphas coded concurrently."""
+
+    coder_max_retries: int = 2
+    """Number of retries for a failed alpha coding request."""
+
+    coder_retry_backoff: float = 1.0
+    """Base delay in seconds for exponential backoff between retries."""
+
+    coder_timeout: float = 120.0
+    """Timeout in seconds for a single alpha coding attempt."""
+
+    # Backtesting
+    market_data_path: Optional[str] = None
+    """Market data store (or .npz panel) used for backtests; falls back to MARKET_DATA_PATH."""
+
+    backtest_quantile: float = 0.2
+    """Fraction of instruments in each leg of the long-short portfolio."""
+
+    backtest_horizon: int = 1
+    """Forward return horizon in periods."""
+
+    sota_size: int = 5
+    """Number of best alphas (by information ratio) kept as SOTA."""
+
+    factor_cache_path: Optional[str] = ".cache/factors"
+    """Directory of cached factor panels, keyed by code/expression and data version (None disables)."""
+
+    factor_cache_max_mb: Optional[float] = 2048.0
+    """Least recently used factor panels are evicted beyond this total size."""
+
+    # Genetic programming
+    evolution_generations: int = 0
+    """Generations of genetic programming run on the seed and SOTA alphas (0 disables; opt-in)."""
+
+    evolution_population: int = 200
+    """Number of individuals per generation."""
+
+    evolution_workers: Optional[int] = 2
+    """Worker processes scoring the population, shared by concurrent runs (None uses every core)."""
+
+    evolution_holdout: float = 0.3
+    """Fraction of the latest dates hidden from the search; evolved alphas compete for SOTA on their metrics there."""
+
+    evolution_memo_mb: float = 256.0
+    """Budget of each worker's memo of computed subexpressions, in megabytes."""
+
+    # Execution of generated alpha code in resource-limited worker processes
+    execution_workers: int = 2
+    """Number of warm worker processes running non-DSL alpha code (0 disables)."""
+
+    execution_cpu_seconds: float = 30.0
+    """CPU time limit per alpha execution."""
+
+    execution_wall_seconds: float = 60.0
+    """Wall clock time limit per alpha execution."""
+
+    execution_memory_mb: int = 2048
+    """Memory limit per alpha execution, in megabytes."""
 
     @classmethod
     def from_runnable_config(
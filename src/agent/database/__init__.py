@@ -3,6 +3,10 @@ Database package for AlphaGPT
 
 This package contains modules for database operations and models.
 """
-from agent.database.checkpointer_api import AlphaGPTCheckpointer, get_checkpoint_manager
+from agent.database.checkpointer_api import (
+    AlphaGPTCheckpointer,
+    get_checkpoint_manager,
+    close_checkpoint_manager,
+)
 
-__all__ = ["AlphaGPTCheckpointer", "get_checkpoint_manager"]
+__all__ = ["AlphaGPTCheckpointer", "get_checkpoint_manager", "close_checkpoint_manager"]
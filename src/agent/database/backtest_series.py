@@ -0,0 +1,146 @@
+"""
+Columnar storage of backtest time series
+
+``batch_backtest`` returns per-date ``series`` (dates, IC, long-short return
+and turnover) with every backtest. Kept in the ``backtest_data`` JSON column,
+they made every read of a backtest result load and parse documents that grow
+with the length of the backtest. They are stored in the ``backtest_series``
+table instead (see ``BacktestSeries``), split into chunks of ``CHUNK_SIZE``
+periods, one row per chunk and series:
+
+* values are little-endian ``float64`` arrays (NaN for missing values)
+* ``dates`` are newline-separated labels, daily datetimes as ISO dates
+  (see ``date_labels``)
+
+and every row is compressed with zlib. Rows carry the first and last date of
+their chunk, so a date range is read by loading only the overlapping chunks
+of the requested series. Date labels compare as strings, which orders ISO
+dates (and fixed-width ``YYYYMMDD`` numbers) chronologically.
+"""
+
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from agent.backtesting.backtester import date_labels
+
+CHUNK_SIZE = 256
+"""Periods per stored chunk (about a year of daily data)"""
+
+DATES = "dates"
+"""Name of the date labels among the series"""
+
+COMPRESSION_LEVEL = 6
+
+
+def _encode_values(values: Sequence[Any]) -> bytes:
+    array = np.asarray(
+        [np.nan if v is None else v for v in values], dtype="<f8"
+    )
+    return zlib.compress(array.tobytes(), COMPRESSION_LEVEL)
+
+
+def _encode_labels(labels: Sequence[Any]) -> bytes:
+    labels = [str(label) for label in labels]
+    if any("\n" in label for label in labels):
+        raise ValueError("Date labels cannot contain newlines")
+    return zlib.compress("\n".join(labels).encode(), COMPRESSION_LEVEL)
+
+
+def _decode(name: str, data: bytes) -> np.ndarray:
+    raw = zlib.decompress(data)
+    if name == DATES:
+        return np.array(raw.decode().split("\n"))
+    return np.frombuffer(raw, dtype="<f8")
+
+
+def encode_series(
+    series: Dict[str, Optional[Sequence[Any]]], chunk_size: int = CHUNK_SIZE
+) -> List[Dict[str, Any]]:
+    """
+    Split a ``series`` dictionary into compressed chunk rows
+
+    Args:
+        series: Mapping of series name to per-period values, optionally with
+            the date labels under ``"dates"``; None entries are skipped
+        chunk_size: Periods per chunk
+
+    Returns:
+        Row dictionaries with the ``BacktestSeries`` columns except
+        ``backtest_result_id``
+    """
+    columns = {name: list(values) for name, values in series.items() if values is not None}
+    if DATES in columns:
+        # Also normalizes labels stored by older backtests
+        columns[DATES] = date_labels(columns[DATES])
+    lengths = {len(values) for values in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError(f"Series have different lengths: {sorted(lengths)}")
+    n_periods = lengths.pop() if lengths else 0
+    dates = columns.get(DATES)
+
+    rows = []
+    for chunk, start in enumerate(range(0, n_periods, chunk_size)):
+        stop = min(start + chunk_size, n_periods)
+        for name, values in columns.items():
+            encode = _encode_labels if name == DATES else _encode_values
+            rows.append({
+                "name": name,
+                "chunk": chunk,
+                "start": start,
+                "length": stop - start,
+                "first_date": str(dates[start]) if dates is not None else None,
+                "last_date": str(dates[stop - 1]) if dates is not None else None,
+                "data": encode(values[start:stop]),
+            })
+    return rows
+
+
+def decode_series(
+    rows: Iterable[Any],
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Reassemble series from chunk rows, optionally cut to a date range
+
+    Args:
+        rows: Rows (or row dictionaries) with ``name``, ``chunk`` and ``data``
+        start: First date to keep (inclusive)
+        end: Last date to keep (inclusive)
+
+    Returns:
+        Mapping of series name to array; ``"dates"`` holds string labels
+    """
+    chunks: Dict[str, List[Any]] = {}
+    for row in rows:
+        row = row if isinstance(row, dict) else row._mapping
+        chunks.setdefault(row["name"], []).append((row["chunk"], bytes(row["data"])))
+
+    series = {
+        name: np.concatenate([_decode(name, data) for _, data in sorted(parts)])
+        for name, parts in chunks.items()
+    }
+
+    if (start is not None or end is not None) and series:
+        if DATES not in series:
+            raise ValueError("Slicing by date needs the dates series")
+        dates = series[DATES]
+        first = np.searchsorted(dates, start, side="left") if start is not None else 0
+        last = np.searchsorted(dates, end, side="right") if end is not None else len(dates)
+        series = {name: values[first:last] for name, values in series.items()}
+
+    return series
+
+
+def series_to_lists(series: Dict[str, np.ndarray]) -> Dict[str, List[Any]]:
+    """JSON-friendly form of decoded series (None for NaN), as ``batch_backtest`` returns them"""
+    return {
+        name: (
+            values.tolist()
+            if name == DATES
+            else [float(v) if np.isfinite(v) else None for v in values]
+        )
+        for name, values in series.items()
+    }
@@ -0,0 +1,229 @@
+"""
+Checkpoint serializer that offloads large payloads
+
+Every checkpoint that changes ``coded_alphas`` or ``sota_alphas`` would
+otherwise re-serialize the generated ``code`` of every alpha and the per-date
+backtest ``series``. ``OffloadingSerializer`` wraps LangGraph's serializer.
+Before a value is serialized, every dictionary entry under one of
+``OFFLOAD_KEYS`` whose serialized form is at least ``min_bytes`` long is
+moved to a content-addressed payload store and replaced by
+``{"__payload__": digest}``. Loading reverses this with one store lookup per
+value.
+
+Payloads are keyed by the SHA-256 of their serialized bytes. Code that is
+unchanged between checkpoints, or shared by threads, is therefore stored
+once, and a checkpoint only carries a 64-character reference.
+"""
+
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from agent.database.operations.payload_operations import get_payloads, save_payloads
+
+Payload = Tuple[str, bytes]
+
+OFFLOAD_KEYS: Tuple[str, ...] = ("code", "series")
+"""Dictionary keys whose values are offloaded when large"""
+
+REFERENCE_KEY = "__payload__"
+"""Key of the dictionaries that replace offloaded values"""
+
+
+def payload_digest(payload: Payload) -> str:
+    """Content address of a serialized value"""
+    type_, data = payload
+    return hashlib.sha256(type_.encode() + b"\0" + data).hexdigest()
+
+
+def _is_reference(value: Any) -> bool:
+    return isinstance(value, dict) and len(value) == 1 and REFERENCE_KEY in value
+
+
+class MemoryPayloadStore:
+    """Payload store kept in process memory (for tests and ``MemorySaver``)"""
+
+    def __init__(self) -> None:
+        self._payloads: Dict[str, Payload] = {}
+        self._lock = threading.Lock()
+
+    def put(self, payloads: Dict[str, Payload]) -> None:
+        """Store payloads; digests already stored are ignored"""
+        with self._lock:
+            for digest, payload in payloads.items():
+                self._payloads.setdefault(digest, payload)
+
+    def get(self, digests: Iterable[str]) -> Dict[str, Payload]:
+        """Payloads of the stored digests"""
+        with self._lock:
+            return {d: self._payloads[d] for d in digests if d in self._payloads}
+
+    def __len__(self) -> int:
+        return len(self._payloads)
+
+
+class DatabasePayloadStore:
+    """Payload store in the ``checkpoint_payloads`` table
+
+    Recently written or read payloads are remembered in process, so a payload
+    that reappears in the next checkpoint costs neither an insert nor a read.
+    A payload is offered to the table again once its last write is older than
+    ``touch_after`` seconds, which keeps its ``last_used_at`` recent while it
+    is in use.
+
+    Args:
+        cache_bytes: Size of the in-process LRU cache of payloads
+        touch_after: Seconds after which a remembered payload is written again
+    """
+
+    def __init__(
+        self, cache_bytes: int = 64 * 1024 * 1024, touch_after: float = 3600.0
+    ) -> None:
+        self.cache_bytes = cache_bytes
+        self.touch_after = touch_after
+        self._cache: "OrderedDict[str, Payload]" = OrderedDict()
+        self._cached_bytes = 0
+        # Time of the last write of each cached payload
+        self._written: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _remember(self, digest: str, payload: Payload) -> None:
+        if digest in self._cache:
+            self._cache.move_to_end(digest)
+            return
+        self._cache[digest] = payload
+        self._cached_bytes += len(payload[1])
+        while self._cached_bytes > self.cache_bytes and self._cache:
+            evicted_digest, evicted = self._cache.popitem(last=False)
+            self._cached_bytes -= len(evicted[1])
+            self._written.pop(evicted_digest, None)
+
+    def put(self, payloads: Dict[str, Payload]) -> None:
+        """Store payloads not written recently by this process"""
+        now = time.monotonic()
+        with self._lock:
+            new = {
+                d: p
+                for d, p in payloads.items()
+                if now - self._written.get(d, -math.inf) >= self.touch_after
+            }
+        if new:
+            save_payloads(new)
+        with self._lock:
+            for digest, payload in payloads.items():
+                self._remember(digest, payload)
+            for digest in new:
+                if digest in self._cache:
+                    self._written[digest] = now
+
+    def get(self, digests: Iterable[str]) -> Dict[str, Payload]:
+        """Payloads of the stored digests, from the cache or with one query"""
+        digests = set(digests)
+        found: Dict[str, Payload] = {}
+        with self._lock:
+            for digest in digests:
+                if digest in self._cache:
+                    self._cache.move_to_end(digest)
+                    found[digest] = self._cache[digest]
+        missing = [d for d in digests if d not in found]
+        if missing:
+            loaded = get_payloads(missing)
+            with self._lock:
+                for digest, payload in loaded.items():
+                    self._remember(digest, payload)
+            found.update(loaded)
+        return found
+
+
+class OffloadingSerializer(SerializerProtocol):
+    """Serializer storing large values by reference
+
+    Args:
+        store: Payload store (``put``/``get`` of ``{digest: (type, bytes)}``)
+        serde: Serializer of values and payloads (LangGraph's default if None)
+        keys: Dictionary keys whose values may be offloaded
+        min_bytes: Serialized size from which a value is offloaded
+    """
+
+    def __init__(
+        self,
+        store: Any,
+        serde: Optional[SerializerProtocol] = None,
+        keys: Iterable[str] = OFFLOAD_KEYS,
+        min_bytes: int = 256,
+    ) -> None:
+        self.store = store
+        self.serde = serde or JsonPlusSerializer()
+        self.keys = frozenset(keys)
+        self.min_bytes = min_bytes
+
+    def _offload(self, value: Any, payloads: Dict[str, Payload]) -> Any:
+        if isinstance(value, dict):
+            result = {}
+            for key, item in value.items():
+                if key in self.keys and item is not None and not _is_reference(item):
+                    payload = self.serde.dumps_typed(item)
+                    if len(payload[1]) >= self.min_bytes:
+                        digest = payload_digest(payload)
+                        payloads[digest] = payload
+                        result[key] = {REFERENCE_KEY: digest}
+                        continue
+                result[key] = self._offload(item, payloads)
+            return result
+        if isinstance(value, list):
+            return [self._offload(item, payloads) for item in value]
+        if type(value) is tuple:
+            return tuple(self._offload(item, payloads) for item in value)
+        return value
+
+    def _references(self, value: Any, found: set) -> None:
+        if _is_reference(value):
+            found.add(value[REFERENCE_KEY])
+        elif isinstance(value, dict):
+            for item in value.values():
+                self._references(item, found)
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                self._references(item, found)
+
+    def _restore(self, value: Any, payloads: Dict[str, Payload]) -> Any:
+        if _is_reference(value):
+            digest = value[REFERENCE_KEY]
+            if digest not in payloads:
+                raise ValueError(f"Checkpoint payload {digest} is missing")
+            return self.serde.loads_typed(payloads[digest])
+        if isinstance(value, dict):
+            return {key: self._restore(item, payloads) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._restore(item, payloads) for item in value]
+        if type(value) is tuple:
+            return tuple(self._restore(item, payloads) for item in value)
+        return value
+
+    def references(self, data: Tuple[str, bytes]) -> set:
+        """Digests of the payloads referenced by a serialized value"""
+        digests: set = set()
+        self._references(self.serde.loads_typed(data), digests)
+        return digests
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        payloads: Dict[str, Payload] = {}
+        stripped = self._offload(obj, payloads)
+        if payloads:
+            # Payloads are written before the checkpoint that references them
+            self.store.put(payloads)
+        return self.serde.dumps_typed(stripped)
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        value = self.serde.loads_typed(data)
+        digests: set = set()
+        self._references(value, digests)
+        if not digests:
+            return value
+        return self._restore(value, self.store.get(digests))
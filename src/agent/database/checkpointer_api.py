@@ -5,33 +5,142 @@ This file serves as the main interface for the checkpointing system in AlphaGPT.
 It provides a clean API for integrating with LangGraph and working with the database.
 """
 
+import asyncio
+import atexit
 import os
-from typing import Dict, Any, List, Optional, Union
+import threading
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional, Sequence, Union
 
+import numpy as np
+from psycopg.rows import dict_row
+from psycopg_pool import ConnectionPool
 from langgraph.checkpoint.postgres import PostgresSaver
 from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
-from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.base import BaseCheckpointSaver, CheckpointTuple
 from langchain_core.runnables import RunnableConfig
-
-from agent.database.operations.db_connection import get_db_engine, create_tables
+from sqlalchemy.orm import Session
+
+from agent.database.checkpoint_serde import DatabasePayloadStore, OffloadingSerializer
+from agent.database.retention import (
+    CheckpointRetention,
+    RetentionJob,
+    RetentionPolicy,
+    RetentionReport,
+)
+from agent.database.operations.db_connection import (
+    get_db_engine,
+    create_tables,
+    dispose_db_engine,
+    get_session_factory,
+    get_async_session_factory,
+)
 from agent.database.operations.hypothesis_operations import (
     save_hypothesis,
     get_hypothesis_history,
+    aget_hypothesis_history,
 )
 from agent.database.operations.alpha_operations import (
     save_alphas,
+    save_evolved_alphas,
     get_alphas_for_hypothesis,
+    aget_alphas_for_hypothesis,
 )
 from agent.database.operations.backtest_operations import (
     save_backtest_results,
     get_backtest_results_for_alpha,
+    aget_backtest_results_for_alpha,
+    get_backtest_series,
+    aget_backtest_series,
 )
 
 from agent.database.operations.db_connection import (
     get_db_url,
     get_db_connection_params,
+    get_db_pool_params,
 )
 
+_checkpoint_manager = None
+_checkpoint_manager_lock = threading.Lock()
+
+
+def _save_state_rows(
+    session: Session,
+    thread_id: str,
+    checkpoint_id: str,
+    state_values: Dict[str, Any],
+) -> None:
+    """Write hypothesis, alphas and backtest results using one session"""
+    # Save hypothesis first
+    hypothesis = save_hypothesis(thread_id, checkpoint_id, state_values, session=session)
+
+    # Save alphas if we have a hypothesis; evolved SOTA alphas need a row
+    # before their backtest results can be saved
+    if hypothesis:
+        save_alphas(
+            thread_id, checkpoint_id, state_values, hypothesis.id, session=session
+        )
+        save_evolved_alphas(
+            thread_id, checkpoint_id, state_values, hypothesis.id, session=session
+        )
+
+    # Save backtest results
+    save_backtest_results(thread_id, checkpoint_id, state_values, session=session)
+
+
+def _schedule_index_sync(config: RunnableConfig) -> None:
+    """Let the retrieval index pick up the rows just written (in the background)"""
+    from agent.configuration import Configuration
+    from agent.retrieval import schedule_retrieval_sync
+
+    schedule_retrieval_sync(Configuration.from_runnable_config(config))
+
+
+class PooledPostgresSaver(PostgresSaver):
+    """
+    PostgresSaver that also serves the async graph API (``ainvoke``/``astream``)
+
+    The sync saver only implements the blocking methods; the async ones it
+    inherits raise NotImplementedError. Its connections come from a thread-safe
+    pool, so the async methods run the blocking ones in worker threads.
+    """
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        # The cursor cannot cross threads, so the listing is read in one go
+        checkpoints = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for checkpoint in checkpoints:
+            yield checkpoint
+
+    async def aput(self, config, checkpoint, metadata, new_versions) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path: str = "") -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    async def aprune(self, thread_ids: Sequence[str], *, strategy: str = "keep_latest") -> None:
+        await asyncio.to_thread(self.prune, thread_ids, strategy=strategy)
+
+    async def aget_delta_channel_history(
+        self, *, config: RunnableConfig, channels: Sequence[str]
+    ) -> Mapping[str, Any]:
+        return await asyncio.to_thread(
+            self.get_delta_channel_history, config=config, channels=channels
+        )
+
 
 class AlphaGPTCheckpointer:
     """
@@ -46,24 +155,55 @@ class AlphaGPTCheckpointer:
         Args:
             postgres_saver: The LangGraph PostgreSQL saver to use
         """
+        self._pool: Optional[ConnectionPool] = None
+        self._retention_job: Optional[RetentionJob] = None
         self.postgres_saver = postgres_saver or self._create_postgres_saver()
         self.engine = get_db_engine()
 
-        # Ensure tables exist
-        create_tables(self.engine)
+        # Ensure tables exist (checked once per process)
+        create_tables()
 
     def _create_postgres_saver(self) -> PostgresSaver:
-        """Create a PostgresSaver instance for LangGraph"""
+        """Create a PostgresSaver instance for LangGraph backed by a connection pool"""
         # Get database URL from centralized function
         db_url = get_db_url()
 
         # Get individual parameters for error reporting
         db_params = get_db_connection_params()
+        pool_params = get_db_pool_params()
 
         try:
-            # Try newer LangGraph versions API
-            return PostgresSaver.from_conn_string(db_url)
+            self._pool = ConnectionPool(
+                conninfo=db_url,
+                min_size=1,
+                max_size=pool_params["pool_size"] + pool_params["max_overflow"],
+                # pool_recycle bounds a connection's age, as for the engine;
+                # idle connections above min_size close sooner
+                max_lifetime=pool_params["pool_recycle"],
+                max_idle=float(os.environ.get("POSTGRES_POOL_MAX_IDLE", "600")),
+                timeout=pool_params["pool_timeout"],
+                check=ConnectionPool.check_connection
+                if pool_params["pool_pre_ping"]
+                else None,
+                kwargs={
+                    "autocommit": True,
+                    "prepare_threshold": 0,
+                    "row_factory": dict_row,
+                },
+                open=True,
+            )
+            # Code and backtest series go to the content-addressed payload
+            # table; checkpoints only hold references to them
+            saver = PooledPostgresSaver(
+                self._pool, serde=OffloadingSerializer(DatabasePayloadStore())
+            )
+            saver.setup()
+            return saver
         except Exception as e:
+            if self._pool is not None:
+                self._pool.close()
+                self._pool = None
+
             # Last resort fallback
             from langgraph.checkpoint.memory import MemorySaver
 
@@ -85,10 +225,93 @@ class AlphaGPTCheckpointer:
         """Return the underlying PostgreSQL saver for LangGraph"""
         return self.postgres_saver
 
+    def close(self) -> None:
+        """Stop the retention job and close the connection pool owned by this checkpointer"""
+        if self._retention_job is not None:
+            self._retention_job.stop()
+            self._retention_job = None
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+
+    def _retention(self, policy: Optional[RetentionPolicy]) -> Optional[CheckpointRetention]:
+        """Retention over the checkpoint tables, if checkpoints are in PostgreSQL"""
+        if not isinstance(self.postgres_saver, PostgresSaver):
+            print("Checkpoint retention is only available with the PostgreSQL saver")
+            return None
+        return CheckpointRetention(policy, engine=self.engine)
+
+    def retention_report(
+        self,
+        policy: Optional[RetentionPolicy] = None,
+        thread_ids: Optional[List[str]] = None,
+    ) -> RetentionReport:
+        """
+        Report what a compaction would delete, without deleting anything
+
+        Args:
+            policy: Retention policy (the defaults if None)
+            thread_ids: Threads to report on (all threads if None)
+
+        Returns:
+            Dry-run report, including the reclaimable size
+        """
+        retention = self._retention(policy)
+        if retention is None:
+            return RetentionReport(dry_run=True)
+        return retention.run(thread_ids, dry_run=True)
+
+    def compact_checkpoints(
+        self,
+        policy: Optional[RetentionPolicy] = None,
+        thread_ids: Optional[List[str]] = None,
+    ) -> RetentionReport:
+        """
+        Delete the checkpoints the policy does not keep, in short batches
+
+        Args:
+            policy: Retention policy (the defaults if None)
+            thread_ids: Threads to compact (all threads if None)
+
+        Returns:
+            Report of what was deleted
+        """
+        retention = self._retention(policy)
+        if retention is None:
+            return RetentionReport()
+        return retention.run(thread_ids)
+
+    def start_retention(
+        self,
+        policy: Optional[RetentionPolicy] = None,
+        interval_seconds: float = 3600.0,
+    ) -> Optional[RetentionJob]:
+        """
+        Compact checkpoints periodically in a background thread
+
+        Args:
+            policy: Retention policy (the defaults if None)
+            interval_seconds: Time between compactions
+
+        Returns:
+            The running job, or None if checkpoints are not in PostgreSQL
+        """
+        if self._retention_job is not None:
+            return self._retention_job
+        retention = self._retention(policy)
+        if retention is None:
+            return None
+        self._retention_job = RetentionJob(retention, interval_seconds).start()
+        return self._retention_job
+
     def save_state(self, config: RunnableConfig, state_values: Dict[str, Any]) -> None:
         """
         Save all state data to our custom database tables
 
+        Hypothesis, alphas and backtest results are written in one
+        transaction, with one bulk statement per table. The retrieval index
+        then embeds the new rows in the background.
+
         Args:
             config: LangGraph config
             state_values: The current state values
@@ -99,15 +322,36 @@ class AlphaGPTCheckpointer:
         if not thread_id or not checkpoint_id:
             return
 
-        # Save hypothesis first
-        hypothesis = save_hypothesis(thread_id, checkpoint_id, state_values)
+        with get_session_factory().begin() as session:
+            _save_state_rows(session, thread_id, checkpoint_id, state_values)
+
+        _schedule_index_sync(config)
+
+    async def asave_state(
+        self, config: RunnableConfig, state_values: Dict[str, Any]
+    ) -> None:
+        """
+        Save all state data to our custom database tables without blocking the event loop
 
-        # Save alphas if we have a hypothesis
-        if hypothesis:
-            save_alphas(thread_id, checkpoint_id, state_values, hypothesis.id)
+        The synchronous save functions run inside a single async session,
+        so hypothesis, alphas and backtest results commit together.
 
-        # Save backtest results
-        save_backtest_results(thread_id, checkpoint_id, state_values)
+        Args:
+            config: LangGraph config
+            state_values: The current state values
+        """
+        thread_id = config.get("configurable", {}).get("thread_id")
+        checkpoint_id = config.get("configurable", {}).get("checkpoint_id")
+
+        if not thread_id or not checkpoint_id:
+            return
+
+        async with get_async_session_factory().begin() as session:
+            await session.run_sync(
+                _save_state_rows, thread_id, checkpoint_id, state_values
+            )
+
+        _schedule_index_sync(config)
 
     def get_hypothesis_history(self, thread_id: str) -> List[Dict[str, Any]]:
         """
@@ -145,13 +389,128 @@ class AlphaGPTCheckpointer:
         """
         return get_backtest_results_for_alpha(alpha_id)
 
+    def get_backtest_series(
+        self,
+        backtest_result_id: int,
+        names: Optional[Sequence[str]] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Get the per-date series of a backtest result, optionally a date range
+
+        Args:
+            backtest_result_id: The backtest result ID to query
+            names: Series to load (all if None)
+            start: First date to include (inclusive)
+            end: Last date to include (inclusive)
+
+        Returns:
+            Mapping of series name to array
+        """
+        return get_backtest_series(backtest_result_id, names, start, end)
+
+    async def aget_hypothesis_history(self, thread_id: str) -> List[Dict[str, Any]]:
+        """
+        Get the history of hypotheses for a thread (async)
+
+        Args:
+            thread_id: The thread ID to query
+
+        Returns:
+            List of hypothesis dictionaries
+        """
+        return await aget_hypothesis_history(thread_id)
+
+    async def aget_alphas_for_hypothesis(
+        self, hypothesis_id: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Get all alphas for a specific hypothesis (async)
+
+        Args:
+            hypothesis_id: The hypothesis ID to query
+
+        Returns:
+            List of alpha dictionaries
+        """
+        return await aget_alphas_for_hypothesis(hypothesis_id)
+
+    async def aget_backtest_results_for_alpha(
+        self, alpha_id: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Get all backtest results for a specific alpha (async)
+
+        Args:
+            alpha_id: The alpha ID to query
+
+        Returns:
+            List of backtest result dictionaries
+        """
+        return await aget_backtest_results_for_alpha(alpha_id)
+
+    async def aget_backtest_series(
+        self,
+        backtest_result_id: int,
+        names: Optional[Sequence[str]] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Get the per-date series of a backtest result (async)
+
+        Args:
+            backtest_result_id: The backtest result ID to query
+            names: Series to load (all if None)
+            start: First date to include (inclusive)
+            end: Last date to include (inclusive)
+
+        Returns:
+            Mapping of series name to array
+        """
+        return await aget_backtest_series(backtest_result_id, names, start, end)
+
 
 def get_checkpoint_manager() -> AlphaGPTCheckpointer:
     """
-    Create and return an AlphaGPT checkpointer instance.
+    Return the process-wide AlphaGPT checkpointer, creating it on first use.
     This manages both LangGraph checkpointing and our custom data storage.
 
     Returns:
         AlphaGPTCheckpointer instance
     """
-    return AlphaGPTCheckpointer()
+    global _checkpoint_manager
+
+    if _checkpoint_manager is None:
+        with _checkpoint_manager_lock:
+            if _checkpoint_manager is None:
+                _checkpoint_manager = AlphaGPTCheckpointer()
+                # Background compaction is opt-in, e.g. CHECKPOINT_RETENTION_INTERVAL=3600
+                interval = float(os.environ.get("CHECKPOINT_RETENTION_INTERVAL", "0"))
+                if interval > 0:
+                    keep_last = int(os.environ.get("CHECKPOINT_RETENTION_KEEP_LAST", "20"))
+                    _checkpoint_manager.start_retention(
+                        RetentionPolicy(keep_last=keep_last), interval
+                    )
+
+    return _checkpoint_manager
+
+
+def close_checkpoint_manager() -> None:
+    """
+    Close the process-wide checkpointer and dispose of the shared engine.
+
+    Registered with ``atexit``; safe to call more than once.
+    """
+    global _checkpoint_manager
+
+    with _checkpoint_manager_lock:
+        if _checkpoint_manager is not None:
+            _checkpoint_manager.close()
+            _checkpoint_manager = None
+
+    dispose_db_engine()
+
+
+atexit.register(close_checkpoint_manager)
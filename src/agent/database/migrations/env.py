@@ -0,0 +1,78 @@
+"""
+Alembic environment of the AlphaGPT database
+
+Runs from the ``alembic`` command line (see ``alembic.ini``) and from
+``agent.database.operations.db_connection.upgrade_database``, which passes an
+open connection in ``config.attributes["connection"]``. The database URL
+comes from the ``POSTGRES_*`` environment variables unless
+``sqlalchemy.url`` is set.
+"""
+import os
+
+from alembic import context
+from sqlalchemy import create_engine, text
+
+# Importing the agent package builds the graph; from the command line it must
+# not open the checkpointer, which would start a second, nested upgrade
+if not context.config.attributes.get("connection"):
+    os.environ.setdefault("USE_POSTGRES_CHECKPOINT", "false")
+
+from agent.database.models import Base  # noqa: E402
+from agent.database.operations.db_connection import (  # noqa: E402
+    MIGRATION_LOCK_KEY,
+    get_db_url,
+)
+
+config = context.config
+target_metadata = Base.metadata
+
+
+def include_object(obj, name, type_, reflected, compare_to) -> bool:
+    """Leave tables the models do not define (the LangGraph checkpoint tables) alone"""
+    table = name if type_ == "table" else getattr(getattr(obj, "table", None), "name", None)
+    return not reflected or table is None or table in target_metadata.tables
+
+
+def run_migrations_offline() -> None:
+    """Emit the migration SQL without connecting to the database"""
+    context.configure(
+        url=config.get_main_option("sqlalchemy.url") or get_db_url(),
+        target_metadata=target_metadata,
+        include_object=include_object,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def _run_with_connection(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_object=include_object,
+    )
+    with context.begin_transaction():
+        connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """Apply the migrations over a live connection"""
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run_with_connection(connection)
+        return
+
+    engine = create_engine(config.get_main_option("sqlalchemy.url") or get_db_url())
+    try:
+        with engine.connect() as connection:
+            _run_with_connection(connection)
+    finally:
+        engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,85 @@
+"""Baseline schema
+
+The three tables as ``Base.metadata.create_all`` created them in the first
+release, before migrations were introduced. ``upgrade_database`` stamps
+databases created that way with this revision instead of running it; the
+later revisions add everything else.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "hypotheses",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("thread_id", sa.String(), nullable=False),
+        sa.Column("checkpoint_id", sa.String(), nullable=False),
+        sa.Column("trading_idea", sa.String(), nullable=False),
+        sa.Column("hypothesis", sa.String(), nullable=False),
+        sa.Column("reason", sa.String(), nullable=True),
+        sa.Column("concise_reason", sa.String(), nullable=True),
+        sa.Column("concise_observation", sa.String(), nullable=True),
+        sa.Column("concise_justification", sa.String(), nullable=True),
+        sa.Column("concise_knowledge", sa.String(), nullable=True),
+        sa.Column("iteration", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_hypotheses_thread_id", "hypotheses", ["thread_id"])
+
+    op.create_table(
+        "alphas",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("thread_id", sa.String(), nullable=False),
+        sa.Column("checkpoint_id", sa.String(), nullable=False),
+        sa.Column("hypothesis_id", sa.Integer(), nullable=False),
+        sa.Column("alpha_id", sa.String(), nullable=False),
+        sa.Column("expression", sa.String(), nullable=True),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.Column("code", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["hypothesis_id"], ["hypotheses.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_alphas_thread_id", "alphas", ["thread_id"])
+
+    op.create_table(
+        "backtest_results",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("thread_id", sa.String(), nullable=False),
+        sa.Column("checkpoint_id", sa.String(), nullable=False),
+        sa.Column("alpha_id", sa.Integer(), nullable=False),
+        sa.Column("is_sota", sa.Boolean(), nullable=True),
+        sa.Column("information_ratio", sa.Float(), nullable=True),
+        sa.Column("annualized_return", sa.Float(), nullable=True),
+        sa.Column("max_drawdown", sa.Float(), nullable=True),
+        sa.Column("ic", sa.Float(), nullable=True),
+        sa.Column("backtest_data", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["alpha_id"], ["alphas.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_backtest_results_thread_id", "backtest_results", ["thread_id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("backtest_results")
+    op.drop_table("alphas")
+    op.drop_table("hypotheses")
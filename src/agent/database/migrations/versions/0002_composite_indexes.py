@@ -0,0 +1,191 @@
+"""Unique alphas and backtest results, cache tables and composite indexes
+
+Adds what the schema gained after the baseline release:
+
+* the unique constraints ``uq_alphas_hypothesis_alpha`` and
+  ``uq_backtest_results_alpha_checkpoint`` the upserts rely on. Before
+  them, every save inserted new rows. Duplicate alphas are merged into
+  their latest row, which takes over their backtest results, and only the
+  latest backtest result of an alpha per checkpoint is kept.
+* the ``llm_cache``, ``alpha_fingerprints`` and ``checkpoint_payloads`` tables
+
+Databases that ``create_all`` built between the baseline release and the
+introduction of migrations may already have some of these; what exists is
+left alone.
+
+It also replaces the single-column ``thread_id`` indexes of hypotheses and alphas
+with composite indexes that lead with ``thread_id``:
+
+* ``hypotheses (thread_id, checkpoint_id, iteration)`` for the lookup of the
+  hypothesis saved at a checkpoint
+* ``hypotheses (thread_id, iteration)`` for thread history, which is ordered
+  by iteration, and for the latest iteration of a thread
+* ``alphas (thread_id, alpha_id)`` for the latest row of an alpha in a thread
+
+Alphas by ``hypothesis_id`` (and ``(hypothesis_id, alpha_id)``) and backtest
+results by ``alpha_id`` are already served by the indexes of the unique
+constraints ``uq_alphas_hypothesis_alpha`` and
+``uq_backtest_results_alpha_checkpoint``, which lead with those columns.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Alphas saved again under the same hypothesis, with their latest row
+DUPLICATE_ALPHAS = """
+    SELECT id, keeper FROM (
+        SELECT id, max(id) OVER (PARTITION BY hypothesis_id, alpha_id) AS keeper
+        FROM alphas
+    ) AS ranked
+    WHERE id <> keeper
+"""
+
+# Backtest results saved again for the same alpha and checkpoint
+DUPLICATE_RESULTS = """
+    SELECT id FROM (
+        SELECT id, max(id) OVER (PARTITION BY alpha_id, checkpoint_id) AS keeper
+        FROM backtest_results
+    ) AS ranked
+    WHERE id <> keeper
+"""
+
+
+class _Schema:
+    """What the database already has; offline, everything is missing"""
+
+    def __init__(self) -> None:
+        self.inspector = None if context.is_offline_mode() else sa.inspect(op.get_bind())
+
+    def has_table(self, table: str) -> bool:
+        return self.inspector is not None and self.inspector.has_table(table)
+
+    def has_unique(self, table: str, name: str) -> bool:
+        return self.inspector is not None and any(
+            c["name"] == name for c in self.inspector.get_unique_constraints(table)
+        )
+
+    def has_index(self, table: str, name: str) -> bool:
+        if self.inspector is None:
+            return name.endswith("_thread_id")  # created by the baseline
+        return any(i["name"] == name for i in self.inspector.get_indexes(table))
+
+
+def _create_cache_tables(schema: _Schema) -> None:
+    if not schema.has_table("llm_cache"):
+        op.create_table(
+            "llm_cache",
+            sa.Column("key", sa.String(length=64), nullable=False),
+            sa.Column("value", sa.Text(), nullable=False),
+            sa.Column("size", sa.Integer(), nullable=False),
+            sa.Column("hits", sa.Integer(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("accessed_at", sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint("key"),
+        )
+        op.create_index("ix_llm_cache_accessed_at", "llm_cache", ["accessed_at"])
+
+    if not schema.has_table("alpha_fingerprints"):
+        op.create_table(
+            "alpha_fingerprints",
+            sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+            sa.Column("fingerprint", sa.String(length=64), nullable=False),
+            sa.Column("canonical", sa.Text(), nullable=False),
+            sa.Column("kind", sa.String(length=8), nullable=False),
+            sa.Column("thread_id", sa.String(), nullable=True),
+            sa.Column("alpha_id", sa.String(), nullable=True),
+            sa.Column("expression", sa.Text(), nullable=True),
+            sa.Column("code", sa.Text(), nullable=True),
+            sa.Column("metrics", sa.JSON(), nullable=True),
+            sa.Column("metrics_version", sa.String(), nullable=True),
+            sa.Column("hits", sa.Integer(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index(
+            "ix_alpha_fingerprints_fingerprint",
+            "alpha_fingerprints",
+            ["fingerprint"],
+            unique=True,
+        )
+
+    if not schema.has_table("checkpoint_payloads"):
+        op.create_table(
+            "checkpoint_payloads",
+            sa.Column("digest", sa.String(length=64), nullable=False),
+            sa.Column("type", sa.String(length=32), nullable=False),
+            sa.Column("data", sa.LargeBinary(), nullable=False),
+            sa.Column("size", sa.Integer(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("last_used_at", sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint("digest"),
+        )
+        op.create_index(
+            "ix_checkpoint_payloads_last_used_at", "checkpoint_payloads", ["last_used_at"]
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    schema = _Schema()
+
+    if not schema.has_unique("alphas", "uq_alphas_hypothesis_alpha"):
+        op.execute(f"""
+            UPDATE backtest_results SET alpha_id = d.keeper
+            FROM ({DUPLICATE_ALPHAS}) AS d WHERE backtest_results.alpha_id = d.id
+        """)
+        op.execute(f"DELETE FROM alphas WHERE id IN (SELECT id FROM ({DUPLICATE_ALPHAS}) AS d)")
+        op.create_unique_constraint(
+            "uq_alphas_hypothesis_alpha", "alphas", ["hypothesis_id", "alpha_id"]
+        )
+    if not schema.has_unique("backtest_results", "uq_backtest_results_alpha_checkpoint"):
+        op.execute(f"DELETE FROM backtest_results WHERE id IN ({DUPLICATE_RESULTS})")
+        op.create_unique_constraint(
+            "uq_backtest_results_alpha_checkpoint",
+            "backtest_results",
+            ["alpha_id", "checkpoint_id"],
+        )
+    _create_cache_tables(schema)
+
+    op.create_index(
+        "ix_hypotheses_thread_checkpoint_iteration",
+        "hypotheses",
+        ["thread_id", "checkpoint_id", "iteration"],
+    )
+    op.create_index("ix_hypotheses_thread_iteration", "hypotheses", ["thread_id", "iteration"])
+    if schema.has_index("hypotheses", "ix_hypotheses_thread_id"):
+        op.drop_index("ix_hypotheses_thread_id", table_name="hypotheses")
+
+    op.create_index("ix_alphas_thread_alpha", "alphas", ["thread_id", "alpha_id"])
+    if schema.has_index("alphas", "ix_alphas_thread_id"):
+        op.drop_index("ix_alphas_thread_id", table_name="alphas")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index("ix_alphas_thread_id", "alphas", ["thread_id"])
+    op.drop_index("ix_alphas_thread_alpha", table_name="alphas")
+
+    op.create_index("ix_hypotheses_thread_id", "hypotheses", ["thread_id"])
+    op.drop_index("ix_hypotheses_thread_iteration", table_name="hypotheses")
+    op.drop_index("ix_hypotheses_thread_checkpoint_iteration", table_name="hypotheses")
+
+    op.drop_table("checkpoint_payloads")
+    op.drop_table("alpha_fingerprints")
+    op.drop_table("llm_cache")
+    op.drop_constraint(
+        "uq_backtest_results_alpha_checkpoint", "backtest_results", type_="unique"
+    )
+    op.drop_constraint("uq_alphas_hypothesis_alpha", "alphas", type_="unique")
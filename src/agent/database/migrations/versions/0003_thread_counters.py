@@ -0,0 +1,89 @@
+"""Per-thread iteration counters and unique hypotheses per checkpoint
+
+Adds ``thread_counters``, filled from the highest iteration of every thread,
+and makes ``(thread_id, checkpoint_id)`` unique in ``hypotheses``. The unique
+index also serves the lookup by checkpoint, so it replaces
+``ix_hypotheses_thread_checkpoint_iteration``.
+
+Concurrent saves could store a checkpoint's hypothesis twice before this
+constraint existed. The duplicates are merged into the first row: their
+alphas move to it unless it already has an alpha with the same id, in which
+case the duplicate alpha and its backtest results are dropped.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Hypotheses that duplicate an earlier row of the same checkpoint, with that row
+DUPLICATES = """
+    SELECT id, keeper FROM (
+        SELECT id, min(id) OVER (PARTITION BY thread_id, checkpoint_id) AS keeper
+        FROM hypotheses
+    ) AS ranked
+    WHERE id <> keeper
+"""
+
+# Alphas whose id already exists under an earlier hypothesis of the checkpoint
+SUPERSEDED_ALPHAS = """
+    SELECT id FROM (
+        SELECT a.id, row_number() OVER (
+            PARTITION BY h.thread_id, h.checkpoint_id, a.alpha_id
+            ORDER BY a.hypothesis_id, a.id
+        ) AS position
+        FROM alphas a JOIN hypotheses h ON h.id = a.hypothesis_id
+    ) AS ranked
+    WHERE position > 1
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(f"DELETE FROM backtest_results WHERE alpha_id IN ({SUPERSEDED_ALPHAS})")
+    op.execute(f"DELETE FROM alphas WHERE id IN ({SUPERSEDED_ALPHAS})")
+    op.execute(f"""
+        UPDATE alphas SET hypothesis_id = d.keeper
+        FROM ({DUPLICATES}) AS d WHERE alphas.hypothesis_id = d.id
+    """)
+    op.execute(f"DELETE FROM hypotheses WHERE id IN (SELECT id FROM ({DUPLICATES}) AS d)")
+
+    op.create_unique_constraint(
+        "uq_hypotheses_thread_checkpoint", "hypotheses", ["thread_id", "checkpoint_id"]
+    )
+    op.drop_index("ix_hypotheses_thread_checkpoint_iteration", table_name="hypotheses")
+
+    op.create_table(
+        "thread_counters",
+        sa.Column("thread_id", sa.String(), nullable=False),
+        sa.Column("last_iteration", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("thread_id"),
+    )
+    op.execute("""
+        INSERT INTO thread_counters (thread_id, last_iteration, updated_at)
+        SELECT thread_id, max(coalesce(iteration, 0)), now() AT TIME ZONE 'utc'
+        FROM hypotheses GROUP BY thread_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("thread_counters")
+    op.create_index(
+        "ix_hypotheses_thread_checkpoint_iteration",
+        "hypotheses",
+        ["thread_id", "checkpoint_id", "iteration"],
+    )
+    op.drop_constraint("uq_hypotheses_thread_checkpoint", "hypotheses", type_="unique")
@@ -0,0 +1,130 @@
+"""Columnar backtest series
+
+Adds ``backtest_series``, which holds the per-date series of backtest results
+as compressed chunks (see ``agent.database.backtest_series``), and moves the
+``series`` entries out of ``backtest_results.backtest_data``.
+
+The series are encoded in Python, so they are only moved when the migration
+runs against a database. SQL generated offline (``--sql``) creates the table
+and leaves existing series in ``backtest_data``.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 12:00:00
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+from agent.database.backtest_series import decode_series, encode_series, series_to_lists
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+
+backtest_series = sa.table(
+    "backtest_series",
+    sa.column("backtest_result_id", sa.Integer),
+    sa.column("name", sa.String),
+    sa.column("chunk", sa.Integer),
+    sa.column("start", sa.Integer),
+    sa.column("length", sa.Integer),
+    sa.column("first_date", sa.String),
+    sa.column("last_date", sa.String),
+    sa.column("data", sa.LargeBinary),
+)
+
+
+def _results_with_series(bind, after: int):
+    """Next batch of (id, series) of results whose backtest_data has series"""
+    return bind.execute(
+        sa.text("""
+            SELECT id, backtest_data -> 'series' AS series FROM backtest_results
+            WHERE id > :after AND json_typeof(backtest_data -> 'series') = 'object'
+            ORDER BY id LIMIT :limit
+        """),
+        {"after": after, "limit": BATCH_SIZE},
+    ).all()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "backtest_series",
+        sa.Column("backtest_result_id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("chunk", sa.Integer(), nullable=False),
+        sa.Column("start", sa.Integer(), nullable=False),
+        sa.Column("length", sa.Integer(), nullable=False),
+        sa.Column("first_date", sa.String(), nullable=True),
+        sa.Column("last_date", sa.String(), nullable=True),
+        sa.Column("data", sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["backtest_result_id"], ["backtest_results.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("backtest_result_id", "name", "chunk"),
+    )
+
+    if context.is_offline_mode():
+        return
+
+    bind = op.get_bind()
+    after = 0
+    while batch := _results_with_series(bind, after):
+        rows = [
+            {"backtest_result_id": result_id, **row}
+            for result_id, series in batch
+            for row in encode_series(series)
+        ]
+        if rows:
+            bind.execute(backtest_series.insert(), rows)
+        bind.execute(
+            sa.text("""
+                UPDATE backtest_results
+                SET backtest_data = (backtest_data::jsonb - 'series')::json
+                WHERE id = ANY(:ids)
+            """),
+            {"ids": [result_id for result_id, _ in batch]},
+        )
+        after = batch[-1][0]
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not context.is_offline_mode():
+        bind = op.get_bind()
+        result_ids = bind.execute(
+            sa.text("SELECT DISTINCT backtest_result_id FROM backtest_series ORDER BY 1")
+        ).scalars().all()
+        for start in range(0, len(result_ids), BATCH_SIZE):
+            chunks = {}
+            for row in bind.execute(
+                sa.select(backtest_series).where(
+                    backtest_series.c.backtest_result_id.in_(
+                        result_ids[start : start + BATCH_SIZE]
+                    )
+                )
+            ):
+                chunks.setdefault(row.backtest_result_id, []).append(row)
+            bind.execute(
+                sa.text("""
+                    UPDATE backtest_results SET backtest_data = (
+                        coalesce(backtest_data::jsonb, '{}'::jsonb)
+                        || jsonb_build_object('series', CAST(:series AS jsonb))
+                    )::json
+                    WHERE id = :id
+                """),
+                [
+                    {"id": result_id, "series": json.dumps(series_to_lists(decode_series(rows)))}
+                    for result_id, rows in chunks.items()
+                ],
+            )
+    op.drop_table("backtest_series")
@@ -0,0 +1,52 @@
+"""Row versions of hypotheses and alphas
+
+Adds ``updated_at`` to ``hypotheses`` and ``alphas``, with ``(updated_at, id)``
+indexes. The retrieval index syncs rows by this version instead of by the
+largest ID it has seen, which missed rows committed out of ID order and
+alphas whose text was updated in place. Existing rows take their
+``created_at``.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ("hypotheses", "alphas")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in TABLES:
+        op.add_column(
+            table,
+            sa.Column(
+                "updated_at",
+                sa.DateTime(),
+                nullable=True,
+                server_default=sa.text("timezone('utc', now())"),
+            ),
+        )
+        op.execute(
+            f"UPDATE {table} SET updated_at = coalesce(created_at, timezone('utc', now()))"
+        )
+        op.alter_column(table, "updated_at", nullable=False)
+        op.create_index(f"ix_{table}_updated_at", table, ["updated_at", "id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in reversed(TABLES):
+        op.drop_index(f"ix_{table}_updated_at", table_name=table)
+        op.drop_column(table, "updated_at")
@@ -7,5 +7,13 @@ from agent.database.models.base import Base
 from agent.database.models.hypothesis import Hypothesis
 from agent.database.models.alpha import Alpha
 from agent.database.models.backtest_result import BacktestResult
+from agent.database.models.backtest_series import BacktestSeries
+from agent.database.models.llm_cache import LLMCacheEntry
+from agent.database.models.alpha_fingerprint import AlphaFingerprint
+from agent.database.models.checkpoint_payload import CheckpointPayload
+from agent.database.models.thread_counter import ThreadCounter
 
-__all__ = ["Base", "Hypothesis", "Alpha", "BacktestResult"]
+__all__ = [
+    "Base", "Hypothesis", "Alpha", "BacktestResult", "BacktestSeries", "LLMCacheEntry",
+    "AlphaFingerprint", "CheckpointPayload", "ThreadCounter",
+]
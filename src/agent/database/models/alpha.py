@@ -2,9 +2,11 @@
 Alpha model definition for AlphaGPT
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import (
+    Column, Integer, String, ForeignKey, DateTime, Index, UniqueConstraint
+)
 from sqlalchemy.orm import relationship
-from agent.database.models.base import Base
+from agent.database.models.base import Base, utc_now
 
 
 class Alpha(Base):
@@ -12,9 +14,16 @@ class Alpha(Base):
     SQLAlchemy model for representing an alpha factor
     """
     __tablename__ = "alphas"
+    __table_args__ = (
+        UniqueConstraint(
+            "hypothesis_id", "alpha_id", name="uq_alphas_hypothesis_alpha"
+        ),
+        Index("ix_alphas_thread_alpha", "thread_id", "alpha_id"),
+        Index("ix_alphas_updated_at", "updated_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    thread_id = Column(String, nullable=False, index=True)
+    thread_id = Column(String, nullable=False)
     checkpoint_id = Column(String, nullable=False)
     # Relationship to hypothesis
     hypothesis_id = Column(Integer, ForeignKey("hypotheses.id"), nullable=False)
@@ -25,7 +34,10 @@ class Alpha(Base):
     code = Column(String)  # Code implementation of the alpha
     # Tracking
     created_at = Column(DateTime, default=datetime.utcnow)
-    # Relationship
+    # Row version, bumped when the embedded text changes (see save_alphas)
+    updated_at = Column(DateTime, nullable=False, server_default=utc_now())
+    # Relationships
+    hypothesis = relationship("Hypothesis", back_populates="alphas")
     backtest_results = relationship(
         "BacktestResult", back_populates="alpha", cascade="all, delete-orphan"
     )
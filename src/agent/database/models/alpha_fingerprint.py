@@ -0,0 +1,33 @@
+"""
+Alpha fingerprint model definition for AlphaGPT
+"""
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, JSON, DateTime
+from agent.database.models.base import Base
+
+
+class AlphaFingerprint(Base):
+    """
+    SQLAlchemy model for the cross-thread alpha dedup index
+
+    One row per canonical expression (see ``agent.factors.canonical``). The
+    first thread that produced the expression owns the row; later threads
+    reuse its code and, while the market data is unchanged, its metrics.
+    """
+    __tablename__ = "alpha_fingerprints"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    fingerprint = Column(String(64), nullable=False, unique=True, index=True)
+    canonical = Column(Text, nullable=False)  # Canonical expression text
+    kind = Column(String(8), nullable=False)  # "dsl" or "text"
+    # First occurrence
+    thread_id = Column(String)
+    alpha_id = Column(String)
+    expression = Column(Text)
+    code = Column(Text)
+    # Backtest metrics and the data/settings they were computed on
+    metrics = Column(JSON)
+    metrics_version = Column(String)
+    # Tracking
+    hits = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -3,7 +3,8 @@ Backtest result model definition for AlphaGPT
 """
 from datetime import datetime
 from sqlalchemy import (
-    Column, Integer, String, ForeignKey, Boolean, Float, JSON, DateTime
+    Column, Integer, String, ForeignKey, Boolean, Float, JSON, DateTime,
+    UniqueConstraint
 )
 from sqlalchemy.orm import relationship
 from agent.database.models.base import Base
@@ -14,6 +15,11 @@ class BacktestResult(Base):
     SQLAlchemy model for representing backtest results for an alpha factor
     """
     __tablename__ = "backtest_results"
+    __table_args__ = (
+        UniqueConstraint(
+            "alpha_id", "checkpoint_id", name="uq_backtest_results_alpha_checkpoint"
+        ),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     thread_id = Column(String, nullable=False, index=True)
@@ -26,9 +32,12 @@ class BacktestResult(Base):
     annualized_return = Column(Float)
     max_drawdown = Column(Float)
     ic = Column(Float)  # Information coefficient
-    # Full backtest data
+    # Full backtest data, except the per-date series (see BacktestSeries)
     backtest_data = Column(JSON)
     # Tracking
     created_at = Column(DateTime, default=datetime.utcnow)
     # Relationship
     alpha = relationship("Alpha", back_populates="backtest_results")
+    series = relationship(
+        "BacktestSeries", cascade="all, delete-orphan", passive_deletes=True
+    )
@@ -0,0 +1,33 @@
+"""
+Backtest series model definition for AlphaGPT
+"""
+from sqlalchemy import Column, Integer, String, ForeignKey, LargeBinary
+from agent.database.models.base import Base
+
+
+class BacktestSeries(Base):
+    """
+    SQLAlchemy model for one chunk of one per-date series of a backtest result
+
+    Series are stored column by column in compressed chunks (see
+    ``agent.database.backtest_series``), outside ``backtest_results``, so
+    queries of the scalar metrics never read them. The primary key serves
+    the lookup of a result's chunks; there are only a few per result.
+    """
+    __tablename__ = "backtest_series"
+
+    backtest_result_id = Column(
+        Integer,
+        ForeignKey("backtest_results.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    name = Column(String, primary_key=True)  # "dates", "ic", ...
+    chunk = Column(Integer, primary_key=True)
+    # Position of the chunk's first period in the series, and its length
+    start = Column(Integer, nullable=False)
+    length = Column(Integer, nullable=False)
+    # Date range of the chunk (None when the backtest had no date labels)
+    first_date = Column(String)
+    last_date = Column(String)
+    # zlib-compressed float64 values, or newline-separated date labels
+    data = Column(LargeBinary, nullable=False)
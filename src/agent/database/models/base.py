@@ -1,6 +1,12 @@
 """
 Base definitions for SQLAlchemy models
 """
+from sqlalchemy import func
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
+
+
+def utc_now():
+    """Database-side current time in UTC, as a naive timestamp like ``created_at``"""
+    return func.timezone("utc", func.now())
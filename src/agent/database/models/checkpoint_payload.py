@@ -0,0 +1,29 @@
+"""
+Checkpoint payload model definition for AlphaGPT
+"""
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, LargeBinary, DateTime
+from agent.database.models.base import Base
+
+
+class CheckpointPayload(Base):
+    """
+    SQLAlchemy model for large values offloaded from graph checkpoints
+
+    Rows are content-addressed: the key is the SHA-256 of the serialized
+    value, so a payload (such as the code of an alpha) that appears in many
+    checkpoints is stored once. Checkpoints hold ``{"__payload__": digest}``
+    references instead (see ``agent.database.checkpoint_serde``).
+
+    ``last_used_at`` is refreshed whenever a writer offers the payload again,
+    so payload collection (see ``agent.database.retention``) can tell
+    payloads in use from orphans.
+    """
+    __tablename__ = "checkpoint_payloads"
+
+    digest = Column(String(64), primary_key=True)
+    type = Column(String(32), nullable=False)  # Serializer type tag
+    data = Column(LargeBinary, nullable=False)
+    size = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow, index=True)
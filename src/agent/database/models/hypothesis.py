@@ -3,8 +3,9 @@ Hypothesis model definition for AlphaGPT
 """
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime
-from agent.database.models.base import Base
+from sqlalchemy import Column, Integer, String, DateTime, Index, UniqueConstraint
+from sqlalchemy.orm import relationship
+from agent.database.models.base import Base, utc_now
 
 
 class Hypothesis(Base):
@@ -13,9 +14,16 @@ class Hypothesis(Base):
     """
 
     __tablename__ = "hypotheses"
+    __table_args__ = (
+        UniqueConstraint(
+            "thread_id", "checkpoint_id", name="uq_hypotheses_thread_checkpoint"
+        ),
+        Index("ix_hypotheses_thread_iteration", "thread_id", "iteration"),
+        Index("ix_hypotheses_updated_at", "updated_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    thread_id = Column(String, nullable=False, index=True)
+    thread_id = Column(String, nullable=False)
     checkpoint_id = Column(String, nullable=False)
     # Hypothesis data
     trading_idea = Column(String, nullable=False)
@@ -28,3 +36,7 @@ class Hypothesis(Base):
     # Iteration tracking
     iteration = Column(Integer, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Row version, read by the retrieval index sync
+    updated_at = Column(DateTime, nullable=False, server_default=utc_now())
+    # Relationship
+    alphas = relationship("Alpha", back_populates="hypothesis")
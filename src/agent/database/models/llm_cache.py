@@ -0,0 +1,24 @@
+"""
+LLM response cache model definition for AlphaGPT
+"""
+from datetime import datetime
+from sqlalchemy import Column, String, Text, Integer, DateTime
+from agent.database.models.base import Base
+
+
+class LLMCacheEntry(Base):
+    """
+    SQLAlchemy model for a cached LLM completion
+
+    Entries are content-addressed: ``key`` is a hash of the model parameters
+    and the normalized prompt messages.
+    """
+    __tablename__ = "llm_cache"
+
+    key = Column(String(64), primary_key=True)
+    value = Column(Text, nullable=False)  # Serialized generations
+    size = Column(Integer, nullable=False)
+    hits = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    accessed_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
@@ -0,0 +1,22 @@
+"""
+Thread counter model definition for AlphaGPT
+"""
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime
+from agent.database.models.base import Base
+
+
+class ThreadCounter(Base):
+    """
+    SQLAlchemy model for the per-thread iteration counter
+
+    ``save_hypothesis`` increments ``last_iteration`` in the same statement
+    that inserts the hypothesis. The row lock taken by the increment orders
+    concurrent writers of a thread, so iterations are assigned without gaps
+    or duplicates.
+    """
+    __tablename__ = "thread_counters"
+
+    thread_id = Column(String, primary_key=True)
+    last_iteration = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -3,19 +3,86 @@ Database operations package
 
 This package contains database operations for the AlphaGPT database.
 """
-from agent.database.operations.db_connection import get_db_engine, get_session_factory, create_tables
-from agent.database.operations.hypothesis_operations import save_hypothesis, get_hypothesis_history
-from agent.database.operations.alpha_operations import save_alphas, get_alphas_for_hypothesis
-from agent.database.operations.backtest_operations import save_backtest_results, get_backtest_results_for_alpha
+from agent.database.operations.db_connection import (
+    get_db_engine,
+    get_session_factory,
+    create_tables,
+    upgrade_database,
+    dispose_db_engine,
+    get_async_db_engine,
+    get_async_session_factory,
+    dispose_async_db_engine,
+)
+from agent.database.operations.hypothesis_operations import (
+    save_hypothesis,
+    get_hypothesis_history,
+    aget_hypothesis_history,
+)
+from agent.database.operations.alpha_operations import (
+    save_alphas,
+    save_evolved_alphas,
+    get_alphas_for_hypothesis,
+    aget_alphas_for_hypothesis,
+)
+from agent.database.operations.backtest_operations import (
+    save_backtest_results,
+    get_backtest_results_for_alpha,
+    aget_backtest_results_for_alpha,
+    save_backtest_series,
+    get_backtest_series,
+    aget_backtest_series,
+)
+from agent.database.operations.fingerprint_operations import (
+    save_fingerprints,
+    asave_fingerprints,
+    get_known_fingerprints,
+    aget_known_fingerprints,
+)
+from agent.database.operations.payload_operations import (
+    save_payloads,
+    get_payloads,
+)
+from agent.database.operations.retrieval_operations import (
+    get_rows_to_index,
+    get_prior_attempts,
+    aget_prior_attempts,
+)
+from agent.database.operations.history_operations import (
+    get_thread_history,
+    iter_thread_history,
+)
 
 __all__ = [
     "get_db_engine", 
     "get_session_factory", 
     "create_tables",
+    "upgrade_database",
+    "dispose_db_engine",
+    "get_async_db_engine",
+    "get_async_session_factory",
+    "dispose_async_db_engine",
     "save_hypothesis", 
     "get_hypothesis_history",
+    "aget_hypothesis_history",
     "save_alphas", 
+    "save_evolved_alphas",
     "get_alphas_for_hypothesis",
+    "aget_alphas_for_hypothesis",
     "save_backtest_results", 
-    "get_backtest_results_for_alpha"
+    "get_backtest_results_for_alpha",
+    "aget_backtest_results_for_alpha",
+    "save_backtest_series",
+    "get_backtest_series",
+    "aget_backtest_series",
+    "save_fingerprints",
+    "asave_fingerprints",
+    "get_known_fingerprints",
+    "aget_known_fingerprints",
+    "save_payloads",
+    "get_payloads",
+    "get_rows_to_index",
+    "get_prior_attempts",
+    "aget_prior_attempts",
+    "get_thread_history",
+    "iter_thread_history",
 ]
@@ -2,11 +2,83 @@
 Alpha factor database operations for AlphaGPT
 """
 from typing import Dict, Any, List, Optional
-import uuid
+from sqlalchemy import case, func, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from agent.database.models.alpha import Alpha
-from agent.database.operations.db_connection import get_session_factory
+from agent.database.models.base import utc_now
+from agent.factors import dsl_code, fingerprint
+from agent.database.operations.db_connection import (
+    get_session_factory,
+    get_async_session_factory,
+)
+
+
+def _alpha_key(alpha_data: Dict[str, Any]) -> str:
+    """
+    Return the identifier used for an alpha in state dictionaries
+
+    An alpha without an ID is keyed by the fingerprint of its expression (or
+    description), so saving the same state again updates its row rather than
+    adding another one.
+    """
+    alpha_id = alpha_data.get("id") or alpha_data.get("alphaID")
+    if alpha_id:
+        return str(alpha_id)
+    text = next(
+        (
+            alpha_data[field]
+            for field in ("dsl", "expression", "expr", "description", "desc")
+            if alpha_data.get(field)
+        ),
+        "",
+    )
+    return f"alpha_{fingerprint(text).digest[:16]}"
+
+
+def build_alpha_rows(
+    thread_id: str,
+    checkpoint_id: str,
+    state_values: Dict[str, Any],
+    hypothesis_id: int,
+) -> List[Dict[str, Any]]:
+    """
+    Merge seed and coded alphas from the state into one row per alpha_id
+    
+    Coded alphas are processed last, so their non-empty fields (notably
+    ``code``) win over the seed version of the same alpha.
+    
+    Returns:
+        List of column dictionaries for the alphas table
+    """
+    rows: Dict[str, Dict[str, Any]] = {}
+    
+    for alpha_data in (state_values.get("seed_alphas") or []) + (
+        state_values.get("coded_alphas") or []
+    ):
+        alpha_id = _alpha_key(alpha_data)
+        row = rows.setdefault(
+            alpha_id,
+            {
+                "thread_id": thread_id,
+                "checkpoint_id": checkpoint_id,
+                "hypothesis_id": hypothesis_id,
+                "alpha_id": alpha_id,
+                "expression": "",
+                "description": "",
+                "code": "",
+            },
+        )
+        values = {
+            "expression": alpha_data.get("expression") or alpha_data.get("expr"),
+            "description": alpha_data.get("description") or alpha_data.get("desc"),
+            "code": alpha_data.get("code"),
+        }
+        row.update({k: v for k, v in values.items() if v})
+    
+    return list(rows.values())
 
 
 def save_alphas(
@@ -19,6 +91,12 @@ def save_alphas(
     """
     Save alpha data from the graph state to our database
     
+    All seed and coded alphas are written with a single
+    ``INSERT ... ON CONFLICT (hypothesis_id, alpha_id) DO UPDATE`` statement.
+    Existing rows keep their values unless the state carries a non-empty
+    replacement (e.g. code produced after the seed alpha was first saved);
+    ``updated_at`` moves when the expression or description changes.
+    
     Args:
         thread_id: LangGraph thread ID
         checkpoint_id: LangGraph checkpoint ID
@@ -29,73 +107,139 @@ def save_alphas(
     Returns:
         List of saved alpha instances
     """
-    saved_alphas = []
+    rows = build_alpha_rows(thread_id, checkpoint_id, state_values, hypothesis_id)
     
-    if not state_values.get("seed_alphas") and not state_values.get("coded_alphas"):
-        return saved_alphas
+    if not rows:
+        return []
+    
+    stmt = pg_insert(Alpha).values(rows)
+    columns = Alpha.__table__.c
+    values = {
+        column: func.coalesce(
+            func.nullif(getattr(stmt.excluded, column), ""), columns[column]
+        )
+        for column in ("expression", "description", "code")
+    }
+    # A new version only when the text embedded by the retrieval index changes
+    values["updated_at"] = case(
+        (
+            or_(
+                values["expression"].is_distinct_from(columns.expression),
+                values["description"].is_distinct_from(columns.description),
+            ),
+            utc_now(),
+        ),
+        else_=columns.updated_at,
+    )
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_alphas_hypothesis_alpha", set_=values
+    ).returning(Alpha)
     
     # Create session if needed
-    session_factory = get_session_factory()
     session_provided = session is not None
     if not session_provided:
-        session = session_factory()
+        session = get_session_factory()()
     
     try:
-        # Save seed alphas
-        if state_values.get("seed_alphas"):
-            for alpha_data in state_values["seed_alphas"]:
-                # Check if we already saved this alpha
-                alpha_id = alpha_data.get("id", str(uuid.uuid4()))
-                existing = (
-                    session.query(Alpha)
-                    .filter_by(
-                        hypothesis_id=hypothesis_id,
-                        alpha_id=alpha_id,
-                    )
-                    .first()
-                )
-                
-                if not existing:
-                    alpha = Alpha(
-                        thread_id=thread_id,
-                        checkpoint_id=checkpoint_id,
-                        hypothesis_id=hypothesis_id,
-                        alpha_id=alpha_id,
-                        expression=alpha_data.get("expression", ""),
-                        description=alpha_data.get("description", ""),
-                        code=alpha_data.get("code", ""),
-                    )
-                    session.add(alpha)
-                    saved_alphas.append(alpha)
+        saved_alphas = list(session.scalars(stmt).all())
+        
+        if not session_provided:
+            session.commit()
         
-        # Save coded alphas
-        if state_values.get("coded_alphas"):
-            for alpha_data in state_values["coded_alphas"]:
-                # Check if we already saved this alpha
-                alpha_id = alpha_data.get("id", str(uuid.uuid4()))
-                existing = (
-                    session.query(Alpha)
-                    .filter_by(
-                        hypothesis_id=hypothesis_id,
-                        alpha_id=alpha_id,
-                    )
-                    .first()
+        return saved_alphas
+    
+    finally:
+        if not session_provided:
+            session.close()
+
+
+def build_evolved_alpha_rows(
+    thread_id: str,
+    checkpoint_id: str,
+    state_values: Dict[str, Any],
+    hypothesis_id: int,
+) -> List[Dict[str, Any]]:
+    """
+    Rows for the SOTA alphas bred by the evolution node
+    
+    Evolved alphas are never seed or coded alphas; they run on the DSL
+    engine, so their stored code is the DSL wrapper.
+    
+    Returns:
+        List of column dictionaries for the alphas table
+    """
+    rows: Dict[str, Dict[str, Any]] = {}
+    for alpha_data in state_values.get("sota_alphas") or []:
+        if alpha_data.get("origin") != "evolution":
+            continue
+        alpha_id = _alpha_key(alpha_data)
+        rows[alpha_id] = {
+            "thread_id": thread_id,
+            "checkpoint_id": checkpoint_id,
+            "hypothesis_id": hypothesis_id,
+            "alpha_id": alpha_id,
+            "expression": alpha_data.get("expression") or "",
+            "description": alpha_data.get("description") or "",
+            "code": dsl_code(alpha_id, alpha_data["dsl"]) if alpha_data.get("dsl") else "",
+        }
+    return list(rows.values())
+
+
+def save_evolved_alphas(
+    thread_id: str,
+    checkpoint_id: str,
+    state_values: Dict[str, Any],
+    hypothesis_id: int,
+    session: Optional[Session] = None
+) -> List[Alpha]:
+    """
+    Save the evolved SOTA alphas that the thread has not stored yet
+    
+    An evolved alpha can stay SOTA over many iterations; it is stored once
+    per thread, under the hypothesis of the iteration that bred it, so that
+    ``save_backtest_results`` finds a row for it.
+    
+    Args:
+        thread_id: LangGraph thread ID
+        checkpoint_id: LangGraph checkpoint ID
+        state_values: The current state values
+        hypothesis_id: ID of the current hypothesis
+        session: Optional SQLAlchemy session
+        
+    Returns:
+        List of newly saved alpha instances
+    """
+    rows = build_evolved_alpha_rows(thread_id, checkpoint_id, state_values, hypothesis_id)
+    
+    if not rows:
+        return []
+    
+    # Create session if needed
+    session_provided = session is not None
+    if not session_provided:
+        session = get_session_factory()()
+    
+    try:
+        stored = set(
+            session.scalars(
+                select(Alpha.alpha_id).where(
+                    Alpha.thread_id == thread_id,
+                    Alpha.alpha_id.in_([row["alpha_id"] for row in rows]),
                 )
-                
-                if not existing:
-                    alpha = Alpha(
-                        thread_id=thread_id,
-                        checkpoint_id=checkpoint_id,
-                        hypothesis_id=hypothesis_id,
-                        alpha_id=alpha_id,
-                        expression=alpha_data.get("expression", ""),
-                        description=alpha_data.get("description", ""),
-                        code=alpha_data.get("code", ""),
-                    )
-                    session.add(alpha)
-                    saved_alphas.append(alpha)
+            ).all()
+        )
+        rows = [row for row in rows if row["alpha_id"] not in stored]
+        saved_alphas = []
+        if rows:
+            stmt = (
+                pg_insert(Alpha)
+                .values(rows)
+                .on_conflict_do_nothing(constraint="uq_alphas_hypothesis_alpha")
+                .returning(Alpha)
+            )
+            saved_alphas = list(session.scalars(stmt).all())
         
-        if not session_provided and saved_alphas:
+        if not session_provided:
             session.commit()
         
         return saved_alphas
@@ -105,6 +249,29 @@ def save_alphas(
             session.close()
 
 
+def alpha_to_dict(a: Alpha, include_code: bool = True) -> Dict[str, Any]:
+    """
+    Convert an alpha row to the dictionary returned by query functions
+    
+    Args:
+        a: Alpha instance
+        include_code: Whether to include the (possibly deferred) code column
+        
+    Returns:
+        Alpha dictionary
+    """
+    result = {
+        "id": a.id,
+        "alpha_id": a.alpha_id,
+        "expression": a.expression,
+        "description": a.description,
+        "created_at": a.created_at.isoformat() if a.created_at else None,
+    }
+    if include_code:
+        result["code"] = a.code
+    return result
+
+
 def get_alphas_for_hypothesis(hypothesis_id: int) -> List[Dict[str, Any]]:
     """
     Get all alphas for a specific hypothesis
@@ -121,17 +288,31 @@ def get_alphas_for_hypothesis(hypothesis_id: int) -> List[Dict[str, Any]]:
     try:
         alphas = session.query(Alpha).filter_by(hypothesis_id=hypothesis_id).all()
         
-        return [
-            {
-                "id": a.id,
-                "alpha_id": a.alpha_id,
-                "expression": a.expression,
-                "description": a.description,
-                "code": a.code,
-                "created_at": a.created_at.isoformat() if a.created_at else None,
-            }
-            for a in alphas
-        ]
+        return [alpha_to_dict(a) for a in alphas]
     
     finally:
         session.close()
+
+
+async def aget_alphas_for_hypothesis(
+    hypothesis_id: int, session: Optional[AsyncSession] = None
+) -> List[Dict[str, Any]]:
+    """
+    Get all alphas for a specific hypothesis without blocking the event loop
+    
+    Args:
+        hypothesis_id: The hypothesis ID to query
+        session: Optional SQLAlchemy async session
+        
+    Returns:
+        List of alpha dictionaries
+    """
+    stmt = select(Alpha).filter_by(hypothesis_id=hypothesis_id)
+
+    if session is not None:
+        alphas = (await session.scalars(stmt)).all()
+        return [alpha_to_dict(a) for a in alphas]
+
+    async with get_async_session_factory()() as session:
+        alphas = (await session.scalars(stmt)).all()
+        return [alpha_to_dict(a) for a in alphas]
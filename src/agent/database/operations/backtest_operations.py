@@ -1,12 +1,21 @@
 """
 Backtest result database operations for AlphaGPT
 """
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Sequence
+import numpy as np
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from agent.database.backtest_series import DATES, decode_series, encode_series
 from agent.database.models.backtest_result import BacktestResult
+from agent.database.models.backtest_series import BacktestSeries
 from agent.database.models.alpha import Alpha
-from agent.database.operations.db_connection import get_session_factory
+from agent.database.operations.db_connection import (
+    get_session_factory,
+    get_async_session_factory,
+)
 
 
 def save_backtest_results(
@@ -18,6 +27,12 @@ def save_backtest_results(
     """
     Save backtest results from the graph state to our database
     
+    The SOTA alphas are resolved to database rows with one query, and all
+    results are written with a single
+    ``INSERT ... ON CONFLICT (alpha_id, checkpoint_id) DO UPDATE`` statement.
+    Per-date series are not part of ``backtest_data``; they are stored in
+    ``backtest_series`` (see ``save_backtest_series``).
+    
     Args:
         thread_id: LangGraph thread ID
         checkpoint_id: LangGraph checkpoint ID
@@ -27,51 +42,78 @@ def save_backtest_results(
     Returns:
         List of saved backtest result instances
     """
-    saved_results = []
+    sota_alphas = [
+        sota_alpha
+        for sota_alpha in state_values.get("sota_alphas") or []
+        if sota_alpha.get("backtest_results")
+    ]
     
-    if not state_values.get("sota_alphas"):
-        return saved_results
+    if not sota_alphas:
+        return []
     
     # Create session if needed
-    session_factory = get_session_factory()
     session_provided = session is not None
     if not session_provided:
-        session = session_factory()
+        session = get_session_factory()()
     
     try:
-        for sota_alpha in state_values["sota_alphas"]:
-            if not sota_alpha.get("backtest_results"):
-                continue
-            
-            # Find the alpha in the database
-            alpha = (
-                session.query(Alpha)
-                .filter_by(thread_id=thread_id, alpha_id=sota_alpha.get("id"))
-                .first()
-            )
-            
-            if not alpha:
+        # Find the alphas in the database, preferring the most recent row
+        # when the same alpha_id was saved under several hypotheses
+        keys = {str(sota_alpha.get("id")) for sota_alpha in sota_alphas}
+        alpha_rows = session.execute(
+            select(Alpha.alpha_id, func.max(Alpha.id))
+            .where(Alpha.thread_id == thread_id, Alpha.alpha_id.in_(keys))
+            .group_by(Alpha.alpha_id)
+        ).all()
+        alpha_ids = dict(alpha_rows)
+        
+        rows = {}
+        series = {}
+        for sota_alpha in sota_alphas:
+            alpha_id = alpha_ids.get(str(sota_alpha.get("id")))
+            if alpha_id is None:
                 continue
             
-            # Create backtest result
-            backtest_data = sota_alpha.get("backtest_results", {})
-            
-            result = BacktestResult(
-                thread_id=thread_id,
-                checkpoint_id=checkpoint_id,
-                alpha_id=alpha.id,
-                is_sota=True,
-                information_ratio=float(backtest_data.get("information_ratio", 0)),
-                annualized_return=float(backtest_data.get("annualized_return", 0)),
-                max_drawdown=float(backtest_data.get("max_drawdown", 0)),
-                ic=float(backtest_data.get("ic", 0)),
-                backtest_data=backtest_data,
-            )
-            
-            session.add(result)
-            saved_results.append(result)
+            backtest_data = dict(sota_alpha.get("backtest_results", {}))
+            series[alpha_id] = backtest_data.pop("series", None) or {}
+            rows[alpha_id] = {
+                "thread_id": thread_id,
+                "checkpoint_id": checkpoint_id,
+                "alpha_id": alpha_id,
+                "is_sota": True,
+                "information_ratio": float(backtest_data.get("information_ratio", 0)),
+                "annualized_return": float(backtest_data.get("annualized_return", 0)),
+                "max_drawdown": float(backtest_data.get("max_drawdown", 0)),
+                "ic": float(backtest_data.get("ic", 0)),
+                "backtest_data": backtest_data,
+            }
+        
+        if not rows:
+            return []
         
-        if not session_provided and saved_results:
+        stmt = pg_insert(BacktestResult).values(list(rows.values()))
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_backtest_results_alpha_checkpoint",
+            set_={
+                column: getattr(stmt.excluded, column)
+                for column in (
+                    "is_sota",
+                    "information_ratio",
+                    "annualized_return",
+                    "max_drawdown",
+                    "ic",
+                    "backtest_data",
+                )
+            },
+        ).returning(BacktestResult)
+        
+        saved_results = list(session.scalars(stmt).all())
+        save_backtest_series(
+            {result.id: series[result.alpha_id] for result in saved_results},
+            session=session,
+        )
+        
+        if not session_provided:
             session.commit()
         
         return saved_results
@@ -81,6 +123,186 @@ def save_backtest_results(
             session.close()
 
 
+def save_backtest_series(
+    series_by_result: Dict[int, Dict[str, Any]],
+    session: Optional[Session] = None
+) -> int:
+    """
+    Store the per-date series of backtest results as compressed chunks
+    
+    Series already stored for these results are replaced.
+    
+    Args:
+        series_by_result: Mapping of backtest result ID to its ``series``
+            dictionary, as returned by ``batch_backtest``
+        session: Optional SQLAlchemy session
+        
+    Returns:
+        Number of chunk rows written
+    """
+    if not series_by_result:
+        return 0
+    
+    rows = [
+        {"backtest_result_id": result_id, **row}
+        for result_id, series in series_by_result.items()
+        for row in encode_series(series)
+    ]
+    
+    session_provided = session is not None
+    if not session_provided:
+        session = get_session_factory()()
+    
+    try:
+        session.execute(
+            delete(BacktestSeries).where(
+                BacktestSeries.backtest_result_id.in_(list(series_by_result))
+            )
+        )
+        if rows:
+            session.execute(pg_insert(BacktestSeries).values(rows))
+        
+        if not session_provided:
+            session.commit()
+        
+        return len(rows)
+    
+    finally:
+        if not session_provided:
+            session.close()
+
+
+def _series_statement(
+    backtest_result_id: int,
+    names: Optional[Sequence[str]],
+    start: Optional[str],
+    end: Optional[str],
+):
+    """Select the chunks of a result's series that overlap the date range"""
+    stmt = select(
+        BacktestSeries.name, BacktestSeries.chunk, BacktestSeries.data
+    ).where(BacktestSeries.backtest_result_id == backtest_result_id)
+    
+    if names is not None:
+        wanted = set(names)
+        if start is not None or end is not None:
+            wanted.add(DATES)
+        stmt = stmt.where(BacktestSeries.name.in_(wanted))
+    if start is not None:
+        stmt = stmt.where(BacktestSeries.last_date >= start)
+    if end is not None:
+        stmt = stmt.where(BacktestSeries.first_date <= end)
+    
+    return stmt
+
+
+def _select_series(
+    series: Dict[str, np.ndarray], names: Optional[Sequence[str]]
+) -> Dict[str, np.ndarray]:
+    """Drop the dates loaded only for slicing"""
+    if names is None:
+        return series
+    return {name: values for name, values in series.items() if name in names}
+
+
+def get_backtest_series(
+    backtest_result_id: int,
+    names: Optional[Sequence[str]] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    session: Optional[Session] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Load the per-date series of a backtest result
+    
+    Only the chunks of the requested series that overlap the date range are
+    read and decompressed.
+    
+    Args:
+        backtest_result_id: The backtest result ID to query
+        names: Series to load (all if None), e.g. ``["ic", "dates"]``
+        start: First date to include (inclusive)
+        end: Last date to include (inclusive)
+        session: Optional SQLAlchemy session
+        
+    Returns:
+        Mapping of series name to array; ``"dates"`` holds the date labels.
+        Empty if the result has no stored series.
+    """
+    stmt = _series_statement(backtest_result_id, names, start, end)
+    
+    session_provided = session is not None
+    if not session_provided:
+        session = get_session_factory()()
+    
+    try:
+        rows = session.execute(stmt).all()
+        return _select_series(decode_series(rows, start, end), names)
+    
+    finally:
+        if not session_provided:
+            session.close()
+
+
+async def aget_backtest_series(
+    backtest_result_id: int,
+    names: Optional[Sequence[str]] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    session: Optional[AsyncSession] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Load the per-date series of a backtest result without blocking the event loop
+    
+    Args:
+        backtest_result_id: The backtest result ID to query
+        names: Series to load (all if None)
+        start: First date to include (inclusive)
+        end: Last date to include (inclusive)
+        session: Optional SQLAlchemy async session
+        
+    Returns:
+        Mapping of series name to array (see ``get_backtest_series``)
+    """
+    stmt = _series_statement(backtest_result_id, names, start, end)
+
+    if session is not None:
+        rows = (await session.execute(stmt)).all()
+        return _select_series(decode_series(rows, start, end), names)
+
+    async with get_async_session_factory()() as session:
+        rows = (await session.execute(stmt)).all()
+        return _select_series(decode_series(rows, start, end), names)
+
+
+def backtest_result_to_dict(
+    r: BacktestResult, include_backtest_data: bool = True
+) -> Dict[str, Any]:
+    """
+    Convert a backtest result row to the dictionary returned by query functions
+    
+    Args:
+        r: BacktestResult instance
+        include_backtest_data: Whether to include the (possibly deferred)
+            backtest_data column
+        
+    Returns:
+        Backtest result dictionary
+    """
+    result = {
+        "id": r.id,
+        "is_sota": r.is_sota,
+        "information_ratio": r.information_ratio,
+        "annualized_return": r.annualized_return,
+        "max_drawdown": r.max_drawdown,
+        "ic": r.ic,
+        "created_at": r.created_at.isoformat() if r.created_at else None,
+    }
+    if include_backtest_data:
+        result["backtest_data"] = r.backtest_data
+    return result
+
+
 def get_backtest_results_for_alpha(alpha_id: int) -> List[Dict[str, Any]]:
     """
     Get all backtest results for a specific alpha
@@ -97,19 +319,31 @@ def get_backtest_results_for_alpha(alpha_id: int) -> List[Dict[str, Any]]:
     try:
         results = session.query(BacktestResult).filter_by(alpha_id=alpha_id).all()
         
-        return [
-            {
-                "id": r.id,
-                "is_sota": r.is_sota,
-                "information_ratio": r.information_ratio,
-                "annualized_return": r.annualized_return,
-                "max_drawdown": r.max_drawdown,
-                "ic": r.ic,
-                "backtest_data": r.backtest_data,
-                "created_at": r.created_at.isoformat() if r.created_at else None,
-            }
-            for r in results
-        ]
+        return [backtest_result_to_dict(r) for r in results]
     
     finally:
         session.close()
+
+
+async def aget_backtest_results_for_alpha(
+    alpha_id: int, session: Optional[AsyncSession] = None
+) -> List[Dict[str, Any]]:
+    """
+    Get all backtest results for a specific alpha without blocking the event loop
+    
+    Args:
+        alpha_id: The alpha ID to query
+        session: Optional SQLAlchemy async session
+        
+    Returns:
+        List of backtest result dictionaries
+    """
+    stmt = select(BacktestResult).filter_by(alpha_id=alpha_id)
+
+    if session is not None:
+        results = (await session.scalars(stmt)).all()
+        return [backtest_result_to_dict(r) for r in results]
+
+    async with get_async_session_factory()() as session:
+        results = (await session.scalars(stmt)).all()
+        return [backtest_result_to_dict(r) for r in results]
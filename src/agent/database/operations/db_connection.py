@@ -1,11 +1,41 @@
 """
 Database connection utilities for AlphaGPT
+
+The engine and session factory are created once per process and shared by
+every operations module. Pool settings are read from environment variables
+(see ``get_db_pool_params``).
+
+The schema is managed by Alembic migrations in ``agent/database/migrations``
+(see ``upgrade_database``).
+
+Async engines use the psycopg (v3) driver. Their connections are bound to
+the event loop that opened them, so one async engine is kept per loop.
 """
 
+import asyncio
 import os
-from sqlalchemy import create_engine
+import threading
+import weakref
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from agent.database.models.base import Base
+
+MIGRATIONS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations"
+)
+BASELINE_REVISION = "0001"
+# Serializes schema upgrades started by several processes at once
+MIGRATION_LOCK_KEY = 0x616C706861
+
+_engine = None
+_session_factory = None
+_tables_created = False
+_lock = threading.Lock()
+
+_async_engines = weakref.WeakKeyDictionary()
+_async_session_factories = weakref.WeakKeyDictionary()
 
 
 def get_db_url():
@@ -24,6 +54,16 @@ def get_db_url():
     return f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
 
 
+def get_async_db_url():
+    """
+    Generate PostgreSQL connection URL for the async psycopg driver
+
+    Returns:
+        Connection URL string for SQLAlchemy's async engine
+    """
+    return get_db_url().replace("postgresql://", "postgresql+psycopg://", 1)
+
+
 def get_db_connection_params():
     """
     Get database connection parameters from environment variables
@@ -40,15 +80,38 @@ def get_db_connection_params():
     }
 
 
+def get_db_pool_params():
+    """
+    Get connection pool settings from environment variables
+
+    Returns:
+        Dictionary of keyword arguments for ``create_engine``
+    """
+    return {
+        "pool_size": int(os.environ.get("POSTGRES_POOL_SIZE", "5")),
+        "max_overflow": int(os.environ.get("POSTGRES_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.environ.get("POSTGRES_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.environ.get("POSTGRES_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": os.environ.get("POSTGRES_POOL_PRE_PING", "true").lower()
+        == "true",
+    }
+
+
 def get_db_engine():
     """
-    Create and return a SQLAlchemy engine using environment variables
+    Return the process-wide SQLAlchemy engine, creating it on first use
 
     Returns:
         SQLAlchemy engine instance
     """
-    db_url = get_db_url()
-    return create_engine(db_url)
+    global _engine
+
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                _engine = create_engine(get_db_url(), **get_db_pool_params())
+
+    return _engine
 
 
 def get_session_factory(engine=None):
@@ -56,25 +119,142 @@ def get_session_factory(engine=None):
     Get a sessionmaker for creating database sessions
 
     Args:
-        engine: Optional SQLAlchemy engine
+        engine: Optional SQLAlchemy engine. When omitted, the shared
+            sessionmaker bound to the process-wide engine is returned.
 
     Returns:
         SQLAlchemy sessionmaker
     """
-    if engine is None:
-        engine = get_db_engine()
+    global _session_factory
+
+    if engine is not None:
+        return sessionmaker(bind=engine)
+
+    if _session_factory is None:
+        shared_engine = get_db_engine()
+        with _lock:
+            if _session_factory is None:
+                _session_factory = sessionmaker(bind=shared_engine)
+
+    return _session_factory
+
+
+def upgrade_database(engine=None, revision="head"):
+    """
+    Migrate the database schema with Alembic
+
+    Databases whose tables were created by ``Base.metadata.create_all``
+    before migrations existed are stamped with the baseline revision first.
+    The upgrade holds an advisory lock, so concurrent callers run it once.
+
+    Args:
+        engine: Optional SQLAlchemy engine (the shared engine if omitted)
+        revision: Target revision
+    """
+    engine = engine or get_db_engine()
+    with engine.begin() as connection:
+        connection.execute(
+            text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY}
+        )
+        config = Config()
+        config.set_main_option("script_location", MIGRATIONS_PATH)
+        config.attributes["connection"] = connection
 
-    return sessionmaker(bind=engine)
+        tables = inspect(connection)
+        if not tables.has_table("alembic_version") and tables.has_table("hypotheses"):
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, revision)
 
 
 def create_tables(engine=None):
     """
-    Create all tables defined in the models
+    Bring the schema up to date by running the migrations
+
+    The check against the shared engine runs at most once per process.
 
     Args:
         engine: Optional SQLAlchemy engine
     """
-    if engine is None:
-        engine = get_db_engine()
+    global _tables_created
+
+    if engine is not None and engine is not _engine:
+        upgrade_database(engine)
+        return
+
+    if _tables_created:
+        return
+
+    shared_engine = get_db_engine()
+    with _lock:
+        if not _tables_created:
+            upgrade_database(shared_engine)
+            _tables_created = True
+
+
+def dispose_db_engine():
+    """
+    Close all pooled connections and drop the process-wide engine
+
+    A later call to ``get_db_engine`` creates a fresh engine.
+    """
+    global _engine, _session_factory, _tables_created
+
+    with _lock:
+        if _engine is not None:
+            _engine.dispose()
+        _engine = None
+        _session_factory = None
+        _tables_created = False
+
+
+def get_async_db_engine():
+    """
+    Return the async SQLAlchemy engine for the running event loop
+
+    Must be called from inside a coroutine.
+
+    Returns:
+        SQLAlchemy AsyncEngine instance
+    """
+    loop = asyncio.get_running_loop()
+
+    with _lock:
+        engine = _async_engines.get(loop)
+        if engine is None:
+            engine = create_async_engine(get_async_db_url(), **get_db_pool_params())
+            _async_engines[loop] = engine
+
+    return engine
+
+
+def get_async_session_factory():
+    """
+    Get an async_sessionmaker bound to the running loop's async engine
+
+    Returns:
+        SQLAlchemy async_sessionmaker
+    """
+    loop = asyncio.get_running_loop()
+    engine = get_async_db_engine()
+
+    with _lock:
+        factory = _async_session_factories.get(loop)
+        if factory is None:
+            factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+            _async_session_factories[loop] = factory
+
+    return factory
+
+
+async def dispose_async_db_engine():
+    """
+    Close the async engine owned by the running event loop
+    """
+    loop = asyncio.get_running_loop()
+
+    with _lock:
+        engine = _async_engines.pop(loop, None)
+        _async_session_factories.pop(loop, None)
 
-    Base.metadata.create_all(engine)
+    if engine is not None:
+        await engine.dispose()
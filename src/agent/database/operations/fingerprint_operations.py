@@ -0,0 +1,201 @@
+"""
+Alpha fingerprint (dedup index) database operations for AlphaGPT
+"""
+from typing import Dict, Any, Iterable, List, Optional
+from sqlalchemy import case, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from agent.database.models.alpha_fingerprint import AlphaFingerprint
+from agent.database.operations.db_connection import (
+    get_session_factory,
+    get_async_session_factory,
+)
+
+
+def fingerprint_to_dict(f: AlphaFingerprint) -> Dict[str, Any]:
+    """
+    Convert a fingerprint row to the dictionary returned by query functions
+    
+    Args:
+        f: AlphaFingerprint instance
+        
+    Returns:
+        Fingerprint dictionary
+    """
+    return {
+        "fingerprint": f.fingerprint,
+        "canonical": f.canonical,
+        "kind": f.kind,
+        "thread_id": f.thread_id,
+        "alpha_id": f.alpha_id,
+        "expression": f.expression,
+        "code": f.code,
+        "metrics": f.metrics,
+        "metrics_version": f.metrics_version,
+        "hits": f.hits,
+    }
+
+
+def _upsert_statement(rows: List[Dict[str, Any]]):
+    """
+    Build ``INSERT ... ON CONFLICT (fingerprint) DO UPDATE`` for fingerprint rows
+    
+    The first occurrence keeps its thread, alpha ID and code; empty columns
+    are filled in from the new row. New metrics replace stored ones, and
+    every repeat increments ``hits``.
+    """
+    stmt = pg_insert(AlphaFingerprint).values(rows)
+    table = AlphaFingerprint.__table__.c
+    return stmt.on_conflict_do_update(
+        index_elements=[AlphaFingerprint.fingerprint],
+        set_={
+            "code": func.coalesce(func.nullif(table.code, ""), stmt.excluded.code),
+            "expression": func.coalesce(table.expression, stmt.excluded.expression),
+            "metrics": case(
+                (stmt.excluded.metrics_version.is_(None), table.metrics),
+                else_=stmt.excluded.metrics,
+            ),
+            "metrics_version": func.coalesce(
+                stmt.excluded.metrics_version, table.metrics_version
+            ),
+            "hits": table.hits + 1,
+        },
+    )
+
+
+def _fingerprint_rows(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One row per fingerprint (a statement may not touch a row twice), last wins"""
+    unique: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        merged = unique.setdefault(row["fingerprint"], {"hits": 0})
+        merged.update({k: v for k, v in row.items() if v is not None})
+    columns = (
+        "fingerprint", "canonical", "kind", "thread_id", "alpha_id",
+        "expression", "code", "metrics", "metrics_version", "hits",
+    )
+    return [{c: row.get(c) for c in columns} for row in unique.values()]
+
+
+def save_fingerprints(
+    rows: Iterable[Dict[str, Any]],
+    session: Optional[Session] = None
+) -> int:
+    """
+    Record alpha fingerprints in the dedup index
+    
+    Args:
+        rows: Fingerprint dictionaries (``fingerprint``, ``canonical`` and
+            ``kind`` are required)
+        session: Optional SQLAlchemy session
+        
+    Returns:
+        Number of fingerprints written
+    """
+    rows = _fingerprint_rows(rows)
+    
+    if not rows:
+        return 0
+    
+    # Create session if needed
+    session_provided = session is not None
+    if not session_provided:
+        session = get_session_factory()()
+    
+    try:
+        session.execute(_upsert_statement(rows))
+        
+        if not session_provided:
+            session.commit()
+        
+        return len(rows)
+    
+    finally:
+        if not session_provided:
+            session.close()
+
+
+async def asave_fingerprints(
+    rows: Iterable[Dict[str, Any]],
+    session: Optional[AsyncSession] = None
+) -> int:
+    """
+    Record alpha fingerprints in the dedup index without blocking the event loop
+    
+    Args:
+        rows: Fingerprint dictionaries, as for ``save_fingerprints``
+        session: Optional SQLAlchemy async session
+        
+    Returns:
+        Number of fingerprints written
+    """
+    rows = _fingerprint_rows(rows)
+    
+    if not rows:
+        return 0
+    
+    if session is not None:
+        await session.execute(_upsert_statement(rows))
+        return len(rows)
+    
+    async with get_async_session_factory()() as session:
+        await session.execute(_upsert_statement(rows))
+        await session.commit()
+        return len(rows)
+
+
+def get_known_fingerprints(fingerprints: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Look up fingerprints in the dedup index with one query
+    
+    Args:
+        fingerprints: Fingerprint digests
+        
+    Returns:
+        Mapping of digest to fingerprint dictionary, for the known digests
+    """
+    keys = set(fingerprints)
+    if not keys:
+        return {}
+    
+    session_factory = get_session_factory()
+    session = session_factory()
+    
+    try:
+        rows = session.scalars(
+            select(AlphaFingerprint).where(AlphaFingerprint.fingerprint.in_(keys))
+        ).all()
+        
+        return {f.fingerprint: fingerprint_to_dict(f) for f in rows}
+    
+    finally:
+        session.close()
+
+
+async def aget_known_fingerprints(
+    fingerprints: Iterable[str], session: Optional[AsyncSession] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Look up fingerprints in the dedup index without blocking the event loop
+    
+    Args:
+        fingerprints: Fingerprint digests
+        session: Optional SQLAlchemy async session
+        
+    Returns:
+        Mapping of digest to fingerprint dictionary, for the known digests
+    """
+    keys = set(fingerprints)
+    if not keys:
+        return {}
+    
+    stmt = select(AlphaFingerprint).where(AlphaFingerprint.fingerprint.in_(keys))
+
+    if session is not None:
+        rows = (await session.scalars(stmt)).all()
+        return {f.fingerprint: fingerprint_to_dict(f) for f in rows}
+
+    async with get_async_session_factory()() as session:
+        rows = (await session.scalars(stmt)).all()
+        return {f.fingerprint: fingerprint_to_dict(f) for f in rows}
@@ -0,0 +1,157 @@
+"""
+Thread history database operations for AlphaGPT
+
+Hypotheses, their alphas and the alphas' backtest results are loaded with
+eager ``selectinload`` options, so a page of history costs three queries
+regardless of how many iterations, alphas or backtests it contains.
+"""
+from typing import Dict, Any, Iterator, List, Optional
+from sqlalchemy import select
+from sqlalchemy.orm import Session, defer, selectinload
+
+from agent.database.models.hypothesis import Hypothesis
+from agent.database.models.alpha import Alpha
+from agent.database.models.backtest_result import BacktestResult
+from agent.database.operations.db_connection import get_session_factory
+from agent.database.operations.hypothesis_operations import hypothesis_to_dict
+from agent.database.operations.alpha_operations import alpha_to_dict
+from agent.database.operations.backtest_operations import backtest_result_to_dict
+
+
+def _history_statement(
+    thread_id: str,
+    after_iteration: Optional[int],
+    limit: Optional[int],
+    include_code: bool,
+    include_backtest_data: bool,
+):
+    """Build the eager-loading select for one page of thread history"""
+    backtest_load = selectinload(Alpha.backtest_results)
+    if not include_backtest_data:
+        backtest_load = backtest_load.options(defer(BacktestResult.backtest_data))
+
+    alpha_options = [backtest_load]
+    if not include_code:
+        alpha_options.append(defer(Alpha.code))
+    alpha_load = selectinload(Hypothesis.alphas).options(*alpha_options)
+
+    stmt = (
+        select(Hypothesis)
+        .filter_by(thread_id=thread_id)
+        .order_by(Hypothesis.iteration, Hypothesis.id)
+        .options(alpha_load)
+    )
+
+    if after_iteration is not None:
+        stmt = stmt.where(Hypothesis.iteration > after_iteration)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+
+    return stmt
+
+
+def _hypothesis_tree_to_dict(
+    h: Hypothesis, include_code: bool, include_backtest_data: bool
+) -> Dict[str, Any]:
+    """Convert an eagerly loaded hypothesis and its children to a dictionary"""
+    hypothesis = hypothesis_to_dict(h)
+    hypothesis["alphas"] = []
+
+    for a in sorted(h.alphas, key=lambda alpha: alpha.id):
+        alpha = alpha_to_dict(a, include_code=include_code)
+        alpha["backtest_results"] = [
+            backtest_result_to_dict(r, include_backtest_data=include_backtest_data)
+            for r in sorted(a.backtest_results, key=lambda result: result.id)
+        ]
+        hypothesis["alphas"].append(alpha)
+
+    return hypothesis
+
+
+def get_thread_history(
+    thread_id: str,
+    after_iteration: Optional[int] = None,
+    limit: Optional[int] = None,
+    include_code: bool = True,
+    include_backtest_data: bool = True,
+    session: Optional[Session] = None,
+) -> Dict[str, Any]:
+    """
+    Get one page of a thread's hypotheses with their alphas and backtest results
+
+    Args:
+        thread_id: The thread ID to query
+        after_iteration: Cursor; only hypotheses with a greater iteration are returned
+        limit: Maximum number of hypotheses in the page
+        include_code: Whether to load the alphas' code column
+        include_backtest_data: Whether to load the full backtest_data column
+        session: Optional SQLAlchemy session
+
+    Returns:
+        Dictionary with ``hypotheses`` and ``next_cursor``, the iteration to
+        pass as ``after_iteration`` for the next page (None on the last page)
+    """
+    stmt = _history_statement(
+        thread_id, after_iteration, limit, include_code, include_backtest_data
+    )
+
+    session_provided = session is not None
+    if not session_provided:
+        session = get_session_factory()()
+
+    try:
+        hypotheses = [
+            _hypothesis_tree_to_dict(h, include_code, include_backtest_data)
+            for h in session.scalars(stmt).all()
+        ]
+
+    finally:
+        if not session_provided:
+            session.close()
+
+    next_cursor = None
+    if limit is not None and len(hypotheses) == limit:
+        next_cursor = hypotheses[-1]["iteration"]
+
+    return {"hypotheses": hypotheses, "next_cursor": next_cursor}
+
+
+def iter_thread_history(
+    thread_id: str,
+    page_size: int = 50,
+    after_iteration: Optional[int] = None,
+    include_code: bool = True,
+    include_backtest_data: bool = True,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream a thread's history one hypothesis at a time
+
+    Pages are fetched lazily with keyset pagination on ``iteration``, each in
+    its own short-lived session, so memory stays bounded for long threads.
+
+    Args:
+        thread_id: The thread ID to query
+        page_size: Number of hypotheses fetched per round trip
+        after_iteration: Optional cursor to resume from
+        include_code: Whether to load the alphas' code column
+        include_backtest_data: Whether to load the full backtest_data column
+
+    Yields:
+        Hypothesis dictionaries with nested alphas and backtest results
+    """
+    cursor = after_iteration
+
+    while True:
+        page = get_thread_history(
+            thread_id,
+            after_iteration=cursor,
+            limit=page_size,
+            include_code=include_code,
+            include_backtest_data=include_backtest_data,
+        )
+        hypotheses: List[Dict[str, Any]] = page["hypotheses"]
+        yield from hypotheses
+
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return
@@ -1,11 +1,92 @@
 """
 Hypothesis database operations for AlphaGPT
 """
+from datetime import datetime
 from typing import Dict, Any, List, Optional
+from sqlalchemy import DateTime, Integer, String, exists, literal, select, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from agent.database.models.hypothesis import Hypothesis
-from agent.database.operations.db_connection import get_session_factory
+from agent.database.models.thread_counter import ThreadCounter
+from agent.database.operations.db_connection import (
+    get_session_factory,
+    get_async_session_factory,
+)
+
+
+def _save_hypothesis_statement(
+    thread_id: str, checkpoint_id: str, state_values: Dict[str, Any]
+):
+    """
+    Build the statement that saves a hypothesis and returns its row
+    
+    One statement with three CTEs:
+    
+    * ``existing`` finds a hypothesis already saved for the checkpoint
+    * ``counter`` increments the thread's counter (starting at 0), only if
+      there is none; the counter row lock orders concurrent writers
+    * ``inserted`` inserts the hypothesis with the new iteration, and does
+      nothing if a concurrent writer inserted the checkpoint first
+    
+    The result is the inserted or the existing row.
+    """
+    table = Hypothesis.__table__
+    existing = (
+        select(table)
+        .where(table.c.thread_id == thread_id, table.c.checkpoint_id == checkpoint_id)
+        .cte("existing")
+    )
+    
+    counter_insert = pg_insert(ThreadCounter).from_select(
+        ["thread_id", "last_iteration", "updated_at"],
+        select(
+            literal(thread_id, String),
+            literal(0, Integer),
+            literal(datetime.utcnow(), DateTime),
+        ).where(~exists(select(existing.c.id))),
+    )
+    counter = (
+        counter_insert.on_conflict_do_update(
+            index_elements=[ThreadCounter.thread_id],
+            set_={
+                "last_iteration": ThreadCounter.last_iteration + 1,
+                "updated_at": counter_insert.excluded.updated_at,
+            },
+        )
+        .returning(ThreadCounter.last_iteration)
+        .cte("counter")
+    )
+    
+    values = {
+        "thread_id": thread_id,
+        "checkpoint_id": checkpoint_id,
+        "trading_idea": state_values.get("trading_idea", ""),
+        "hypothesis": state_values.get("hypothesis", ""),
+        "reason": state_values.get("reason", ""),
+        "concise_reason": state_values.get("concise_reason", ""),
+        "concise_observation": state_values.get("concise_observation", ""),
+        "concise_justification": state_values.get("concise_justification", ""),
+        "concise_knowledge": state_values.get("concise_knowledge", ""),
+        "created_at": datetime.utcnow(),
+    }
+    inserted = (
+        pg_insert(Hypothesis)
+        .from_select(
+            list(values) + ["iteration"],
+            select(
+                *(literal(value, table.c[name].type) for name, value in values.items()),
+                counter.c.last_iteration,
+            ),
+        )
+        .on_conflict_do_nothing(index_elements=["thread_id", "checkpoint_id"])
+        .returning(*table.c)
+        .cte("inserted")
+    )
+    
+    rows = union_all(select(inserted), select(existing))
+    return select(Hypothesis).from_statement(rows)
 
 
 def save_hypothesis(
@@ -17,6 +98,13 @@ def save_hypothesis(
     """
     Save hypothesis data from the graph state to our database
     
+    The lookup of an existing row, the iteration number and the insert are
+    one statement (see ``_save_hypothesis_statement``), so concurrent
+    writers to a thread get consecutive iterations, and a checkpoint is
+    saved once. The counter row stays locked until the transaction commits,
+    so the statement runs in a savepoint that is rolled back if a concurrent
+    writer saved the same checkpoint first.
+    
     Args:
         thread_id: LangGraph thread ID
         checkpoint_id: LangGraph checkpoint ID
@@ -36,45 +124,27 @@ def save_hypothesis(
         session = session_factory()
     
     try:
-        # Check if we already saved this checkpoint's hypothesis
-        existing = (
-            session.query(Hypothesis)
-            .filter_by(thread_id=thread_id, checkpoint_id=checkpoint_id)
-            .first()
-        )
-        
-        if existing:
-            return existing
+        stmt = _save_hypothesis_statement(thread_id, checkpoint_id, state_values)
+        savepoint = session.begin_nested()
+        hypothesis = session.scalars(stmt).first()
         
-        # Get the current iteration
-        current_iteration = 0
-        last_hypothesis = (
-            session.query(Hypothesis)
-            .filter_by(thread_id=thread_id)
-            .order_by(Hypothesis.iteration.desc())
-            .first()
-        )
-        
-        if last_hypothesis:
-            current_iteration = last_hypothesis.iteration + 1
-        
-        # Create new hypothesis record
-        hypothesis = Hypothesis(
-            thread_id=thread_id,
-            checkpoint_id=checkpoint_id,
-            trading_idea=state_values.get("trading_idea", ""),
-            hypothesis=state_values.get("hypothesis", ""),
-            reason=state_values.get("reason", ""),
-            concise_reason=state_values.get("concise_reason", ""),
-            concise_observation=state_values.get("concise_observation", ""),
-            concise_justification=state_values.get("concise_justification", ""),
-            concise_knowledge=state_values.get("concise_knowledge", ""),
-            iteration=current_iteration,
-        )
-        
-        session.add(hypothesis)
+        if hypothesis is None:
+            # A concurrent writer inserted this checkpoint after our snapshot.
+            # Rolling back returns the iteration we took, and as we still hold
+            # the counter row lock, no later iteration was handed out.
+            savepoint.rollback()
+            hypothesis = session.scalars(
+                select(Hypothesis).filter_by(
+                    thread_id=thread_id, checkpoint_id=checkpoint_id
+                )
+            ).first()
+        else:
+            savepoint.commit()
         
         if not session_provided:
+            # Keep the loaded attributes usable after the session closes
+            if hypothesis is not None:
+                session.expunge(hypothesis)
             session.commit()
         
         return hypothesis
@@ -84,6 +154,30 @@ def save_hypothesis(
             session.close()
 
 
+def hypothesis_to_dict(h: Hypothesis) -> Dict[str, Any]:
+    """
+    Convert a hypothesis row to the dictionary returned by query functions
+    
+    Args:
+        h: Hypothesis instance
+        
+    Returns:
+        Hypothesis dictionary
+    """
+    return {
+        "id": h.id,
+        "iteration": h.iteration,
+        "trading_idea": h.trading_idea,
+        "hypothesis": h.hypothesis,
+        "reason": h.reason,
+        "concise_reason": h.concise_reason,
+        "concise_observation": h.concise_observation,
+        "concise_justification": h.concise_justification,
+        "concise_knowledge": h.concise_knowledge,
+        "created_at": h.created_at.isoformat() if h.created_at else None,
+    }
+
+
 def get_hypothesis_history(thread_id: str) -> List[Dict[str, Any]]:
     """
     Get the history of hypotheses for a thread
@@ -105,21 +199,35 @@ def get_hypothesis_history(thread_id: str) -> List[Dict[str, Any]]:
             .all()
         )
         
-        return [
-            {
-                "id": h.id,
-                "iteration": h.iteration,
-                "trading_idea": h.trading_idea,
-                "hypothesis": h.hypothesis,
-                "reason": h.reason,
-                "concise_reason": h.concise_reason,
-                "concise_observation": h.concise_observation,
-                "concise_justification": h.concise_justification,
-                "concise_knowledge": h.concise_knowledge,
-                "created_at": h.created_at.isoformat() if h.created_at else None,
-            }
-            for h in hypotheses
-        ]
+        return [hypothesis_to_dict(h) for h in hypotheses]
     
     finally:
         session.close()
+
+
+async def aget_hypothesis_history(
+    thread_id: str, session: Optional[AsyncSession] = None
+) -> List[Dict[str, Any]]:
+    """
+    Get the history of hypotheses for a thread without blocking the event loop
+    
+    Args:
+        thread_id: The thread ID to query
+        session: Optional SQLAlchemy async session
+        
+    Returns:
+        List of hypothesis dictionaries
+    """
+    stmt = (
+        select(Hypothesis)
+        .filter_by(thread_id=thread_id)
+        .order_by(Hypothesis.iteration)
+    )
+
+    if session is not None:
+        hypotheses = (await session.scalars(stmt)).all()
+        return [hypothesis_to_dict(h) for h in hypotheses]
+
+    async with get_async_session_factory()() as session:
+        hypotheses = (await session.scalars(stmt)).all()
+        return [hypothesis_to_dict(h) for h in hypotheses]
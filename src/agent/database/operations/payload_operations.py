@@ -0,0 +1,108 @@
+"""
+Checkpoint payload database operations for AlphaGPT
+
+Content-addressed storage of the large values offloaded from graph
+checkpoints (see ``agent.database.checkpoint_serde``).
+"""
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from agent.database.models.checkpoint_payload import CheckpointPayload
+from agent.database.operations.db_connection import get_session_factory
+
+Payload = Tuple[str, bytes]
+
+
+def save_payloads(
+    payloads: Dict[str, Payload],
+    session: Optional[Session] = None
+) -> int:
+    """
+    Store payloads that are not stored yet, with one statement
+    
+    Payloads that are already stored only get their ``last_used_at`` refreshed.
+    
+    Args:
+        payloads: Mapping of digest to ``(type, data)``
+        session: Optional SQLAlchemy session
+        
+    Returns:
+        Number of payloads offered to the database
+    """
+    if not payloads:
+        return 0
+    
+    now = datetime.utcnow()
+    rows = [
+        {
+            "digest": digest,
+            "type": type_,
+            "data": data,
+            "size": len(data),
+            "created_at": now,
+            "last_used_at": now,
+        }
+        for digest, (type_, data) in payloads.items()
+    ]
+    # Identical content has the same digest; existing rows are only touched
+    stmt = pg_insert(CheckpointPayload).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CheckpointPayload.digest],
+        set_={"last_used_at": stmt.excluded.last_used_at},
+    )
+    
+    session_provided = session is not None
+    if not session_provided:
+        session = get_session_factory()()
+    
+    try:
+        session.execute(stmt)
+        
+        if not session_provided:
+            session.commit()
+        
+        return len(rows)
+    
+    finally:
+        if not session_provided:
+            session.close()
+
+
+def get_payloads(
+    digests: Iterable[str],
+    session: Optional[Session] = None
+) -> Dict[str, Payload]:
+    """
+    Load payloads by digest with one query
+    
+    Args:
+        digests: Payload digests
+        session: Optional SQLAlchemy session
+        
+    Returns:
+        Mapping of digest to ``(type, data)``, for the stored digests
+    """
+    keys = set(digests)
+    if not keys:
+        return {}
+    
+    stmt = select(
+        CheckpointPayload.digest, CheckpointPayload.type, CheckpointPayload.data
+    ).where(CheckpointPayload.digest.in_(keys))
+    
+    session_provided = session is not None
+    if not session_provided:
+        session = get_session_factory()()
+    
+    try:
+        return {
+            row.digest: (row.type, bytes(row.data))
+            for row in session.execute(stmt).all()
+        }
+    
+    finally:
+        if not session_provided:
+            session.close()
@@ -0,0 +1,250 @@
+"""
+Retrieval index database operations for AlphaGPT
+
+Queries used to keep the embedding index of hypotheses and alphas in sync
+with the database, and to resolve search hits to rows with their metrics.
+"""
+from datetime import datetime
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from agent.database.models.hypothesis import Hypothesis
+from agent.database.models.alpha import Alpha
+from agent.database.models.backtest_result import BacktestResult
+from agent.database.operations.db_connection import (
+    get_session_factory,
+    get_async_session_factory,
+)
+
+
+def hypothesis_text(hypothesis: Optional[str]) -> str:
+    """Text embedded for a hypothesis row"""
+    return (hypothesis or "").strip()
+
+
+def alpha_text(description: Optional[str], expression: Optional[str]) -> str:
+    """Text embedded for an alpha row"""
+    return "\n".join(part.strip() for part in (description, expression) if part)
+
+
+def get_rows_to_index(
+    kind: str,
+    since: Optional[datetime] = None,
+    after_id: int = 0,
+    limit: int = 256,
+    session: Optional[Session] = None,
+) -> List[Tuple[int, str, datetime]]:
+    """
+    Get one page of rows to embed, in ``(updated_at, id)`` order
+
+    ``updated_at`` is a row version: it is set on insert and bumped when the
+    embedded text changes. Row IDs are not a complete cursor because
+    concurrent transactions can commit them out of order.
+
+    Args:
+        kind: ``"hypothesis"`` or ``"alpha"``
+        since: Cursor version; only rows after ``(since, after_id)`` are
+            returned (None for all rows)
+        after_id: Cursor row ID within ``since``
+        limit: Maximum number of rows
+        session: Optional SQLAlchemy session
+
+    Returns:
+        List of ``(row_id, text, updated_at)`` tuples
+    """
+    if kind == "hypothesis":
+        model = Hypothesis
+        stmt = select(Hypothesis.id, Hypothesis.hypothesis, Hypothesis.updated_at)
+    elif kind == "alpha":
+        model = Alpha
+        stmt = select(Alpha.id, Alpha.description, Alpha.expression, Alpha.updated_at)
+    else:
+        raise ValueError(f"Unknown row kind '{kind}'")
+
+    if since is not None:
+        stmt = stmt.where(tuple_(model.updated_at, model.id) > tuple_(since, after_id))
+    stmt = stmt.order_by(model.updated_at, model.id).limit(limit)
+
+    session_provided = session is not None
+    if not session_provided:
+        session = get_session_factory()()
+
+    try:
+        rows = session.execute(stmt).all()
+    finally:
+        if not session_provided:
+            session.close()
+
+    if kind == "hypothesis":
+        return [(row.id, hypothesis_text(row.hypothesis), row.updated_at) for row in rows]
+    return [
+        (row.id, alpha_text(row.description, row.expression), row.updated_at) for row in rows
+    ]
+
+
+def _latest_results():
+    """Subquery of the most recent backtest result of every alpha"""
+    return (
+        select(func.max(BacktestResult.id).label("id"))
+        .group_by(BacktestResult.alpha_id)
+        .scalar_subquery()
+    )
+
+
+def _metrics(row: Any) -> Optional[Dict[str, Any]]:
+    if row.information_ratio is None and row.ic is None:
+        return None
+    return {
+        "information_ratio": row.information_ratio,
+        "annualized_return": row.annualized_return,
+        "max_drawdown": row.max_drawdown,
+        "ic": row.ic,
+    }
+
+
+def _hypotheses_statement(ids: Iterable[int]):
+    best = (
+        select(
+            Alpha.hypothesis_id,
+            func.max(BacktestResult.information_ratio).label("information_ratio"),
+            func.max(BacktestResult.annualized_return).label("annualized_return"),
+            func.min(BacktestResult.max_drawdown).label("max_drawdown"),
+            func.max(BacktestResult.ic).label("ic"),
+        )
+        .join(BacktestResult, BacktestResult.alpha_id == Alpha.id)
+        .where(Alpha.hypothesis_id.in_(ids), BacktestResult.id.in_(_latest_results()))
+        .group_by(Alpha.hypothesis_id)
+        .subquery()
+    )
+    return (
+        select(
+            Hypothesis.id,
+            Hypothesis.thread_id,
+            Hypothesis.trading_idea,
+            Hypothesis.hypothesis,
+            Hypothesis.reason,
+            best.c.information_ratio,
+            best.c.annualized_return,
+            best.c.max_drawdown,
+            best.c.ic,
+        )
+        .outerjoin(best, best.c.hypothesis_id == Hypothesis.id)
+        .where(Hypothesis.id.in_(ids))
+    )
+
+
+def _alphas_statement(ids: Iterable[int]):
+    latest = (
+        select(BacktestResult)
+        .where(BacktestResult.id.in_(_latest_results()))
+        .subquery()
+    )
+    return (
+        select(
+            Alpha.id,
+            Alpha.thread_id,
+            Alpha.hypothesis_id,
+            Alpha.alpha_id,
+            Alpha.expression,
+            Alpha.description,
+            latest.c.information_ratio,
+            latest.c.annualized_return,
+            latest.c.max_drawdown,
+            latest.c.ic,
+        )
+        .outerjoin(latest, latest.c.alpha_id == Alpha.id)
+        .where(Alpha.id.in_(ids))
+    )
+
+
+def _prior_attempt(kind: str, row: Any) -> Dict[str, Any]:
+    if kind == "hypothesis":
+        result = {
+            "id": row.id,
+            "thread_id": row.thread_id,
+            "trading_idea": row.trading_idea,
+            "hypothesis": row.hypothesis,
+            "reason": row.reason,
+        }
+    else:
+        result = {
+            "id": row.id,
+            "thread_id": row.thread_id,
+            "hypothesis_id": row.hypothesis_id,
+            "alpha_id": row.alpha_id,
+            "expression": row.expression,
+            "description": row.description,
+        }
+    result["metrics"] = _metrics(row)
+    return result
+
+
+def _statements(hits: Iterable[Tuple[str, int]]):
+    ids: Dict[str, List[int]] = {"hypothesis": [], "alpha": []}
+    for kind, row_id in hits:
+        ids[kind].append(row_id)
+    if ids["hypothesis"]:
+        yield "hypothesis", _hypotheses_statement(ids["hypothesis"])
+    if ids["alpha"]:
+        yield "alpha", _alphas_statement(ids["alpha"])
+
+
+def get_prior_attempts(
+    hits: Iterable[Tuple[str, int]], session: Optional[Session] = None
+) -> Dict[Tuple[str, int], Dict[str, Any]]:
+    """
+    Resolve search hits to hypotheses and alphas with their best metrics
+
+    Hypotheses carry the best metrics among their alphas' latest backtests;
+    alphas carry their latest backtest.
+
+    Args:
+        hits: ``(kind, row_id)`` pairs
+        session: Optional SQLAlchemy session
+
+    Returns:
+        Mapping of ``(kind, row_id)`` to the row dictionary
+    """
+    session_provided = session is not None
+    if not session_provided:
+        session = get_session_factory()()
+
+    try:
+        return {
+            (kind, row.id): _prior_attempt(kind, row)
+            for kind, stmt in _statements(hits)
+            for row in session.execute(stmt).all()
+        }
+    finally:
+        if not session_provided:
+            session.close()
+
+
+async def aget_prior_attempts(
+    hits: Iterable[Tuple[str, int]], session: Optional[AsyncSession] = None
+) -> Dict[Tuple[str, int], Dict[str, Any]]:
+    """
+    Resolve search hits to rows with their metrics without blocking the event loop
+
+    Args:
+        hits: ``(kind, row_id)`` pairs
+        session: Optional SQLAlchemy async session
+
+    Returns:
+        Mapping of ``(kind, row_id)`` to the row dictionary
+    """
+    if session is not None:
+        return {
+            (kind, row.id): _prior_attempt(kind, row)
+            for kind, stmt in _statements(hits)
+            for row in (await session.execute(stmt)).all()
+        }
+
+    async with get_async_session_factory()() as session:
+        return {
+            (kind, row.id): _prior_attempt(kind, row)
+            for kind, stmt in _statements(hits)
+            for row in (await session.execute(stmt)).all()
+        }
@@ -0,0 +1,698 @@
+"""
+Checkpoint retention and compaction
+
+``PostgresSaver`` keeps every checkpoint of every node, so a thread that runs
+for hundreds of iterations accumulates thousands of checkpoints, each with
+blobs for every channel version it saw. ``CheckpointRetention`` removes the
+checkpoints a ``RetentionPolicy`` does not keep.
+
+A policy keeps the newest checkpoints of a thread, the checkpoint at the end
+of every graph run (the iteration boundaries), the checkpoints referenced by
+``hypotheses.checkpoint_id``, and checkpoints younger than a minimum age.
+
+The history channels are ``DeltaChannel``s (see ``agent.state``): their value
+is rebuilt by replaying the writes of the checkpoint's ancestors, back to the
+nearest snapshot. An ancestor on that chain cannot be deleted without
+silently truncating the history, so it is kept as a *skeleton*: the row
+stays, marked ``{"pruned": true}`` in its metadata and stripped down to the
+history channels, together with its history-channel writes, while its other
+writes and blobs are deleted. The "input" checkpoint that starts each run is
+kept as a skeleton too, since it is what marks its parent as an iteration
+boundary. Everything else is deleted outright.
+
+Compaction works one thread at a time. Deletes run in short transactions of
+at most ``batch_size`` rows, each with a ``lock_timeout``. A batch that
+cannot get its locks is skipped and retried on the next run, so a compaction
+never blocks a running graph for long. Payloads offloaded by
+``agent.database.checkpoint_serde`` are collected separately by a
+mark-and-sweep over the remaining blobs and writes. A dry run plans
+everything without deleting anything and reports the reclaimable size.
+"""
+
+import threading
+import time
+import typing
+from dataclasses import dataclass, field, fields
+from datetime import datetime, timedelta, timezone
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from agent.database.checkpoint_serde import REFERENCE_KEY, OffloadingSerializer
+from agent.database.operations.db_connection import get_db_engine
+
+BlobKey = Tuple[str, str]
+
+
+def state_delta_channels() -> Tuple[str, ...]:
+    """Names of the ``State`` fields stored as ``DeltaChannel``"""
+    from langgraph.channels import DeltaChannel
+
+    from agent.state import State
+
+    hints = typing.get_type_hints(State, include_extras=True)
+    return tuple(
+        name
+        for name, hint in hints.items()
+        if any(isinstance(meta, DeltaChannel) for meta in getattr(hint, "__metadata__", ()))
+    )
+
+
+@dataclass(kw_only=True)
+class RetentionPolicy:
+    """Which checkpoints of a thread are kept, and how compaction is paced"""
+
+    keep_last: int = 20
+    """Number of newest checkpoints kept in every thread (at least 1)"""
+
+    keep_iteration_boundaries: bool = True
+    """Keep the last checkpoint of every graph run"""
+
+    keep_referenced: bool = True
+    """Keep the checkpoints referenced by ``hypotheses.checkpoint_id``"""
+
+    min_age_seconds: float = 3600.0
+    """Checkpoints younger than this are always kept"""
+
+    delta_channels: Optional[Tuple[str, ...]] = None
+    """Channels rebuilt from ancestor writes (the ``DeltaChannel`` fields of ``State`` if None)"""
+
+    batch_size: int = 500
+    """Maximum number of rows deleted or updated per transaction"""
+
+    lock_timeout_ms: int = 2000
+    """Lock timeout of every batch; a batch that times out is skipped"""
+
+    pause_seconds: float = 0.05
+    """Pause between batches, leaving the database to the running graphs"""
+
+    payload_grace_seconds: float = 2 * 3600.0
+    """Payloads written or touched within this period are never collected;
+    must exceed ``DatabasePayloadStore.touch_after``"""
+
+    def __post_init__(self) -> None:
+        if self.keep_last < 1:
+            raise ValueError("keep_last must be at least 1")
+        if self.batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        if self.delta_channels is None:
+            self.delta_channels = state_delta_channels()
+
+
+class CheckpointInfo(NamedTuple):
+    """The parts of a checkpoint row retention needs"""
+
+    checkpoint_id: str
+    parent_id: Optional[str]
+    versions: Dict[str, str]
+    inline: FrozenSet[str] = frozenset()
+    source: Optional[str] = None
+    created_at: Optional[datetime] = None
+    size: int = 0
+    strippable: int = 0
+    pruned: bool = False
+
+
+@dataclass
+class RetentionPlan:
+    """Outcome of applying a policy to one thread"""
+
+    keep: Set[str] = field(default_factory=set)
+    skeleton: Set[str] = field(default_factory=set)
+    delete: Set[str] = field(default_factory=set)
+    blobs: List[BlobKey] = field(default_factory=list)
+    newly_pruned: int = 0
+    writes: int = 0
+    reclaimable_bytes: int = 0
+
+
+@dataclass
+class RetentionReport:
+    """Totals of a compaction; for a dry run, what a compaction would do"""
+
+    dry_run: bool = False
+    threads: int = 0
+    checkpoints: int = 0
+    checkpoints_deleted: int = 0
+    checkpoints_pruned: int = 0
+    writes_deleted: int = 0
+    blobs_deleted: int = 0
+    payloads_deleted: int = 0
+    reclaimable_bytes: int = 0
+    skipped_batches: int = 0
+
+    def merge(self, other: "RetentionReport") -> "RetentionReport":
+        """Add the counts of another report to this one"""
+        for f in fields(self):
+            if f.name != "dry_run":
+                setattr(self, f.name, getattr(self, f.name) + getattr(other, f.name))
+        return self
+
+    def summary(self) -> str:
+        """One-line description of the report"""
+        verb = "would reclaim" if self.dry_run else "reclaimed"
+        return (
+            f"Checkpoint retention {verb} {self.reclaimable_bytes / 2**20:.1f} MiB "
+            f"in {self.threads} threads: {self.checkpoints_deleted} of "
+            f"{self.checkpoints} checkpoints deleted, {self.checkpoints_pruned} pruned, "
+            f"{self.writes_deleted} writes, {self.blobs_deleted} blobs and "
+            f"{self.payloads_deleted} payloads deleted"
+            + (f", {self.skipped_batches} batches skipped" if self.skipped_batches else "")
+        )
+
+
+def _is_seed(
+    checkpoint: CheckpointInfo, channel: str, blobs: Dict[BlobKey, Tuple[str, int]]
+) -> bool:
+    """Whether a checkpoint stores the full value of a delta channel"""
+    if channel in checkpoint.inline:
+        return True
+    version = checkpoint.versions.get(channel)
+    blob = blobs.get((channel, version)) if version is not None else None
+    return blob is not None and blob[0] != "empty"
+
+
+def plan_retention(
+    checkpoints: Sequence[CheckpointInfo],
+    blobs: Dict[BlobKey, Tuple[str, int]],
+    writes: Dict[str, Dict[str, Tuple[int, int]]],
+    policy: RetentionPolicy,
+    referenced: Iterable[str] = (),
+    now: Optional[datetime] = None,
+) -> RetentionPlan:
+    """
+    Decide which checkpoints, writes and blobs of one thread can go
+
+    Args:
+        checkpoints: Checkpoints of the thread (one namespace)
+        blobs: ``(type, size)`` of every blob, by ``(channel, version)``
+        writes: ``(count, size)`` of the writes of every checkpoint, by channel
+        policy: Retention policy
+        referenced: Checkpoint ids referenced by application tables
+        now: Current time (UTC), for ``min_age_seconds``
+
+    Returns:
+        Retention plan of the thread
+    """
+    by_id = {c.checkpoint_id: c for c in checkpoints}
+    # Checkpoint ids are uuid6, so they sort by creation time
+    newest = sorted(by_id)[-policy.keep_last:]
+    keep = set(newest)
+
+    if policy.keep_iteration_boundaries:
+        # A run starts with an "input" checkpoint whose parent ended the previous run
+        keep.update(
+            c.parent_id for c in checkpoints if c.source == "input" and c.parent_id in by_id
+        )
+    if policy.keep_referenced:
+        keep.update(cid for cid in referenced if cid in by_id)
+    if policy.min_age_seconds > 0:
+        cutoff = (now or datetime.now(timezone.utc)) - timedelta(seconds=policy.min_age_seconds)
+        keep.update(
+            c.checkpoint_id
+            for c in checkpoints
+            if c.created_at is None or c.created_at > cutoff
+        )
+
+    # Ancestors whose writes rebuild a delta channel of a kept checkpoint,
+    # down to (and including) the nearest snapshot
+    skeleton: Set[str] = set()
+    for channel in policy.delta_channels:
+        walked: Set[str] = set()
+        for cid in keep:
+            ancestor = by_id[cid].parent_id
+            while ancestor in by_id and ancestor not in walked:
+                walked.add(ancestor)
+                if ancestor not in keep:
+                    skeleton.add(ancestor)
+                if _is_seed(by_id[ancestor], channel, blobs):
+                    break
+                ancestor = by_id[ancestor].parent_id
+
+    if policy.keep_iteration_boundaries:
+        skeleton.update(
+            c.checkpoint_id
+            for c in checkpoints
+            if c.source == "input" and c.parent_id in keep and c.checkpoint_id not in keep
+        )
+
+    plan = RetentionPlan(keep=keep, skeleton=skeleton)
+    plan.delete = set(by_id) - keep - skeleton
+    plan.newly_pruned = sum(1 for cid in skeleton if not by_id[cid].pruned)
+
+    delta = set(policy.delta_channels)
+    needed: Set[BlobKey] = set()
+    for cid in keep:
+        needed.update(by_id[cid].versions.items())
+    for cid in skeleton:
+        needed.update((ch, v) for ch, v in by_id[cid].versions.items() if ch in delta)
+
+    # Only blobs of pruned checkpoints are candidates: a blob no scanned
+    # checkpoint references may belong to a checkpoint being written
+    candidates: Set[BlobKey] = set()
+    for cid in plan.delete | skeleton:
+        candidates.update(by_id[cid].versions.items())
+    plan.blobs = sorted(key for key in candidates - needed if key in blobs)
+
+    reclaimable = sum(blobs[key][1] for key in plan.blobs)
+    for cid in plan.delete:
+        reclaimable += by_id[cid].size
+        for count, size in writes.get(cid, {}).values():
+            plan.writes += count
+            reclaimable += size
+    for cid in skeleton:
+        if not by_id[cid].pruned:
+            reclaimable += by_id[cid].strippable
+        for channel, (count, size) in writes.get(cid, {}).items():
+            if channel not in delta:
+                plan.writes += count
+                reclaimable += size
+    plan.reclaimable_bytes = reclaimable
+    return plan
+
+
+def _only_delta_channels(column: str) -> str:
+    """SQL of a checkpoint's JSON object ``column`` restricted to the delta channels"""
+    return (
+        "(SELECT coalesce(jsonb_object_agg(key, value), '{}'::jsonb) "
+        f"FROM jsonb_each(checkpoint -> '{column}') WHERE key = ANY(:delta))"
+    )
+
+
+SKELETON_CHECKPOINT_SQL = (
+    "jsonb_build_object('v', checkpoint -> 'v', 'id', checkpoint -> 'id', "
+    "'ts', checkpoint -> 'ts', 'versions_seen', '{}'::jsonb, "
+    f"'channel_values', {_only_delta_channels('channel_values')}, "
+    f"'channel_versions', {_only_delta_channels('channel_versions')}, "
+    "'updated_channels', '[]'::jsonb)"
+)
+"""SQL of a skeleton checkpoint: only what rebuilding the delta channels reads"""
+
+
+def _batches(items: Sequence[Any], size: int) -> Iterator[List[Any]]:
+    for start in range(0, len(items), size):
+        yield list(items[start:start + size])
+
+
+def _parse_ts(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        ts = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+class CheckpointRetention:
+    """
+    Apply a retention policy to the LangGraph checkpoint tables
+
+    Args:
+        policy: Retention policy (the defaults if None)
+        engine: SQLAlchemy engine (the shared engine if None)
+    """
+
+    def __init__(self, policy: Optional[RetentionPolicy] = None, engine=None) -> None:
+        self.policy = policy or RetentionPolicy()
+        self.engine = engine or get_db_engine()
+
+    def threads(self, thread_ids: Optional[Iterable[str]] = None) -> Iterator[Tuple[str, str]]:
+        """``(thread_id, checkpoint_ns)`` pairs with checkpoints, a page at a time"""
+        thread_filter = "AND thread_id = ANY(:thread_ids)" if thread_ids is not None else ""
+        params: Dict[str, Any] = {"thread_id": "", "ns": "", "limit": self.policy.batch_size}
+        if thread_ids is not None:
+            params["thread_ids"] = list(thread_ids)
+        query = text(
+            "SELECT DISTINCT thread_id, checkpoint_ns FROM checkpoints "
+            f"WHERE (thread_id, checkpoint_ns) > (:thread_id, :ns) {thread_filter} "
+            "ORDER BY thread_id, checkpoint_ns LIMIT :limit"
+        )
+        while True:
+            with self.engine.connect() as conn:
+                page = conn.execute(query, params).all()
+            yield from ((row[0], row[1]) for row in page)
+            if len(page) < self.policy.batch_size:
+                return
+            params["thread_id"], params["ns"] = page[-1][0], page[-1][1]
+
+    def plan_thread(self, thread_id: str, checkpoint_ns: str = "") -> Tuple[RetentionPlan, int]:
+        """
+        Plan the compaction of one thread
+
+        Blobs are read before checkpoints. A snapshot committed in between
+        then looks like an ordinary checkpoint, which only makes the plan
+        keep more of the history chain than it needs to.
+
+        Args:
+            thread_id: Thread to plan
+            checkpoint_ns: Checkpoint namespace of the thread
+
+        Returns:
+            The plan and the number of checkpoints of the thread
+        """
+        params = {"thread_id": thread_id, "ns": checkpoint_ns}
+        with self.engine.connect() as conn:
+            blobs = {
+                (row.channel, row.version): (row.type, row.size)
+                for row in conn.execute(
+                    text(
+                        "SELECT channel, version, type, pg_column_size(blob) AS size "
+                        "FROM checkpoint_blobs WHERE thread_id = :thread_id AND checkpoint_ns = :ns"
+                    ),
+                    params,
+                )
+            }
+            checkpoints = [
+                CheckpointInfo(
+                    checkpoint_id=row.checkpoint_id,
+                    parent_id=row.parent_checkpoint_id,
+                    versions=dict(row.versions or {}),
+                    inline=frozenset(row.inline or ()),
+                    source=row.source,
+                    created_at=_parse_ts(row.ts),
+                    size=row.size,
+                    strippable=max(row.strippable, 0),
+                    pruned=bool(row.pruned),
+                )
+                for row in conn.execute(
+                    text(
+                        "SELECT checkpoint_id, parent_checkpoint_id, "
+                        "checkpoint -> 'channel_versions' AS versions, "
+                        "ARRAY(SELECT key FROM jsonb_each(checkpoint -> 'channel_values') "
+                        "WHERE value <> 'null'::jsonb) AS inline, "
+                        "metadata ->> 'source' AS source, checkpoint ->> 'ts' AS ts, "
+                        "metadata ->> 'pruned' AS pruned, "
+                        "pg_column_size(checkpoints.*) AS size, "
+                        "pg_column_size(checkpoint) - "
+                        f"pg_column_size({SKELETON_CHECKPOINT_SQL}) AS strippable "
+                        "FROM checkpoints WHERE thread_id = :thread_id AND checkpoint_ns = :ns"
+                    ),
+                    {**params, "delta": list(self.policy.delta_channels)},
+                )
+            ]
+            writes: Dict[str, Dict[str, Tuple[int, int]]] = {}
+            for row in conn.execute(
+                text(
+                    "SELECT checkpoint_id, channel, count(*) AS count, "
+                    "sum(pg_column_size(checkpoint_writes.*)) AS size FROM checkpoint_writes "
+                    "WHERE thread_id = :thread_id AND checkpoint_ns = :ns "
+                    "GROUP BY checkpoint_id, channel"
+                ),
+                params,
+            ):
+                writes.setdefault(row.checkpoint_id, {})[row.channel] = (row.count, int(row.size))
+            referenced: List[str] = []
+            if self.policy.keep_referenced:
+                referenced = list(
+                    conn.execute(
+                        text("SELECT DISTINCT checkpoint_id FROM hypotheses WHERE thread_id = :thread_id"),
+                        params,
+                    ).scalars()
+                )
+
+        plan = plan_retention(checkpoints, blobs, writes, self.policy, referenced)
+        return plan, len(checkpoints)
+
+    def _execute_batches(
+        self,
+        statement: str,
+        params: Dict[str, Any],
+        items: Sequence[Any],
+        report: RetentionReport,
+        bind: Callable[[List[Any]], Dict[str, Any]] = lambda batch: {"ids": batch},
+    ) -> int:
+        """Run a statement once per batch of ``items``, each in its own short transaction"""
+        affected = 0
+        for batch in _batches(items, self.policy.batch_size):
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(
+                        text(f"SET LOCAL lock_timeout = '{int(self.policy.lock_timeout_ms)}ms'")
+                    )
+                    affected += conn.execute(text(statement), {**params, **bind(batch)}).rowcount
+            except OperationalError as e:
+                # Most likely a lock timeout; the rows stay for the next run
+                print(f"Skipping a checkpoint retention batch: {str(e).splitlines()[0]}")
+                report.skipped_batches += 1
+            if self.policy.pause_seconds:
+                time.sleep(self.policy.pause_seconds)
+        return affected
+
+    def compact_thread(
+        self, thread_id: str, checkpoint_ns: str = "", dry_run: bool = False
+    ) -> RetentionReport:
+        """
+        Compact one thread
+
+        Writes go first, then skeleton checkpoints are stripped, then blobs and
+        finally checkpoint rows are deleted. A compaction that stops half way
+        leaves every kept checkpoint loadable, and the next run finds the
+        remaining rows again.
+
+        Args:
+            thread_id: Thread to compact
+            checkpoint_ns: Checkpoint namespace of the thread
+            dry_run: Only report what would be deleted
+
+        Returns:
+            Report of the thread
+        """
+        plan, total = self.plan_thread(thread_id, checkpoint_ns)
+        report = RetentionReport(
+            dry_run=dry_run,
+            threads=1,
+            checkpoints=total,
+            checkpoints_deleted=len(plan.delete),
+            checkpoints_pruned=plan.newly_pruned,
+            writes_deleted=plan.writes,
+            blobs_deleted=len(plan.blobs),
+            reclaimable_bytes=plan.reclaimable_bytes,
+        )
+        if dry_run or not (plan.delete or plan.newly_pruned or plan.writes or plan.blobs):
+            return report
+
+        params = {
+            "thread_id": thread_id,
+            "ns": checkpoint_ns,
+            "delta": list(self.policy.delta_channels),
+        }
+        scope = "thread_id = :thread_id AND checkpoint_ns = :ns"
+        delete = sorted(plan.delete)
+        skeleton = sorted(plan.skeleton)
+
+        report.writes_deleted = self._execute_batches(
+            f"DELETE FROM checkpoint_writes WHERE {scope} AND checkpoint_id = ANY(:ids)",
+            params, delete, report,
+        )
+        report.writes_deleted += self._execute_batches(
+            f"DELETE FROM checkpoint_writes WHERE {scope} AND checkpoint_id = ANY(:ids) "
+            "AND channel <> ALL(:delta)",
+            params, skeleton, report,
+        )
+        report.checkpoints_pruned = self._execute_batches(
+            f"UPDATE checkpoints SET checkpoint = {SKELETON_CHECKPOINT_SQL}, "
+            "metadata = metadata || '{\"pruned\": true}'::jsonb "
+            f"WHERE {scope} AND checkpoint_id = ANY(:ids) AND metadata ->> 'pruned' IS NULL",
+            params, skeleton, report,
+        )
+        report.blobs_deleted = self._execute_batches(
+            f"DELETE FROM checkpoint_blobs WHERE {scope} AND (channel, version) IN "
+            "(SELECT * FROM unnest(CAST(:channels AS text[]), CAST(:versions AS text[])))",
+            params, plan.blobs, report,
+            bind=lambda batch: {
+                "channels": [channel for channel, _ in batch],
+                "versions": [version for _, version in batch],
+            },
+        )
+        report.checkpoints_deleted = self._execute_batches(
+            f"DELETE FROM checkpoints WHERE {scope} AND checkpoint_id = ANY(:ids)",
+            params, delete, report,
+        )
+        return report
+
+    def compact(
+        self,
+        thread_ids: Optional[Iterable[str]] = None,
+        dry_run: bool = False,
+        stop: Optional[threading.Event] = None,
+    ) -> RetentionReport:
+        """
+        Compact threads one at a time
+
+        Args:
+            thread_ids: Threads to compact (all threads if None)
+            dry_run: Only report what would be deleted
+            stop: Event that ends the compaction after the current thread
+
+        Returns:
+            Report over all compacted threads
+        """
+        report = RetentionReport(dry_run=dry_run)
+        for thread_id, checkpoint_ns in self.threads(thread_ids):
+            if stop is not None and stop.is_set():
+                break
+            try:
+                report.merge(self.compact_thread(thread_id, checkpoint_ns, dry_run))
+            except Exception as e:
+                print(f"Error compacting checkpoints of thread {thread_id}: {str(e)}")
+        return report
+
+    def _referenced_payloads(self, stop: Optional[threading.Event]) -> Optional[Set[str]]:
+        """Digests referenced by any blob or write, or None if the scan did not finish"""
+        serde = OffloadingSerializer(store=None)
+        marker = REFERENCE_KEY.encode()
+        referenced: Set[str] = set()
+        tables = (
+            ("checkpoint_blobs", ("thread_id", "checkpoint_ns", "channel", "version")),
+            ("checkpoint_writes", ("thread_id", "checkpoint_ns", "checkpoint_id", "task_id", "idx")),
+        )
+        for table, key in tables:
+            columns = ", ".join(key)
+            placeholders = ", ".join(f":k{i}" for i in range(len(key)))
+            query = text(
+                f"SELECT {columns}, type, blob FROM {table} "
+                f"WHERE ({columns}) > ({placeholders}) AND position(:marker IN blob) > 0 "
+                f"ORDER BY {columns} LIMIT :limit"
+            )
+            # Keyset cursor below every key (``idx`` of writes is an integer)
+            cursor: Tuple[Any, ...] = tuple(-(2**31) if k == "idx" else "" for k in key)
+            while True:
+                if stop is not None and stop.is_set():
+                    return None
+                with self.engine.connect() as conn:
+                    page = conn.execute(
+                        query,
+                        {
+                            **{f"k{i}": value for i, value in enumerate(cursor)},
+                            "marker": marker,
+                            "limit": self.policy.batch_size,
+                        },
+                    ).all()
+                for row in page:
+                    try:
+                        referenced |= serde.references((row.type, bytes(row.blob)))
+                    except Exception as e:
+                        # Never collect payloads that an unreadable value might reference
+                        print(f"Error reading payload references, skipping collection: {str(e)}")
+                        return None
+                if len(page) < self.policy.batch_size:
+                    break
+                cursor = tuple(page[-1][: len(key)])
+        return referenced
+
+    def collect_payloads(
+        self, dry_run: bool = False, stop: Optional[threading.Event] = None
+    ) -> RetentionReport:
+        """
+        Delete offloaded payloads that no blob or write references any more
+
+        The mark phase scans the blobs and writes holding payload references.
+        The sweep only deletes payloads last used more than
+        ``payload_grace_seconds`` before the scan started, so payloads written
+        for a checkpoint that is still being stored are never collected.
+
+        Args:
+            dry_run: Only report what would be deleted
+            stop: Event that ends the collection early (nothing is deleted then)
+
+        Returns:
+            Report of the collection
+        """
+        report = RetentionReport(dry_run=dry_run)
+        cutoff = datetime.utcnow() - timedelta(seconds=self.policy.payload_grace_seconds)
+        referenced = self._referenced_payloads(stop)
+        if referenced is None:
+            return report
+
+        query = text(
+            "SELECT digest, size FROM checkpoint_payloads "
+            "WHERE digest > :digest AND last_used_at < :cutoff ORDER BY digest LIMIT :limit"
+        )
+        params: Dict[str, Any] = {"digest": "", "cutoff": cutoff, "limit": self.policy.batch_size}
+        unreferenced: List[str] = []
+        while True:
+            with self.engine.connect() as conn:
+                page = conn.execute(query, params).all()
+            for digest, size in page:
+                if digest not in referenced:
+                    unreferenced.append(digest)
+                    report.reclaimable_bytes += size
+            if len(page) < self.policy.batch_size:
+                break
+            params["digest"] = page[-1][0]
+
+        report.payloads_deleted = len(unreferenced)
+        if not dry_run and unreferenced:
+            # last_used_at is checked again, in case a writer touched a payload since
+            report.payloads_deleted = self._execute_batches(
+                "DELETE FROM checkpoint_payloads WHERE digest = ANY(:ids) AND last_used_at < :cutoff",
+                {"cutoff": cutoff}, unreferenced, report,
+            )
+        return report
+
+    def run(
+        self,
+        thread_ids: Optional[Iterable[str]] = None,
+        dry_run: bool = False,
+        stop: Optional[threading.Event] = None,
+    ) -> RetentionReport:
+        """Compact threads, then collect unreferenced payloads"""
+        report = self.compact(thread_ids, dry_run=dry_run, stop=stop)
+        if stop is None or not stop.is_set():
+            payloads = self.collect_payloads(dry_run=dry_run, stop=stop)
+            report.merge(payloads)
+        return report
+
+
+class RetentionJob:
+    """
+    Background thread running ``CheckpointRetention.run`` periodically
+
+    Args:
+        retention: Retention to run
+        interval_seconds: Time between the end of a run and the next one
+    """
+
+    def __init__(self, retention: CheckpointRetention, interval_seconds: float = 3600.0) -> None:
+        self.retention = retention
+        self.interval_seconds = interval_seconds
+        self.last_report: Optional[RetentionReport] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._loop, name="checkpoint-retention", daemon=True
+        )
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.last_report = self.retention.run(stop=self._stop)
+                print(self.last_report.summary())
+            except Exception as e:
+                print(f"Error running checkpoint retention: {str(e)}")
+            self._stop.wait(self.interval_seconds)
+
+    def start(self) -> "RetentionJob":
+        """Start the background thread"""
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop after the current thread or batch, and wait for the thread to end"""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
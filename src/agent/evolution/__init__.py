@@ -0,0 +1,36 @@
+"""
+Evolution package for AlphaGPT
+
+This package contains the genetic programming search that evolves alpha
+expression trees by selection, mutation and crossover.
+"""
+from agent.evolution.engine import (
+    EvaluationStats,
+    EvolutionSettings,
+    FitnessEvaluator,
+    GenerationStats,
+    Individual,
+    SubtreeMemo,
+    close_fitness_evaluators,
+    evolve,
+    get_fitness_evaluator,
+)
+from agent.evolution.trees import crossover, depth, mutate, random_tree, size, subtrees
+
+__all__ = [
+    "EvaluationStats",
+    "EvolutionSettings",
+    "FitnessEvaluator",
+    "GenerationStats",
+    "Individual",
+    "SubtreeMemo",
+    "close_fitness_evaluators",
+    "evolve",
+    "get_fitness_evaluator",
+    "crossover",
+    "depth",
+    "mutate",
+    "random_tree",
+    "size",
+    "subtrees",
+]
@@ -0,0 +1,798 @@
+"""
+Parallel genetic programming search over alpha expressions
+
+``evolve`` runs a generational GP loop (tournament selection, elitism,
+subtree crossover and several kinds of mutation from
+``agent.evolution.trees``) seeded with known alphas. Each individual is
+scored by backtesting its factor against forward returns of the shared
+market panel.
+
+Fitness is evaluated by a ``FitnessEvaluator``. It keeps one single-process
+executor per core, and every worker maps the market data store once at
+startup, so all workers share the page cache instead of copying the panel.
+Work is memoized at two levels:
+
+* individuals are identified by their canonical fingerprint, and the metrics
+  of every fingerprint ever scored are kept, so survivors, re-discovered
+  trees and equivalent rewrites are never evaluated twice
+* each worker keeps an LRU memo of computed subtree panels across
+  generations. A child is sent to the worker that evaluated its first
+  parent, so the subtrees it shares with that parent are usually cached
+  there already.
+
+Each worker evaluates its share of a generation in batches with
+``evaluate_batch``, so subexpressions shared within a batch are computed once.
+
+With a ``holdout`` fraction, the search only sees the earlier dates: fitness
+is computed on the training window, and the metrics of the latest dates are
+reported separately under ``"validation"``, so that evolved alphas can be
+judged out of sample. Forward returns reaching into the validation window
+are dropped from the training window.
+
+Evaluators returned by ``get_fitness_evaluator`` are shared by concurrent
+runs: their state is guarded by a lock, and each caller holds a lease that it
+gives back with ``release``, so an evaluator replaced for a newer data
+version is only closed once the last run using it is done.
+"""
+
+import atexit
+import math
+import multiprocessing
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    MutableMapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import numpy as np
+
+from agent.backtesting import BacktestSettings, batch_backtest, forward_returns
+from agent.evolution.trees import crossover, depth, mutate, random_tree, size
+from agent.factors import (
+    DSLError,
+    Node,
+    canonicalize,
+    evaluate_batch,
+    fingerprint,
+    parse_expression,
+    to_node,
+)
+from agent.market_data import load_panel
+
+
+@dataclass(kw_only=True)
+class EvolutionSettings:
+    """Parameters of a genetic programming run"""
+
+    population_size: int = 1000
+    """Number of individuals per generation."""
+
+    generations: int = 10
+    """Number of generations bred after the initial population."""
+
+    tournament_size: int = 7
+    """Individuals compared in each tournament selection."""
+
+    crossover_rate: float = 0.5
+    """Probability that a child is bred by crossover."""
+
+    mutation_rate: float = 0.4
+    """Probability that a child is bred by mutation (otherwise it is a copy)."""
+
+    elite_size: int = 10
+    """Best individuals carried over unchanged to the next generation."""
+
+    max_depth: int = 6
+    """Maximum depth of an expression tree."""
+
+    parsimony: float = 0.0005
+    """Fitness penalty per tree node, favouring smaller expressions."""
+
+    fitness_metric: str = "ic"
+    """Backtest metric maximized by the search."""
+
+    min_coverage: float = 0.5
+    """Minimum fraction of scorable cells with a finite factor value.
+
+    Factors that are almost always NaN are scored on a handful of dates and
+    instruments, which makes their IC large and meaningless."""
+
+    hall_of_fame: int = 20
+    """Number of best distinct individuals returned."""
+
+    seed: Optional[int] = None
+    """Random seed, for reproducible runs."""
+
+
+@dataclass
+class Individual:
+    """An expression tree in the population"""
+
+    node: Node
+    """Canonical expression tree."""
+
+    digest: str
+    """Canonical fingerprint; equal for equivalent expressions."""
+
+    generation: int = 0
+    """Generation in which the individual first appeared."""
+
+    slot: int = 0
+    """Worker that evaluates the individual."""
+
+    metrics: Optional[Dict[str, Any]] = None
+    """Backtest metrics, once evaluated."""
+
+    fitness: float = float("-inf")
+    """Penalized fitness; ``-inf`` for invalid or degenerate factors."""
+
+    @property
+    def expression(self) -> str:
+        """DSL text of the expression"""
+        return self.node.to_text()
+
+
+@dataclass
+class EvaluationStats:
+    """Work done by one ``FitnessEvaluator.evaluate`` call"""
+
+    evaluated: int
+    """Expressions actually scored; the rest had known metrics."""
+
+    memo_hits: int = 0
+    memo_misses: int = 0
+
+
+@dataclass
+class GenerationStats:
+    """Progress report of one generation"""
+
+    generation: int
+    population: int
+    evaluated: int
+    """Individuals scored in this generation; the rest had known metrics."""
+
+    best_fitness: float
+    mean_fitness: float
+    best_expression: str
+    memo_hit_rate: float
+    """Fraction of subtree lookups answered by the workers' memos."""
+
+    seconds: float
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+
+
+class SubtreeMemo(MutableMapping):
+    """LRU mapping of expression node to computed panel, bounded in bytes
+
+    Passed as the ``cache`` of ``evaluate_batch``. Nodes in ``exclude`` (the
+    roots of the current batch) are not stored, since whole individuals are
+    memoized by fingerprint instead.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.exclude: set = set()
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._values: "OrderedDict[Node, np.ndarray]" = OrderedDict()
+
+    def __contains__(self, node: object) -> bool:
+        return node in self._values
+
+    def __getitem__(self, node: Node) -> np.ndarray:
+        value = self._values[node]
+        self._values.move_to_end(node)
+        self.hits += 1
+        return value
+
+    def __setitem__(self, node: Node, value: np.ndarray) -> None:
+        self.misses += 1
+        nbytes = getattr(value, "nbytes", 0)
+        if node in self.exclude or nbytes > self.max_bytes:
+            return
+        if node in self._values:
+            self.nbytes -= self._values.pop(node).nbytes
+        self._values[node] = value
+        self.nbytes += nbytes
+        while self.nbytes > self.max_bytes:
+            _, evicted = self._values.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+
+    def __delitem__(self, node: Node) -> None:
+        self.nbytes -= self._values.pop(node).nbytes
+
+    def __iter__(self) -> Iterator[Node]:
+        return iter(self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+class _FitnessWorker:
+    """Scores expressions on one process's view of the market panel"""
+
+    def __init__(
+        self,
+        data_path: str,
+        horizon: int,
+        quantile: float,
+        memo_bytes: int,
+        holdout: float = 0.0,
+    ) -> None:
+        self.fields = load_panel(data_path).fields
+        fwd = forward_returns(self.fields["close"], horizon)
+        n_dates = len(fwd)
+        self.split = n_dates - int(round(n_dates * max(holdout, 0.0)))
+        self.fwd = fwd[: self.split].copy()
+        self.fwd_validation = fwd[self.split :]
+        if self.split < n_dates:
+            # Returns ending inside the validation window are not training data
+            self.fwd[max(0, self.split - horizon) :] = np.nan
+        self.scorable = max(1, int(np.isfinite(self.fwd).sum()))
+        self.settings = BacktestSettings(
+            quantile=quantile, horizon=horizon, include_series=False
+        )
+        self.memo = SubtreeMemo(memo_bytes)
+
+    def _values(self, nodes: Dict[str, Node]) -> Tuple[Dict[str, np.ndarray], Dict[str, str]]:
+        with np.errstate(all="ignore"):
+            try:
+                return evaluate_batch(nodes, self.fields, cache=self.memo), {}
+            except Exception:
+                pass
+            # Find the failing expressions one by one
+            values, errors = {}, {}
+            for key, node in nodes.items():
+                try:
+                    values.update(evaluate_batch({key: node}, self.fields, cache=self.memo))
+                except Exception as e:
+                    errors[key] = str(e)
+            return values, errors
+
+    def evaluate(self, expressions: Sequence[str]) -> Tuple[List[Any], Tuple[int, int]]:
+        """
+        Backtest a batch of DSL expressions
+
+        Returns:
+            One metrics dictionary (or error string) per expression, and the
+            memo's ``(hits, misses)`` counts for the batch
+        """
+        hits, misses = self.memo.hits, self.memo.misses
+        nodes: Dict[str, Node] = {}
+        errors: Dict[str, str] = {}
+        for i, text in enumerate(expressions):
+            try:
+                nodes[str(i)] = parse_expression(text)
+            except DSLError as e:
+                errors[str(i)] = str(e)
+
+        self.memo.exclude = set(nodes.values())
+        try:
+            values, failed = self._values(nodes)
+        finally:
+            self.memo.exclude = set()
+        errors.update(failed)
+
+        keys = list(values)
+        training = [values[k][: self.split] for k in keys]
+        metrics = dict(zip(keys, batch_backtest(training, self.fwd, self.settings)))
+        for key, factor in zip(keys, training):
+            finite = np.isfinite(factor) & np.isfinite(self.fwd)
+            metrics[key]["coverage"] = float(finite.sum()) / self.scorable
+        if len(self.fwd_validation):
+            validation = batch_backtest(
+                [values[k][self.split :] for k in keys], self.fwd_validation, self.settings
+            )
+            for key, result in zip(keys, validation):
+                metrics[key]["validation"] = result
+        results = [
+            metrics.get(str(i), errors.get(str(i), "No values"))
+            for i in range(len(expressions))
+        ]
+        return results, (self.memo.hits - hits, self.memo.misses - misses)
+
+
+_worker: Optional[_FitnessWorker] = None
+
+
+def _init_worker(
+    data_path: str, horizon: int, quantile: float, memo_bytes: int, holdout: float
+) -> None:
+    global _worker
+    _worker = _FitnessWorker(data_path, horizon, quantile, memo_bytes, holdout)
+
+
+def _evaluate_in_worker(expressions: Sequence[str]):
+    return _worker.evaluate(expressions)
+
+
+# ---------------------------------------------------------------------------
+# Parent side
+# ---------------------------------------------------------------------------
+
+
+class FitnessEvaluator:
+    """Warm worker processes scoring expressions on one market panel
+
+    The evaluator can be used from several threads at once. Evaluations in
+    the calling process (``workers=0``) are serialized.
+
+    Args:
+        data_path: Market data store directory (or ``.npz`` panel)
+        workers: Number of worker processes; None uses every core, 0
+            evaluates in the calling process
+        horizon: Forward return horizon in periods
+        quantile: Fraction of instruments in each leg of the portfolio
+        memo_mb: Subtree memo budget per worker, in megabytes
+        holdout: Fraction of the latest dates kept out of the fitness and
+            scored separately as ``metrics["validation"]``
+        batch_size: Expressions evaluated together by a worker
+        start_method: multiprocessing start method for the workers
+    """
+
+    def __init__(
+        self,
+        data_path: str,
+        workers: Optional[int] = None,
+        horizon: int = 1,
+        quantile: float = 0.2,
+        memo_mb: float = 256.0,
+        holdout: float = 0.0,
+        batch_size: int = 64,
+        start_method: str = "spawn",
+    ) -> None:
+        self.data_path = str(data_path)
+        self.batch_size = max(1, batch_size)
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self._init_args = (
+            self.data_path, horizon, quantile, int(memo_mb * 1024 * 1024), holdout
+        )
+        self._context = multiprocessing.get_context(start_method)
+        self._local: Optional[_FitnessWorker] = None
+        self._slots: List[ProcessPoolExecutor] = []
+        # Metrics (or error) of every fingerprint scored so far
+        self._known: Dict[str, Any] = {}
+        self._closed = False
+        # Guards _known, _slots, the counters and the lease state
+        self._lock = threading.Lock()
+        self._local_lock = threading.Lock()
+        self._leases = 0
+        self._retired = False
+        self.memo_hits = 0
+        self.memo_misses = 0
+
+        if self.workers <= 0:
+            self._local = _FitnessWorker(*self._init_args)
+        else:
+            self._slots = [self._new_slot() for _ in range(self.workers)]
+
+    def _new_slot(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=self._context,
+            initializer=_init_worker,
+            initargs=self._init_args,
+        )
+
+    def __enter__(self) -> "FitnessEvaluator":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def slots(self) -> int:
+        """Number of independent evaluation slots (workers)"""
+        return max(1, len(self._slots))
+
+    def known(self, digest: str) -> bool:
+        """Whether an expression with this fingerprint has been scored"""
+        with self._lock:
+            return digest in self._known
+
+    def _lease(self) -> "FitnessEvaluator":
+        with self._lock:
+            self._leases += 1
+        return self
+
+    def _retire(self) -> None:
+        """Close once the last lease is released"""
+        with self._lock:
+            self._retired = True
+            idle = self._leases == 0
+        if idle:
+            self.close()
+
+    def release(self) -> None:
+        """Give back a lease taken by ``get_fitness_evaluator``"""
+        with self._lock:
+            self._leases = max(0, self._leases - 1)
+            idle = self._retired and self._leases == 0
+        if idle:
+            self.close()
+
+    def _balance(self, pending: List[Individual]) -> None:
+        """Keep every worker within 25% of an even share of the batch
+
+        Only the ``slot`` of the given individuals is changed; callers pass
+        individuals of their own run.
+        """
+        n = self.slots
+        cap = math.ceil(len(pending) / n * 1.25)
+        load = [0] * n
+        overflow = []
+        for individual in pending:
+            individual.slot %= n
+            if load[individual.slot] < cap:
+                load[individual.slot] += 1
+            else:
+                overflow.append(individual)
+        for individual in overflow:
+            individual.slot = load.index(min(load))
+            load[individual.slot] += 1
+
+    def _chunks(self, pending: List[Individual]) -> Iterable[Tuple[int, List[Individual]]]:
+        by_slot: Dict[int, List[Individual]] = {}
+        for individual in pending:
+            by_slot.setdefault(individual.slot, []).append(individual)
+        for slot, group in by_slot.items():
+            for start in range(0, len(group), self.batch_size):
+                yield slot, group[start : start + self.batch_size]
+
+    def _collect(
+        self, future: Future, slot: int, executor: ProcessPoolExecutor
+    ) -> Tuple[List[Any], Tuple[int, int]]:
+        try:
+            return future.result()
+        except BrokenProcessPool as e:
+            # Replace a crashed worker once, however many of its batches failed
+            with self._lock:
+                if self._slots[slot] is executor and not self._closed:
+                    print(f"Restarting evolution worker {slot}: {e}")
+                    executor.shutdown(wait=False)
+                    self._slots[slot] = self._new_slot()
+            raise
+
+    def evaluate(self, individuals: Sequence[Individual]) -> EvaluationStats:
+        """
+        Attach metrics to individuals, scoring unknown fingerprints in parallel
+
+        Args:
+            individuals: Individuals to evaluate; their ``metrics`` are set
+
+        Returns:
+            Number of expressions actually scored and the memo lookups of
+            this call
+        """
+        stats = EvaluationStats(evaluated=0)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Fitness evaluator is closed")
+            pending: Dict[str, Individual] = {}
+            for individual in individuals:
+                if individual.digest not in self._known and individual.digest not in pending:
+                    pending[individual.digest] = individual
+        batch = list(pending.values())
+        stats.evaluated = len(batch)
+
+        if self._local is not None:
+            for _, chunk in self._chunks(batch):
+                with self._local_lock:
+                    results, memo = self._local.evaluate([i.expression for i in chunk])
+                self._record(chunk, results, memo, stats)
+        elif batch:
+            self._balance(batch)
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("Fitness evaluator is closed")
+                submitted = [
+                    (
+                        slot,
+                        chunk,
+                        self._slots[slot],
+                        self._slots[slot].submit(
+                            _evaluate_in_worker, [i.expression for i in chunk]
+                        ),
+                    )
+                    for slot, chunk in self._chunks(batch)
+                ]
+            for slot, chunk, executor, future in submitted:
+                try:
+                    results, memo = self._collect(future, slot, executor)
+                except Exception as e:
+                    results, memo = [f"Worker failed: {e}"] * len(chunk), (0, 0)
+                self._record(chunk, results, memo, stats)
+
+        with self._lock:
+            for individual in individuals:
+                result = self._known.get(individual.digest)
+                individual.metrics = result if isinstance(result, dict) else None
+        return stats
+
+    def score(
+        self, expressions: Sequence[Union[str, Node]]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Backtest metrics of expressions, on the same windows as evolved ones
+
+        Used to compare known alphas with the hall of fame; with a holdout,
+        their held-out metrics are under ``"validation"`` too.
+
+        Returns:
+            One metrics dictionary per expression, ``None`` for expressions
+            that are not valid DSL or fail to evaluate
+        """
+        scored: Dict[int, Individual] = {}
+        for i, expression in enumerate(expressions):
+            try:
+                node = to_node(expression) if isinstance(expression, str) else expression
+            except DSLError:
+                continue
+            scored[i] = _individual(node, 0, 0)
+        self.evaluate(list(scored.values()))
+        return [
+            scored[i].metrics if i in scored else None for i in range(len(expressions))
+        ]
+
+    def _record(
+        self,
+        chunk: List[Individual],
+        results: List[Any],
+        memo: Tuple[int, int],
+        stats: EvaluationStats,
+    ) -> None:
+        stats.memo_hits += memo[0]
+        stats.memo_misses += memo[1]
+        with self._lock:
+            for individual, result in zip(chunk, results):
+                self._known[individual.digest] = result
+            self.memo_hits += memo[0]
+            self.memo_misses += memo[1]
+
+    def close(self) -> None:
+        """Stop the worker processes"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            slots = list(self._slots)
+        for slot in slots:
+            slot.shutdown(wait=True, cancel_futures=True)
+
+
+_evaluators: Dict[Tuple, Tuple[Optional[str], FitnessEvaluator]] = {}
+_evaluators_lock = threading.Lock()
+
+
+def get_fitness_evaluator(
+    data_path: str,
+    version: Optional[str] = None,
+    workers: Optional[int] = None,
+    horizon: int = 1,
+    quantile: float = 0.2,
+    memo_mb: float = 256.0,
+    holdout: float = 0.0,
+) -> FitnessEvaluator:
+    """
+    Lease the process-wide fitness evaluator for a market panel
+
+    Evaluators are created on first use and kept warm, with their fitness
+    and subtree memos, for later calls with the same arguments. An evaluator
+    for an older ``version`` of the data is replaced, and closed once every
+    run still using it has released it. Call ``release()`` on the returned
+    evaluator when done.
+    """
+    key = (str(data_path), workers, horizon, quantile, memo_mb, holdout)
+    with _evaluators_lock:
+        current = _evaluators.get(key)
+        if current is not None and current[0] == version:
+            return current[1]._lease()
+        if current is not None:
+            current[1]._retire()
+        evaluator = FitnessEvaluator(
+            data_path,
+            workers=workers,
+            horizon=horizon,
+            quantile=quantile,
+            memo_mb=memo_mb,
+            holdout=holdout,
+        )
+        _evaluators[key] = (version, evaluator)
+        return evaluator._lease()
+
+
+def close_fitness_evaluators() -> None:
+    """Stop every evaluator created by ``get_fitness_evaluator``"""
+    with _evaluators_lock:
+        for _, evaluator in _evaluators.values():
+            evaluator.close()
+        _evaluators.clear()
+
+
+atexit.register(close_fitness_evaluators)
+
+
+def _individual(node: Node, generation: int, slot: int) -> Individual:
+    node = canonicalize(node)
+    return Individual(node, fingerprint(node).digest, generation=generation, slot=slot)
+
+
+def _fitness(individual: Individual, settings: EvolutionSettings) -> float:
+    metrics = individual.metrics or {}
+    value = metrics.get(settings.fitness_metric)
+    if value is None or not np.isfinite(value):
+        return float("-inf")
+    if metrics.get("coverage", 0.0) < settings.min_coverage:
+        return float("-inf")
+    return float(value) - settings.parsimony * size(individual.node)
+
+
+def _tournament(
+    rng: random.Random, population: List[Individual], settings: EvolutionSettings
+) -> Individual:
+    contenders = rng.sample(population, min(settings.tournament_size, len(population)))
+    return max(contenders, key=lambda individual: individual.fitness)
+
+
+def _initial_population(
+    rng: random.Random,
+    seeds: Sequence[Node],
+    settings: EvolutionSettings,
+    slots: int,
+) -> List[Individual]:
+    """Seeds, mutants of the seeds, then random trees of ramped depths"""
+    population: Dict[str, Individual] = {}
+
+    def add(node: Node) -> None:
+        if depth(node) > settings.max_depth:
+            return
+        individual = _individual(node, 0, len(population) % slots)
+        population.setdefault(individual.digest, individual)
+
+    for node in seeds:
+        add(node)
+
+    attempts = 0
+    limit = settings.population_size * 10
+    while len(population) < settings.population_size and attempts < limit:
+        attempts += 1
+        if seeds and attempts % 2:
+            add(mutate(rng, rng.choice(seeds), settings.max_depth))
+        else:
+            tree_depth = rng.randint(2, max(2, settings.max_depth))
+            add(random_tree(rng, tree_depth, grow=bool(attempts % 4 < 2)))
+    return list(population.values())[: settings.population_size]
+
+
+def _offspring(
+    rng: random.Random,
+    population: List[Individual],
+    generation: int,
+    settings: EvolutionSettings,
+) -> List[Individual]:
+    """Elites plus distinct children bred by crossover, mutation or copying"""
+    ranked = sorted(population, key=lambda individual: individual.fitness, reverse=True)
+    children: Dict[str, Individual] = {
+        individual.digest: individual for individual in ranked[: settings.elite_size]
+    }
+
+    attempts = 0
+    limit = settings.population_size * 10
+    while len(children) < settings.population_size and attempts < limit:
+        attempts += 1
+        parent = _tournament(rng, population, settings)
+        draw = rng.random()
+        if draw < settings.crossover_rate:
+            donor = _tournament(rng, population, settings)
+            node = crossover(rng, parent.node, donor.node, settings.max_depth)
+        elif draw < settings.crossover_rate + settings.mutation_rate:
+            node = mutate(rng, parent.node, settings.max_depth)
+        else:
+            node = parent.node
+        # Children go to their first parent's worker, which has its subtrees
+        child = _individual(node, generation, parent.slot)
+        if child.digest in children:
+            continue
+        if child.digest == parent.digest:
+            child = parent
+        children[child.digest] = child
+    return list(children.values())
+
+
+def evolve(
+    seeds: Iterable[Union[str, Node]],
+    evaluator: FitnessEvaluator,
+    settings: Optional[EvolutionSettings] = None,
+    progress: Optional[Callable[[GenerationStats], None]] = None,
+    stop: Optional[threading.Event] = None,
+) -> List[Individual]:
+    """
+    Evolve alpha expressions with genetic programming
+
+    Args:
+        seeds: Initial expressions (DSL text, LaTeX or ``Node``); those that
+            are not valid DSL are skipped
+        evaluator: Fitness evaluator on the market panel
+        settings: Search parameters
+        progress: Called with the statistics of every generation; by default
+            they are printed
+        stop: Optional event; once set, no further generation is started and
+            the hall of fame found so far is returned
+
+    Returns:
+        Hall of fame: the best distinct evaluated individuals, best first
+    """
+    settings = settings or EvolutionSettings()
+    rng = random.Random(settings.seed)
+    report = progress or _print_progress
+
+    nodes = []
+    for seed in seeds:
+        try:
+            nodes.append(to_node(seed) if isinstance(seed, str) else seed)
+        except DSLError as e:
+            print(f"Skipping evolution seed '{seed}': {e}")
+
+    hall: Dict[str, Individual] = {}
+    population = _initial_population(rng, nodes, settings, evaluator.slots)
+    for generation in range(settings.generations + 1):
+        if stop is not None and stop.is_set():
+            break
+        if generation:
+            population = _offspring(rng, population, generation, settings)
+
+        start = time.perf_counter()
+        evaluation = evaluator.evaluate(population)
+        for individual in population:
+            individual.fitness = _fitness(individual, settings)
+            if np.isfinite(individual.fitness):
+                hall.setdefault(individual.digest, individual)
+
+        lookups = evaluation.memo_hits + evaluation.memo_misses
+        finite = [i.fitness for i in population if np.isfinite(i.fitness)]
+        best = max(population, key=lambda individual: individual.fitness)
+        report(
+            GenerationStats(
+                generation=generation,
+                population=len(population),
+                evaluated=evaluation.evaluated,
+                best_fitness=best.fitness,
+                mean_fitness=float(np.mean(finite)) if finite else float("-inf"),
+                best_expression=best.expression,
+                memo_hit_rate=evaluation.memo_hits / lookups if lookups else 0.0,
+                seconds=time.perf_counter() - start,
+            )
+        )
+
+    ranked = sorted(hall.values(), key=lambda individual: individual.fitness, reverse=True)
+    return ranked[: settings.hall_of_fame]
+
+
+def _print_progress(stats: GenerationStats) -> None:
+    print(
+        f"Generation {stats.generation}: best={stats.best_fitness:.4f} "
+        f"mean={stats.mean_fitness:.4f} evaluated={stats.evaluated}/{stats.population} "
+        f"memo_hits={stats.memo_hit_rate:.0%} ({stats.seconds:.1f}s) {stats.best_expression}"
+    )
@@ -0,0 +1,218 @@
+"""
+Random generation, mutation and crossover of alpha expression trees
+
+Individuals of the genetic programming search are ``Node`` trees of the alpha
+DSL (see ``agent.factors.parser``). Every tree built here goes through
+``make_node``, so it is always a valid expression. A subtree is addressed by
+its path, the tuple of argument indices from the root. The window constant
+of a time-series operator is never selected as a subtree, since replacing it
+with an arbitrary expression would not be valid DSL. Window mutation changes
+it to another window length instead.
+"""
+
+import random
+from typing import List, Optional, Sequence, Tuple
+
+from agent.factors.operators import FIELDS, OPERATORS
+from agent.factors.parser import DSLError, Node, const_node, field_node, make_node
+
+Path = Tuple[int, ...]
+
+WINDOWS: Tuple[int, ...] = (2, 3, 5, 10, 20, 40, 60)
+"""Window lengths used for new and mutated time-series operators"""
+
+CONSTANTS: Tuple[float, ...] = (-1.0, 0.5, 1.0, 2.0)
+"""Constants used as terminals"""
+
+_UNARY = tuple(name for name, op in OPERATORS.items() if op.arity == 1 and not op.window)
+_BINARY = tuple(name for name, op in OPERATORS.items() if op.arity == 2 and not op.window)
+_SERIES = tuple(name for name, op in OPERATORS.items() if op.window)
+
+
+def depth(node: Node) -> int:
+    """Depth of a tree; a terminal has depth 1"""
+    if node.is_leaf:
+        return 1
+    return 1 + max(depth(arg) for arg in _operands(node))
+
+
+def size(node: Node) -> int:
+    """Number of operators and terminals in a tree, window constants excluded"""
+    if node.is_leaf:
+        return 1
+    return 1 + sum(size(arg) for arg in _operands(node))
+
+
+def _operands(node: Node) -> Tuple[Node, ...]:
+    """Arguments of a node without its window constant"""
+    if node.is_leaf:
+        return ()
+    return node.args[: OPERATORS[node.op].arity]
+
+
+def subtrees(node: Node, path: Path = ()) -> List[Tuple[Path, Node]]:
+    """All ``(path, subtree)`` pairs of a tree, root first"""
+    found = [(path, node)]
+    for i, arg in enumerate(_operands(node)):
+        found.extend(subtrees(arg, path + (i,)))
+    return found
+
+
+def replace(node: Node, path: Path, subtree: Node) -> Node:
+    """Return a copy of ``node`` with the subtree at ``path`` replaced"""
+    if not path:
+        return subtree
+    args = list(node.args)
+    args[path[0]] = replace(args[path[0]], path[1:], subtree)
+    return make_node(node.op, *args)
+
+
+def random_terminal(rng: random.Random, fields: Sequence[str] = FIELDS) -> Node:
+    """A random market field or, rarely, a constant"""
+    if rng.random() < 0.1:
+        return const_node(rng.choice(CONSTANTS))
+    return field_node(rng.choice(fields))
+
+
+def random_tree(
+    rng: random.Random,
+    max_depth: int,
+    grow: bool = True,
+    fields: Sequence[str] = FIELDS,
+) -> Node:
+    """
+    Build a random tree
+
+    Args:
+        rng: Random number generator
+        max_depth: Maximum depth of the tree
+        grow: Stop branches early at random ("grow" method); otherwise every
+            branch reaches ``max_depth`` ("full" method)
+        fields: Market fields used as terminals
+
+    Returns:
+        Random expression tree
+    """
+    if max_depth <= 1 or (grow and rng.random() < 0.3):
+        return random_terminal(rng, fields)
+
+    kind = rng.random()
+    if kind < 0.4:
+        op = rng.choice(_SERIES)
+        args = [random_tree(rng, max_depth - 1, grow, fields) for _ in range(OPERATORS[op].arity)]
+        args.append(const_node(rng.choice(WINDOWS)))
+    elif kind < 0.75:
+        op = rng.choice(_BINARY)
+        args = [random_tree(rng, max_depth - 1, grow, fields) for _ in range(2)]
+    else:
+        op = rng.choice(_UNARY)
+        args = [random_tree(rng, max_depth - 1, grow, fields)]
+    return make_node(op, *args)
+
+
+def _point_mutation(rng: random.Random, node: Node) -> Optional[Node]:
+    """Swap an operator for another of the same shape, or a field for another"""
+    if node.op == "field":
+        return field_node(rng.choice([f for f in FIELDS if f != node.value] or FIELDS))
+    if node.op == "const":
+        return const_node(rng.choice(CONSTANTS))
+    spec = OPERATORS[node.op]
+    peers = [
+        name
+        for name, op in OPERATORS.items()
+        if name != node.op and op.arity == spec.arity and op.window == spec.window
+    ]
+    if not peers:
+        return None
+    return make_node(rng.choice(peers), *node.args)
+
+
+def _window_mutation(rng: random.Random, node: Node) -> Optional[Node]:
+    """Change the window length of a time-series operator"""
+    if node.is_leaf or not OPERATORS[node.op].window:
+        return None
+    current = int(node.args[-1].value)
+    window = rng.choice([w for w in WINDOWS if w != current])
+    return make_node(node.op, *node.args[:-1], const_node(window))
+
+
+def mutate(rng: random.Random, node: Node, max_depth: int = 6) -> Node:
+    """
+    Apply one random mutation
+
+    The mutation is one of: replace a subtree with a random tree, swap an
+    operator or field (point mutation), change a window length, wrap a
+    subtree in a new operator, or hoist a subtree to the root. Results deeper
+    than ``max_depth`` are rejected, and the parent is returned unchanged if
+    no mutation succeeds.
+
+    Args:
+        rng: Random number generator
+        node: Parent tree
+        max_depth: Maximum depth of the child
+
+    Returns:
+        Mutated tree
+    """
+    candidates = subtrees(node)
+    for _ in range(10):
+        path, target = rng.choice(candidates)
+        kind = rng.random()
+        try:
+            if kind < 0.3:
+                budget = max(1, max_depth - len(path))
+                child = replace(node, path, random_tree(rng, min(budget, 3)))
+            elif kind < 0.55:
+                new = _point_mutation(rng, target)
+                child = replace(node, path, new) if new is not None else None
+            elif kind < 0.8:
+                series = [(p, n) for p, n in candidates if not n.is_leaf and OPERATORS[n.op].window]
+                if not series:
+                    continue
+                path, target = rng.choice(series)
+                child = replace(node, path, _window_mutation(rng, target))
+            elif kind < 0.9:
+                op = rng.choice(_SERIES + _UNARY)
+                args = [target]
+                if OPERATORS[op].arity == 2:
+                    args.append(random_terminal(rng))
+                if OPERATORS[op].window:
+                    args.append(const_node(rng.choice(WINDOWS)))
+                child = replace(node, path, make_node(op, *args))
+            else:
+                if not path or target.is_leaf:
+                    continue
+                child = target
+        except DSLError:
+            continue
+
+        if child is not None and child != node and depth(child) <= max_depth:
+            return child
+    return node
+
+
+def crossover(
+    rng: random.Random, first: Node, second: Node, max_depth: int = 6
+) -> Node:
+    """
+    Replace a random subtree of ``first`` with a random subtree of ``second``
+
+    Args:
+        rng: Random number generator
+        first: Parent receiving the subtree
+        second: Parent donating the subtree
+        max_depth: Maximum depth of the child
+
+    Returns:
+        Child tree, or ``first`` if no crossover point fits within ``max_depth``
+    """
+    donors = subtrees(second)
+    for _ in range(10):
+        path, _ = rng.choice(subtrees(first))
+        _, donor = rng.choice(donors)
+        if len(path) + depth(donor) > max_depth:
+            continue
+        child = replace(first, path, donor)
+        if child != first:
+            return child
+    return first
@@ -0,0 +1,23 @@
+"""
+Execution package for AlphaGPT
+
+This package contains the pre-warmed, resource-limited process pool that runs
+the Python code generated for alphas against the market data panel. Workers
+are separate processes with CPU and memory limits; they are not a security
+sandbox, and the code has the file system and network access of the app.
+"""
+from agent.execution.pool import (
+    ExecutionLimits,
+    ExecutionResult,
+    FactorExecutionPool,
+    close_execution_pools,
+    get_execution_pool,
+)
+
+__all__ = [
+    "ExecutionLimits",
+    "ExecutionResult",
+    "FactorExecutionPool",
+    "close_execution_pools",
+    "get_execution_pool",
+]
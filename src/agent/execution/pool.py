@@ -0,0 +1,292 @@
+"""
+Warm process pool for executing generated factor code
+
+Starting a fresh interpreter per factor (and re-reading the market data) costs
+more than most factors take to compute. ``FactorExecutionPool`` keeps a fixed
+set of worker processes that have already imported numpy/pandas and attached
+the market data panel. Every task runs under a per-factor CPU time, wall time
+and memory limit. A worker that dies or overruns its wall time is killed and
+replaced. Results come back through a shared memory block per worker rather
+than as pickled DataFrames.
+
+The limits contain runaway factors, not hostile ones: workers run as the
+same user as the app and are not isolated from its files or network.
+"""
+
+import atexit
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from agent.execution.worker import worker_main
+from agent.market_data import load_panel
+
+# Time allowed for a worker to import its dependencies and attach the data
+_STARTUP_TIMEOUT = 120.0
+
+
+@dataclass(frozen=True, kw_only=True)
+class ExecutionLimits:
+    """Resource limits applied to every factor execution"""
+
+    cpu_seconds: Optional[float] = 30.0
+    """CPU time per factor; the worker is killed by the kernel beyond it."""
+
+    wall_seconds: Optional[float] = 60.0
+    """Wall clock time per factor; the worker is killed and replaced beyond it."""
+
+    memory_mb: Optional[int] = 2048
+    """Additional address space a worker may allocate while running a factor."""
+
+
+@dataclass
+class ExecutionResult:
+    """Outcome of running one factor"""
+
+    alpha_id: str
+    values: Optional[np.ndarray] = None
+    error: Optional[str] = None
+    duration: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        """Whether the factor produced values"""
+        return self.error is None
+
+
+class _Worker:
+    """A worker process and the shared memory block it writes results to"""
+
+    def __init__(self, context, data_path: str, shape: Tuple[int, int], limits: ExecutionLimits):
+        self._context = context
+        self._data_path = data_path
+        self._limits = limits
+        self.shm = shared_memory.SharedMemory(
+            create=True, size=max(1, int(np.prod(shape))) * 8
+        )
+        self.values = np.ndarray(shape, dtype=np.float64, buffer=self.shm.buf)
+        self.process = None
+        self.conn = None
+
+    def launch(self) -> None:
+        parent_conn, child_conn = self._context.Pipe()
+        memory_bytes = (
+            self._limits.memory_mb * 1024 * 1024 if self._limits.memory_mb else None
+        )
+        process = self._context.Process(
+            target=worker_main,
+            args=(child_conn, self._data_path, self.shm.name, memory_bytes),
+            daemon=True,
+        )
+        try:
+            process.start()
+        finally:
+            child_conn.close()
+        self.process = process
+        self.conn = parent_conn
+
+    def wait_ready(self) -> None:
+        if not self.conn.poll(_STARTUP_TIMEOUT):
+            self.kill()
+            raise RuntimeError("Execution worker did not start in time")
+        try:
+            status, _ = self.conn.recv()
+        except EOFError:
+            status = None
+        if status != "ready":
+            self.kill()
+            raise RuntimeError(
+                f"Execution worker failed to start (exit code {self.process.exitcode})"
+            )
+
+    def kill(self) -> None:
+        if self.process is not None and self.process.is_alive():
+            self.process.kill()
+        if self.process is not None:
+            self.process.join()
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def restart(self) -> None:
+        self.kill()
+        self.launch()
+        self.wait_ready()
+
+    def stop(self) -> None:
+        if self.conn is not None and self.process is not None and self.process.is_alive():
+            try:
+                self.conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            self.process.join(timeout=5)
+        self.kill()
+        del self.values
+        self.shm.close()
+        self.shm.unlink()
+
+
+class FactorExecutionPool:
+    """Pool of pre-warmed, resource-limited processes running factor code
+
+    Args:
+        data_path: Market data store directory (or ``.npz`` panel) every
+            worker attaches at startup
+        workers: Number of worker processes
+        limits: Per-factor resource limits
+        start_method: multiprocessing start method for the workers
+    """
+
+    def __init__(
+        self,
+        data_path: str,
+        workers: int = 2,
+        limits: Optional[ExecutionLimits] = None,
+        start_method: str = "spawn",
+    ) -> None:
+        self.data_path = str(data_path)
+        self.limits = limits or ExecutionLimits()
+        self.shape = load_panel(self.data_path).shape
+        self._closed = False
+
+        context = multiprocessing.get_context(start_method)
+        self._workers: List[_Worker] = []
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        try:
+            # Launch every worker before waiting so they warm up in parallel
+            for _ in range(max(1, workers)):
+                worker = _Worker(context, self.data_path, self.shape, self.limits)
+                self._workers.append(worker)
+                worker.launch()
+            for worker in self._workers:
+                worker.wait_ready()
+                self._idle.put(worker)
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self) -> "FactorExecutionPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def size(self) -> int:
+        """Number of worker processes"""
+        return len(self._workers)
+
+    def _execute(self, worker: _Worker, alpha_id: str, code: str) -> ExecutionResult:
+        """Run one factor on ``worker``, replacing the worker if it dies or hangs"""
+        start = time.perf_counter()
+        try:
+            worker.conn.send((alpha_id, code, self.limits.cpu_seconds))
+            if worker.conn.poll(self.limits.wall_seconds):
+                status, message = worker.conn.recv()
+            else:
+                status, message = "killed", "Wall time limit exceeded"
+        except (EOFError, BrokenPipeError, OSError):
+            worker.process.join(timeout=1)
+            exitcode = worker.process.exitcode
+            if exitcode == -signal.SIGXCPU:
+                message = "CPU time limit exceeded"
+            else:
+                message = f"Worker exited with code {exitcode}"
+            status = "killed"
+
+        duration = time.perf_counter() - start
+        if status == "ok":
+            return ExecutionResult(alpha_id, values=worker.values.copy(), duration=duration)
+
+        if status == "killed":
+            worker.restart()
+        return ExecutionResult(alpha_id, error=message, duration=duration)
+
+    def run(self, alpha_id: str, code: str) -> ExecutionResult:
+        """
+        Execute the code of one alpha
+
+        Args:
+            alpha_id: Alpha identifier; the code must define ``calculate_<alpha_id>``
+            code: Python source generated for the alpha
+
+        Returns:
+            ExecutionResult with a ``(date, instrument)`` array or an error message
+        """
+        if self._closed:
+            raise RuntimeError("Execution pool is closed")
+
+        worker = self._idle.get()
+        try:
+            return self._execute(worker, alpha_id, code)
+        except Exception as e:
+            return ExecutionResult(alpha_id, error=f"Execution failed: {e}")
+        finally:
+            self._idle.put(worker)
+
+    def map(self, alphas: Sequence[Tuple[str, str]]) -> List[ExecutionResult]:
+        """
+        Execute many alphas across all workers
+
+        Args:
+            alphas: Sequence of ``(alpha_id, code)`` pairs
+
+        Returns:
+            One ExecutionResult per alpha, in input order
+        """
+        if not alphas:
+            return []
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            return list(executor.map(lambda item: self.run(*item), alphas))
+
+    def close(self) -> None:
+        """Stop all workers and release their shared memory"""
+        if self._closed:
+            return
+        self._closed = True
+        for worker in self._workers:
+            try:
+                worker.stop()
+            except Exception as e:
+                print(f"Error stopping execution worker: {e}")
+
+
+_pools: Dict[Tuple[str, int, ExecutionLimits], FactorExecutionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_execution_pool(
+    data_path: str, workers: int = 2, limits: Optional[ExecutionLimits] = None
+) -> FactorExecutionPool:
+    """
+    Get the process-wide execution pool for a market data path
+
+    Pools are created on first use and kept warm for later calls with the
+    same arguments.
+    """
+    key = (str(data_path), workers, limits or ExecutionLimits())
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = FactorExecutionPool(data_path, workers=workers, limits=key[2])
+            _pools[key] = pool
+        return pool
+
+
+def close_execution_pools() -> None:
+    """Stop every pool created by ``get_execution_pool``"""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+
+atexit.register(close_execution_pools)
@@ -0,0 +1,164 @@
+"""
+Worker side of the factor execution pool
+
+Each worker process imports numpy and pandas, attaches the market data panel
+and builds the ``(datetime, instrument)`` DataFrame the generated scripts expect
+once at startup. After that it runs factor code on request. Factor values are
+written into a shared memory block owned by the parent, and only a short status
+message goes back over the pipe.
+"""
+
+import os
+import resource
+import traceback
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from agent.market_data import MarketPanel, load_panel
+
+
+def panel_frame(panel: MarketPanel) -> pd.DataFrame:
+    """
+    Build the (datetime, instrument) MultiIndex DataFrame used by generated code
+
+    Columns wrap the panel arrays without copying where pandas allows it, so
+    memory-mapped fields stay shared with the page cache.
+    """
+    dates = np.asarray(panel.dates)
+    if np.issubdtype(dates.dtype, np.datetime64):
+        dates = pd.DatetimeIndex(dates)
+    else:
+        # ISO labels such as "2021-01-04" or 20210104; other labels are kept
+        try:
+            dates = pd.DatetimeIndex(pd.to_datetime(dates.astype(str), format="ISO8601"))
+        except (TypeError, ValueError):
+            dates = pd.Index(dates)
+
+    index = pd.MultiIndex.from_product(
+        [dates, pd.Index(np.asarray(panel.instruments))],
+        names=["datetime", "instrument"],
+    )
+    columns = {
+        name: np.asarray(values, dtype=np.float64).reshape(-1)
+        for name, values in panel.fields.items()
+    }
+    return pd.DataFrame(columns, index=index, copy=False)
+
+
+def find_factor_function(alpha_id: str, namespace: Dict[str, Any]) -> Callable:
+    """Return ``calculate_<alpha_id>`` (or the only ``calculate_*`` function) from executed code"""
+    function = namespace.get(f"calculate_{alpha_id}")
+    if callable(function):
+        return function
+
+    candidates = [
+        value
+        for name, value in namespace.items()
+        if name.startswith("calculate_") and callable(value)
+    ]
+    if len(candidates) != 1:
+        raise ValueError(f"No calculate_{alpha_id} function defined by the alpha code")
+    return candidates[0]
+
+
+def run_factor_code(alpha_id: str, code: str, frame: pd.DataFrame) -> np.ndarray:
+    """
+    Execute generated factor code and return its values as a (date, instrument) array
+
+    The code runs as a module that is not ``__main__``, so the file I/O in the
+    script's main block is skipped and only the factor function is called.
+    """
+    namespace: Dict[str, Any] = {"__name__": f"alpha_{alpha_id}"}
+    exec(compile(code, f"<alpha {alpha_id}>", "exec"), namespace)
+    result = find_factor_function(alpha_id, namespace)(frame.copy(deep=False))
+
+    if isinstance(result, pd.DataFrame):
+        if result.shape[1] == 0:
+            raise ValueError("Alpha code returned an empty DataFrame")
+        result = result.iloc[:, 0]
+    if not isinstance(result, pd.Series):
+        raise TypeError(f"Alpha code returned {type(result).__name__}, expected a DataFrame")
+
+    levels = frame.index.levshape
+    values = result.reindex(frame.index).to_numpy(dtype=np.float64, na_value=np.nan)
+    return values.reshape(levels)
+
+
+def _virtual_memory_bytes() -> Optional[int]:
+    """Current virtual memory size of this process (Linux only)"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def _limit_memory(memory_bytes: Optional[int]) -> None:
+    """Cap address space growth at ``memory_bytes`` beyond the warmed-up worker"""
+    baseline = _virtual_memory_bytes()
+    if not memory_bytes or baseline is None:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    limit = baseline + memory_bytes
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _limit_cpu(cpu_seconds: Optional[float]) -> None:
+    """Allow ``cpu_seconds`` more CPU time; the kernel kills the worker beyond that"""
+    if not cpu_seconds:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    limit = int(usage.ru_utime + usage.ru_stime + cpu_seconds) + 1
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (limit, hard))
+
+
+def worker_main(
+    conn: Any,
+    data_path: str,
+    shm_name: str,
+    memory_bytes: Optional[int],
+) -> None:
+    """
+    Entry point of a pool worker process
+
+    Messages from the parent are ``(alpha_id, code, cpu_seconds)`` tuples, or
+    None to exit. Replies are ``("ok", None)`` after the values were written
+    to shared memory, or ``("error", message)``.
+    """
+    panel = load_panel(data_path)
+    frame = panel_frame(panel)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    out = np.ndarray(panel.shape, dtype=np.float64, buffer=shm.buf)
+
+    _limit_memory(memory_bytes)
+    conn.send(("ready", os.getpid()))
+
+    try:
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+
+            alpha_id, code, cpu_seconds = message
+            _limit_cpu(cpu_seconds)
+            try:
+                out[...] = run_factor_code(alpha_id, code, frame)
+                conn.send(("ok", None))
+            except MemoryError:
+                conn.send(("error", "Memory limit exceeded"))
+            except Exception as e:
+                trace = traceback.format_exc(limit=-3)
+                conn.send(("error", f"{type(e).__name__}: {e}\n{trace}"))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        del out
+        shm.close()
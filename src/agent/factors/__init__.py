@@ -0,0 +1,65 @@
+"""
+Factors package for AlphaGPT
+
+This package contains the parser and vectorized evaluation engine for the
+alpha DSL.
+"""
+from agent.factors.operators import FIELDS, OPERATORS, Operator
+from agent.factors.parser import (
+    DSLError,
+    Node,
+    latex_to_dsl,
+    parse_expression,
+    parse_formulation,
+)
+from agent.factors.canonical import Fingerprint, canonicalize, fingerprint
+from agent.factors.cache import (
+    FactorValueCache,
+    factor_key,
+    get_factor_cache,
+    normalize_code,
+)
+from agent.factors.evaluator import (
+    dsl_code,
+    evaluate,
+    evaluate_batch,
+    evaluate_frame,
+    is_dsl_expression,
+    panel_from_frame,
+    to_node,
+    topological_order,
+)
+from agent.factors.incremental import (
+    IncrementalEvaluator,
+    RollingState,
+    evaluate_incremental,
+)
+
+__all__ = [
+    "FIELDS",
+    "OPERATORS",
+    "Operator",
+    "DSLError",
+    "Node",
+    "latex_to_dsl",
+    "parse_expression",
+    "parse_formulation",
+    "Fingerprint",
+    "canonicalize",
+    "fingerprint",
+    "FactorValueCache",
+    "factor_key",
+    "get_factor_cache",
+    "normalize_code",
+    "dsl_code",
+    "evaluate",
+    "evaluate_batch",
+    "evaluate_frame",
+    "is_dsl_expression",
+    "panel_from_frame",
+    "to_node",
+    "topological_order",
+    "IncrementalEvaluator",
+    "RollingState",
+    "evaluate_incremental",
+]
@@ -0,0 +1,234 @@
+"""
+Content-addressed on-disk cache of computed factor panels
+
+A factor's values depend only on what it computes and on the market data, so
+they are keyed by a hash of
+
+* the canonical expression (DSL alphas), or the normalized code (alphas run
+  from generated Python: formatting, comments and the ``calculate_<id>``
+  function name do not count), and
+* the market data version (see ``agent.market_data.data_version``).
+
+Each panel is one ``.npy`` file, read back memory-mapped, so a cached factor
+costs no copy until it is used. Reading a panel refreshes its modification
+time. When the cache exceeds its byte budget the least recently used files
+are deleted. Files are written atomically, so several processes can share a
+cache directory.
+"""
+
+import ast
+import hashlib
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+import numpy as np
+
+from agent.factors.canonical import fingerprint
+from agent.factors.parser import Node
+
+_SUFFIX = ".npy"
+
+PathLike = Union[str, os.PathLike]
+
+
+class _RenameFactorFunction(ast.NodeTransformer):
+    """Give every ``calculate_*`` function the same name"""
+
+    @staticmethod
+    def _rename(name: str) -> str:
+        return "calculate_factor" if name.startswith("calculate_") else name
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> ast.AST:
+        node.name = self._rename(node.name)
+        return self.generic_visit(node)
+
+    def visit_Name(self, node: ast.Name) -> ast.AST:
+        node.id = self._rename(node.id)
+        return node
+
+
+def normalize_code(code: str) -> str:
+    """
+    Normalize factor code so that equivalent programs compare equal
+
+    The code is parsed and dumped back, which drops comments and formatting,
+    and the factor function is renamed. Code that does not parse is only
+    stripped.
+    """
+    try:
+        tree = _RenameFactorFunction().visit(ast.parse(code))
+    except SyntaxError:
+        return code.strip()
+    return ast.dump(tree, annotate_fields=False)
+
+
+def factor_key(
+    data_version: str,
+    expression: Optional[Union[str, Node]] = None,
+    code: Optional[str] = None,
+) -> str:
+    """
+    Cache key of a factor on a version of the market data
+
+    Args:
+        data_version: Market data version
+        expression: DSL expression, if the factor runs on the DSL engine
+        code: Generated Python code otherwise
+
+    Returns:
+        SHA-256 hex digest
+    """
+    if expression is not None:
+        identity = f"dsl:{fingerprint(expression).canonical}"
+    elif code is not None:
+        identity = f"code:{normalize_code(code)}"
+    else:
+        raise ValueError("A factor needs an expression or code")
+    return hashlib.sha256(f"{data_version}\0{identity}".encode()).hexdigest()
+
+
+class FactorValueCache:
+    """Directory of cached ``(date, instrument)`` factor panels
+
+    Args:
+        path: Cache directory
+        max_bytes: Byte budget; least recently used panels are evicted
+            beyond it (None for no limit)
+    """
+
+    def __init__(self, path: PathLike, max_bytes: Optional[int] = None) -> None:
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Sizes of the files this process knows about; rebuilt by ``evict``
+        self._sizes: Optional[Dict[str, int]] = None
+
+    def _file(self, key: str) -> Path:
+        # Two-level fan-out keeps directories small
+        return self.path / key[:2] / f"{key}{_SUFFIX}"
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Return the cached panel for ``key`` (memory-mapped, read-only) or None"""
+        file = self._file(key)
+        try:
+            values = np.load(file, mmap_mode="r")
+            os.utime(file)
+        except (FileNotFoundError, ValueError, OSError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return values
+
+    def put(self, key: str, values: Any) -> None:
+        """Store a panel, then evict least recently used panels over budget"""
+        values = np.asarray(values)
+        file = self._file(key)
+        file.parent.mkdir(parents=True, exist_ok=True)
+
+        fd, staging = tempfile.mkstemp(dir=file.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                np.save(handle, values, allow_pickle=False)
+            os.replace(staging, file)
+        except BaseException:
+            if os.path.exists(staging):
+                os.unlink(staging)
+            raise
+
+        with self._lock:
+            if self._sizes is not None:
+                self._sizes[key] = file.stat().st_size
+            over_budget = self.max_bytes is not None and (
+                self._sizes is None or sum(self._sizes.values()) > self.max_bytes
+            )
+        if over_budget:
+            self.evict()
+
+    def _scan(self) -> Dict[str, Any]:
+        files = {}
+        if self.path.is_dir():
+            for file in self.path.glob(f"*/*{_SUFFIX}"):
+                try:
+                    files[file.stem] = file.stat()
+                except FileNotFoundError:
+                    continue
+        return files
+
+    def evict(self) -> int:
+        """
+        Delete least recently used panels until the cache fits its budget
+
+        Returns:
+            Number of deleted panels
+        """
+        files = self._scan()
+        total = sum(stat.st_size for stat in files.values())
+        deleted = 0
+        if self.max_bytes is not None and total > self.max_bytes:
+            for key, stat in sorted(files.items(), key=lambda item: item[1].st_mtime_ns):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    self._file(key).unlink()
+                except FileNotFoundError:
+                    pass
+                total -= stat.st_size
+                del files[key]
+                deleted += 1
+
+        with self._lock:
+            self._sizes = {key: stat.st_size for key, stat in files.items()}
+        return deleted
+
+    def size(self) -> Dict[str, int]:
+        """Number of cached panels and their total size in bytes"""
+        files = self._scan()
+        return {
+            "entries": len(files),
+            "bytes": sum(stat.st_size for stat in files.values()),
+        }
+
+    def clear(self) -> None:
+        """Delete every cached panel"""
+        for key in self._scan():
+            try:
+                self._file(key).unlink()
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._sizes = {}
+
+
+_caches: Dict[tuple, FactorValueCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_factor_cache(configuration: Any) -> Optional[FactorValueCache]:
+    """
+    Return the process-wide factor value cache for a configuration
+
+    Returns:
+        FactorValueCache, or None if ``Configuration.factor_cache_path`` is unset
+    """
+    if not configuration.factor_cache_path:
+        return None
+
+    max_bytes = (
+        int(configuration.factor_cache_max_mb * 1024 * 1024)
+        if configuration.factor_cache_max_mb
+        else None
+    )
+    key = (os.path.abspath(configuration.factor_cache_path), max_bytes)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = FactorValueCache(configuration.factor_cache_path, max_bytes)
+            _caches[key] = cache
+        return cache
@@ -0,0 +1,210 @@
+"""
+Canonical forms and fingerprints of alpha expressions
+
+Two formulations of the same factor should hash to the same fingerprint
+regardless of operand order, constant arithmetic or how field names are
+spelled.
+``canonicalize`` rewrites an expression tree into a normal form:
+
+* subtraction becomes addition of a negation, and nested sums and products
+  are flattened, so ``a - b``, ``-b + a`` and ``(a + -b)`` coincide
+* operands of commutative operators (``add``, ``mul``, ``maximum``,
+  ``minimum``, ``ts_corr``) are sorted
+* constant subexpressions are folded and identities (``x * 1``, ``x + 0``,
+  ``--x``) are removed
+* the spelling of variable names is normalized: aliases map to market
+  fields (``vol`` to ``volume``), and other names are lowercased with time
+  subscripts removed (``R_t`` becomes ``r``). Variables are not renamed, so
+  ``x / y`` and ``a / b`` have different fingerprints.
+
+``fingerprint`` hashes the canonical text. Formulations that do not parse
+fall back to a whitespace-normalized hash of the text.
+"""
+
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import List, Union
+
+import numpy as np
+
+from agent.factors.operators import OPERATORS
+from agent.factors.parser import (
+    FIELD_ALIASES,
+    DSLError,
+    Node,
+    const_node,
+    field_node,
+    parse_formulation,
+    strip_definition,
+)
+
+# Operators whose constant arguments can be folded to a constant
+_FOLDABLE = {
+    "add", "sub", "mul", "div", "pow", "neg", "log", "sqrt", "abs", "sign",
+    "maximum", "minimum",
+}
+_ASSOCIATIVE = {"add", "mul"}
+_SYMMETRIC = {"ts_corr", "maximum", "minimum"}
+
+_TIME_SUFFIX = re.compile(r"_(?:t|\{t\})$")
+_LATEX_NOISE = re.compile(r"\\(?:left|right|big|Big|bigg|Bigg)\b|\\[,;:! ]|\\quad|\\qquad|\$|\s+")
+
+
+@dataclass(frozen=True)
+class Fingerprint:
+    """Identity of an alpha expression"""
+
+    digest: str
+    """SHA-256 hex digest of ``kind`` and ``canonical``."""
+
+    canonical: str
+    """Canonical DSL text, or normalized text when the formulation does not parse."""
+
+    kind: str
+    """``"dsl"`` for parsed expressions, ``"text"`` for the textual fallback."""
+
+
+def _sort_key(node: Node) -> str:
+    return node.to_text()
+
+
+def _fold(node: Node) -> Node:
+    """Fold an operator whose arguments are all constants, if the result is finite"""
+    if node.op not in _FOLDABLE or not all(arg.op == "const" for arg in node.args):
+        return node
+    with np.errstate(all="ignore"):
+        value = OPERATORS[node.op].func(
+            *(np.array([float(arg.value)]) for arg in node.args)
+        )
+    value = float(np.asarray(value).reshape(-1)[0])
+    return const_node(value) if np.isfinite(value) else node
+
+
+def _operands(node: Node, op: str) -> List[Node]:
+    """Flatten a chain of ``op`` into its operands"""
+    if node.op != op:
+        return [node]
+    operands: List[Node] = []
+    for arg in node.args:
+        operands.extend(_operands(arg, op))
+    return operands
+
+
+def _rebuild(op: str, operands: List[Node]) -> Node:
+    """Combine sorted operands of an associative operator, folding constants"""
+    identity = 0.0 if op == "add" else 1.0
+    constant = identity
+    rest = []
+    for operand in operands:
+        if operand.op == "const":
+            constant = constant + operand.value if op == "add" else constant * operand.value
+        else:
+            rest.append(operand)
+
+    rest.sort(key=_sort_key)
+    if constant != identity or not rest:
+        rest.insert(0, const_node(constant))
+
+    node = rest[0]
+    for operand in rest[1:]:
+        node = Node(op, (node, operand))
+    return node
+
+
+def _canonical(node: Node) -> Node:
+    """One bottom-up normalization pass"""
+    if node.is_leaf:
+        return node
+
+    args = tuple(_canonical(arg) for arg in node.args)
+    op = node.op
+
+    if op == "sub":
+        op, args = "add", (args[0], _canonical(Node("neg", (args[1],))))
+    if op == "neg":
+        inner = args[0]
+        if inner.op == "neg":
+            return inner.args[0]
+        if inner.op == "const":
+            return const_node(-float(inner.value))
+
+    if op in _ASSOCIATIVE:
+        operands: List[Node] = []
+        for arg in args:
+            operands.extend(_operands(arg, op))
+        return _rebuild(op, operands)
+
+    if op == "div" and args[1].op == "const" and float(args[1].value) == 1.0:
+        return args[0]
+    if op == "pow" and args[1].op == "const" and float(args[1].value) == 1.0:
+        return args[0]
+
+    if op in _SYMMETRIC:
+        pair = sorted(args[:2], key=_sort_key)
+        args = (pair[0], pair[1]) + args[2:]
+
+    return _fold(Node(op, args))
+
+
+def normalize_name(name: str) -> str:
+    """Canonical spelling of a variable name"""
+    name = _TIME_SUFFIX.sub("", name.lower())
+    return FIELD_ALIASES.get(name, name)
+
+
+def _rename(node: Node) -> Node:
+    if node.op == "field":
+        return field_node(normalize_name(node.value))
+    if node.is_leaf:
+        return node
+    return Node(node.op, tuple(_rename(arg) for arg in node.args))
+
+
+def canonicalize(node: Node) -> Node:
+    """
+    Return the canonical form of an expression tree
+
+    Args:
+        node: Parsed expression
+
+    Returns:
+        Canonical expression; evaluates to the same values as ``node``
+    """
+    return _canonical(_rename(node))
+
+
+def normalize_text(formulation: str) -> str:
+    """Whitespace and LaTeX-spacing-insensitive form of a formulation"""
+    return _LATEX_NOISE.sub("", strip_definition(formulation))
+
+
+def fingerprint(expression: Union[str, Node]) -> Fingerprint:
+    """
+    Fingerprint an alpha expression
+
+    Args:
+        expression: DSL text, LaTeX formulation or parsed ``Node``
+
+    Returns:
+        Fingerprint of the canonical form
+    """
+    if isinstance(expression, Node):
+        node = expression
+    else:
+        try:
+            node = parse_formulation(expression)
+        except DSLError:
+            try:
+                # Formulations with non-market variables still have structure
+                node = parse_formulation(expression, fields=None)
+            except DSLError:
+                node = None
+
+    if node is None:
+        kind, canonical = "text", normalize_text(expression or "")
+    else:
+        kind, canonical = "dsl", canonicalize(node).to_text()
+
+    digest = hashlib.sha256(f"{kind}:{canonical}".encode()).hexdigest()
+    return Fingerprint(digest=digest, canonical=canonical, kind=kind)
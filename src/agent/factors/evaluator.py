@@ -0,0 +1,248 @@
+"""
+Evaluation of alpha DSL expressions on dense market data panels
+
+Expressions are parsed into ``Node`` trees (see ``agent.factors.parser``) and
+evaluated with the vectorized operators in ``agent.factors.operators``.
+``evaluate_batch`` evaluates many factors over one shared DAG, so a
+subexpression such as ``ts_mean(volume, 20)`` that appears in several factors
+is computed once. Intermediate arrays are released as soon as their last
+consumer has run.
+"""
+
+import re
+from collections import Counter
+from typing import Any, Callable, Dict, List, Mapping, MutableMapping, Optional, Tuple, Union
+
+import numpy as np
+
+from agent.factors.operators import OPERATORS
+from agent.factors.parser import DSLError, Node, parse_formulation
+
+Expression = Union[str, Node]
+
+
+def to_node(expression: Expression) -> Node:
+    """Parse ``expression`` unless it already is a ``Node``"""
+    if isinstance(expression, Node):
+        return expression
+    return parse_formulation(expression)
+
+
+def topological_order(
+    roots: List[Node], stop: Optional[Callable[[Node], bool]] = None
+) -> List[Node]:
+    """
+    Return the unique nodes reachable from ``roots``, children before parents
+
+    Constants are omitted since they are never materialized as arrays. Nodes
+    for which ``stop`` returns True are listed but their children are not
+    visited (unless another path reaches them).
+    """
+    order: List[Node] = []
+    seen = set()
+    stack: List[Tuple[Node, bool]] = [(root, False) for root in reversed(roots)]
+
+    while stack:
+        node, expanded = stack.pop()
+        if node in seen or node.op == "const":
+            continue
+        if expanded or (stop is not None and stop(node)):
+            seen.add(node)
+            order.append(node)
+            continue
+        stack.append((node, True))
+        for arg in reversed(node.args):
+            if arg not in seen:
+                stack.append((arg, False))
+
+    return order
+
+
+def _compute(
+    node: Node, data: Mapping[str, np.ndarray], values: Mapping[Node, Any]
+) -> Any:
+    """Compute a single node whose children are already in ``values``"""
+    if node.op == "field":
+        if node.value not in data:
+            raise DSLError(f"Unknown field '{node.value}'")
+        return np.asarray(data[node.value], dtype=np.float64)
+
+    op = OPERATORS[node.op]
+    args = [
+        float(arg.value) if arg.op == "const" else values[arg]
+        for arg in node.args[: op.arity]
+    ]
+    if op.window:
+        args.append(int(node.args[-1].value))
+    return op.func(*args)
+
+
+def evaluate_batch(
+    expressions: Mapping[str, Expression],
+    data: Mapping[str, np.ndarray],
+    cache: Optional[MutableMapping[Node, np.ndarray]] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Evaluate several factors together, computing shared subexpressions once
+
+    Args:
+        expressions: Mapping of factor name to DSL text, LaTeX or ``Node``
+        data: Mapping of field name to ``(date, instrument)`` array
+        cache: Optional mapping of already computed subexpressions. A node
+            found in it is not computed, and neither are the nodes below it;
+            every computed non-leaf node is added, so it can be reused across
+            batches on the same data.
+
+    Returns:
+        Mapping of factor name to ``(date, instrument)`` float64 array
+    """
+    roots = {name: to_node(expression) for name, expression in expressions.items()}
+    shape = np.broadcast_shapes(*(np.shape(v) for v in data.values()))
+
+    # Cached nodes are read once, while ordering, and their subtrees are not
+    # visited: nothing below a cache hit needs computing
+    hits: Dict[Node, Any] = {}
+
+    def cached(node: Node) -> bool:
+        if cache is None or node not in cache:
+            return False
+        hits[node] = cache[node]
+        return True
+
+    order = topological_order(list(roots.values()), stop=cached)
+
+    # Reference counts let intermediates be dropped after their last use
+    remaining = Counter(
+        arg
+        for node in order
+        if node not in hits
+        for arg in set(node.args)
+        if arg.op != "const"
+    )
+    root_nodes = set(roots.values())
+    values: Dict[Node, Any] = {}
+
+    for node in order:
+        if node in hits:
+            values[node] = hits.pop(node)
+            continue
+
+        values[node] = _compute(node, data, values)
+        if cache is not None and not node.is_leaf:
+            cache[node] = values[node]
+
+        for arg in set(node.args):
+            if arg.op == "const":
+                continue
+            remaining[arg] -= 1
+            if remaining[arg] == 0 and arg not in root_nodes:
+                del values[arg]
+
+    results = {}
+    for name, root in roots.items():
+        if root.op == "const":
+            value = np.full(shape, float(root.value))
+        else:
+            value = np.broadcast_to(values[root], shape).astype(np.float64, copy=True)
+        results[name] = value
+    return results
+
+
+def evaluate(expression: Expression, data: Mapping[str, np.ndarray]) -> np.ndarray:
+    """
+    Evaluate a DSL expression on a panel of market data
+
+    Args:
+        expression: DSL text (e.g. ``ts_mean(volume, 20) / volume``), LaTeX
+            formulation or parsed ``Node``
+        data: Mapping of field name to ``(date, instrument)`` array
+
+    Returns:
+        ``(date, instrument)`` float64 array of factor values
+    """
+    return evaluate_batch({"factor": expression}, data)["factor"]
+
+
+def is_dsl_expression(expression: str) -> bool:
+    """Return True if ``expression`` can be expressed with DSL operators and market fields"""
+    if not expression:
+        return False
+
+    try:
+        to_node(expression)
+        return True
+    except DSLError:
+        return False
+
+
+def panel_from_frame(frame: Any) -> Tuple[Any, Any, Dict[str, np.ndarray]]:
+    """
+    Convert a (datetime, instrument) MultiIndex DataFrame to dense arrays
+
+    Returns:
+        Tuple of (dates index, instruments index, mapping of field to array)
+    """
+    wide = frame.unstack(level=1).sort_index()
+    dates = wide.index
+    instruments = wide.columns.get_level_values(1).unique()
+    data = {
+        field: wide[field].reindex(columns=instruments).to_numpy(dtype=np.float64)
+        for field in frame.columns
+    }
+    return dates, instruments, data
+
+
+def evaluate_frame(expression: Expression, frame: Any, name: str = "factor") -> Any:
+    """
+    Evaluate a DSL expression on a (datetime, instrument) MultiIndex DataFrame
+
+    Args:
+        expression: DSL expression
+        frame: DataFrame with market data columns
+        name: Name of the output column
+
+    Returns:
+        DataFrame with the same index as ``frame`` and a single column ``name``
+    """
+    import pandas as pd
+
+    dates, instruments, data = panel_from_frame(frame)
+    values = evaluate(expression, data)
+    wide = pd.DataFrame(values, index=dates, columns=instruments)
+    series = wide.stack(future_stack=True).reindex(frame.index)
+    return series.to_frame(name)
+
+
+DSL_CODE_TEMPLATE = '''import pandas as pd
+
+from agent.factors import evaluate_frame
+
+
+def calculate_{function_suffix}(df):
+    """
+    Calculate {function_suffix} with the built-in DSL engine
+
+    Expression: {expression}
+    """
+    return evaluate_frame({expression!r}, df, name={alpha_id!r})
+'''
+"""Code stored for alphas evaluated by the DSL engine instead of LLM-written code"""
+
+
+def _function_suffix(alpha_id: str) -> str:
+    """Turn an alpha ID into a valid identifier suffix (``alpha-1`` becomes ``alpha_1``)"""
+    suffix = re.sub(r"\W", "_", alpha_id)
+    return f"_{suffix}" if not suffix or suffix[0].isdigit() else suffix
+
+
+def dsl_code(alpha_id: str, expression: Expression) -> str:
+    """
+    Return the Python code stored for an alpha that runs on the DSL engine
+
+    The factor function is named after the alpha ID, with characters that
+    are not valid in an identifier replaced by ``_``.
+    """
+    text = expression.to_text() if isinstance(expression, Node) else expression
+    return DSL_CODE_TEMPLATE.format(
+        alpha_id=alpha_id, function_suffix=_function_suffix(alpha_id), expression=text
+    )
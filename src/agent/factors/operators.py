@@ -0,0 +1,353 @@
+"""
+Vectorized operators for the alpha DSL
+
+Every operator works on dense ``(date, instrument)`` float arrays and processes
+all instruments at once, so there is no per-instrument groupby. Rolling
+operators follow pandas' default ``min_periods=window`` semantics: the first
+``window - 1`` rows are NaN, and any window containing a NaN produces NaN.
+"""
+
+import warnings
+from typing import Callable, Dict, NamedTuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Upper bound on the number of elements materialized at once by operators
+# that need to compare every value in a window (ts_rank).
+_CHUNK_ELEMENTS = 1 << 23
+
+
+def _as_panel(x: np.ndarray) -> np.ndarray:
+    """Return ``x`` as a 2-D float64 array"""
+    x = np.asarray(x, dtype=np.float64)
+    if x.ndim == 1:
+        x = x[:, None]
+    return x
+
+
+def _check_window(window: int) -> int:
+    """Validate a rolling window length"""
+    window = int(window)
+    if window < 1:
+        raise ValueError(f"Window must be a positive integer, got {window}")
+    return window
+
+
+def _rolling_sums(window: int, *arrays: np.ndarray):
+    """
+    Rolling window sums of several aligned arrays via cumulative sums
+
+    NaNs are treated as zero in the sums and counted separately, so each
+    result can be masked where the window is incomplete.
+
+    Returns:
+        Tuple of (window sums for each array, boolean mask of complete windows)
+    """
+    valid = np.ones(arrays[0].shape, dtype=bool)
+    for a in arrays:
+        valid &= ~np.isnan(a)
+
+    def window_sum(values: np.ndarray) -> np.ndarray:
+        csum = np.cumsum(values, axis=0)
+        out = np.empty_like(csum)
+        out[:window] = csum[:window]
+        out[window:] = csum[window:] - csum[:-window]
+        return out
+
+    counts = window_sum(valid.astype(np.int64))
+    complete = counts == window
+    complete[: window - 1] = False
+
+    sums = tuple(window_sum(np.where(valid, a, 0.0)) for a in arrays)
+    return sums, complete
+
+
+def _demean(x: np.ndarray) -> np.ndarray:
+    """Subtract each column's mean to limit cancellation in sums of squares"""
+    with warnings.catch_warnings():
+        # All-NaN columns warn about an empty slice; they stay NaN anyway
+        warnings.simplefilter("ignore", RuntimeWarning)
+        center = np.nanmean(x, axis=0)
+    return x - np.nan_to_num(center)
+
+
+# ---------------------------------------------------------------------------
+# Element-wise operators
+# ---------------------------------------------------------------------------
+
+
+def add(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Element-wise x + y"""
+    return np.add(x, y)
+
+
+def sub(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Element-wise x - y"""
+    return np.subtract(x, y)
+
+
+def mul(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Element-wise x * y"""
+    return np.multiply(x, y)
+
+
+def div(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Element-wise x / y, NaN where the divisor is zero"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = np.divide(x, y)
+    return np.where(np.isfinite(out), out, np.nan)
+
+
+def power(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Element-wise x ** y, NaN where undefined"""
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        out = np.power(x, y)
+    return np.where(np.isfinite(out), out, np.nan)
+
+
+def neg(x: np.ndarray) -> np.ndarray:
+    """Element-wise -x"""
+    return np.negative(x)
+
+
+def log(x: np.ndarray) -> np.ndarray:
+    """Natural logarithm, NaN for non-positive inputs"""
+    x = np.asarray(x, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(x > 0, np.log(np.where(x > 0, x, 1.0)), np.nan)
+
+
+def sqrt(x: np.ndarray) -> np.ndarray:
+    """Square root, NaN for negative inputs"""
+    x = np.asarray(x, dtype=np.float64)
+    return np.where(x >= 0, np.sqrt(np.where(x >= 0, x, 0.0)), np.nan)
+
+
+def abs_(x: np.ndarray) -> np.ndarray:
+    """Element-wise absolute value"""
+    return np.abs(x)
+
+
+def sign(x: np.ndarray) -> np.ndarray:
+    """Element-wise sign"""
+    return np.sign(x)
+
+
+def maximum(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Element-wise larger of x and y, NaN where either is NaN"""
+    return np.maximum(x, y)
+
+
+def minimum(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Element-wise smaller of x and y, NaN where either is NaN"""
+    return np.minimum(x, y)
+
+
+# ---------------------------------------------------------------------------
+# Cross-sectional operators
+# ---------------------------------------------------------------------------
+
+
+def rank(x: np.ndarray) -> np.ndarray:
+    """
+    Cross-sectional percentile rank of each date's values
+
+    Matches ``DataFrame.rank(axis=1, pct=True)``: ties get their average
+    rank and NaNs stay NaN.
+    """
+    x = _as_panel(x)
+    n_dates, n_instruments = x.shape
+    if n_instruments == 0:
+        return x.copy()
+
+    # NaNs sort to the end of each row; ties are averaged, so the sort
+    # does not need to be stable
+    order = np.argsort(x, axis=1)
+    ordered = np.take_along_axis(x, order, axis=1)
+    positions = np.broadcast_to(np.arange(n_instruments), x.shape)
+
+    # Tie groups: first and last position of each run of equal values
+    starts_group = np.ones(x.shape, dtype=bool)
+    starts_group[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+    ends_group = np.ones(x.shape, dtype=bool)
+    ends_group[:, :-1] = starts_group[:, 1:]
+
+    first = np.maximum.accumulate(np.where(starts_group, positions, 0), axis=1)
+    last = np.minimum.accumulate(
+        np.where(ends_group, positions, n_instruments - 1)[:, ::-1], axis=1
+    )[:, ::-1]
+
+    ranks = np.empty_like(x)
+    np.put_along_axis(ranks, order, (first + last) / 2.0 + 1.0, axis=1)
+
+    counts = (~np.isnan(x)).sum(axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ranks = ranks / counts
+    ranks[np.isnan(x)] = np.nan
+    return ranks
+
+
+# ---------------------------------------------------------------------------
+# Time-series operators
+# ---------------------------------------------------------------------------
+
+
+def ts_delay(x: np.ndarray, window: int) -> np.ndarray:
+    """Value of x ``window`` days ago"""
+    x = _as_panel(x)
+    window = int(window)
+    if window < 0:
+        raise ValueError(f"Delay must be non-negative, got {window}")
+    out = np.full_like(x, np.nan)
+    if window == 0:
+        out[:] = x
+    elif window < len(x):
+        out[window:] = x[:-window]
+    return out
+
+
+def ts_delta(x: np.ndarray, window: int) -> np.ndarray:
+    """x minus its value ``window`` days ago"""
+    x = _as_panel(x)
+    return x - ts_delay(x, window)
+
+
+def ts_sum(x: np.ndarray, window: int) -> np.ndarray:
+    """Rolling sum over the past ``window`` days"""
+    x = _as_panel(x)
+    window = _check_window(window)
+    (total,), complete = _rolling_sums(window, x)
+    return np.where(complete, total, np.nan)
+
+
+def ts_mean(x: np.ndarray, window: int) -> np.ndarray:
+    """Rolling mean over the past ``window`` days"""
+    return ts_sum(x, window) / _check_window(window)
+
+
+def ts_std(x: np.ndarray, window: int) -> np.ndarray:
+    """Rolling sample standard deviation (ddof=1) over the past ``window`` days"""
+    x = _as_panel(x)
+    window = _check_window(window)
+    if window < 2:
+        return np.full_like(x, np.nan)
+
+    centered = _demean(x)
+    (total, total_sq), complete = _rolling_sums(window, centered, centered**2)
+    variance = (total_sq - total**2 / window) / (window - 1)
+    variance = np.maximum(variance, 0.0)
+    return np.where(complete, np.sqrt(variance), np.nan)
+
+
+def _rolling_reduce(x: np.ndarray, window: int, reducer: Callable) -> np.ndarray:
+    """Apply a NaN-propagating reduction over each rolling window"""
+    x = _as_panel(x)
+    window = _check_window(window)
+    out = np.full_like(x, np.nan)
+    if window <= len(x):
+        out[window - 1 :] = reducer(sliding_window_view(x, window, axis=0), axis=-1)
+    return out
+
+
+def ts_min(x: np.ndarray, window: int) -> np.ndarray:
+    """Rolling minimum over the past ``window`` days"""
+    return _rolling_reduce(x, window, np.min)
+
+
+def ts_max(x: np.ndarray, window: int) -> np.ndarray:
+    """Rolling maximum over the past ``window`` days"""
+    return _rolling_reduce(x, window, np.max)
+
+
+def ts_rank(x: np.ndarray, window: int) -> np.ndarray:
+    """
+    Percentile rank of today's value among the past ``window`` days
+
+    Matches ``Series.rolling(window).rank(pct=True)`` with average ties.
+    """
+    x = _as_panel(x)
+    window = _check_window(window)
+    out = np.full_like(x, np.nan)
+    if window > len(x):
+        return out
+
+    windows = sliding_window_view(x, window, axis=0)
+    chunk = max(1, _CHUNK_ELEMENTS // max(1, x.shape[1] * window))
+
+    for start in range(0, len(windows), chunk):
+        block = windows[start : start + chunk]
+        current = block[..., -1:]
+        below = (block < current).sum(axis=-1)
+        equal = (block == current).sum(axis=-1)
+        ranks = (below + (equal + 1) / 2.0) / window
+        ranks[np.isnan(block).any(axis=-1)] = np.nan
+        out[window - 1 + start : window - 1 + start + len(block)] = ranks
+
+    return out
+
+
+def ts_corr(x: np.ndarray, y: np.ndarray, window: int) -> np.ndarray:
+    """Rolling Pearson correlation of x and y over the past ``window`` days"""
+    x, y = np.broadcast_arrays(_as_panel(x), _as_panel(y))
+    window = _check_window(window)
+    if window < 2:
+        return np.full(x.shape, np.nan)
+
+    x, y = _demean(x), _demean(y)
+    (sx, sy, sxy, sxx, syy), complete = _rolling_sums(
+        window, x, y, x * y, x * x, y * y
+    )
+    cov = sxy - sx * sy / window
+    var_x = sxx - sx**2 / window
+    var_y = syy - sy**2 / window
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        corr = cov / np.sqrt(var_x * var_y)
+
+    tiny = 1e-12 * window
+    degenerate = (var_x <= tiny) | (var_y <= tiny)
+    corr = np.clip(corr, -1.0, 1.0)
+    return np.where(complete & ~degenerate, corr, np.nan)
+
+
+class Operator(NamedTuple):
+    """An operator in the alpha DSL"""
+
+    func: Callable[..., np.ndarray]
+    arity: int
+    """Number of array arguments"""
+    window: bool = False
+    """Whether a trailing integer window argument follows the arrays"""
+    min_window: int = 1
+    """Smallest valid window (0 for delays, where 0 means today)"""
+
+
+OPERATORS: Dict[str, Operator] = {
+    "add": Operator(add, 2),
+    "sub": Operator(sub, 2),
+    "mul": Operator(mul, 2),
+    "div": Operator(div, 2),
+    "pow": Operator(power, 2),
+    "neg": Operator(neg, 1),
+    "log": Operator(log, 1),
+    "sqrt": Operator(sqrt, 1),
+    "abs": Operator(abs_, 1),
+    "sign": Operator(sign, 1),
+    "maximum": Operator(maximum, 2),
+    "minimum": Operator(minimum, 2),
+    "rank": Operator(rank, 1),
+    "ts_delay": Operator(ts_delay, 1, window=True, min_window=0),
+    "ts_delta": Operator(ts_delta, 1, window=True, min_window=0),
+    "ts_sum": Operator(ts_sum, 1, window=True),
+    "ts_mean": Operator(ts_mean, 1, window=True),
+    "ts_std": Operator(ts_std, 1, window=True),
+    "ts_min": Operator(ts_min, 1, window=True),
+    "ts_max": Operator(ts_max, 1, window=True),
+    "ts_rank": Operator(ts_rank, 1, window=True),
+    "ts_corr": Operator(ts_corr, 2, window=True),
+}
+"""Registry of DSL operators by name"""
+
+FIELDS = ("open", "high", "low", "close", "volume")
+"""Market data fields available to DSL expressions"""
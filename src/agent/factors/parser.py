@@ -0,0 +1,399 @@
+"""
+Parser for alpha DSL expressions
+
+Factor formulations arrive either as canonical DSL text
+(``ts_mean(volume, 20) / close``) or as the LaTeX ``formulation`` written by
+``alpha_generator_agent``. Both are parsed into immutable ``Node`` trees.
+Nodes compare and hash structurally, so identical subexpressions in
+different factors are the same dictionary key. A batch of factors therefore
+forms a DAG in which each shared subexpression is evaluated once.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Tuple, Union
+
+from agent.factors.operators import FIELDS, OPERATORS
+
+
+class DSLError(ValueError):
+    """Raised when an expression is not valid in the alpha DSL"""
+
+
+FIELD_ALIASES = {
+    "o": "open",
+    "h": "high",
+    "l": "low",
+    "c": "close",
+    "v": "volume",
+    "vol": "volume",
+    "price": "close",
+    "open_price": "open",
+    "close_price": "close",
+    "high_price": "high",
+    "low_price": "low",
+}
+"""Alternative variable names mapped to market data fields"""
+
+FUNCTION_ALIASES = {
+    "ln": "log",
+    "mean": "ts_mean",
+    "sum": "ts_sum",
+    "std": "ts_std",
+    "stddev": "ts_std",
+    # Element-wise, as in LaTeX \max(a, b); rolling extremes are ts_min/ts_max
+    "min": "minimum",
+    "max": "maximum",
+    "delta": "ts_delta",
+    "delay": "ts_delay",
+    "corr": "ts_corr",
+    "correlation": "ts_corr",
+    "cs_rank": "rank",
+}
+"""Alternative function names mapped to DSL operators"""
+
+
+@dataclass(frozen=True)
+class Node:
+    """A node in an alpha expression tree
+
+    ``op`` is an operator name from ``OPERATORS``, ``"field"`` (``value`` is the
+    field name) or ``"const"`` (``value`` is a float). Window arguments are
+    stored as trailing ``const`` children.
+    """
+
+    op: str
+    args: Tuple["Node", ...] = ()
+    value: Union[str, float, None] = None
+    _hash: int = field(default=0, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "_hash", hash((self.op, self.args, self.value)))
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    @property
+    def is_leaf(self) -> bool:
+        """Whether the node is a field or constant"""
+        return self.op in ("field", "const")
+
+    def to_text(self) -> str:
+        """Render the node as canonical DSL text"""
+        if self.op == "field":
+            return str(self.value)
+        if self.op == "const":
+            value = float(self.value)
+            return str(int(value)) if value.is_integer() else repr(value)
+        return f"{self.op}({', '.join(arg.to_text() for arg in self.args)})"
+
+    def walk(self) -> Iterable["Node"]:
+        """Yield this node and all descendants, parents before children"""
+        yield self
+        for arg in self.args:
+            yield from arg.walk()
+
+
+def field_node(name: str) -> Node:
+    """Create a field node"""
+    return Node("field", value=name)
+
+
+def const_node(value: float) -> Node:
+    """Create a constant node"""
+    return Node("const", value=float(value))
+
+
+def make_node(op: str, *args: Node) -> Node:
+    """
+    Create an operator node, validating arity and window arguments
+
+    Raises:
+        DSLError: If the operator is unknown or its arguments are invalid
+    """
+    spec = OPERATORS.get(op)
+    if spec is None:
+        raise DSLError(f"Unknown operator '{op}'")
+
+    expected = spec.arity + (1 if spec.window else 0)
+    if len(args) != expected:
+        raise DSLError(f"Operator '{op}' expects {expected} arguments, got {len(args)}")
+
+    if spec.window:
+        window = args[-1]
+        if window.op != "const" or not float(window.value).is_integer():
+            raise DSLError(f"Window of '{op}' must be an integer constant")
+        # A negative delay would read future values
+        if window.value < spec.min_window:
+            raise DSLError(
+                f"Window of '{op}' must be at least {spec.min_window}, "
+                f"got {int(window.value)}"
+            )
+
+    return Node(op, tuple(args))
+
+
+# ---------------------------------------------------------------------------
+# Text parser
+# ---------------------------------------------------------------------------
+
+_TOKEN = re.compile(
+    r"\s*(?:(?P<number>\d+\.\d*|\.\d+|\d+)(?:[eE][+-]?\d+)?|(?P<name>[A-Za-z_][A-Za-z0-9_]*)"
+    r"|(?P<op>\*\*|[-+*/^(),]))"
+)
+
+_BINARY = {"+": "add", "-": "sub", "*": "mul", "/": "div", "^": "pow", "**": "pow"}
+
+
+def _tokenize(text: str) -> List[Tuple[str, str]]:
+    """Split DSL text into (kind, token) pairs"""
+    tokens = []
+    position = 0
+    text = text.strip()
+
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if match is None or match.end() == position:
+            raise DSLError(f"Unexpected character {text[position]!r} in '{text}'")
+        kind = match.lastgroup
+        token = match.group(0).strip()
+        tokens.append((kind, token))
+        position = match.end()
+        while position < len(text) and text[position].isspace():
+            position += 1
+
+    return tokens
+
+
+class _Parser:
+    """Recursive-descent parser for infix DSL text"""
+
+    def __init__(self, text: str, fields: Optional[Iterable[str]]) -> None:
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.position = 0
+        self.fields = None if fields is None else set(fields)
+
+    def peek(self) -> Optional[str]:
+        if self.position < len(self.tokens):
+            return self.tokens[self.position][1]
+        return None
+
+    def take(self, expected: Optional[str] = None) -> Tuple[str, str]:
+        if self.position >= len(self.tokens):
+            raise DSLError(f"Unexpected end of expression '{self.text}'")
+        kind, token = self.tokens[self.position]
+        if expected is not None and token != expected:
+            raise DSLError(f"Expected '{expected}' but found '{token}' in '{self.text}'")
+        self.position += 1
+        return kind, token
+
+    def parse(self) -> Node:
+        node = self.expression()
+        if self.position != len(self.tokens):
+            raise DSLError(f"Unexpected '{self.peek()}' in '{self.text}'")
+        return node
+
+    def expression(self) -> Node:
+        node = self.term()
+        while self.peek() in ("+", "-"):
+            _, op = self.take()
+            node = make_node(_BINARY[op], node, self.term())
+        return node
+
+    def term(self) -> Node:
+        node = self.unary()
+        while self.peek() in ("*", "/"):
+            _, op = self.take()
+            node = make_node(_BINARY[op], node, self.unary())
+        return node
+
+    def unary(self) -> Node:
+        if self.peek() in ("-", "+"):
+            _, op = self.take()
+            operand = self.unary()
+            if op == "+":
+                return operand
+            if operand.op == "const":
+                return const_node(-float(operand.value))
+            return make_node("neg", operand)
+        return self.power()
+
+    def power(self) -> Node:
+        base = self.atom()
+        if self.peek() in ("^", "**"):
+            self.take()
+            # Right associative and binds tighter than unary minus on the left
+            return make_node("pow", base, self.unary())
+        return base
+
+    def atom(self) -> Node:
+        kind, token = self.take()
+
+        if kind == "number":
+            return const_node(float(token))
+
+        if token == "(":
+            node = self.expression()
+            self.take(")")
+            return node
+
+        if kind == "name":
+            name = token.lower()
+            if self.peek() == "(":
+                self.take("(")
+                args = []
+                if self.peek() != ")":
+                    args.append(self.expression())
+                    while self.peek() == ",":
+                        self.take(",")
+                        args.append(self.expression())
+                self.take(")")
+                return make_node(FUNCTION_ALIASES.get(name, name), *args)
+
+            name = FIELD_ALIASES.get(name, name)
+            if self.fields is not None and name not in self.fields:
+                raise DSLError(f"Unknown field '{token}' in '{self.text}'")
+            return field_node(name)
+
+        raise DSLError(f"Unexpected '{token}' in '{self.text}'")
+
+
+def parse_expression(text: str, fields: Optional[Iterable[str]] = FIELDS) -> Node:
+    """
+    Parse canonical DSL text into an expression tree
+
+    Args:
+        text: DSL expression, e.g. ``rank(ts_mean(volume, 20)) / close``
+        fields: Allowed field names, or None to accept any variable name
+
+    Raises:
+        DSLError: If the expression is not valid DSL
+    """
+    if not text or not text.strip():
+        raise DSLError("Empty expression")
+    return _Parser(text, fields).parse()
+
+
+# ---------------------------------------------------------------------------
+# LaTeX normalization
+# ---------------------------------------------------------------------------
+
+_LATEX_WRAPPERS = re.compile(
+    r"\\(?:text|mathrm|mathit|mathbf|operatorname|textrm|texttt)\s*\{([^{}]*)\}"
+)
+_LATEX_DROP = re.compile(r"\\(?:left|right|big|Big|bigg|Bigg)\b|\\[,;:! ]|\\quad|\\qquad|\$")
+_LATEX_SYMBOLS = {
+    r"\cdot": "*",
+    r"\times": "*",
+    r"\div": "/",
+    r"\log": "log",
+    r"\ln": "log",
+    r"\min": "min",
+    r"\max": "max",
+    r"\sqrt": "sqrt",
+    r"\_": "_",
+}
+_DELAYED = re.compile(r"([A-Za-z][A-Za-z0-9_]*?)_\{\s*t\s*-\s*(\d+)\s*\}")
+_CURRENT = re.compile(r"([A-Za-z][A-Za-z0-9]*)_(?:\{\s*t\s*\}|t(?![A-Za-z0-9_]))")
+_SUBSCRIPT = re.compile(r"[A-Za-z][A-Za-z0-9]*_(\{[^{}]*\}|[A-Za-z0-9](?![A-Za-z0-9_]))")
+
+
+def _replace_braced_command(text: str, command: str, arity: int, render) -> str:
+    """Replace ``\\command{a}{b}`` with ``render(a, b)``, innermost first"""
+    while True:
+        start = text.rfind(command + "{")
+        if start < 0:
+            return text
+
+        args = []
+        position = start + len(command)
+        for _ in range(arity):
+            while position < len(text) and text[position].isspace():
+                position += 1
+            if position >= len(text) or text[position] != "{":
+                raise DSLError(f"Malformed {command} in LaTeX formulation")
+            depth = 0
+            for end in range(position, len(text)):
+                if text[end] == "{":
+                    depth += 1
+                elif text[end] == "}":
+                    depth -= 1
+                    if depth == 0:
+                        break
+            else:
+                raise DSLError("Unbalanced braces in LaTeX formulation")
+            args.append(text[position + 1 : end])
+            position = end + 1
+
+        text = text[:start] + render(*args) + text[position:]
+
+
+def strip_definition(formulation: str) -> str:
+    """Drop a leading ``Factor = `` definition (an ``=`` outside any braces)"""
+    depth = 0
+    for index, char in enumerate(formulation):
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+        elif char == "=" and depth == 0:
+            return formulation[index + 1 :].strip()
+    return formulation.strip()
+
+
+def latex_to_dsl(latex: str) -> str:
+    """
+    Convert a LaTeX factor formulation to DSL text on a best-effort basis
+
+    Handles ``\\frac``, ``\\sqrt``, ``\\text{...}`` wrappers, ``\\cdot``/``\\times``,
+    ``\\log``/``\\ln``, time subscripts (``close_t`` becomes ``close`` and
+    ``close_{t-5}`` becomes ``ts_delay(close, 5)``) and ``\\left``/``\\right``.
+    Other subscripts (``close_{t+1}``, ``x_{i}``) raise ``DSLError``. Anything
+    else (sums, implicit products, ...) is left for the parser to reject.
+    """
+    text = strip_definition(latex)
+
+    text = _LATEX_DROP.sub(" ", text)
+    previous = None
+    while previous != text:
+        previous = text
+        text = _LATEX_WRAPPERS.sub(lambda m: m.group(1), text)
+
+    text = _replace_braced_command(text, r"\frac", 2, lambda a, b: f"(({a})/({b}))")
+    text = _replace_braced_command(text, r"\sqrt", 1, lambda a: f"sqrt({a})")
+
+    for symbol, replacement in _LATEX_SYMBOLS.items():
+        text = text.replace(symbol, replacement)
+
+    text = _DELAYED.sub(lambda m: f"ts_delay({m.group(1)}, {m.group(2)})", text)
+    text = _CURRENT.sub(lambda m: m.group(1), text)
+    # Dropping any other subscript would silently change the factor, e.g.
+    # read the look-ahead close_{t+1} as close
+    subscript = _SUBSCRIPT.search(text)
+    if subscript:
+        raise DSLError(
+            f"Unsupported subscript '_{subscript.group(1)}' in formulation '{latex}'"
+        )
+    text = text.replace("{", "(").replace("}", ")")
+
+    if "\\" in text:
+        raise DSLError(f"Unsupported LaTeX in formulation '{latex}'")
+    return text
+
+
+def parse_formulation(
+    formulation: str, fields: Optional[Iterable[str]] = FIELDS
+) -> Node:
+    """
+    Parse a factor formulation given as DSL text or LaTeX
+
+    Raises:
+        DSLError: If the formulation cannot be expressed in the DSL
+    """
+    if "\\" not in formulation and "{" not in formulation:
+        try:
+            return parse_expression(formulation, fields)
+        except DSLError:
+            pass
+    return parse_expression(latex_to_dsl(formulation), fields)
@@ -10,6 +10,8 @@ from agent.agents.user_input_agent import user_input_agent
 from agent.agents.hypothesis_agent import hypothesis_agent
 from agent.agents.alpha_generator_agent import alpha_generator_agent
 from agent.agents.alpha_coder_agent import alpha_coder_agent
+from agent.agents.backtest_agent import backtest_agent
+from agent.agents.evolution_agent import evolution_agent
 from agent.database.checkpointer_api import get_checkpoint_manager
 
 
@@ -24,13 +26,17 @@ def create_graph():
     workflow.add_node("hypothesis_generator", hypothesis_agent)
     workflow.add_node("alpha_generator", alpha_generator_agent)
     workflow.add_node("alpha_coder", alpha_coder_agent)
+    workflow.add_node("backtest", backtest_agent)
+    workflow.add_node("evolution", evolution_agent)
 
     # Connect the agents
     workflow.add_edge("__start__", "user_input")
     workflow.add_edge("user_input", "hypothesis_generator")
     workflow.add_edge("hypothesis_generator", "alpha_generator")
     workflow.add_edge("alpha_generator", "alpha_coder")
-    workflow.add_edge("alpha_coder", "__end__")
+    workflow.add_edge("alpha_coder", "backtest")
+    workflow.add_edge("backtest", "evolution")
+    workflow.add_edge("evolution", "__end__")
 
     # Configure checkpointing
     use_postgres = os.environ.get("USE_POSTGRES_CHECKPOINT", "true").lower() == "true"
@@ -39,7 +45,7 @@ def create_graph():
         # Use PostgreSQL checkpointer
         checkpointer = get_checkpoint_manager()
         # Create the graph with checkpointing
-        graph = workflow.compile(checkpointer=checkpointer)
+        graph = workflow.compile(checkpointer=checkpointer.get_saver())
     else:
         # Fallback to memory checkpointer for development
         checkpointer = None
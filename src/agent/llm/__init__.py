@@ -0,0 +1,44 @@
+"""
+LLM package for AlphaGPT
+
+This package contains the shared chat model clients, the rate limiter that
+coordinates their requests, the persistent response cache and an offline
+stand-in chat model for benchmarks and tests.
+"""
+from agent.llm.cache import (
+    CacheStats,
+    CacheStore,
+    ResponseCache,
+    cache_key,
+    get_cache_stats,
+    get_cache_store,
+    get_llm_cache,
+)
+from agent.llm.client import (
+    create_async_http_client,
+    create_http_client,
+    get_chat_model,
+    get_embedding_model,
+    get_rate_limiter,
+)
+from agent.llm.fake import FakeChatModel
+from agent.llm.rate_limit import RateLimiter, count_tokens, estimate_request_tokens
+
+__all__ = [
+    "CacheStats",
+    "CacheStore",
+    "ResponseCache",
+    "cache_key",
+    "get_cache_stats",
+    "get_cache_store",
+    "get_llm_cache",
+    "create_async_http_client",
+    "create_http_client",
+    "get_chat_model",
+    "get_embedding_model",
+    "get_rate_limiter",
+    "FakeChatModel",
+    "RateLimiter",
+    "count_tokens",
+    "estimate_request_tokens",
+]
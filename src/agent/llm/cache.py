@@ -0,0 +1,393 @@
+"""
+Persistent, content-addressed cache for LLM responses
+
+The agents build their prompts from deterministic templates, so rerunning a
+thread, replaying a checkpoint or coding the same expression again sends the
+exact same request. ``ResponseCache`` is a LangChain ``BaseCache``: pass it as
+``cache=`` to a chat model, and identical requests are answered from the
+``llm_cache`` table instead of the API.
+
+Entries are keyed by a hash of the model parameters (model, temperature, ...)
+and the normalized prompt messages. They expire after a TTL, and the least
+recently used entries are evicted once the cache exceeds its entry or byte
+budget. The table lives either in a local SQLite file or in the application's
+PostgreSQL database.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Sequence
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+from sqlalchemy import create_engine, delete, event, func, or_, select, update
+from sqlalchemy.orm import sessionmaker
+
+from agent.database.models import LLMCacheEntry
+
+# Eviction is checked after this many inserts rather than on every write
+_EVICT_EVERY = 100
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Normalize a serialized prompt so formatting noise does not defeat the cache
+
+    Line endings and trailing whitespace are normalized inside every string,
+    and JSON payloads (LangChain serializes chat messages as JSON) are
+    re-encoded with sorted keys.
+    """
+
+    def clean(value: Any) -> Any:
+        if isinstance(value, str):
+            lines = value.replace("\r\n", "\n").split("\n")
+            return "\n".join(line.rstrip() for line in lines).strip()
+        if isinstance(value, list):
+            return [clean(v) for v in value]
+        if isinstance(value, dict):
+            return {k: clean(v) for k, v in value.items()}
+        return value
+
+    try:
+        payload = json.loads(prompt)
+    except (TypeError, ValueError):
+        return clean(prompt)
+    return json.dumps(clean(payload), sort_keys=True, separators=(",", ":"))
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """Content hash of a request: model parameters plus normalized messages"""
+    digest = hashlib.sha256()
+    digest.update(llm_string.encode())
+    digest.update(b"\0")
+    digest.update(normalize_prompt(prompt).encode())
+    return digest.hexdigest()
+
+
+@dataclass
+class CacheStats:
+    """Hit and miss counters of a response cache"""
+
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def lookups(self) -> int:
+        """Total number of lookups"""
+        return self.hits + self.misses
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups answered from the cache"""
+        return self.hits / self.lookups if self.lookups else 0.0
+
+
+class CacheStore:
+    """The ``llm_cache`` table with TTL and LRU size eviction
+
+    Args:
+        engine: SQLAlchemy engine (SQLite or PostgreSQL)
+        ttl: Seconds an entry stays valid, or None for no expiry
+        max_entries: Maximum number of entries, or None for no limit
+        max_bytes: Maximum total size of cached values, or None for no limit
+    """
+
+    def __init__(
+        self,
+        engine,
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> None:
+        self.engine = engine
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._session_factory = sessionmaker(bind=engine)
+        self._writes = 0
+        self._table_ready = False
+        self._lock = threading.Lock()
+
+    def _begin(self):
+        """Open a transaction, creating the table on first use"""
+        if not self._table_ready:
+            with self._lock:
+                if not self._table_ready:
+                    LLMCacheEntry.__table__.create(self.engine, checkfirst=True)
+                    self._table_ready = True
+        return self._session_factory.begin()
+
+    def _insert(self):
+        if self.engine.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        return insert(LLMCacheEntry)
+
+    def _expiry(self) -> Optional[datetime]:
+        return datetime.utcnow() - timedelta(seconds=self.ttl) if self.ttl else None
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value for ``key`` and mark it as recently used"""
+        expiry = self._expiry()
+        with self._begin() as session:
+            entry = session.execute(
+                select(LLMCacheEntry.value, LLMCacheEntry.created_at).where(
+                    LLMCacheEntry.key == key
+                )
+            ).first()
+            if entry is None or (expiry is not None and entry.created_at < expiry):
+                return None
+            session.execute(
+                update(LLMCacheEntry)
+                .where(LLMCacheEntry.key == key)
+                .values(accessed_at=datetime.utcnow(), hits=LLMCacheEntry.hits + 1)
+            )
+            return entry.value
+
+    def put(self, key: str, value: str) -> None:
+        """Insert or replace the value for ``key``"""
+        now = datetime.utcnow()
+        statement = self._insert().values(
+            key=key, value=value, size=len(value), hits=0, created_at=now, accessed_at=now
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[LLMCacheEntry.key],
+            set_={
+                "value": statement.excluded.value,
+                "size": statement.excluded.size,
+                "created_at": statement.excluded.created_at,
+                "accessed_at": statement.excluded.accessed_at,
+            },
+        )
+        with self._begin() as session:
+            session.execute(statement)
+
+        with self._lock:
+            self._writes += 1
+            due = self._writes % _EVICT_EVERY == 0
+        if due:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Delete expired entries, then least recently used entries over budget
+
+        Returns:
+            Number of deleted entries
+        """
+        deleted = 0
+        expiry = self._expiry()
+        with self._begin() as session:
+            if expiry is not None:
+                deleted += session.execute(
+                    delete(LLMCacheEntry).where(LLMCacheEntry.created_at < expiry)
+                ).rowcount
+
+            if self.max_entries is not None or self.max_bytes is not None:
+                newest_first = (LLMCacheEntry.accessed_at.desc(), LLMCacheEntry.key)
+                ranked = select(
+                    LLMCacheEntry.key,
+                    func.row_number().over(order_by=newest_first).label("position"),
+                    func.sum(LLMCacheEntry.size).over(order_by=newest_first).label("total"),
+                ).subquery()
+
+                conditions = []
+                if self.max_entries is not None:
+                    conditions.append(ranked.c.position > self.max_entries)
+                if self.max_bytes is not None:
+                    conditions.append(ranked.c.total > self.max_bytes)
+                over_budget = select(ranked.c.key).where(or_(*conditions))
+                deleted += session.execute(
+                    delete(LLMCacheEntry).where(LLMCacheEntry.key.in_(over_budget))
+                ).rowcount
+
+        return deleted
+
+    def clear(self) -> None:
+        """Delete every entry"""
+        with self._begin() as session:
+            session.execute(delete(LLMCacheEntry))
+
+    def size(self) -> Dict[str, int]:
+        """Number of entries and total bytes currently cached"""
+        with self._begin() as session:
+            entries, total = session.execute(
+                select(func.count(), func.coalesce(func.sum(LLMCacheEntry.size), 0))
+            ).one()
+        return {"entries": entries, "bytes": int(total)}
+
+
+def sqlite_engine(path: str):
+    """Create an engine for a local SQLite cache file, in WAL mode
+
+    Nothing is created on disk until the first connection.
+    """
+    engine = create_engine(f"sqlite:///{path}")
+
+    @event.listens_for(engine, "do_connect")
+    def _create_directory(*_):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    @event.listens_for(engine, "connect")
+    def _configure(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+    return engine
+
+
+class ResponseCache(BaseCache):
+    """LangChain cache backed by a ``CacheStore``, with hit-rate counters
+
+    Several ``ResponseCache`` instances (one per graph node) can share one
+    store. Each keeps its own statistics.
+    """
+
+    def __init__(self, store: CacheStore, name: str = "default") -> None:
+        self.store = store
+        self.name = name
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.stats.hits += 1
+            else:
+                self.stats.misses += 1
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        """Look up a cached response"""
+        try:
+            value = self.store.get(cache_key(prompt, llm_string))
+        except Exception as e:
+            print(f"Error reading LLM cache: {e}")
+            value = None
+
+        if value is not None:
+            try:
+                generations = loads(value)
+            except Exception as e:
+                print(f"Ignoring unreadable LLM cache entry: {e}")
+                generations = None
+            if generations is not None:
+                self._count(hit=True)
+                return generations
+        self._count(hit=False)
+        return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        """Store a response"""
+        try:
+            self.store.put(cache_key(prompt, llm_string), dumps(list(return_val)))
+        except Exception as e:
+            print(f"Error writing LLM cache: {e}")
+
+    def clear(self, **kwargs: Any) -> None:
+        """Delete every cached response in the underlying store"""
+        self.store.clear()
+
+
+_stores: Dict[tuple, CacheStore] = {}
+_caches: Dict[tuple, ResponseCache] = {}
+_registry_lock = threading.Lock()
+
+
+def get_cache_store(
+    backend: str,
+    path: Optional[str] = None,
+    ttl: Optional[float] = None,
+    max_entries: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+) -> CacheStore:
+    """
+    Get the process-wide cache store for a backend
+
+    Args:
+        backend: ``"sqlite"`` (local file at ``path``) or ``"postgres"``
+            (the application database)
+        path: SQLite file path
+        ttl: Seconds an entry stays valid
+        max_entries: Maximum number of entries
+        max_bytes: Maximum total size of cached values
+    """
+    key = (backend, path, ttl, max_entries, max_bytes)
+    with _registry_lock:
+        store = _stores.get(key)
+        if store is None:
+            if backend == "sqlite":
+                engine = sqlite_engine(path or ".cache/llm_cache.sqlite")
+            elif backend == "postgres":
+                from agent.database.operations.db_connection import get_db_engine
+
+                engine = get_db_engine()
+            else:
+                raise ValueError(f"Unknown LLM cache backend '{backend}'")
+            store = CacheStore(engine, ttl=ttl, max_entries=max_entries, max_bytes=max_bytes)
+            _stores[key] = store
+        return store
+
+
+def get_llm_cache(node: str, configuration: Any) -> Any:
+    """
+    Return the cache a graph node should pass to its chat model
+
+    Args:
+        node: Graph node name, matched against ``Configuration.llm_cache_nodes``
+        configuration: Agent ``Configuration``
+
+    Returns:
+        A ``ResponseCache`` for the node, or False to disable caching
+    """
+    backend = configuration.llm_cache_backend
+    if not backend or node not in configuration.llm_cache_nodes:
+        return False
+
+    max_bytes = (
+        int(configuration.llm_cache_max_mb * 1024 * 1024)
+        if configuration.llm_cache_max_mb
+        else None
+    )
+    settings = (
+        backend,
+        configuration.llm_cache_path,
+        configuration.llm_cache_ttl,
+        configuration.llm_cache_max_entries,
+        max_bytes,
+    )
+    store = get_cache_store(*settings)
+
+    with _registry_lock:
+        cache = _caches.get((node,) + settings)
+        if cache is None:
+            cache = ResponseCache(store, name=node)
+            _caches[(node,) + settings] = cache
+        return cache
+
+
+def get_cache_stats(nodes: Optional[Sequence[str]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Hit-rate statistics of the node caches created in this process
+
+    Returns:
+        Mapping of node name to hits, misses and hit rate
+    """
+    totals: Dict[str, CacheStats] = {}
+    with _registry_lock:
+        for cache in _caches.values():
+            if nodes is not None and cache.name not in nodes:
+                continue
+            stats = totals.setdefault(cache.name, CacheStats())
+            stats.hits += cache.stats.hits
+            stats.misses += cache.stats.misses
+    return {
+        name: {"hits": s.hits, "misses": s.misses, "hit_rate": s.hit_rate}
+        for name, s in totals.items()
+    }
@@ -0,0 +1,218 @@
+"""
+Process-wide registry of chat model clients
+
+Creating a ``ChatOpenAI`` per node invocation also creates a fresh HTTP
+client, so no keep-alive connection is ever reused. ``get_chat_model``
+instead returns one model per (model, temperature, node cache) that shares a
+pooled httpx client. Every request sent through that client first passes the
+model's ``RateLimiter``. The limiter learns from the rate-limit headers of
+every response. When one thread hits a 429, all threads back off together
+instead of retrying into the same wall.
+
+httpx async connections belong to the event loop that opened them, so the
+async client (and the models using it) are kept per event loop.
+"""
+
+import asyncio
+import threading
+import weakref
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+from agent.llm.cache import get_llm_cache
+from agent.llm.rate_limit import RateLimiter, request_tokens
+
+_lock = threading.Lock()
+_limiters: Dict[Tuple[str, Optional[int], Optional[int]], RateLimiter] = {}
+_sync_clients: Dict[Tuple[int, RateLimiter], httpx.Client] = {}
+_async_clients = weakref.WeakKeyDictionary()
+_models: Dict[Tuple[Any, ...], ChatOpenAI] = {}
+_embedding_models: Dict[Tuple[Any, ...], OpenAIEmbeddings] = {}
+_loop_models = weakref.WeakKeyDictionary()
+
+
+def get_rate_limiter(
+    model: str, rpm: Optional[int] = None, tpm: Optional[int] = None
+) -> RateLimiter:
+    """Return the process-wide rate limiter for a model and its limits"""
+    key = (model, rpm, tpm)
+    with _lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = RateLimiter(rpm=rpm, tpm=tpm)
+            _limiters[key] = limiter
+        return limiter
+
+
+def _connection_limits(max_connections: int) -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_connections,
+        keepalive_expiry=60.0,
+    )
+
+
+def create_async_http_client(
+    limiter: RateLimiter,
+    max_connections: int = 20,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+) -> httpx.AsyncClient:
+    """
+    Create a pooled async httpx client whose requests pass through ``limiter``
+
+    Args:
+        limiter: Rate limiter consulted before each request
+        max_connections: Size of the keep-alive connection pool
+        transport: Optional transport, e.g. ``httpx.MockTransport`` in tests
+    """
+
+    async def limit(request: httpx.Request) -> None:
+        await limiter.acquire(request_tokens(request.content))
+
+    async def observe(response: httpx.Response) -> None:
+        limiter.update_from_headers(response.status_code, response.headers)
+
+    return httpx.AsyncClient(
+        limits=_connection_limits(max_connections),
+        timeout=httpx.Timeout(600.0, connect=10.0),
+        event_hooks={"request": [limit], "response": [observe]},
+        transport=transport,
+    )
+
+
+def create_http_client(
+    limiter: RateLimiter,
+    max_connections: int = 20,
+    transport: Optional[httpx.BaseTransport] = None,
+) -> httpx.Client:
+    """Synchronous counterpart of ``create_async_http_client``"""
+
+    def limit(request: httpx.Request) -> None:
+        limiter.acquire_sync(request_tokens(request.content))
+
+    def observe(response: httpx.Response) -> None:
+        limiter.update_from_headers(response.status_code, response.headers)
+
+    return httpx.Client(
+        limits=_connection_limits(max_connections),
+        timeout=httpx.Timeout(600.0, connect=10.0),
+        event_hooks={"request": [limit], "response": [observe]},
+        transport=transport,
+    )
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def get_chat_model(
+    node: str,
+    configuration: Any,
+    model: str = "gpt-4o",
+    temperature: float = 0.0,
+    **kwargs: Any,
+) -> ChatOpenAI:
+    """
+    Return the shared chat model for a graph node
+
+    Models are cached per (model, temperature, cache, extra arguments) and
+    event loop, and all models of the same name share one rate limiter and
+    connection pool.
+
+    Args:
+        node: Graph node name, used to pick the node's response cache
+        configuration: Agent ``Configuration``
+        model: OpenAI model name
+        temperature: Sampling temperature
+        **kwargs: Extra ``ChatOpenAI`` arguments
+
+    Returns:
+        ChatOpenAI instance
+    """
+    cache = get_llm_cache(node, configuration)
+    limiter = get_rate_limiter(model, configuration.llm_rpm, configuration.llm_tpm)
+    max_connections = configuration.llm_max_connections
+    key = (
+        model,
+        temperature,
+        id(cache),
+        id(limiter),
+        max_connections,
+        configuration.llm_max_retries,
+        tuple(sorted(kwargs.items())),
+    )
+    loop = _running_loop()
+
+    with _lock:
+        models = _models if loop is None else _loop_models.setdefault(loop, {})
+        chat_model = models.get(key)
+        if chat_model is not None:
+            return chat_model
+
+        sync_client = _sync_clients.get((max_connections, limiter))
+        if sync_client is None:
+            sync_client = create_http_client(limiter, max_connections)
+            _sync_clients[(max_connections, limiter)] = sync_client
+
+        async_kwargs = {}
+        if loop is not None:
+            clients = _async_clients.setdefault(loop, {})
+            async_client = clients.get((max_connections, limiter))
+            if async_client is None:
+                async_client = create_async_http_client(limiter, max_connections)
+                clients[(max_connections, limiter)] = async_client
+            async_kwargs["http_async_client"] = async_client
+
+        chat_model = ChatOpenAI(
+            model=model,
+            temperature=temperature,
+            cache=cache,
+            max_retries=configuration.llm_max_retries,
+            http_client=sync_client,
+            **async_kwargs,
+            **kwargs,
+        )
+        models[key] = chat_model
+        return chat_model
+
+
+def get_embedding_model(configuration: Any) -> OpenAIEmbeddings:
+    """
+    Return the shared embedding model (``Configuration.embedding_model``)
+
+    Embedding requests go through the same pooled, rate-limited synchronous
+    client as chat requests; async callers should run them in a thread.
+
+    Args:
+        configuration: Agent ``Configuration``
+
+    Returns:
+        OpenAIEmbeddings instance
+    """
+    model = configuration.embedding_model
+    limiter = get_rate_limiter(model, configuration.llm_rpm, configuration.llm_tpm)
+    max_connections = configuration.llm_max_connections
+    key = (model, id(limiter), max_connections, configuration.llm_max_retries)
+
+    with _lock:
+        embedding_model = _embedding_models.get(key)
+        if embedding_model is not None:
+            return embedding_model
+
+        sync_client = _sync_clients.get((max_connections, limiter))
+        if sync_client is None:
+            sync_client = create_http_client(limiter, max_connections)
+            _sync_clients[(max_connections, limiter)] = sync_client
+
+        embedding_model = OpenAIEmbeddings(
+            model=model,
+            max_retries=configuration.llm_max_retries,
+            http_client=sync_client,
+        )
+        _embedding_models[key] = embedding_model
+        return embedding_model
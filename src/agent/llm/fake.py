@@ -0,0 +1,239 @@
+"""
+Deterministic chat model standing in for OpenAI
+
+``FakeChatModel`` answers the prompts of the graph nodes offline:
+
+* the hypothesis generator gets a hypothesis in ``HYPOTHESIS_OUTPUT_FORMAT``
+* the alpha generator gets a factor object in ``ALPHA_OUTPUT_FORMAT``; most
+  factors have a DSL ``expression``, the others only a LaTeX formulation and
+  need the coder
+* the alpha coder gets a pandas ``calculate_<alpha>`` function
+
+The answer depends only on the prompt and ``seed``, so runs are repeatable.
+Every request waits ``latency`` seconds before the first token, and streams
+its answer at ``tokens_per_second``, which mimics a remote model without a
+network. It is meant for benchmarks (``benchmarks/graph_workflow.py``) and
+tests, in place of ``get_chat_model``.
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+from agent.prompts.alpha_coder_prompts import ALPHA_CODER_SYSTEM_PROMPT
+from agent.prompts.alpha_prompts import ALPHA_SYSTEM_PROMPT
+from agent.prompts.hypothesis_prompts import HYPOTHESIS_SYSTEM_PROMPT
+
+# DSL templates of generated factors; {x}/{y} are fields, {w}/{v} windows
+EXPRESSIONS = (
+    "ts_delta({x}, {w})",
+    "-ts_delta({x}, {w}) / ts_std({x}, {v})",
+    "rank(ts_mean({x}, {w}) / {x})",
+    "ts_corr({x}, {y}, {v})",
+    "rank(ts_std({x}, {v}))",
+    "({x} - ts_min({x}, {w})) / (ts_max({x}, {w}) - ts_min({x}, {w}))",
+    "ts_rank({y}, {w}) * sign(ts_delta({x}, 1))",
+    "log({y}) / ts_mean(log({y}), {v})",
+)
+
+FIELDS = ("open", "high", "low", "close", "volume")
+
+# Body of generated code; {w}/{v} are windows
+CODE = '''import numpy as np
+import pandas as pd
+
+
+def calculate_{alpha_id}(df):
+    """Volume-weighted {w}-day return, smoothed over {v} days"""
+    close = df["close"].unstack()
+    volume = df["volume"].unstack()
+    weight = np.log(volume.where(volume > 0))
+    value = (close.pct_change({w}) * weight).rolling({v}).mean()
+    return value.stack(future_stack=True).reindex(df.index).to_frame("{alpha_id}")
+'''
+
+
+def _prompt_kind(messages: List[BaseMessage]) -> str:
+    """Which node sent the prompt, from its system message"""
+    system = next((m.content for m in messages if m.type == "system"), "")
+    if system == HYPOTHESIS_SYSTEM_PROMPT:
+        return "hypothesis"
+    if system == ALPHA_SYSTEM_PROMPT:
+        return "factors"
+    if system == ALPHA_CODER_SYSTEM_PROMPT:
+        return "code"
+    raise ValueError("FakeChatModel does not know this prompt")
+
+
+def _user_prompt(messages: List[BaseMessage]) -> str:
+    return "\n".join(m.content for m in messages if m.type == "human")
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Offline chat model answering the graph's prompts (see module docstring)
+
+    ``calls`` counts the requests per prompt kind (``"hypothesis"``,
+    ``"factors"`` and ``"code"``).
+    """
+
+    latency: float = 0.5
+    """Seconds before the first token of every response."""
+
+    tokens_per_second: Optional[float] = 50.0
+    """Streaming speed of the response (None sends it at once)."""
+
+    code_fraction: float = 0.2
+    """Share of generated factors without a DSL expression, which need coding."""
+
+    seed: int = 0
+    """Seed mixed into every response."""
+
+    chunk_chars: int = 16
+    """Characters per streamed chunk (about four tokens)."""
+
+    _calls: Counter = PrivateAttr(default_factory=Counter)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-alphagpt"
+
+    @property
+    def calls(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._calls)
+
+    def _rng(self, prompt: str) -> random.Random:
+        digest = hashlib.sha256(f"{self.seed}\0{prompt}".encode()).digest()
+        return random.Random(int.from_bytes(digest[:8], "big"))
+
+    def _hypothesis(self, rng: random.Random) -> Dict[str, Any]:
+        horizon = rng.choice(["one-week", "one-month", "quarterly"])
+        signal = rng.choice(["volume spikes", "price reversals", "volatility compression"])
+        return {
+            "hypothesis": f"Stocks with {signal} over a {horizon} horizon are mispriced "
+            "and revert as liquidity providers step in.",
+            "reason": f"Liquidity demand around {signal} pushes prices away from "
+            "fundamental value; the pressure fades as inventory is absorbed.",
+            "concise_reason": f"{signal.capitalize()} reflect temporary liquidity demand.\n"
+            "Temporary price pressure reverts.",
+            "concise_observation": f"Returns after {signal} tend to reverse.",
+            "concise_justification": "Inventory risk models of market making.",
+            "concise_knowledge": f"If {signal} occur without news, then subsequent "
+            "returns tend to reverse.",
+        }
+
+    def _factors(self, rng: random.Random, prompt: str) -> Dict[str, Any]:
+        match = re.search(r"Develop (\d+)", prompt)
+        count = int(match.group(1)) if match else 3
+        factors = {}
+        for i in range(count):
+            name = f"factor_{rng.randrange(16**6):06x}_{i}"
+            x, y = rng.sample(FIELDS, 2)
+            w, v = rng.choice((2, 3, 5, 10)), rng.choice((10, 20, 40))
+            expression = rng.choice(EXPRESSIONS).format(x=x, y=y, w=w, v=v)
+            coded = rng.random() < self.code_fraction
+            factors[name] = {
+                "description": f"Factor {i + 1} of the hypothesis on {x} and {y}",
+                "formulation": (
+                    f"\\text{{mean}}_{{{v}}}\\left(r^{{({w})}}_t \\cdot \\log V_t\\right)"
+                    if coded
+                    else expression
+                ),
+                "expression": "" if coded else expression,
+                "variables": {x: f"{x} of the stock", y: f"{y} of the stock"},
+            }
+        return factors
+
+    def _code(self, rng: random.Random, prompt: str) -> str:
+        match = re.search(r"Alpha ID: (\w+)", prompt)
+        alpha_id = match.group(1) if match else "alpha"
+        body = CODE.format(
+            alpha_id=alpha_id, w=rng.choice((1, 2, 5)), v=rng.choice((5, 10, 20))
+        )
+        return f"```python\n{body}```"
+
+    def respond(self, messages: List[BaseMessage]) -> str:
+        """Text of the response to a prompt, without waiting"""
+        kind = _prompt_kind(messages)
+        prompt = _user_prompt(messages)
+        rng = self._rng(prompt)
+        with self._lock:
+            self._calls[kind] += 1
+        if kind == "hypothesis":
+            return json.dumps(self._hypothesis(rng), indent=2)
+        if kind == "factors":
+            return "```json\n" + json.dumps(self._factors(rng, prompt), indent=2) + "\n```"
+        return self._code(rng, prompt)
+
+    def _chunks(self, text: str) -> List[str]:
+        return [text[i : i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)]
+
+    def _chunk_delay(self) -> float:
+        if not self.tokens_per_second:
+            return 0.0
+        return self.chunk_chars / 4 / self.tokens_per_second
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        text = self.respond(messages)
+        time.sleep(self.latency + self._chunk_delay() * len(self._chunks(text)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        text = self.respond(messages)
+        await asyncio.sleep(self.latency + self._chunk_delay() * len(self._chunks(text)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        text = self.respond(messages)
+        time.sleep(self.latency)
+        for chunk in self._chunks(text):
+            time.sleep(self._chunk_delay())
+            yield ChatGenerationChunk(message=AIMessageChunk(content=chunk))
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        text = self.respond(messages)
+        await asyncio.sleep(self.latency)
+        for chunk in self._chunks(text):
+            await asyncio.sleep(self._chunk_delay())
+            yield ChatGenerationChunk(message=AIMessageChunk(content=chunk))
@@ -0,0 +1,238 @@
+"""
+Token-bucket rate limiting for LLM requests
+
+All LLM traffic for a model goes through one ``RateLimiter``. The limiter
+enforces a requests-per-minute and a tokens-per-minute budget. Each bucket
+is a GCRA (virtual scheduling) timeline, so a request reserves its slot on
+arrival and waits outside the lock. Requests are therefore admitted in
+arrival order across threads and event loops.
+
+The limiter also adapts to the server: ``update_from_headers`` reads OpenAI's
+``x-ratelimit-*`` headers, and a 429 with ``retry-after`` pauses every caller,
+not only the one that got rejected.
+"""
+
+import asyncio
+import functools
+import json
+import re
+import threading
+import time
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+# Tokens assumed for the completion when a request does not set max_tokens
+DEFAULT_COMPLETION_TOKENS = 512
+
+_DURATION = re.compile(r"(?P<value>\d+(?:\.\d+)?)(?P<unit>ms|s|m|h)")
+_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_reset(value: Optional[str]) -> Optional[float]:
+    """Parse an OpenAI reset duration such as ``"1m30s"`` or ``"250ms"`` to seconds"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _UNITS[unit] for number, unit in parts)
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding(model: str):
+    """tiktoken encoding for ``model``, or None if it cannot be loaded (e.g. offline)"""
+    try:
+        import tiktoken
+
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        print(f"tiktoken unavailable for {model}, estimating tokens from length: {e}")
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    """Count the tokens of ``text`` with tiktoken, falling back to ~4 characters per token"""
+    encoding = _encoding(model)
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def estimate_request_tokens(payload: Mapping[str, Any]) -> int:
+    """
+    Estimate the tokens a chat completion request counts against the TPM limit
+
+    That is the prompt tokens plus the completion budget (``max_tokens``),
+    or just the input tokens of an embeddings request.
+    """
+    model = payload.get("model") or "gpt-4o"
+    if "input" in payload and "messages" not in payload:
+        inputs = payload["input"]
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        # Inputs are either strings or pre-tokenized lists of token ids
+        return sum(
+            count_tokens(item, model) if isinstance(item, str) else len(item)
+            for item in inputs or []
+        )
+
+    prompt_tokens = 0
+    for message in payload.get("messages") or []:
+        content = message.get("content")
+        if isinstance(content, list):
+            content = " ".join(
+                part.get("text", "") for part in content if isinstance(part, dict)
+            )
+        # Per-message overhead of the chat format
+        prompt_tokens += 4 + count_tokens(str(content or ""), model)
+
+    completion = (
+        payload.get("max_completion_tokens")
+        or payload.get("max_tokens")
+        or DEFAULT_COMPLETION_TOKENS
+    )
+    return prompt_tokens + int(completion) * max(1, int(payload.get("n") or 1))
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limiter
+
+    Args:
+        rpm: Requests per minute, or None for no request limit
+        tpm: Tokens per minute, or None for no token limit
+        burst: Fraction of a minute's budget that may be spent at once
+    """
+
+    def __init__(
+        self, rpm: Optional[int] = None, tpm: Optional[int] = None, burst: float = 0.1
+    ) -> None:
+        self.rpm = rpm
+        self.tpm = tpm
+        self.burst = burst
+        self._lock = threading.Lock()
+        # Theoretical arrival times of the request and token timelines
+        self._request_tat = 0.0
+        self._token_tat = 0.0
+        self._paused_until = 0.0
+        self.waited = 0.0
+        self.throttled = 0
+
+    def _intervals(self) -> Tuple[float, float]:
+        request_interval = 60.0 / self.rpm if self.rpm else 0.0
+        token_interval = 60.0 / self.tpm if self.tpm else 0.0
+        return request_interval, token_interval
+
+    def reserve(self, tokens: int = 0) -> float:
+        """
+        Reserve capacity for one request of ``tokens`` tokens
+
+        Returns:
+            Seconds the caller must wait before sending the request
+        """
+        request_interval, token_interval = self._intervals()
+        with self._lock:
+            now = time.monotonic()
+            # Bucket capacities; a request larger than the burst would
+            # otherwise never fit
+            request_capacity = max(1.0, self.burst * (self.rpm or 0))
+            token_capacity = max(float(tokens), self.burst * (self.tpm or 0))
+
+            start = max(
+                now,
+                self._paused_until,
+                self._request_tat + (1.0 - request_capacity) * request_interval,
+                self._token_tat + (tokens - token_capacity) * token_interval,
+            )
+            self._request_tat = max(self._request_tat, start) + request_interval
+            self._token_tat = max(self._token_tat, start) + tokens * token_interval
+
+            delay = start - now
+            if delay > 0:
+                self.throttled += 1
+                self.waited += delay
+            return delay
+
+    async def acquire(self, tokens: int = 0) -> None:
+        """Wait until a request of ``tokens`` tokens may be sent"""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def acquire_sync(self, tokens: int = 0) -> None:
+        """Blocking variant of ``acquire`` for synchronous clients"""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every caller for ``seconds``, e.g. after a 429"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def update_from_headers(self, status_code: int, headers: Mapping[str, str]) -> None:
+        """
+        Adapt to the server's view of the remaining budget
+
+        A 429 pauses all callers for ``retry-after`` (or the reset time). An
+        exhausted ``x-ratelimit-remaining-*`` budget pauses until its reset.
+        A low remaining budget pushes the local timeline forward to match.
+        """
+        headers = {k.lower(): v for k, v in headers.items()}
+        request_interval, token_interval = self._intervals()
+
+        if status_code == 429:
+            retry_after = parse_reset(headers.get("retry-after")) or max(
+                parse_reset(headers.get("x-ratelimit-reset-requests")) or 0.0,
+                parse_reset(headers.get("x-ratelimit-reset-tokens")) or 0.0,
+                1.0,
+            )
+            self.pause(retry_after)
+            return
+
+        for kind, limit, interval in (
+            ("requests", self.rpm, request_interval),
+            ("tokens", self.tpm, token_interval),
+        ):
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            if remaining is None:
+                continue
+            try:
+                remaining = int(float(remaining))
+            except ValueError:
+                continue
+
+            if remaining <= 0:
+                self.pause(parse_reset(headers.get(f"x-ratelimit-reset-{kind}")) or 1.0)
+                continue
+            if not limit:
+                continue
+
+            with self._lock:
+                # Budget already used per the server, in our timeline's units
+                used = max(0, limit - remaining) * interval
+                floor = time.monotonic() + used - 60.0
+                if kind == "requests":
+                    self._request_tat = max(self._request_tat, floor)
+                else:
+                    self._token_tat = max(self._token_tat, floor)
+
+    def stats(self) -> Dict[str, Any]:
+        """Number of throttled requests and total time spent waiting"""
+        return {"throttled": self.throttled, "waited": self.waited}
+
+
+def request_tokens(content: bytes) -> int:
+    """Estimate the tokens of a serialized OpenAI request body (0 if it is not JSON)"""
+    try:
+        payload = json.loads(content or b"{}")
+    except ValueError:
+        return 0
+    if not isinstance(payload, dict):
+        return 0
+    return estimate_request_tokens(payload)
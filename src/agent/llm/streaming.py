@@ -0,0 +1,120 @@
+"""
+Streaming helpers for LLM responses
+
+``JSONObjectStream`` parses a JSON object while it is still being generated
+and hands out each top-level member as soon as its value is closed. The alpha
+generator uses it to start coding a factor while the model is still writing
+the next ones.
+"""
+
+import json
+from typing import Any, AsyncIterator, List, Optional, Tuple
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration
+
+
+class JSONObjectStream:
+    """Incremental parser for the members of a streamed top-level JSON object
+
+    Text before the first ``{`` (e.g. a Markdown code fence) is ignored, and
+    so is everything after the matching ``}``. The full text received so far
+    is kept in ``text`` for a fallback parse of malformed output.
+    """
+
+    def __init__(self) -> None:
+        self.text = ""
+        self.done = False
+        self._depth = 0
+        self._started = False
+        self._in_string = False
+        self._escape = False
+        self._member_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        Add streamed text
+
+        Returns:
+            The ``(key, value)`` members completed by this chunk, in order
+        """
+        members: List[Tuple[str, Any]] = []
+        position = len(self.text)
+        self.text += chunk
+
+        for index in range(position, len(self.text)):
+            if self.done:
+                break
+            char = self.text[index]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if not self._started:
+                if char == "{":
+                    self._started = True
+                    self._depth = 1
+                    self._member_start = index + 1
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    members.extend(self._close_member(index))
+                    self.done = True
+            elif char == "," and self._depth == 1:
+                members.extend(self._close_member(index))
+                self._member_start = index + 1
+
+        return members
+
+    def _close_member(self, end: int) -> List[Tuple[str, Any]]:
+        text = self.text[self._member_start : end].strip()
+        if not text:
+            return []
+        try:
+            return list(json.loads("{" + text + "}").items())
+        except ValueError:
+            # Left for the caller's fallback parse of the full text
+            return []
+
+
+async def astream_text(llm: Any, messages: List[Any]) -> AsyncIterator[str]:
+    """
+    Stream the text of a chat completion, honoring the model's response cache
+
+    ``astream`` bypasses LangChain's cache, so a cached response is looked up
+    (and a fresh one stored) here with the same key ``ainvoke`` would use.
+    """
+    cache = getattr(llm, "cache", None)
+    prompt = llm_string = None
+    if isinstance(cache, BaseCache):
+        prompt = dumps(llm._convert_input(messages).to_messages())
+        llm_string = llm._get_llm_string()
+        cached = await cache.alookup(prompt, llm_string)
+        if cached:
+            yield cached[0].text
+            return
+
+    parts = []
+    async for chunk in llm.astream(messages):
+        content = chunk.content if isinstance(chunk.content, str) else ""
+        if content:
+            parts.append(content)
+            yield content
+
+    if isinstance(cache, BaseCache):
+        generation = ChatGeneration(message=AIMessage(content="".join(parts)))
+        await cache.aupdate(prompt, llm_string, [generation])
@@ -0,0 +1,28 @@
+"""
+Market data package for AlphaGPT
+
+This package contains the dense market data panel consumed by the factor
+engine and backtester, and the memory-mapped store it is loaded from.
+"""
+from agent.market_data.panel import MarketPanel, load_npz_panel
+from agent.market_data.store import (
+    MarketDataStore,
+    convert_hdf,
+    data_version,
+    is_store,
+    load_panel,
+    open_store,
+    write_store,
+)
+
+__all__ = [
+    "MarketPanel",
+    "load_npz_panel",
+    "MarketDataStore",
+    "convert_hdf",
+    "data_version",
+    "is_store",
+    "load_panel",
+    "open_store",
+    "write_store",
+]
@@ -0,0 +1,51 @@
+"""
+Market data panel used by factor evaluation and backtesting
+"""
+
+import functools
+from dataclasses import dataclass
+from typing import Mapping
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class MarketPanel:
+    """Dense (date, instrument) market data
+
+    Every array in ``fields`` has shape ``(len(dates), len(instruments))``.
+    """
+
+    dates: np.ndarray
+    instruments: np.ndarray
+    fields: Mapping[str, np.ndarray]
+
+    @property
+    def shape(self):
+        """Shape of each field array"""
+        return (len(self.dates), len(self.instruments))
+
+
+@functools.lru_cache(maxsize=4)
+def load_npz_panel(path: str) -> MarketPanel:
+    """
+    Load a panel saved with ``numpy.savez``
+
+    The archive must contain ``dates`` and ``instruments`` arrays plus one
+    ``(date, instrument)`` array per field. Loaded panels are cached per path.
+
+    Args:
+        path: Path to the ``.npz`` file
+
+    Returns:
+        MarketPanel instance
+    """
+    with np.load(path, allow_pickle=False) as archive:
+        dates = archive["dates"]
+        instruments = archive["instruments"]
+        fields = {
+            name: archive[name].astype(np.float64, copy=False)
+            for name in archive.files
+            if name not in ("dates", "instruments")
+        }
+    return MarketPanel(dates=dates, instruments=instruments, fields=fields)
@@ -0,0 +1,289 @@
+"""
+Memory-mapped columnar market data store
+
+A store is a directory holding one contiguous ``(date, instrument)`` array per
+field, saved as ``.npy`` files next to the date and instrument index files::
+
+    store/
+        meta.json
+        dates.npy
+        instruments.npy
+        fields/close.npy
+        fields/volume.npy
+        ...
+
+Fields are opened read-only with ``numpy.load(mmap_mode="r")``. Opening a
+store copies nothing, and every process that opens the same store shares the
+operating system's page cache instead of holding a private copy of the panel.
+A store pickles as its path, so handing it to a worker process re-maps the
+files rather than serializing the arrays.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterator, Mapping, Optional, Sequence, Union
+
+import numpy as np
+
+from agent.market_data.panel import MarketPanel, load_npz_panel
+
+STORE_FORMAT = 1
+"""Version of the on-disk layout written by ``write_store``"""
+
+_META_FILE = "meta.json"
+_FIELDS_DIR = "fields"
+
+PathLike = Union[str, os.PathLike]
+
+
+class _FieldMapping(Mapping[str, np.ndarray]):
+    """Read-only mapping of field name to a lazily opened memory map"""
+
+    def __init__(self, directory: Path, names: Sequence[str]) -> None:
+        self._directory = directory
+        self._names = list(names)
+        self._arrays: Dict[str, np.ndarray] = {}
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        if name not in self._arrays:
+            if name not in self._names:
+                raise KeyError(name)
+            self._arrays[name] = np.load(
+                self._directory / f"{name}.npy", mmap_mode="r", allow_pickle=False
+            )
+        return self._arrays[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
+class MarketDataStore:
+    """A read-only, memory-mapped market data store
+
+    Use ``open_store`` to open an existing store and ``write_store`` to create one.
+    """
+
+    def __init__(self, path: PathLike) -> None:
+        self.path = Path(path)
+        meta_path = self.path / _META_FILE
+        if not meta_path.is_file():
+            raise FileNotFoundError(f"No market data store at {self.path}")
+
+        self.meta: Dict[str, Any] = json.loads(meta_path.read_text())
+        if self.meta.get("format") != STORE_FORMAT:
+            raise ValueError(
+                f"Unsupported market data store format {self.meta.get('format')!r}"
+            )
+
+        self.dates = np.load(self.path / "dates.npy", mmap_mode="r", allow_pickle=False)
+        self.instruments = np.load(
+            self.path / "instruments.npy", mmap_mode="r", allow_pickle=False
+        )
+        self.fields = _FieldMapping(self.path / _FIELDS_DIR, self.meta["fields"])
+
+    def __reduce__(self):
+        # Workers re-map the files instead of receiving a copy of the arrays
+        return (MarketDataStore, (str(self.path),))
+
+    def __repr__(self) -> str:
+        return f"MarketDataStore({str(self.path)!r}, version={self.version!r})"
+
+    @property
+    def version(self) -> str:
+        """Content hash of the store, changes whenever the data is rewritten"""
+        return self.meta["version"]
+
+    @property
+    def shape(self):
+        """Shape of each field array"""
+        return tuple(self.meta["shape"])
+
+    def panel(self) -> MarketPanel:
+        """Return the store as a ``MarketPanel`` backed by the memory maps"""
+        return MarketPanel(dates=self.dates, instruments=self.instruments, fields=self.fields)
+
+
+def open_store(path: PathLike) -> MarketDataStore:
+    """
+    Open a market data store read-only
+
+    Args:
+        path: Store directory
+
+    Returns:
+        MarketDataStore instance
+
+    Raises:
+        FileNotFoundError: If ``path`` is not a market data store
+    """
+    return MarketDataStore(path)
+
+
+def is_store(path: PathLike) -> bool:
+    """Return True if ``path`` is a market data store directory"""
+    return (Path(path) / _META_FILE).is_file()
+
+
+def _index_array(values: Any) -> np.ndarray:
+    """Convert a date or instrument index to an array that loads without pickle"""
+    array = np.asarray(values)
+    if array.dtype == object:
+        array = array.astype(str)
+    return array
+
+
+def write_store(
+    path: PathLike,
+    dates: Any,
+    instruments: Any,
+    fields: Mapping[str, np.ndarray],
+    dtype: Any = np.float64,
+) -> MarketDataStore:
+    """
+    Write a market data store
+
+    The store is written to a temporary directory next to ``path`` and moved
+    into place at the end, so readers never see a partially written store.
+    An existing store at ``path`` is replaced.
+
+    Args:
+        path: Store directory
+        dates: Date index, one entry per row
+        instruments: Instrument index, one entry per column
+        fields: Mapping of field name to ``(date, instrument)`` array
+        dtype: Floating point type the fields are stored as (float32 or float64)
+
+    Returns:
+        The newly written store, opened read-only
+    """
+    path = Path(path)
+    dtype = np.dtype(dtype)
+    if dtype not in (np.dtype(np.float32), np.dtype(np.float64)):
+        raise ValueError(f"Unsupported field dtype {dtype}")
+
+    dates = _index_array(dates)
+    instruments = _index_array(instruments)
+    shape = (len(dates), len(instruments))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=f".{path.name}-", dir=path.parent))
+    try:
+        (staging / _FIELDS_DIR).mkdir()
+        digest = hashlib.sha256()
+
+        for name, index in (("dates", dates), ("instruments", instruments)):
+            np.save(staging / f"{name}.npy", index, allow_pickle=False)
+            digest.update(index.tobytes())
+
+        for name, values in fields.items():
+            array = np.ascontiguousarray(values, dtype=dtype)
+            if array.shape != shape:
+                raise ValueError(
+                    f"Field '{name}' has shape {array.shape}, expected {shape}"
+                )
+            np.save(staging / _FIELDS_DIR / f"{name}.npy", array, allow_pickle=False)
+            digest.update(name.encode())
+            digest.update(array.tobytes())
+
+        meta = {
+            "format": STORE_FORMAT,
+            "version": digest.hexdigest()[:16],
+            "shape": list(shape),
+            "dtype": dtype.name,
+            "fields": list(fields),
+        }
+        (staging / _META_FILE).write_text(json.dumps(meta, indent=2))
+
+        if path.exists():
+            backup = Path(tempfile.mkdtemp(prefix=f".{path.name}-old-", dir=path.parent))
+            os.replace(path, backup / path.name)
+            os.replace(staging, path)
+            shutil.rmtree(backup, ignore_errors=True)
+        else:
+            os.replace(staging, path)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    return open_store(path)
+
+
+def convert_hdf(
+    hdf_path: PathLike,
+    store_path: PathLike,
+    key: str = "data",
+    dtype: Any = np.float64,
+) -> MarketDataStore:
+    """
+    Convert a (datetime, instrument) MultiIndex HDF5 panel to a store
+
+    This is the ``daily_pv.h5`` layout read by the generated alpha scripts.
+    Requires pandas with PyTables.
+
+    Args:
+        hdf_path: Path to the HDF5 file
+        store_path: Store directory to write
+        key: HDF5 key of the frame
+        dtype: Floating point type the fields are stored as
+
+    Returns:
+        The newly written store
+    """
+    import pandas as pd
+
+    from agent.factors.evaluator import panel_from_frame
+
+    frame = pd.read_hdf(hdf_path, key=key)
+    dates, instruments, data = panel_from_frame(frame.select_dtypes("number"))
+    return write_store(
+        store_path,
+        dates.astype(str),
+        instruments.astype(str),
+        data,
+        dtype=dtype,
+    )
+
+
+def load_panel(path: Optional[PathLike]) -> MarketPanel:
+    """
+    Load market data from a store directory or an ``.npz`` archive
+
+    Args:
+        path: Store directory or ``.npz`` file
+
+    Returns:
+        MarketPanel instance
+    """
+    if path is None:
+        raise ValueError("No market data path given")
+    if is_store(path):
+        return open_store(path).panel()
+    return load_npz_panel(str(path))
+
+
+def data_version(path: PathLike) -> str:
+    """
+    Identify the contents of a store directory or ``.npz`` archive
+
+    Stores carry the content hash written by ``write_store``. Other files
+    are identified by their size and modification time.
+
+    Args:
+        path: Store directory or ``.npz`` file
+
+    Returns:
+        Version string; changes whenever the data changes
+    """
+    if is_store(path):
+        return open_store(path).version
+    stat = os.stat(path)
+    return hashlib.sha256(
+        f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode()
+    ).hexdigest()[:16]
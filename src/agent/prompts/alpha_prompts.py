@@ -54,6 +54,7 @@ You may use time-series operations with clear time indices:
 - ts_rank(X, d): Rank of current X among the past d days
 - ts_delta(X, d): X minus the value d days ago
 - ts_corr(X, Y, d): Correlation between X and Y over the past d days
+- max(X, Y), min(X, Y): Element-wise larger / smaller of X and Y (not rolling; use ts_max/ts_min for that)
 
 {output_format}
 """
@@ -91,6 +92,7 @@ Your response must follow this exact JSON format:
     "factor_name_1": {
         "description": "detailed description of what this factor captures and why it should work",
         "formulation": "LaTeX mathematical formulation (e.g., \\frac{\\log(\\text{volume})}{\\text{close} - \\text{open}})",
+        "expression": "the same factor in plain operator syntax (e.g., log(volume) / (close - open))",
         "variables": {
             "volume": "trading volume of the stock",
             "close": "closing price of the stock",
@@ -100,6 +102,7 @@ Your response must follow this exact JSON format:
     "factor_name_2": {
         "description": "detailed description of what this factor captures and why it should work",
         "formulation": "LaTeX mathematical formulation",
+        "expression": "plain operator syntax, or an empty string if it cannot be expressed",
         "variables": {
             "variable_1": "description of variable_1",
             "variable_2": "description of variable_2"
@@ -112,4 +115,5 @@ Remember:
 2. Include all variables used in your formulation in the variables section
 3. LaTeX formulation should be readable and follow standard mathematical notation
 4. Ensure all factors are computable from historical market data
+5. The expression may only use open, high, low, close, volume, numeric constants, + - * / ^, log, sqrt, abs, sign, rank, max, min and the ts_* operators listed above, with integer windows
 """
@@ -0,0 +1,31 @@
+"""
+Retrieval package for AlphaGPT
+
+This package contains the persistent FAISS index of embeddings of past
+hypotheses and alphas, and the similarity search agents use to find related
+prior attempts.
+"""
+from agent.retrieval.index import KINDS, VectorIndex, decode_id, encode_id
+from agent.retrieval.prior_attempts import (
+    PriorAttemptIndex,
+    asearch_prior_attempts,
+    close_retrieval_indexes,
+    format_prior_attempts,
+    get_retrieval_index,
+    retrieval_enabled,
+    schedule_retrieval_sync,
+)
+
+__all__ = [
+    "KINDS",
+    "VectorIndex",
+    "decode_id",
+    "encode_id",
+    "PriorAttemptIndex",
+    "asearch_prior_attempts",
+    "close_retrieval_indexes",
+    "format_prior_attempts",
+    "get_retrieval_index",
+    "retrieval_enabled",
+    "schedule_retrieval_sync",
+]
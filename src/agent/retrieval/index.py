@@ -0,0 +1,263 @@
+"""
+Persistent FAISS index of embedding vectors
+
+The index directory holds two segments::
+
+    index/
+        meta.json
+        base.faiss     HNSW graph over most vectors, memory-mapped on load
+        delta.faiss    exact (flat) index of vectors added since the last compaction
+
+``base.faiss`` is opened with ``IO_FLAG_MMAP_IFC``, so its vectors stay in
+the page cache rather than in the process heap, and opening a large index is
+nearly instant. A memory-mapped index cannot grow. New vectors therefore go
+to the small in-memory delta segment, and searches merge the results of both
+segments. ``compact`` folds the delta into a new base once it reaches
+``compact_every`` vectors.
+
+Vectors are L2-normalized and compared by inner product (cosine similarity).
+An index has a single writer; other processes may open it read-only.
+
+A vector can be replaced (``add(..., replace=True)``). An old vector in the
+delta is removed; one in the HNSW base, which cannot remove vectors, is
+marked stale and skipped by searches until the next compaction drops it.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import faiss
+import numpy as np
+
+INDEX_FORMAT = 1
+"""Version of the on-disk layout"""
+
+KINDS: Dict[str, int] = {"hypothesis": 1, "alpha": 2}
+"""Kinds of indexed rows, stored in the high bits of the vector ids"""
+
+_KIND_SHIFT = 48
+_META_FILE = "meta.json"
+_BASE_FILE = "base.faiss"
+_DELTA_FILE = "delta.faiss"
+
+PathLike = Union[str, os.PathLike]
+
+
+def encode_id(kind: str, row_id: int) -> int:
+    """Vector id of a database row"""
+    return (KINDS[kind] << _KIND_SHIFT) | int(row_id)
+
+
+def decode_id(vector_id: int) -> Tuple[str, int]:
+    """``(kind, row_id)`` of a vector id"""
+    code = int(vector_id) >> _KIND_SHIFT
+    kind = next(name for name, value in KINDS.items() if value == code)
+    return kind, int(vector_id) & ((1 << _KIND_SHIFT) - 1)
+
+
+def _write_atomic(index: faiss.Index, path: Path) -> None:
+    staging = path.with_suffix(".tmp")
+    faiss.write_index(index, str(staging))
+    os.replace(staging, path)
+
+
+class VectorIndex:
+    """Two-segment (memory-mapped HNSW base plus flat delta) vector index
+
+    Args:
+        path: Index directory; created on the first ``save``
+        dim: Embedding dimension
+        hnsw_neighbors: HNSW graph degree of the base segment
+        compact_every: Delta size that triggers a compaction on ``save``
+    """
+
+    def __init__(
+        self,
+        path: PathLike,
+        dim: int,
+        hnsw_neighbors: int = 32,
+        compact_every: int = 10_000,
+    ) -> None:
+        self.path = Path(path)
+        self.dim = dim
+        self.hnsw_neighbors = hnsw_neighbors
+        self.compact_every = compact_every
+        self.meta: Dict[str, object] = {}
+        self._lock = threading.RLock()
+        self._base: Optional[faiss.Index] = None
+        self._delta = self._new_delta()
+        self._ids: set = set()
+        self._base_ids: set = set()
+        self._stale: set = set()
+        self._dirty = False
+        self._load()
+
+    def _new_delta(self) -> faiss.Index:
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(self.dim))
+
+    def _new_base(self) -> faiss.Index:
+        hnsw = faiss.IndexHNSWFlat(
+            self.dim, self.hnsw_neighbors, faiss.METRIC_INNER_PRODUCT
+        )
+        return faiss.IndexIDMap2(hnsw)
+
+    def _load(self) -> None:
+        meta_path = self.path / _META_FILE
+        if not meta_path.is_file():
+            return
+        meta = json.loads(meta_path.read_text())
+        if meta.get("format") != INDEX_FORMAT or meta.get("dim") != self.dim:
+            print(f"Ignoring incompatible vector index at {self.path}")
+            return
+
+        self.meta = meta
+        if (self.path / _BASE_FILE).is_file():
+            self._base = faiss.read_index(
+                str(self.path / _BASE_FILE), faiss.IO_FLAG_MMAP_IFC
+            )
+            self._base_ids = set(faiss.vector_to_array(self._base.id_map).tolist())
+            self._ids.update(self._base_ids)
+            self._stale = set(meta.get("stale") or ()) & self._base_ids
+        if (self.path / _DELTA_FILE).is_file():
+            self._delta = faiss.read_index(str(self.path / _DELTA_FILE))
+            self._ids.update(faiss.vector_to_array(self._delta.id_map).tolist())
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._ids)
+
+    def __contains__(self, vector_id: int) -> bool:
+        with self._lock:
+            return int(vector_id) in self._ids
+
+    def add(self, ids: Sequence[int], vectors: np.ndarray, replace: bool = False) -> int:
+        """
+        Add vectors; ids already in the index are skipped unless ``replace``
+
+        Args:
+            ids: Vector ids (see ``encode_id``)
+            vectors: ``(n, dim)`` array
+            replace: Replace the vectors of ids already in the index
+
+        Returns:
+            Number of vectors added
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        with self._lock:
+            if replace:
+                self._remove([int(vector_id) for vector_id in ids])
+            keep = [i for i, vector_id in enumerate(ids) if int(vector_id) not in self._ids]
+            if not keep:
+                return 0
+            new_ids = np.asarray([int(ids[i]) for i in keep], dtype=np.int64)
+            new_vectors = vectors[keep].copy()
+            faiss.normalize_L2(new_vectors)
+            self._delta.add_with_ids(new_vectors, new_ids)
+            self._ids.update(new_ids.tolist())
+            self._dirty = True
+            return len(keep)
+
+    def _remove(self, ids: Sequence[int]) -> None:
+        """Drop vectors from the delta and mark those in the base as stale"""
+        present = [vector_id for vector_id in ids if vector_id in self._ids]
+        if not present:
+            return
+        self._delta.remove_ids(np.asarray(present, dtype=np.int64))
+        self._stale.update(vector_id for vector_id in present if vector_id in self._base_ids)
+        self._ids.difference_update(present)
+        self.meta["stale"] = sorted(self._stale)
+        self._dirty = True
+
+    def search(
+        self, vector: np.ndarray, k: int = 5, kind: Optional[str] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Find the ``k`` nearest vectors
+
+        Args:
+            vector: Query embedding
+            k: Number of results
+            kind: Restrict results to one of ``KINDS``
+
+        Returns:
+            ``(vector_id, similarity)`` pairs, most similar first
+        """
+        query = np.ascontiguousarray(vector, dtype=np.float32).reshape(1, self.dim).copy()
+        faiss.normalize_L2(query)
+        params = None
+        if kind is not None:
+            code = KINDS[kind]
+            params = faiss.SearchParameters(
+                sel=faiss.IDSelectorRange(code << _KIND_SHIFT, (code + 1) << _KIND_SHIFT)
+            )
+
+        hits: Dict[int, float] = {}
+        with self._lock:
+            for segment in (self._base, self._delta):
+                if segment is None or segment.ntotal == 0:
+                    continue
+                # Over-fetch from the base, whose stale vectors are skipped
+                stale = self._stale if segment is self._base else ()
+                scores, ids = segment.search(query, k + len(stale), params=params)
+                for vector_id, score in zip(ids[0], scores[0]):
+                    if vector_id >= 0 and int(vector_id) not in stale:
+                        hits[int(vector_id)] = max(float(score), hits.get(int(vector_id), -1.0))
+
+        return sorted(hits.items(), key=lambda hit: hit[1], reverse=True)[:k]
+
+    def compact(self) -> None:
+        """Fold the delta segment into a new base segment on disk"""
+        with self._lock:
+            if self._delta.ntotal == 0 and not self._stale:
+                return
+            base = self._new_base()
+            if self._base is not None:
+                # The memory-mapped base cannot grow; copy its live vectors
+                base_ids = faiss.vector_to_array(self._base.id_map)
+                live = ~np.isin(base_ids, np.asarray(sorted(self._stale), dtype=np.int64))
+                if live.any():
+                    vectors = self._base.index.reconstruct_n(0, self._base.ntotal)
+                    base.add_with_ids(vectors[live], base_ids[live])
+
+            if self._delta.ntotal:
+                vectors = self._delta.index.reconstruct_n(0, self._delta.ntotal)
+                ids = faiss.vector_to_array(self._delta.id_map)
+                base.add_with_ids(vectors, ids)
+
+            self.path.mkdir(parents=True, exist_ok=True)
+            _write_atomic(base, self.path / _BASE_FILE)
+            del base
+            self._base = faiss.read_index(
+                str(self.path / _BASE_FILE), faiss.IO_FLAG_MMAP_IFC
+            )
+            self._base_ids = set(faiss.vector_to_array(self._base.id_map).tolist())
+            self._stale = set()
+            self.meta["stale"] = []
+            self._delta = self._new_delta()
+            self._dirty = True
+            self.save(compact=False)
+
+    def save(self, compact: bool = True) -> None:
+        """Persist the delta segment and metadata, compacting a large delta"""
+        with self._lock:
+            if compact and self._delta.ntotal >= self.compact_every:
+                self.compact()
+                return
+            if not self._dirty:
+                return
+            self.path.mkdir(parents=True, exist_ok=True)
+            _write_atomic(self._delta, self.path / _DELTA_FILE)
+            self.meta.update({"format": INDEX_FORMAT, "dim": self.dim})
+            staging = self.path / (_META_FILE + ".tmp")
+            staging.write_text(json.dumps(self.meta, indent=2, sort_keys=True))
+            os.replace(staging, self.path / _META_FILE)
+            self._dirty = False
+
+    def set_meta(self, **values: object) -> None:
+        """Update metadata persisted with the next ``save``"""
+        with self._lock:
+            self.meta.update(values)
+            self._dirty = True
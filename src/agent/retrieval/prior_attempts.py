@@ -0,0 +1,367 @@
+"""
+Similarity search over past hypotheses and alphas
+
+``PriorAttemptIndex`` keeps a ``VectorIndex`` of embeddings of every stored
+``Hypothesis.hypothesis`` and ``Alpha.description``/``expression`` in sync with
+the database. Every row carries a version (``updated_at``), bumped when its
+embedded text changes. Per table, the index remembers the newest version it
+has embedded, and the versions of rows near it. Each sync re-reads the rows
+of the last ``SETTLE_WINDOW`` before that cursor: a version is the start time
+of the writing transaction, so rows can commit out of version and ID order.
+New or changed rows are (re-)embedded.
+
+The backtest and evolution nodes and ``save_state`` schedule a sync after
+they run. Syncing runs on a background thread, so neither the graph nor
+checkpointing waits for the embedding API.
+
+Agents call ``asearch_prior_attempts`` to get the top-k most similar prior
+attempts with their metrics, instead of scanning the tables.
+"""
+
+import asyncio
+import atexit
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from agent.database.operations.retrieval_operations import (
+    aget_prior_attempts,
+    get_prior_attempts,
+    get_rows_to_index,
+)
+from agent.retrieval.index import KINDS, VectorIndex, decode_id, encode_id
+
+SETTLE_WINDOW = timedelta(minutes=10)
+"""Longest expected write transaction; rows this much older than the sync
+cursor can still appear and are re-read by every sync"""
+
+
+class PriorAttemptIndex:
+    """Embedding index of the hypotheses and alphas in the database
+
+    Args:
+        path: Index directory
+        embeddings: LangChain ``Embeddings`` (``embed_documents``/``embed_query``)
+        model: Name of the embedding model; an index built with another
+            model is discarded
+        batch_size: Rows embedded per request
+        compact_every: Delta size that triggers a compaction of the index
+        settle_window: How far before its cursor a sync re-reads rows
+    """
+
+    def __init__(
+        self,
+        path: str,
+        embeddings: Any,
+        model: str,
+        batch_size: int = 256,
+        compact_every: int = 10_000,
+        settle_window: timedelta = SETTLE_WINDOW,
+    ) -> None:
+        self.path = Path(path)
+        self.embeddings = embeddings
+        self.model = model
+        self.batch_size = batch_size
+        self.compact_every = compact_every
+        self.settle_window = settle_window
+        self.index: Optional[VectorIndex] = None
+        self._lock = threading.Lock()
+        self._schedule_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="retrieval")
+        self._pending: Optional[Future] = None
+        self._open()
+
+    def _open(self) -> None:
+        meta_path = self.path / "meta.json"
+        if not meta_path.is_file():
+            return
+        meta = json.loads(meta_path.read_text())
+        if meta.get("model") != self.model:
+            print(f"Rebuilding retrieval index at {self.path}: embedding model changed")
+            shutil.rmtree(self.path)
+            return
+        self.index = VectorIndex(self.path, meta["dim"], compact_every=self.compact_every)
+
+    def __len__(self) -> int:
+        return len(self.index) if self.index is not None else 0
+
+    def _add(self, kind: str, rows: List[Any]) -> None:
+        vectors = np.asarray(
+            self.embeddings.embed_documents([text or " " for _, text, _ in rows]),
+            dtype=np.float32,
+        )
+        if self.index is None:
+            self.index = VectorIndex(
+                self.path, vectors.shape[1], compact_every=self.compact_every
+            )
+            self.index.set_meta(model=self.model, cursors={})
+        # Changed rows replace their old vectors
+        self.index.add(
+            [encode_id(kind, row_id) for row_id, _, _ in rows], vectors, replace=True
+        )
+
+    def _set_cursor(self, kind: str, version: datetime, recent: Dict[str, str]) -> None:
+        """Persist the newest version seen and the versions within the settle window"""
+        oldest = version - self.settle_window
+        stale = [row_id for row_id, seen in recent.items() if datetime.fromisoformat(seen) < oldest]
+        for row_id in stale:
+            del recent[row_id]
+        cursors = dict(self.index.meta.get("cursors") or {})
+        cursors[kind] = {"version": version.isoformat(), "recent": dict(recent)}
+        self.index.set_meta(cursors=cursors)
+
+    def _sync_kind(self, kind: str, max_rows: Optional[int]) -> int:
+        cursors = (self.index.meta.get("cursors") or {}) if self.index else {}
+        cursor = cursors.get(kind)
+        if cursor is None:
+            # First sync, or an index built before row versions: rows that are
+            # already indexed are kept
+            since, recent = None, {}
+        else:
+            since = datetime.fromisoformat(cursor["version"]) - self.settle_window
+            recent = dict(cursor["recent"])
+
+        indexed = 0
+        after_id = 0
+        while max_rows is None or indexed < max_rows:
+            rows = get_rows_to_index(kind, since=since, after_id=after_id, limit=self.batch_size)
+            if not rows:
+                break
+            after_id, _, since = rows[-1]
+
+            changed = [row for row in rows if recent.get(str(row[0])) != row[2].isoformat()]
+            if cursor is None and self.index is not None:
+                changed = [row for row in changed if encode_id(kind, row[0]) not in self.index]
+            if changed:
+                self._add(kind, changed)
+                indexed += len(changed)
+            if self.index is None:
+                continue
+
+            recent.update((str(row_id), version.isoformat()) for row_id, _, version in rows)
+            self._set_cursor(kind, since, recent)
+            # Persist per batch so an interrupted backfill resumes
+            self.index.save()
+        return indexed
+
+    def sync(self, max_rows: Optional[int] = None) -> int:
+        """
+        Embed and index the rows written or changed since the last sync
+
+        Args:
+            max_rows: Stop after roughly this many rows (None for all)
+
+        Returns:
+            Number of rows indexed
+        """
+        indexed = 0
+        with self._lock:
+            for kind in KINDS:
+                remaining = None if max_rows is None else max_rows - indexed
+                if remaining is not None and remaining <= 0:
+                    break
+                indexed += self._sync_kind(kind, remaining)
+        return indexed
+
+    def schedule_sync(self) -> Future:
+        """Sync on the background thread; requests made while one is queued coalesce"""
+        with self._schedule_lock:
+            pending = self._pending
+            if pending is not None and not pending.running() and not pending.done():
+                return pending
+            self._pending = self._executor.submit(self._background_sync)
+            return self._pending
+
+    def _background_sync(self) -> int:
+        try:
+            return self.sync()
+        except Exception as e:
+            print(f"Error syncing retrieval index: {str(e)}")
+            return 0
+
+    def _hits(self, vector: np.ndarray, k: int, kind: Optional[str]):
+        if self.index is None:
+            return []
+        return [
+            (decode_id(vector_id), score)
+            for vector_id, score in self.index.search(vector, k, kind=kind)
+        ]
+
+    @staticmethod
+    def _attempts(hits, rows) -> List[Dict[str, Any]]:
+        attempts = []
+        for key, score in hits:
+            if key in rows:
+                attempts.append({"kind": key[0], "score": score, **rows[key]})
+        return attempts
+
+    def search(self, text: str, k: int = 5, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Find the prior attempts most similar to ``text``
+
+        Args:
+            text: Query text (a trading idea, hypothesis or factor description)
+            k: Number of results
+            kind: ``"hypothesis"``, ``"alpha"`` or None for both
+
+        Returns:
+            Row dictionaries with ``kind``, ``score`` (cosine similarity) and
+            ``metrics``, most similar first
+        """
+        if not len(self):
+            return []
+        hits = self._hits(self.embeddings.embed_query(text), k, kind)
+        return self._attempts(hits, get_prior_attempts(key for key, _ in hits))
+
+    async def asearch(
+        self, text: str, k: int = 5, kind: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Async variant of ``search``"""
+        if not len(self):
+            return []
+        vector = await asyncio.to_thread(self.embeddings.embed_query, text)
+        hits = await asyncio.to_thread(self._hits, vector, k, kind)
+        return self._attempts(hits, await aget_prior_attempts(key for key, _ in hits))
+
+    def close(self) -> None:
+        """Finish pending syncs and persist the index"""
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            if self.index is not None:
+                self.index.save()
+
+
+_indexes: Dict[tuple, PriorAttemptIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def retrieval_enabled(configuration: Any) -> bool:
+    """The index needs a path, a positive top-k and the application database"""
+    return (
+        bool(configuration.retrieval_index_path)
+        and configuration.retrieval_top_k > 0
+        and os.environ.get("USE_POSTGRES_CHECKPOINT", "true").lower() == "true"
+    )
+
+
+def get_retrieval_index(configuration: Any) -> Optional[PriorAttemptIndex]:
+    """
+    Return the process-wide prior attempt index for a configuration
+
+    Returns:
+        PriorAttemptIndex, or None if retrieval is disabled
+    """
+    if not retrieval_enabled(configuration):
+        return None
+
+    key = (os.path.abspath(configuration.retrieval_index_path), configuration.embedding_model)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            from agent.llm.client import get_embedding_model
+
+            index = PriorAttemptIndex(
+                configuration.retrieval_index_path,
+                get_embedding_model(configuration),
+                configuration.embedding_model,
+            )
+            _indexes[key] = index
+        return index
+
+
+def schedule_retrieval_sync(configuration: Any) -> None:
+    """
+    Let the retrieval index pick up newly written rows, in the background
+
+    Errors are reported and otherwise ignored.
+
+    Args:
+        configuration: Agent ``Configuration``
+    """
+    try:
+        index = get_retrieval_index(configuration)
+        if index is not None:
+            index.schedule_sync()
+    except Exception as e:
+        print(f"Error scheduling retrieval index sync: {str(e)}")
+
+
+async def asearch_prior_attempts(
+    text: str,
+    configuration: Any,
+    kind: Optional[str] = None,
+    exclude_thread: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Top ``Configuration.retrieval_top_k`` prior attempts similar to ``text``
+
+    Search errors are reported and treated as no results.
+
+    Args:
+        text: Query text
+        configuration: Agent ``Configuration``
+        kind: ``"hypothesis"``, ``"alpha"`` or None for both
+        exclude_thread: Leave out attempts from this thread
+
+    Returns:
+        Prior attempts, most similar first
+    """
+    index = get_retrieval_index(configuration)
+    if index is None or not text:
+        return []
+
+    k = configuration.retrieval_top_k
+    try:
+        # Over-fetch so excluding the current thread still leaves k results
+        attempts = await index.asearch(text, k * 2 if exclude_thread else k, kind=kind)
+    except Exception as e:
+        print(f"Error searching retrieval index: {str(e)}")
+        return []
+
+    if exclude_thread:
+        attempts = [a for a in attempts if a.get("thread_id") != exclude_thread]
+    return attempts[:k]
+
+
+def format_prior_attempts(attempts: List[Dict[str, Any]]) -> str:
+    """Summarize prior attempts and their metrics for a prompt"""
+    if not attempts:
+        return ""
+
+    lines = ["Similar prior attempts (avoid repeating what did not work):"]
+    for attempt in attempts:
+        if attempt["kind"] == "hypothesis":
+            text = attempt.get("hypothesis") or ""
+        else:
+            text = f"{attempt.get('description') or ''} [{attempt.get('expression') or ''}]"
+
+        metrics = attempt.get("metrics")
+        if metrics:
+            ir = metrics.get("information_ratio")
+            ic = metrics.get("ic")
+            result = (
+                f"IR={ir:.4f}" if ir is not None else "IR=N/A"
+            ) + (f", IC={ic:.4f}" if ic is not None else ", IC=N/A")
+        else:
+            result = "not backtested"
+        lines.append(f"- ({attempt['kind']}) {text.strip()} -> {result}")
+    return "\n".join(lines)
+
+
+def close_retrieval_indexes() -> None:
+    """Persist and close every index; registered with ``atexit``"""
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+        _indexes.clear()
+    for index in indexes:
+        index.close()
+
+
+atexit.register(close_retrieval_indexes)
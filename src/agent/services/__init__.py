@@ -3,6 +3,32 @@ Services package for AlphaGPT
 
 This package contains service modules that provide higher-level functionality.
 """
-from agent.services.state_service import invoke_graph_with_state, get_state_history
+from agent.services.state_service import (
+    invoke_graph_with_state,
+    ainvoke_graph_with_state,
+    run_batch,
+    BatchRunResult,
+    get_state_history,
+    iter_state_history,
+)
+from agent.services.dedup_service import (
+    alpha_fingerprint,
+    alookup_known_alphas,
+    arecord_alphas,
+    dedup_enabled,
+    metrics_version,
+)
 
-__all__ = ["invoke_graph_with_state", "get_state_history"]
+__all__ = [
+    "invoke_graph_with_state",
+    "ainvoke_graph_with_state",
+    "run_batch",
+    "BatchRunResult",
+    "get_state_history",
+    "iter_state_history",
+    "alpha_fingerprint",
+    "alookup_known_alphas",
+    "arecord_alphas",
+    "dedup_enabled",
+    "metrics_version",
+]
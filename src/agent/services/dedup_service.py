@@ -0,0 +1,143 @@
+"""
+Alpha dedup service for AlphaGPT
+
+Generated alphas are fingerprinted by their canonical expression (see
+``agent.factors.canonical``) and looked up in the ``alpha_fingerprints``
+index before any LLM coding or backtesting. An alpha already seen in any
+thread reuses the stored code, and its stored metrics while the market data
+and backtest settings are unchanged.
+
+The index lives in the application database. Without PostgreSQL
+(``USE_POSTGRES_CHECKPOINT=false``) lookups find nothing and nothing is
+recorded, but duplicates within one run are still coded and evaluated once.
+"""
+
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+from agent.backtesting import METRICS_REVISION
+from agent.factors import Fingerprint, fingerprint
+from agent.database.operations.fingerprint_operations import (
+    asave_fingerprints,
+    aget_known_fingerprints,
+)
+
+
+def dedup_enabled(configuration: Any) -> bool:
+    """Return True if alphas should be deduplicated by fingerprint"""
+    return bool(configuration.dedup_alphas)
+
+
+def _index_available() -> bool:
+    """The dedup index needs the application database"""
+    return os.environ.get("USE_POSTGRES_CHECKPOINT", "true").lower() == "true"
+
+
+def alpha_fingerprint(alpha: Dict[str, Any]) -> Fingerprint:
+    """
+    Fingerprint a seed or coded alpha
+
+    Args:
+        alpha: Alpha dictionary with ``dsl`` or ``expr``
+
+    Returns:
+        Fingerprint of the alpha's canonical expression
+    """
+    return fingerprint(alpha.get("dsl") or alpha.get("expr") or "")
+
+
+def metrics_version(data_version: str, configuration: Any) -> str:
+    """Identify the data and backtest settings metrics were computed with"""
+    return (
+        f"{data_version}:h{configuration.backtest_horizon}"
+        f":q{configuration.backtest_quantile}:r{METRICS_REVISION}"
+    )
+
+
+async def alookup_known_alphas(
+    alphas: Iterable[Dict[str, Any]]
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Look up alphas in the dedup index with one query
+
+    Lookup errors are reported and treated as misses.
+
+    Args:
+        alphas: Seed or coded alphas
+
+    Returns:
+        Mapping of alphaID to the stored fingerprint dictionary, for the
+        alphas that were seen before
+    """
+    if not _index_available():
+        return {}
+
+    digests = {alpha["alphaID"]: alpha_fingerprint(alpha).digest for alpha in alphas}
+    if not digests:
+        return {}
+
+    try:
+        known = await aget_known_fingerprints(digests.values())
+    except Exception as e:
+        print(f"Error looking up alpha fingerprints: {str(e)}")
+        return {}
+
+    return {
+        alpha_id: known[digest]
+        for alpha_id, digest in digests.items()
+        if digest in known
+    }
+
+
+async def arecord_alphas(
+    alphas: Iterable[Dict[str, Any]],
+    thread_id: Optional[str] = None,
+    metrics: Optional[Dict[str, Dict[str, Any]]] = None,
+    version: Optional[str] = None,
+) -> int:
+    """
+    Record alphas (and optionally their metrics) in the dedup index
+
+    Recording errors are reported and otherwise ignored.
+
+    Args:
+        alphas: Coded alphas
+        thread_id: Thread that produced the alphas
+        metrics: Backtest metrics by alphaID; only the scalar metrics are
+            stored, not the ``series``
+        version: ``metrics_version`` of the metrics
+
+    Returns:
+        Number of fingerprints written
+    """
+    if not _index_available():
+        return 0
+
+    metrics = metrics or {}
+    rows: List[Dict[str, Any]] = []
+    for alpha in alphas:
+        fp = alpha_fingerprint(alpha)
+        alpha_metrics = metrics.get(alpha["alphaID"])
+        if alpha_metrics is not None:
+            # Only the summary metrics; per-date series are stored with the
+            # backtest results (see backtest_series)
+            alpha_metrics = {k: v for k, v in alpha_metrics.items() if k != "series"}
+        rows.append(
+            {
+                "fingerprint": fp.digest,
+                "canonical": fp.canonical,
+                "kind": fp.kind,
+                "thread_id": thread_id,
+                "alpha_id": alpha["alphaID"],
+                "expression": alpha.get("expr"),
+                "code": alpha.get("code"),
+                "metrics": alpha_metrics,
+                "metrics_version": version if alpha_metrics is not None else None,
+            }
+        )
+
+    try:
+        return await asave_fingerprints(rows)
+    except Exception as e:
+        print(f"Error recording alpha fingerprints: {str(e)}")
+        return 0
@@ -4,10 +4,17 @@ State management service for AlphaGPT
 This module provides functions for working with graph states and history.
 """
 
-from typing import Dict, Any, Optional
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Dict, Any, AsyncIterator, Iterable, Iterator, Optional, Union
 
 from agent.state import State
-from agent.database.checkpointer_api import get_checkpoint_manager
+from agent.database.operations.history_operations import (
+    get_thread_history,
+    iter_thread_history,
+)
 
 # Import graph lazily to avoid circular imports
 
@@ -43,29 +50,206 @@ def invoke_graph_with_state(
     return graph.invoke(initial_state, config_dict)
 
 
-def get_state_history(thread_id: str) -> Dict[str, Any]:
+async def ainvoke_graph_with_state(
+    initial_state: Union[State, Dict[str, Any]],
+    thread_id: Optional[str] = None,
+    checkpoint_id: Optional[str] = None,
+    configurable: Optional[Dict[str, Any]] = None,
+    graph: Any = None,
+) -> Dict[str, Any]:
     """
-    Get the full history of a thread, including hypotheses, alphas, and backtest results
+    Async version of ``invoke_graph_with_state``
 
     Args:
-        thread_id: Thread ID to get history for
+        initial_state: The initial state (or partial state update) for the graph
+        thread_id: Optional thread ID to continue from
+        checkpoint_id: Optional checkpoint ID to continue from
+        configurable: Optional extra ``Configuration`` values for the run
+        graph: Optional compiled graph; defaults to ``agent.graph.graph``
 
     Returns:
-        Dictionary containing thread history
+        Final state values from the graph execution
     """
-    checkpointer = get_checkpoint_manager()
+    config_dict: Dict[str, Any] = {"configurable": dict(configurable or {})}
+
+    if thread_id:
+        config_dict["configurable"]["thread_id"] = thread_id
+
+        if checkpoint_id:
+            config_dict["configurable"]["checkpoint_id"] = checkpoint_id
+
+    if graph is None:
+        # Avoid circular import by importing here
+        from agent.graph import graph
+
+    return await graph.ainvoke(initial_state, config_dict)
+
+
+@dataclass
+class BatchRunResult:
+    """Outcome of one run of a batch"""
 
-    # Get all hypotheses for this thread
-    hypotheses = checkpointer.get_hypothesis_history(thread_id)
+    index: int
+    """Position of the run in the submitted batch."""
 
-    # Get alphas for each hypothesis
-    for hypothesis in hypotheses:
-        hypothesis["alphas"] = checkpointer.get_alphas_for_hypothesis(hypothesis["id"])
+    thread_id: str
+    trading_idea: Optional[str] = None
+    state: Optional[Dict[str, Any]] = None
+    """Final state values, when the run succeeded."""
 
-        # Get backtest results for each alpha
-        for alpha in hypothesis["alphas"]:
-            alpha["backtest_results"] = checkpointer.get_backtest_results_for_alpha(
-                alpha["id"]
-            )
+    error: Optional[str] = None
+    duration: float = 0.0
 
-    return {"thread_id": thread_id, "hypotheses": hypotheses}
+    @property
+    def ok(self) -> bool:
+        """Whether the run finished without an error"""
+        return self.error is None
+
+
+def _batch_input(run: Union[str, State, Dict[str, Any]]) -> Dict[str, Any]:
+    """Normalize a batch entry to trading_idea/thread_id/checkpoint_id/state"""
+    if isinstance(run, str):
+        return {"trading_idea": run}
+    if isinstance(run, State):
+        return {"trading_idea": run.trading_idea, "state": run}
+    return dict(run)
+
+
+async def run_batch(
+    runs: Iterable[Union[str, State, Dict[str, Any]]],
+    max_concurrency: int = 8,
+    timeout: Optional[float] = None,
+    configurable: Optional[Dict[str, Any]] = None,
+    graph: Any = None,
+) -> AsyncIterator[BatchRunResult]:
+    """
+    Run the graph for many trading ideas or threads concurrently
+
+    Runs are started in order, at most ``max_concurrency`` at a time, and
+    their results are yielded as each one finishes, not in submission order.
+    A failing or timed-out run is reported in its result and does not stop
+    the batch. Closing the iterator early cancels the unfinished runs.
+
+    Args:
+        runs: Trading ideas (new threads), ``State`` objects, or dictionaries
+            with ``trading_idea``, ``thread_id`` and/or ``checkpoint_id``. A
+            dictionary with only a ``thread_id`` runs another iteration of
+            that thread.
+        max_concurrency: Maximum number of runs in flight
+        timeout: Optional deadline in seconds for each run, measured from
+            when the run starts
+        configurable: Optional extra ``Configuration`` values for every run
+        graph: Optional compiled graph; defaults to ``agent.graph.graph``
+
+    Yields:
+        BatchRunResult for each run, as it completes
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def run_one(index: int, run: Dict[str, Any]) -> BatchRunResult:
+        thread_id = run.get("thread_id") or str(uuid.uuid4())
+        trading_idea = run.get("trading_idea")
+        result = BatchRunResult(index=index, thread_id=thread_id, trading_idea=trading_idea)
+
+        if run.get("state") is not None:
+            initial_state: Any = run["state"]
+        else:
+            initial_state = {"trading_idea": trading_idea} if trading_idea else {}
+
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                final_state = await asyncio.wait_for(
+                    ainvoke_graph_with_state(
+                        initial_state,
+                        thread_id=thread_id,
+                        checkpoint_id=run.get("checkpoint_id"),
+                        configurable=configurable,
+                        graph=graph,
+                    ),
+                    timeout=timeout,
+                )
+                result.state = dict(final_state) if final_state is not None else {}
+            except asyncio.TimeoutError:
+                result.error = f"Timed out after {timeout}s"
+            except Exception as e:
+                result.error = f"{type(e).__name__}: {e}"
+            result.duration = time.perf_counter() - start
+
+        return result
+
+    tasks = [
+        asyncio.create_task(run_one(index, _batch_input(run)))
+        for index, run in enumerate(runs)
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def get_state_history(
+    thread_id: str,
+    after_iteration: Optional[int] = None,
+    limit: Optional[int] = None,
+    include_code: bool = True,
+    include_backtest_data: bool = True,
+) -> Dict[str, Any]:
+    """
+    Get the history of a thread, including hypotheses, alphas, and backtest results
+
+    The whole tree is loaded with a fixed number of queries. Pass the returned
+    ``next_cursor`` as ``after_iteration`` to fetch the following page.
+
+    Args:
+        thread_id: Thread ID to get history for
+        after_iteration: Optional cursor; only later iterations are returned
+        limit: Optional maximum number of hypotheses to return
+        include_code: Whether to include alpha code
+        include_backtest_data: Whether to include full backtest_data payloads
+
+    Returns:
+        Dictionary containing thread history
+    """
+    page = get_thread_history(
+        thread_id,
+        after_iteration=after_iteration,
+        limit=limit,
+        include_code=include_code,
+        include_backtest_data=include_backtest_data,
+    )
+
+    return {
+        "thread_id": thread_id,
+        "hypotheses": page["hypotheses"],
+        "next_cursor": page["next_cursor"],
+    }
+
+
+def iter_state_history(
+    thread_id: str,
+    page_size: int = 50,
+    include_code: bool = True,
+    include_backtest_data: bool = True,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the history of a very long thread one hypothesis at a time
+
+    Args:
+        thread_id: Thread ID to get history for
+        page_size: Number of hypotheses fetched per round trip
+        include_code: Whether to include alpha code
+        include_backtest_data: Whether to include full backtest_data payloads
+
+    Yields:
+        Hypothesis dictionaries with nested alphas and backtest results
+    """
+    return iter_thread_history(
+        thread_id,
+        page_size=page_size,
+        include_code=include_code,
+        include_backtest_data=include_backtest_data,
+    )
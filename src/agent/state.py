@@ -1,6 +1,31 @@
 # src/agent/state.py
 from dataclasses import dataclass, field
-from typing import List, Dict, Any, Optional
+from typing import Annotated, List, Dict, Any, Optional, Sequence
+
+from langgraph.channels import DeltaChannel
+
+
+def append_records(
+    history: List[Dict[str, Any]], updates: Sequence[List[Dict[str, Any]]]
+) -> List[Dict[str, Any]]:
+    """Reducer of the append-only history channels.
+
+    Nodes return only their new records. Checkpoints store those writes
+    rather than the whole list, and the list is rebuilt by replaying them.
+    """
+    records = list(history)
+    for update in updates:
+        records.extend(update)
+    return records
+
+
+HISTORY_SNAPSHOT_FREQUENCY = 25
+"""Updates of a history channel between full snapshots of its value.
+
+Rebuilding a history replays the writes back to the latest snapshot, and
+checkpoint retention (``agent.database.retention``) must keep those
+ancestors, so snapshots bound both the replay and what compaction retains.
+"""
 
 
 @dataclass
@@ -26,6 +51,12 @@ class State:
     sota_alphas: List[Dict[str, Any]] = field(default_factory=list)
     feedback: Optional[Dict[str, Any]] = None
 
-    # Historical data for iterations
-    hypothesis_history: List[Dict[str, Any]] = field(default_factory=list)
-    alpha_history: List[Dict[str, Any]] = field(default_factory=list)
+    # Historical data for iterations (append-only: return new records only)
+    hypothesis_history: Annotated[
+        List[Dict[str, Any]],
+        DeltaChannel(append_records, snapshot_frequency=HISTORY_SNAPSHOT_FREQUENCY),
+    ] = field(default_factory=list)
+    alpha_history: Annotated[
+        List[Dict[str, Any]],
+        DeltaChannel(append_records, snapshot_frequency=HISTORY_SNAPSHOT_FREQUENCY),
+    ] = field(default_factory=list)
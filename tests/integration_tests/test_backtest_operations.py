@@ -0,0 +1,132 @@
+import uuid
+
+import numpy as np
+import pytest
+from sqlalchemy import delete, event
+from sqlalchemy.exc import OperationalError
+
+from agent.backtesting import batch_backtest
+from agent.database.models import Alpha, BacktestResult, Hypothesis, ThreadCounter
+from agent.database.operations.alpha_operations import save_alphas, save_evolved_alphas
+from agent.database.operations.backtest_operations import (
+    get_backtest_results_for_alpha,
+    get_backtest_series,
+    save_backtest_results,
+)
+from agent.database.operations.db_connection import (
+    create_tables,
+    get_db_engine,
+    get_session_factory,
+)
+from agent.database.operations.hypothesis_operations import save_hypothesis
+
+
+@pytest.fixture
+def thread_id():
+    try:
+        create_tables()
+    except OperationalError:
+        pytest.skip("PostgreSQL is not reachable")
+    thread_id = f"test-{uuid.uuid4()}"
+    yield thread_id
+    with get_session_factory()() as session:
+        for model in (BacktestResult, Alpha, Hypothesis, ThreadCounter):
+            session.execute(delete(model).where(model.thread_id == thread_id))
+        session.commit()
+
+
+@pytest.fixture
+def statements():
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    engine = get_db_engine()
+    event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def test_series_are_stored_apart_and_sliced_by_date(thread_id, statements) -> None:
+    rng = np.random.default_rng(0)
+    n_dates = 700
+    dates = np.datetime64("2020-01-01") + np.arange(n_dates)
+    metrics = batch_backtest(
+        [rng.normal(size=(n_dates, 20))], rng.normal(0, 0.01, (n_dates, 20)), dates=dates
+    )[0]
+    state = {
+        "hypothesis": "Reversal",
+        "coded_alphas": [{"alphaID": "a", "expr": "-ts_delta(close, 5)", "code": "x"}],
+        "sota_alphas": [{"id": "a", "backtest_results": metrics}],
+    }
+    with get_session_factory()() as session:
+        hypothesis = save_hypothesis(thread_id, "c1", state, session=session)
+        (alpha,) = save_alphas(thread_id, "c1", state, hypothesis.id, session=session)
+        (result,) = save_backtest_results(thread_id, "c1", state, session=session)
+        alpha_id, result_id = alpha.id, result.id
+        session.commit()
+
+    del statements[:]
+    (listed,) = get_backtest_results_for_alpha(alpha_id)
+    # The scalar listing never reads the series table, and the JSON holds no series
+    assert not any("backtest_series" in s for s in statements)
+    assert listed["ic"] == pytest.approx(metrics["ic"])
+    assert "series" not in listed["backtest_data"]
+    assert listed["backtest_data"]["n_periods"] == metrics["n_periods"]
+
+    full = get_backtest_series(result_id)
+    assert full["dates"].tolist() == metrics["series"]["dates"]
+    np.testing.assert_array_equal(
+        full["long_short_return"],
+        [np.nan if v is None else v for v in metrics["series"]["long_short_return"]],
+    )
+
+    sliced = get_backtest_series(result_id, ["ic"], start="2021-01-01", end="2021-01-31")
+    assert list(sliced) == ["ic"]
+    first = metrics["series"]["dates"].index("2021-01-01")
+    np.testing.assert_array_equal(
+        sliced["ic"],
+        [np.nan if v is None else v for v in metrics["series"]["ic"][first : first + 31]],
+    )
+
+    # Saving again without series replaces the stored ones
+    state["sota_alphas"][0]["backtest_results"] = {"ic": 0.1}
+    save_backtest_results(thread_id, "c1", state)
+    assert get_backtest_series(result_id) == {}
+
+
+def test_evolved_alphas_are_stored_before_their_results(thread_id) -> None:
+    evolved = {
+        "id": "evolved_0123456789ab",
+        "expression": "rank(ts_delta(close, 5))",
+        "dsl": "rank(ts_delta(close, 5))",
+        "description": "Evolved",
+        "origin": "evolution",
+        "backtest_results": {"information_ratio": 1.0, "ic": 0.05},
+    }
+    state = {"hypothesis": "Momentum", "sota_alphas": [evolved]}
+    with get_session_factory()() as session:
+        first = save_hypothesis(thread_id, "c1", state, session=session)
+        (alpha,) = save_evolved_alphas(thread_id, "c1", state, first.id, session=session)
+        (result,) = save_backtest_results(thread_id, "c1", state, session=session)
+        assert result.alpha_id == alpha.id
+        assert "calculate_evolved_0123456789ab" in alpha.code
+
+        # Still SOTA in the next iteration: no second row for the thread
+        second = save_hypothesis(thread_id, "c2", state, session=session)
+        assert save_evolved_alphas(thread_id, "c2", state, second.id, session=session) == []
+        (again,) = save_backtest_results(thread_id, "c2", state, session=session)
+        assert again.alpha_id == alpha.id
+        session.commit()
+
+
+def test_alphas_without_ids_are_saved_once(thread_id) -> None:
+    state = {"hypothesis": "Gap", "seed_alphas": [{"expr": "rank(close / open)", "desc": "Gap"}]}
+    with get_session_factory()() as session:
+        hypothesis = save_hypothesis(thread_id, "c1", state, session=session)
+        (first,) = save_alphas(thread_id, "c1", state, hypothesis.id, session=session)
+        (again,) = save_alphas(thread_id, "c2", state, hypothesis.id, session=session)
+        assert again.id == first.id
+        assert first.alpha_id.startswith("alpha_")
+        session.commit()
@@ -0,0 +1,64 @@
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import delete
+from sqlalchemy.exc import OperationalError
+
+from agent.database.models import Hypothesis, ThreadCounter
+from agent.database.operations.db_connection import (
+    create_tables,
+    get_session_factory,
+)
+from agent.database.operations.hypothesis_operations import save_hypothesis
+
+
+@pytest.fixture
+def thread_id():
+    try:
+        create_tables()
+    except OperationalError:
+        pytest.skip("PostgreSQL is not reachable")
+    thread_id = f"test-{uuid.uuid4()}"
+    yield thread_id
+    with get_session_factory()() as session:
+        session.execute(delete(Hypothesis).where(Hypothesis.thread_id == thread_id))
+        session.execute(delete(ThreadCounter).where(ThreadCounter.thread_id == thread_id))
+        session.commit()
+
+
+def state(n):
+    return {"hypothesis": f"Hypothesis {n}", "trading_idea": "Momentum", "reason": "Test"}
+
+
+def test_parallel_writers_get_consecutive_iterations(thread_id) -> None:
+    writers = 12
+    checkpoints = [f"checkpoint-{n}" for n in range(200)]
+    # Every checkpoint is saved twice, by different writers
+    jobs = checkpoints + checkpoints[::-1]
+
+    with ThreadPoolExecutor(writers) as pool:
+        saved = list(
+            pool.map(lambda cid: save_hypothesis(thread_id, cid, state(cid)), jobs)
+        )
+
+    by_checkpoint = {}
+    for cid, hypothesis in zip(jobs, saved):
+        assert hypothesis.checkpoint_id == cid
+        by_checkpoint.setdefault(cid, set()).add((hypothesis.id, hypothesis.iteration))
+    # A checkpoint saved twice returns the same row
+    assert all(len(rows) == 1 for rows in by_checkpoint.values())
+    iterations = sorted(iteration for (_, iteration), in by_checkpoint.values())
+    assert iterations == list(range(len(checkpoints)))
+
+
+def test_saving_a_checkpoint_again_keeps_its_iteration(thread_id) -> None:
+    first = save_hypothesis(thread_id, "a", state("a"))
+    second = save_hypothesis(thread_id, "b", state("b"))
+    again = save_hypothesis(thread_id, "a", state("changed"))
+
+    assert (first.iteration, second.iteration) == (0, 1)
+    assert (again.id, again.iteration, again.hypothesis) == (first.id, 0, "Hypothesis a")
+    assert save_hypothesis(thread_id, "c", {"hypothesis": ""}) is None
+    with get_session_factory()() as session:
+        assert session.get(ThreadCounter, thread_id).last_iteration == 1
@@ -0,0 +1,131 @@
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy import (
+    JSON,
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    create_engine,
+    inspect,
+    text,
+)
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from agent.database.operations.alpha_operations import save_alphas
+from agent.database.operations.db_connection import get_db_url, upgrade_database
+
+# The tables as create_all built them in the first release
+legacy = MetaData()
+Table(
+    "hypotheses",
+    legacy,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("thread_id", String, nullable=False, index=True),
+    Column("checkpoint_id", String, nullable=False),
+    Column("trading_idea", String, nullable=False),
+    Column("hypothesis", String, nullable=False),
+    Column("reason", String),
+    Column("concise_reason", String),
+    Column("concise_observation", String),
+    Column("concise_justification", String),
+    Column("concise_knowledge", String),
+    Column("iteration", Integer),
+    Column("created_at", DateTime),
+)
+Table(
+    "alphas",
+    legacy,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("thread_id", String, nullable=False, index=True),
+    Column("checkpoint_id", String, nullable=False),
+    Column("hypothesis_id", Integer, ForeignKey("hypotheses.id"), nullable=False),
+    Column("alpha_id", String, nullable=False),
+    Column("expression", String),
+    Column("description", String),
+    Column("code", String),
+    Column("created_at", DateTime),
+)
+Table(
+    "backtest_results",
+    legacy,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("thread_id", String, nullable=False, index=True),
+    Column("checkpoint_id", String, nullable=False),
+    Column("alpha_id", Integer, ForeignKey("alphas.id"), nullable=False),
+    Column("is_sota", Boolean),
+    Column("information_ratio", Float),
+    Column("annualized_return", Float),
+    Column("max_drawdown", Float),
+    Column("ic", Float),
+    Column("backtest_data", JSON),
+    Column("created_at", DateTime),
+)
+
+
+@pytest.fixture
+def legacy_engine():
+    url = make_url(get_db_url())
+    name = f"alphagpt_migration_{uuid.uuid4().hex[:8]}"
+    admin = create_engine(url, isolation_level="AUTOCOMMIT")
+    try:
+        with admin.connect() as conn:
+            conn.execute(text(f'CREATE DATABASE "{name}"'))
+    except OperationalError:
+        pytest.skip("PostgreSQL is not reachable")
+
+    engine = create_engine(url.set(database=name))
+    legacy.create_all(engine)
+    yield engine
+    engine.dispose()
+    with admin.connect() as conn:
+        conn.execute(text(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)'))
+    admin.dispose()
+
+
+def test_upgrade_of_a_legacy_database(legacy_engine) -> None:
+    now = datetime.utcnow()
+    with legacy_engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO hypotheses
+                (id, thread_id, checkpoint_id, trading_idea, hypothesis, iteration, created_at)
+            VALUES (1, 't', 'c1', 'Momentum', 'Momentum persists', 0, :now)
+        """), {"now": now})
+        # The first release inserted an alpha again on every save
+        conn.execute(text("""
+            INSERT INTO alphas
+                (id, thread_id, checkpoint_id, hypothesis_id, alpha_id, expression, code, created_at)
+            VALUES (1, 't', 'c1', 1, 'a', 'rank(close)', 'old', :now),
+                   (2, 't', 'c2', 1, 'a', 'rank(close)', 'new', :now)
+        """), {"now": now})
+        conn.execute(text("""
+            INSERT INTO backtest_results (thread_id, checkpoint_id, alpha_id, ic, created_at)
+            VALUES ('t', 'c1', 1, 0.1, :now), ('t', 'c2', 2, 0.2, :now), ('t', 'c2', 2, 0.3, :now)
+        """), {"now": now})
+
+    upgrade_database(legacy_engine)
+
+    schema = inspect(legacy_engine)
+    for table in ("llm_cache", "alpha_fingerprints", "checkpoint_payloads", "backtest_series"):
+        assert schema.has_table(table)
+    with legacy_engine.connect() as conn:
+        assert conn.execute(text("SELECT id, code FROM alphas")).all() == [(2, "new")]
+        results = conn.execute(
+            text("SELECT checkpoint_id, ic FROM backtest_results ORDER BY checkpoint_id")
+        ).all()
+        assert results == [("c1", 0.1), ("c2", 0.3)]
+
+    state = {"coded_alphas": [{"alphaID": "a", "expr": "rank(close)", "code": "newer"}]}
+    with Session(legacy_engine) as session:
+        (alpha,) = save_alphas("t", "c3", state, 1, session=session)
+        assert (alpha.id, alpha.code) == (2, "newer")
+        session.commit()
@@ -0,0 +1,4 @@
+import os
+
+# Unit tests must not require a running PostgreSQL instance.
+os.environ.setdefault("USE_POSTGRES_CHECKPOINT", "false")
@@ -0,0 +1,109 @@
+import asyncio
+
+from agent.agents import alpha_coder_agent as coder_module
+from agent.state import State
+
+
+class FakeResponse:
+    def __init__(self, content: str) -> None:
+        self.content = content
+
+
+class FakeLLM:
+    def __init__(self, *args, **kwargs) -> None:
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls: dict = {}
+        self.spans: dict = {}
+
+    async def ainvoke(self, messages):
+        prompt = messages[-1]["content"]
+        alpha_id = prompt.split("Alpha ID: ")[1].split("\n")[0]
+        self.calls[alpha_id] = self.calls.get(alpha_id, 0) + 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        started = asyncio.get_running_loop().time()
+        try:
+            if alpha_id == "broken":
+                raise RuntimeError("boom")
+            if alpha_id == "slow":
+                await asyncio.sleep(10)
+            await asyncio.sleep(0.1)
+            return FakeResponse(f"```python\nvalue = '{alpha_id}'\n```")
+        finally:
+            self.in_flight -= 1
+            finished = asyncio.get_running_loop().time()
+            self.spans.setdefault(alpha_id, []).append((started, finished))
+
+
+def _alpha(alpha_id: str) -> dict:
+    return {
+        "alphaID": alpha_id,
+        "expr": "\\sum_{i=1}^{5} r_{t-i}",
+        "desc": "d",
+        "variables": {},
+    }
+
+
+def test_alpha_coder_runs_concurrently_and_keeps_order(monkeypatch) -> None:
+    llm = FakeLLM()
+    monkeypatch.setattr(coder_module, "get_chat_model", lambda *a, **k: llm)
+    ids = ["a", "broken", "b", "slow", "c", "d"]
+    state = State(seed_alphas=[_alpha(i) for i in ids])
+    config = {
+        "configurable": {
+            "coder_max_concurrency": 3,
+            "coder_max_retries": 1,
+            "coder_retry_backoff": 0.01,
+            "coder_timeout": 0.5,
+            # Every alpha shares one expression; code each of them
+            "dedup_alphas": False,
+        }
+    }
+
+    result = asyncio.run(coder_module.alpha_coder_agent(state, config))
+
+    assert [a["alphaID"] for a in result["coded_alphas"]] == ["a", "b", "c", "d"]
+    assert result["coded_alphas"][0]["code"] == "value = 'a'"
+    assert llm.calls["broken"] == 2
+    assert llm.calls["slow"] == 2
+    assert llm.max_in_flight == 3
+    # The other alphas are coded while the slow one waits for its timeouts
+    slow = llm.spans["slow"]
+    overlapping = {
+        alpha_id
+        for alpha_id in ("a", "b", "c", "d")
+        for start, finish in llm.spans[alpha_id]
+        if any(start < slow_finish and slow_start < finish for slow_start, slow_finish in slow)
+    }
+    assert len(overlapping) >= 2
+
+
+def test_alpha_coder_skips_llm_for_dsl_expressions(monkeypatch) -> None:
+    llm = FakeLLM()
+    monkeypatch.setattr(coder_module, "get_chat_model", lambda *a, **k: llm)
+    alpha = dict(_alpha("dsl"), expr="rank(ts_mean(volume, 20))")
+
+    result = asyncio.run(coder_module.alpha_coder_agent(State(seed_alphas=[alpha]), {}))
+
+    assert llm.calls == {}
+    assert result["coded_alphas"][0]["engine"] == "dsl"
+    assert "def calculate_dsl(df)" in result["coded_alphas"][0]["code"]
+
+
+def test_alpha_coder_codes_equivalent_alphas_once(monkeypatch) -> None:
+    llm = FakeLLM()
+    monkeypatch.setattr(coder_module, "get_chat_model", lambda *a, **k: llm)
+    first = dict(_alpha("first"), expr="\\frac{R_t}{Q_t} - M_t")
+    second = dict(_alpha("second"), expr="-m + r / q")
+    other = dict(_alpha("other"), expr="\\frac{Q_t}{R_t}")
+
+    result = asyncio.run(
+        coder_module.alpha_coder_agent(State(seed_alphas=[first, second, other]), {})
+    )
+
+    assert llm.calls == {"first": 1, "other": 1}
+    coded = {a["alphaID"]: a for a in result["coded_alphas"]}
+    assert list(coded) == ["first", "second", "other"]
+    assert coded["second"]["code"] == "value = 'first'"
+    assert coded["second"]["expr"] == "-m + r / q"
@@ -0,0 +1,91 @@
+import asyncio
+import json
+import time
+
+from agent.agents import alpha_coder_agent as coder_module
+from agent.agents import alpha_generator_agent as generator_module
+from agent.llm.streaming import JSONObjectStream
+from agent.state import State
+
+FACTORS = {
+    f"factor_{i}": {
+        "description": "uses {braces} and \"quotes\" in text",
+        "formulation": f"\\sum_{{i=1}}^{{{i + 2}}} r_{{t-i}}",
+        "expression": "",
+        "variables": {"r": "return"},
+    }
+    for i in range(3)
+}
+RESPONSE = "```json\n" + json.dumps(FACTORS, indent=2) + "\n```"
+
+
+class FakeChunk:
+    def __init__(self, content: str) -> None:
+        self.content = content
+
+
+class StreamingLLM:
+    """Streams RESPONSE in small chunks, like a slow completion"""
+
+    cache = False
+
+    def __init__(self) -> None:
+        self.finished_at = None
+
+    async def astream(self, messages):
+        for start in range(0, len(RESPONSE), 20):
+            await asyncio.sleep(0.01)
+            yield FakeChunk(RESPONSE[start : start + 20])
+        self.finished_at = time.perf_counter()
+
+
+class CoderLLM:
+    def __init__(self) -> None:
+        self.started = []
+
+    async def ainvoke(self, messages):
+        self.started.append(time.perf_counter())
+        await asyncio.sleep(0.05)
+        return FakeChunk("```python\nvalue = 1\n```")
+
+
+def test_json_object_stream_emits_members_as_they_close() -> None:
+    parser = JSONObjectStream()
+    emitted = []
+    for start in range(0, len(RESPONSE), 7):
+        emitted.extend(parser.feed(RESPONSE[start : start + 7]))
+
+    assert emitted == list(FACTORS.items())
+    assert parser.done
+
+
+def test_generator_codes_factors_while_streaming(monkeypatch) -> None:
+    generator_llm = StreamingLLM()
+    coder_llm = CoderLLM()
+    monkeypatch.setattr(generator_module, "get_chat_model", lambda *a, **k: generator_llm)
+    monkeypatch.setattr(coder_module, "get_chat_model", lambda *a, **k: coder_llm)
+
+    state = State(hypothesis="h", coded_alphas=[{"alphaID": "stale"}])
+    result = asyncio.run(generator_module.alpha_generator_agent(state, {}))
+
+    assert [a["alphaID"] for a in result["seed_alphas"]] == list(FACTORS)
+    assert [a["alphaID"] for a in result["coded_alphas"]] == list(FACTORS)
+    # The first factor was being coded before the generation finished
+    assert min(coder_llm.started) < generator_llm.finished_at
+
+    # The coder node only codes what is still missing
+    state = State(seed_alphas=result["seed_alphas"], coded_alphas=result["coded_alphas"][:2])
+    coded = asyncio.run(coder_module.alpha_coder_agent(state, {}))
+    assert [a["alphaID"] for a in coded["coded_alphas"]] == list(FACTORS)
+    assert len(coder_llm.started) == 4
+
+
+def test_generator_without_streaming_leaves_coding_to_the_coder(monkeypatch) -> None:
+    generator_llm = StreamingLLM()
+    monkeypatch.setattr(generator_module, "get_chat_model", lambda *a, **k: generator_llm)
+
+    config = {"configurable": {"stream_factors": False}}
+    result = asyncio.run(generator_module.alpha_generator_agent(State(), config))
+
+    assert len(result["seed_alphas"]) == 3
+    assert result["coded_alphas"] == []
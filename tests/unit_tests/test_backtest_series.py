@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from agent.backtesting import BacktestSettings, batch_backtest, forward_returns
+from agent.database.backtest_series import decode_series, encode_series, series_to_lists
+from agent.market_data import load_panel, write_store
+
+
+def series(n=600):
+    rng = np.random.default_rng(0)
+    ic = rng.normal(0, 0.05, n).tolist()
+    ic[3] = None
+    return {
+        "dates": np.datetime_as_string(np.datetime64("2020-01-01") + np.arange(n)).tolist(),
+        "ic": ic,
+        "long_short_return": rng.normal(0, 0.01, n).tolist(),
+        "turnover": None,
+    }
+
+
+def test_round_trip_in_chunks() -> None:
+    original = series()
+
+    rows = encode_series(original, chunk_size=256)
+
+    # Three chunks of each stored series; missing series are skipped
+    assert sorted({(r["name"], r["chunk"]) for r in rows}) == [
+        (name, chunk) for name in ("dates", "ic", "long_short_return") for chunk in range(3)
+    ]
+    assert [r["length"] for r in rows if r["name"] == "ic"] == [256, 256, 88]
+    assert rows[0]["first_date"] == original["dates"][0]
+    assert rows[-1]["last_date"] == original["dates"][-1]
+
+    decoded = decode_series(reversed(rows))
+    assert np.isnan(decoded["ic"][3])
+    lists = series_to_lists(decoded)
+    assert lists == {k: v for k, v in original.items() if v is not None}
+
+
+def test_date_range_slicing() -> None:
+    n = 300
+    original = {
+        "dates": [f"{20200000 + i:08d}" for i in range(n)],
+        "ic": list(range(n)),
+    }
+    rows = encode_series(original, chunk_size=100)
+
+    # Only the chunks overlapping the range are needed
+    start, end = original["dates"][150], original["dates"][160]
+    needed = [r for r in rows if r["last_date"] >= start and r["first_date"] <= end]
+    assert {r["chunk"] for r in needed} == {1}
+
+    sliced = decode_series(needed, start=start, end=end)
+    assert sliced["ic"].tolist() == list(range(150, 161))
+    assert sliced["dates"].tolist() == original["dates"][150:161]
+
+
+def test_invalid_series_are_rejected() -> None:
+    with pytest.raises(ValueError):
+        encode_series({"ic": [1.0, 2.0], "turnover": [1.0]})
+    with pytest.raises(ValueError):
+        decode_series(encode_series({"ic": [1.0]}), start="2020-01-01")
+    assert encode_series({}) == [] and decode_series([]) == {}
+
+
+def test_datetime_panel_dates_slice_inclusively(tmp_path) -> None:
+    rng = np.random.default_rng(1)
+    dates = pd.date_range("2020-01-01", periods=10, freq="D")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (10, 8)), axis=0))
+    write_store(tmp_path / "store", dates, [f"S{i}" for i in range(8)], {"close": close})
+    panel = load_panel(str(tmp_path / "store"))
+
+    (metrics,) = batch_backtest(
+        [rng.normal(size=close.shape)],
+        forward_returns(panel.fields["close"]),
+        BacktestSettings(quantile=0.25),
+        dates=panel.dates,
+    )
+    assert metrics["series"]["dates"][:2] == ["2020-01-01", "2020-01-02"]
+
+    # Labels stored by older backtests are normalized as well
+    legacy = dict(metrics["series"], dates=[str(d) for d in panel.dates])
+    for stored in (metrics["series"], legacy):
+        sliced = decode_series(encode_series(stored), start="2020-01-03", end="2020-01-05")
+        assert sliced["dates"].tolist() == ["2020-01-03", "2020-01-04", "2020-01-05"]
@@ -0,0 +1,181 @@
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from agent.agents import backtest_agent as backtest_module
+from agent.agents.backtest_agent import backtest_agent
+from agent.backtesting import BacktestSettings, batch_backtest, forward_returns
+from agent.backtesting import backtester
+from agent.state import State
+
+
+def _prices(shape=(120, 40), seed=0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return 100 * np.cumprod(1 + rng.normal(0, 0.01, shape), axis=0)
+
+
+def test_forward_returns() -> None:
+    close = np.array([[1.0], [2.0], [3.0]])
+    np.testing.assert_allclose(
+        forward_returns(close), [[1.0], [0.5], [np.nan]], equal_nan=True
+    )
+
+
+def test_batch_backtest_scores_all_factors_at_once() -> None:
+    fwd = forward_returns(_prices())
+    rng = np.random.default_rng(1)
+    factors = [fwd, -fwd, rng.normal(size=fwd.shape)]
+
+    perfect, inverse, noise = batch_backtest(
+        factors, fwd, BacktestSettings(include_series=False)
+    )
+
+    assert perfect["ic"] == pytest.approx(1.0)
+    assert inverse["ic"] == pytest.approx(-1.0)
+    assert abs(noise["ic"]) < 0.1
+    assert perfect["annualized_return"] > 0 > inverse["annualized_return"]
+    assert perfect["information_ratio"] > 0
+    assert inverse["max_drawdown"] < 0
+    assert perfect["n_periods"] == len(fwd) - 1
+    assert "series" not in perfect
+
+
+def test_batch_backtest_matches_single_factor_runs() -> None:
+    fwd = forward_returns(_prices())
+    rng = np.random.default_rng(2)
+    factors = [rng.normal(size=fwd.shape) for _ in range(4)]
+    factors[0][rng.random(fwd.shape) < 0.1] = np.nan
+
+    batched = batch_backtest(factors, fwd, dates=list(range(len(fwd))))
+    assert len(batched[0]["series"]["ic"]) == len(fwd)
+    for factor, expected in zip(factors, batched):
+        single = batch_backtest([factor], fwd, dates=list(range(len(fwd))))[0]
+        assert single.pop("series") == expected.pop("series")
+        assert single == pytest.approx(expected, nan_ok=True)
+
+
+@pytest.mark.parametrize("budget", [8 * 40 * 120 * 2, 8 * 40 * 7])
+def test_batch_backtest_chunks_large_panels(monkeypatch, budget) -> None:
+    # Shrink the block budget so factors are chunked (two per block) or, when
+    # one factor does not fit, each one is scored in windows of seven dates
+    fwd = forward_returns(_prices())
+    rng = np.random.default_rng(3)
+    factors = [rng.normal(size=fwd.shape) for _ in range(3)]
+    factors[1][rng.random(fwd.shape) < 0.1] = np.nan
+    expected = batch_backtest(factors, fwd, BacktestSettings(horizon=5))
+
+    monkeypatch.setattr(backtester, "_MAX_BLOCK_ELEMENTS", budget)
+    chunked = batch_backtest(factors, fwd, BacktestSettings(horizon=5))
+
+    for single, full in zip(chunked, expected):
+        assert single.pop("series") == full.pop("series")
+        assert single == pytest.approx(full, nan_ok=True)
+
+
+def _write_panel(tmp_path):
+    close = _prices()
+    path = tmp_path / "panel.npz"
+    np.savez(
+        path,
+        dates=np.arange(len(close)),
+        instruments=np.arange(close.shape[1]),
+        close=close,
+        volume=np.ones_like(close),
+    )
+    return path
+
+
+def test_backtest_agent_fills_sota_alphas(tmp_path) -> None:
+    path = _write_panel(tmp_path)
+    state = State(
+        coded_alphas=[
+            {"alphaID": "momentum", "expr": "ts_delta(close, 5)", "desc": "m"},
+            {"alphaID": "latex_only", "expr": "\\sum_i r_i", "desc": "x"},
+        ],
+        sota_alphas=[{"id": "old", "backtest_results": {"information_ratio": -9.0}}],
+    )
+    config = {
+        "configurable": {
+            "market_data_path": str(path),
+            "sota_size": 2,
+            "factor_cache_path": str(tmp_path / "factors"),
+        }
+    }
+
+    result = asyncio.run(backtest_agent(state, config))
+
+    ids = [a["id"] for a in result["sota_alphas"]]
+    assert ids == ["momentum", "old"]
+    momentum = result["sota_alphas"][0]
+    assert set(momentum["backtest_results"]) >= {
+        "information_ratio",
+        "annualized_return",
+        "max_drawdown",
+        "ic",
+    }
+    assert momentum["performance"].startswith("IR=")
+
+
+def test_backtest_agent_skips_only_the_failing_alphas(tmp_path) -> None:
+    # The panel has no 'open' field, so evaluating the second alpha fails
+    path = _write_panel(tmp_path)
+    state = State(
+        coded_alphas=[
+            {"alphaID": "ranked", "expr": "rank(close)", "desc": "r"},
+            {"alphaID": "gap", "expr": "ts_mean(open, 5)", "desc": "g"},
+            {"alphaID": "momentum", "expr": "ts_delta(close, 5)", "desc": "m"},
+        ]
+    )
+    config = {"configurable": {"market_data_path": str(path), "sota_size": 5}}
+
+    result = asyncio.run(backtest_agent(state, config))
+
+    assert sorted(a["id"] for a in result["sota_alphas"]) == ["momentum", "ranked"]
+
+
+def test_backtest_agent_does_not_block_the_event_loop(tmp_path, monkeypatch) -> None:
+    path = _write_panel(tmp_path)
+    original = backtest_module.batch_backtest
+
+    def slow_batch_backtest(*args, **kwargs):
+        time.sleep(0.5)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(backtest_module, "batch_backtest", slow_batch_backtest)
+    state = State(
+        coded_alphas=[{"alphaID": "momentum", "expr": "ts_delta(close, 5)", "desc": "m"}]
+    )
+    config = {"configurable": {"market_data_path": str(path)}}
+
+    async def main():
+        ticks = 0
+        task = asyncio.create_task(backtest_agent(state, config))
+        while not task.done():
+            await asyncio.sleep(0.01)
+            ticks += 1
+        return ticks, task.result()
+
+    ticks, result = asyncio.run(main())
+
+    assert ticks >= 10
+    assert [a["id"] for a in result["sota_alphas"]] == ["momentum"]
+
+
+def test_metrics_are_annualized_per_holding_period() -> None:
+    close = _prices(seed=3)
+    fwd = forward_returns(close, horizon=5)
+    factor = -np.random.default_rng(4).normal(size=fwd.shape) + fwd
+
+    daily, weekly = (
+        batch_backtest([factor], fwd, BacktestSettings(horizon=h, include_series=False))[0]
+        for h in (1, 5)
+    )
+
+    assert weekly["annualized_return"] == pytest.approx(daily["annualized_return"] / 5)
+    assert weekly["information_ratio"] == pytest.approx(
+        daily["information_ratio"] / np.sqrt(5)
+    )
+    # Compounding overlapping 5-day returns every day overstates the drawdown
+    assert daily["max_drawdown"] < weekly["max_drawdown"] <= 0
@@ -0,0 +1,153 @@
+import asyncio
+import threading
+import time
+
+import numpy as np
+from langgraph.graph import StateGraph
+
+from agent.agents import backtest_agent as backtest_module
+from agent.agents import evolution_agent as evolution_module
+from agent.market_data import write_store
+from agent.services import run_batch
+from agent.state import State
+
+
+class FakeGraph:
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.configs = []
+
+    async def ainvoke(self, state, config):
+        self.configs.append(config)
+        idea = state.trading_idea if isinstance(state, State) else state.get("trading_idea")
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if idea == "broken":
+                raise RuntimeError("boom")
+            await asyncio.sleep(1.0 if idea == "slow" else 0.05)
+            return {"trading_idea": idea, "hypothesis": f"h({idea})"}
+        finally:
+            self.in_flight -= 1
+
+
+async def _collect(runs, **kwargs):
+    return [result async for result in run_batch(runs, **kwargs)]
+
+
+def test_run_batch_streams_results_and_isolates_failures() -> None:
+    graph = FakeGraph()
+    runs = ["slow", "a", "broken", State(trading_idea="b"), {"thread_id": "t-1"}]
+
+    results = asyncio.run(
+        _collect(
+            runs,
+            max_concurrency=2,
+            timeout=0.5,
+            configurable={"sota_size": 3},
+            graph=graph,
+        )
+    )
+
+    assert graph.max_in_flight == 2
+    assert len(results) == 5
+    # Results arrive as runs finish; the slow first run comes last
+    assert results[-1].index == 0
+    assert results[-1].error == "Timed out after 0.5s"
+
+    by_index = {r.index: r for r in results}
+    assert by_index[1].ok and by_index[1].state["hypothesis"] == "h(a)"
+    assert by_index[2].error == "RuntimeError: boom"
+    assert by_index[3].state["hypothesis"] == "h(b)"
+    assert by_index[4].thread_id == "t-1" and by_index[4].ok
+
+    thread_ids = {c["configurable"]["thread_id"] for c in graph.configs}
+    assert len(thread_ids) == 5
+    assert all(c["configurable"]["sota_size"] == 3 for c in graph.configs)
+
+
+def test_run_batch_cancels_pending_runs_when_closed_early() -> None:
+    graph = FakeGraph()
+
+    async def first_only():
+        stream = run_batch(["a"] + ["slow"] * 5, max_concurrency=1, graph=graph)
+        first = await stream.__anext__()
+        await stream.aclose()
+        return first
+
+    first = asyncio.run(first_only())
+    assert first.index == 0 and first.ok
+    assert len(graph.configs) <= 2
+
+
+def _store(tmp_path) -> str:
+    rng = np.random.default_rng(0)
+    close = 100 * np.cumprod(1 + rng.normal(0, 0.01, (80, 30)), axis=0)
+    fields = {"close": close, "volume": rng.lognormal(10, 1, close.shape)}
+    path = tmp_path / "store"
+    write_store(path, np.arange(80), [f"S{i}" for i in range(30)], fields)
+    return str(path)
+
+
+def _single_node_graph(name, node):
+    workflow = StateGraph(State)
+    workflow.add_node(name, node)
+    workflow.set_entry_point(name)
+    workflow.set_finish_point(name)
+    return workflow.compile()
+
+
+def test_run_batch_deadline_holds_while_a_node_is_computing(tmp_path, monkeypatch) -> None:
+    def busy_batch_backtest(*args, **kwargs):
+        deadline = time.perf_counter() + 2.0
+        while time.perf_counter() < deadline:
+            sum(range(1000))
+        return []
+
+    monkeypatch.setattr(backtest_module, "batch_backtest", busy_batch_backtest)
+    graph = _single_node_graph("backtest", backtest_module.backtest_agent)
+    state = State(coded_alphas=[{"alphaID": "a", "expr": "ts_delta(close, 5)"}])
+
+    results = asyncio.run(
+        _collect(
+            [state, state],
+            timeout=0.3,
+            configurable={"market_data_path": _store(tmp_path), "factor_cache_path": None},
+            graph=graph,
+        )
+    )
+
+    assert [r.error for r in results] == ["Timed out after 0.3s"] * 2
+    assert all(r.duration < 1.0 for r in results)
+
+
+def test_cancelled_evolution_stops_searching(tmp_path, monkeypatch) -> None:
+    finished = threading.Event()
+    original = evolution_module.evolve
+
+    def tracked_evolve(*args, **kwargs):
+        try:
+            return original(*args, **kwargs)
+        finally:
+            finished.set()
+
+    monkeypatch.setattr(evolution_module, "evolve", tracked_evolve)
+    graph = _single_node_graph("evolution", evolution_module.evolution_agent)
+    state = State(seed_alphas=[{"alphaID": "a", "dsl": "ts_delta(close, 5)"}])
+    configurable = {
+        "market_data_path": _store(tmp_path),
+        "evolution_generations": 10_000,
+        "evolution_population": 50,
+        "evolution_workers": 0,
+    }
+
+    start = time.perf_counter()
+    results = asyncio.run(
+        _collect([state], timeout=0.5, configurable=configurable, graph=graph)
+    )
+
+    assert results[0].error == "Timed out after 0.5s"
+    assert time.perf_counter() - start < 2.0
+    # The search thread notices the cancellation after its current generation
+    assert finished.wait(timeout=10)
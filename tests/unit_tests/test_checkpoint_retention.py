@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from agent.database.retention import (
+    CheckpointInfo,
+    RetentionPolicy,
+    RetentionReport,
+    plan_retention,
+)
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def thread(runs=4, steps=3, seed_at=None):
+    """Checkpoints of ``runs`` graph runs: an input checkpoint, then ``steps`` node steps"""
+    checkpoints, blobs, writes = [], {}, {}
+    parent = None
+    for run in range(runs):
+        for step in range(steps + 1):
+            n = len(checkpoints)
+            cid = f"{n:04d}"
+            version = f"{n:04d}"
+            blobs[("values", version)] = ("msgpack", 100)
+            writes[cid] = {"values": (1, 10), "history": (1, 5)}
+            history_version = f"h{n:04d}"
+            if n == seed_at:
+                blobs[("history", history_version)] = ("msgpack", 50)
+            checkpoints.append(
+                CheckpointInfo(
+                    checkpoint_id=cid,
+                    parent_id=parent,
+                    versions={"values": version, "history": history_version},
+                    source="input" if step == 0 else "loop",
+                    created_at=NOW - timedelta(days=1),
+                    size=1000,
+                )
+            )
+            parent = cid
+    return checkpoints, blobs, writes
+
+
+def policy(**kwargs):
+    kwargs.setdefault("min_age_seconds", 0)
+    return RetentionPolicy(delta_channels=("history",), **kwargs)
+
+
+def test_history_chain_is_kept_as_skeleton_back_to_the_snapshot() -> None:
+    checkpoints, blobs, writes = thread(seed_at=6)
+
+    plan = plan_retention(
+        checkpoints, blobs, writes, policy(keep_last=2, keep_iteration_boundaries=False), now=NOW
+    )
+
+    assert plan.keep == {"0014", "0015"}
+    # The latest checkpoints replay history writes back to the snapshot at 0006
+    assert plan.skeleton == {f"{n:04d}" for n in range(6, 14)}
+    assert plan.delete == {f"{n:04d}" for n in range(6)}
+    # Only value blobs of pruned checkpoints go; the snapshot blob stays
+    assert plan.blobs == [("values", f"{n:04d}") for n in range(14)]
+    assert plan.writes == 6 * 2 + 8
+    assert plan.reclaimable_bytes == 6 * (1000 + 15) + 8 * 10 + 14 * 100
+
+
+def test_boundaries_references_and_recent_checkpoints_are_kept() -> None:
+    checkpoints, blobs, writes = thread(seed_at=10)
+    young = checkpoints[5]._replace(created_at=NOW - timedelta(minutes=5))
+    checkpoints[5] = young
+
+    plan = plan_retention(
+        checkpoints,
+        blobs,
+        writes,
+        policy(keep_last=1, min_age_seconds=3600),
+        referenced=["0001", "unknown"],
+        now=NOW,
+    )
+
+    # Last checkpoint of every run, the referenced and the young checkpoint
+    assert plan.keep == {"0003", "0007", "0011", "0015", "0001", "0005"}
+    # Input checkpoints after a kept boundary mark it as one, so they stay
+    assert {"0004", "0008", "0012"} <= plan.skeleton
+    assert not plan.keep & plan.skeleton
+    assert not (plan.keep | plan.skeleton) & plan.delete
+    kept_values = {("values", cid) for cid in plan.keep}
+    assert not kept_values & set(plan.blobs)
+
+
+def test_already_pruned_checkpoints_are_not_pruned_again() -> None:
+    checkpoints, blobs, writes = thread()
+    checkpoints = [c._replace(pruned=True, strippable=400) for c in checkpoints]
+
+    plan = plan_retention(checkpoints, blobs, writes, policy(keep_last=4), now=NOW)
+
+    assert plan.newly_pruned == 0
+    assert plan.delete == set()
+
+
+def test_policy_defaults_and_validation() -> None:
+    assert RetentionPolicy().delta_channels == ("hypothesis_history", "alpha_history")
+    with pytest.raises(ValueError):
+        RetentionPolicy(keep_last=0)
+
+    report = RetentionReport(dry_run=True, threads=1, reclaimable_bytes=2**20)
+    report.merge(RetentionReport(threads=2, checkpoints_deleted=3))
+    assert (report.threads, report.checkpoints_deleted, report.dry_run) == (3, 3, True)
+    assert "would reclaim 1.0 MiB in 3 threads" in report.summary()
@@ -0,0 +1,72 @@
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import StateGraph
+
+from agent.database.checkpoint_serde import (
+    REFERENCE_KEY,
+    MemoryPayloadStore,
+    OffloadingSerializer,
+)
+from agent.state import State
+
+CODE = "import pandas as pd\n\n" + "# long generated code\n" * 50
+
+
+def test_large_values_are_stored_once_by_reference() -> None:
+    store = MemoryPayloadStore()
+    serde = OffloadingSerializer(store)
+    value = [
+        {"alphaID": "a", "code": CODE, "expr": "x"},
+        {"alphaID": "b", "code": CODE, "expr": "y"},
+        {"alphaID": "c", "code": "short", "backtest_results": {"series": None}},
+    ]
+
+    type_, data = serde.dumps_typed(value)
+
+    assert CODE.encode() not in data
+    assert len(store) == 1
+    assert serde.loads_typed((type_, data)) == value
+    # Plain serialization keeps the reference rather than the code
+    assert serde.serde.loads_typed((type_, data))[0]["code"].keys() == {REFERENCE_KEY}
+
+
+def _graph(saver):
+    def generate(state: State):
+        return {
+            "coded_alphas": [{"alphaID": "a", "code": CODE}],
+            "hypothesis_history": [{"hypothesis": f"h{len(state.hypothesis_history)}"}],
+        }
+
+    def backtest(state: State):
+        return {"alpha_history": [{"id": "a", "ic": 0.1}]}
+
+    workflow = StateGraph(State)
+    workflow.add_node("generate", generate)
+    workflow.add_node("backtest", backtest)
+    workflow.add_edge("__start__", "generate")
+    workflow.add_edge("generate", "backtest")
+    workflow.add_edge("backtest", "__end__")
+    return workflow.compile(checkpointer=saver)
+
+
+def test_history_channels_append_and_checkpoints_hold_references() -> None:
+    store = MemoryPayloadStore()
+    saver = MemorySaver(serde=OffloadingSerializer(store))
+    graph = _graph(saver)
+    config = {"configurable": {"thread_id": "t"}}
+
+    for _ in range(3):
+        graph.invoke({}, config)
+
+    values = graph.get_state(config).values
+    assert [h["hypothesis"] for h in values["hypothesis_history"]] == ["h0", "h1", "h2"]
+    assert len(values["alpha_history"]) == 3
+    assert values["coded_alphas"][0]["code"] == CODE
+
+    # The code was stored once, however many checkpoints refer to it
+    assert len(store) == 1
+    checkpoint = saver.get_tuple(config).checkpoint
+    # History channels are rebuilt from writes, not stored with each checkpoint
+    assert "hypothesis_history" not in checkpoint["channel_values"]
+    assert "alpha_history" not in checkpoint["channel_values"]
+    for (_, _, channel, _), (_, blob) in saver.blobs.items():
+        assert CODE.encode() not in blob, channel
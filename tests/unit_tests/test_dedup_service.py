@@ -0,0 +1,26 @@
+import asyncio
+
+from agent.services import dedup_service
+
+
+def test_recorded_metrics_leave_out_series(monkeypatch) -> None:
+    saved = []
+
+    async def asave_fingerprints(rows):
+        saved.extend(rows)
+        return len(rows)
+
+    monkeypatch.setenv("USE_POSTGRES_CHECKPOINT", "true")
+    monkeypatch.setattr(dedup_service, "asave_fingerprints", asave_fingerprints)
+    metrics = {"information_ratio": 0.4, "ic": 0.02, "series": {"dates": ["2020-01-02"]}}
+    alphas = [
+        {"alphaID": "a", "expr": "rank(close)", "code": "..."},
+        {"alphaID": "b", "expr": "rank(volume)", "code": "..."},
+    ]
+
+    assert asyncio.run(dedup_service.arecord_alphas(alphas, "t", {"a": metrics}, "v1")) == 2
+
+    assert saved[0]["metrics"] == {"information_ratio": 0.4, "ic": 0.02}
+    assert saved[0]["metrics_version"] == "v1"
+    assert saved[1]["metrics"] is None and saved[1]["metrics_version"] is None
+    assert "series" in metrics
@@ -0,0 +1,265 @@
+import asyncio
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from agent.agents import evolution_agent as evolution_module
+from agent.agents.evolution_agent import evolution_agent
+from agent.evolution import (
+    EvolutionSettings,
+    FitnessEvaluator,
+    SubtreeMemo,
+    close_fitness_evaluators,
+    crossover,
+    depth,
+    evolve,
+    get_fitness_evaluator,
+    mutate,
+    random_tree,
+)
+from agent.evolution.engine import _individual
+from agent.factors import parse_expression
+from agent.market_data import write_store
+from agent.state import State
+
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    rng = np.random.default_rng(0)
+    close = 100 * np.cumprod(1 + rng.normal(0, 0.01, (80, 30)), axis=0)
+    fields = {
+        "open": close * rng.uniform(0.99, 1.01, close.shape),
+        "high": close * 1.01,
+        "low": close * 0.99,
+        "close": close,
+        "volume": rng.lognormal(10, 1, close.shape),
+    }
+    path = tmp_path_factory.mktemp("store") / "store"
+    write_store(path, np.arange(80), [f"S{i}" for i in range(30)], fields)
+    return str(path)
+
+
+def test_variation_keeps_trees_valid() -> None:
+    rng = random.Random(0)
+    trees = [random_tree(rng, 4) for _ in range(50)]
+    for first, second in zip(trees, trees[1:]):
+        for child in (mutate(rng, first, 5), crossover(rng, first, second, 5)):
+            assert depth(child) <= 5
+            # Every child is valid DSL and survives a round trip
+            assert parse_expression(child.to_text()) == child
+
+
+def test_subtree_memo_evicts_least_recently_used() -> None:
+    memo = SubtreeMemo(max_bytes=3 * 80)
+    nodes = [parse_expression(f"ts_mean(close, {w})") for w in (2, 3, 5, 10)]
+    for node in nodes[:3]:
+        memo[node] = np.zeros(10)
+    memo[nodes[0]]
+    memo[nodes[3]] = np.zeros(10)
+
+    assert nodes[1] not in memo
+    assert nodes[0] in memo and nodes[3] in memo
+    assert memo.nbytes == 3 * 80
+
+    memo.exclude = {nodes[1]}
+    memo[nodes[1]] = np.zeros(10)
+    assert nodes[1] not in memo
+
+
+def test_evolve_improves_on_seeds_and_reports_progress(store) -> None:
+    reports = []
+    settings = EvolutionSettings(population_size=40, generations=3, seed=1)
+    with FitnessEvaluator(store, workers=0, batch_size=16) as evaluator:
+        seed_only = evolve(
+            ["ts_delta(close, 5)"],
+            evaluator,
+            EvolutionSettings(population_size=1, generations=0),
+            progress=lambda stats: None,
+        )
+        hall = evolve(["ts_delta(close, 5)"], evaluator, settings, progress=reports.append)
+
+    assert [stats.generation for stats in reports] == [0, 1, 2, 3]
+    # The seed was already scored, and elites carry over without re-scoring
+    assert reports[0].evaluated < reports[0].population
+    assert all(stats.evaluated < stats.population for stats in reports[1:])
+    assert any(stats.memo_hit_rate > 0 for stats in reports)
+
+    fitness = [individual.fitness for individual in hall]
+    assert fitness == sorted(fitness, reverse=True)
+    assert len({individual.digest for individual in hall}) == len(hall)
+    assert hall[0].fitness >= seed_only[0].fitness
+    assert reports[-1].best_fitness == hall[0].fitness
+
+
+def test_worker_processes_match_in_process_evaluation(store) -> None:
+    settings = EvolutionSettings(population_size=20, generations=1, seed=3)
+    with FitnessEvaluator(store, workers=0) as evaluator:
+        local = evolve(["rank(volume)"], evaluator, settings, progress=lambda s: None)
+    with FitnessEvaluator(store, workers=2) as evaluator:
+        parallel = evolve(["rank(volume)"], evaluator, settings, progress=lambda s: None)
+
+    assert [i.expression for i in parallel] == [i.expression for i in local]
+    np.testing.assert_allclose([i.fitness for i in parallel], [i.fitness for i in local])
+
+
+def test_holdout_dates_are_scored_apart_from_the_fitness(store) -> None:
+    individual = _individual(parse_expression("ts_delta(close, 5)"), 0, 0)
+    with FitnessEvaluator(store, workers=0, horizon=2, holdout=0.25) as evaluator:
+        evaluator.evaluate([individual])
+
+    training, validation = individual.metrics, individual.metrics["validation"]
+    # 60 training dates, of which the last 2 have returns ending after the
+    # split, and 5 more without factor values
+    assert training["n_periods"] == 60 - 2 - 5
+    assert validation["n_periods"] == 20 - 2
+    assert training["ic"] != validation["ic"]
+
+
+def test_shared_evaluator_serves_concurrent_runs(store) -> None:
+    settings = EvolutionSettings(population_size=20, generations=2, seed=5)
+    with FitnessEvaluator(store, workers=0) as evaluator:
+        expected = evolve(["rank(volume)"], evaluator, settings, progress=lambda s: None)
+    with FitnessEvaluator(store, workers=0) as evaluator:
+        with ThreadPoolExecutor(4) as pool:
+            halls = list(
+                pool.map(
+                    lambda _: evolve(
+                        ["rank(volume)"], evaluator, settings, progress=lambda s: None
+                    ),
+                    range(4),
+                )
+            )
+
+    for hall in halls:
+        assert [i.expression for i in hall] == [i.expression for i in expected]
+
+
+def test_replaced_evaluator_closes_after_its_last_lease(store) -> None:
+    try:
+        first = get_fitness_evaluator(store, "v1", workers=0)
+        again = get_fitness_evaluator(store, "v1", workers=0)
+        assert again is first
+
+        newer = get_fitness_evaluator(store, "v2", workers=0)
+        assert newer is not first
+        first.release()
+        # Still leased by the other run
+        assert first.evaluate([]).evaluated == 0
+        again.release()
+        with pytest.raises(RuntimeError):
+            first.evaluate([])
+        newer.release()
+    finally:
+        close_fitness_evaluators()
+
+
+def test_evolution_agent_adds_evolved_alphas_to_sota(store) -> None:
+    state = State(seed_alphas=[{"alphaID": "a", "expr": "x", "dsl": "ts_delta(close, 5)"}])
+    config = {
+        "configurable": {
+            "market_data_path": store,
+            "evolution_generations": 1,
+            "evolution_population": 20,
+            "evolution_workers": 0,
+            "sota_size": 3,
+        }
+    }
+
+    result = asyncio.run(evolution_agent(state, config))
+
+    assert 0 < len(result["sota_alphas"]) <= 3
+    for alpha in result["sota_alphas"]:
+        assert alpha["id"].startswith("evolved_")
+        assert alpha["origin"] == "evolution"
+        parse_expression(alpha["dsl"])
+        assert alpha["backtest_results"]["ic"] is not None
+        # SOTA admission uses the held-out dates the search never saw
+        assert "validation" not in alpha["backtest_results"]
+        assert alpha["backtest_results"]["n_periods"] <= 24
+
+
+def test_evolution_agent_ranks_sota_on_the_holdout(store) -> None:
+    # The stored IRs are full-sample; the ranking must not use them
+    state = State(
+        seed_alphas=[{"alphaID": "a", "expr": "x", "dsl": "ts_delta(close, 5)"}],
+        sota_alphas=[
+            {"id": "old", "dsl": "rank(volume)", "backtest_results": {"information_ratio": 99.0}},
+            {"id": "coded", "expression": r"\sum_i r_i", "backtest_results": {"information_ratio": -9.0}},
+        ],
+    )
+    config = {
+        "configurable": {
+            "market_data_path": store,
+            "evolution_generations": 1,
+            "evolution_population": 20,
+            "evolution_workers": 0,
+            "evolution_holdout": 0.3,
+            "sota_size": 50,
+        }
+    }
+
+    result = asyncio.run(evolution_agent(state, config))
+
+    with FitnessEvaluator(store, workers=0, holdout=0.3) as evaluator:
+        (old,) = evaluator.score(["rank(volume)"])
+    ids = [a["id"] for a in result["sota_alphas"]]
+    # Not scorable on the held-out dates, so kept as is
+    assert ids[0] == "coded"
+    holdout_ir = [
+        old["validation"]["information_ratio"]
+        if a["id"] == "old"
+        else a["backtest_results"]["information_ratio"]
+        for a in result["sota_alphas"][1:]
+    ]
+    holdout_ir = [value if value is not None else float("-inf") for value in holdout_ir]
+    assert "old" in ids
+    assert holdout_ir == sorted(holdout_ir, reverse=True)
+
+
+def test_cancelled_evolution_keeps_its_lease_until_the_search_stops(
+    store, monkeypatch
+) -> None:
+    started, finish = threading.Event(), threading.Event()
+    seen = {}
+
+    def slow_evolve(seeds, evaluator, settings, stop=None):
+        started.set()
+        finish.wait(5)
+        seen.update(evaluator=evaluator, leases=evaluator._leases, stopped=stop.is_set())
+        return []
+
+    monkeypatch.setattr(evolution_module, "evolve", slow_evolve)
+    state = State(seed_alphas=[{"alphaID": "a", "dsl": "rank(volume)"}])
+    config = {
+        "configurable": {
+            "market_data_path": store,
+            "evolution_generations": 1,
+            "evolution_workers": 0,
+        }
+    }
+
+    async def main():
+        task = asyncio.create_task(evolution_agent(state, config))
+        await asyncio.to_thread(started.wait, 5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        finish.set()
+
+    try:
+        # asyncio.run waits for the worker thread before returning
+        asyncio.run(main())
+        assert seen["stopped"]
+        assert seen["leases"] == 1
+        assert seen["evaluator"]._leases == 0
+    finally:
+        close_fitness_evaluators()
+
+
+def test_evolution_agent_is_disabled_with_zero_generations(store) -> None:
+    state = State(seed_alphas=[{"alphaID": "a", "dsl": "rank(volume)"}])
+    config = {"configurable": {"market_data_path": store, "evolution_generations": 0}}
+    assert asyncio.run(evolution_agent(state, config)) == {}
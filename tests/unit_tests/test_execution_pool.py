@@ -0,0 +1,100 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from agent.execution import ExecutionLimits, FactorExecutionPool
+from agent.execution.worker import panel_frame
+from agent.factors import dsl_code
+from agent.market_data import MarketPanel, write_store
+
+PANDAS_CODE = '''
+import pandas as pd
+
+def calculate_ratio(df):
+    return pd.DataFrame({"ratio": df["close"] / df["volume"]}, index=df.index)
+
+if __name__ == "__main__":
+    df = pd.read_hdf("daily_pv.h5", key="data")
+'''
+
+
+@pytest.fixture(scope="module")
+def fields():
+    rng = np.random.default_rng(0)
+    return {
+        "close": rng.uniform(10, 20, (40, 6)),
+        "volume": rng.uniform(1e5, 2e5, (40, 6)),
+    }
+
+
+@pytest.fixture(scope="module")
+def pool(tmp_path_factory, fields):
+    path = tmp_path_factory.mktemp("store") / "store"
+    dates = np.arange("2021-01-01", "2021-02-10", dtype="datetime64[D]").astype(str)
+    write_store(path, dates, [f"S{i}" for i in range(6)], fields)
+    limits = ExecutionLimits(cpu_seconds=1, wall_seconds=3, memory_mb=256)
+    with FactorExecutionPool(str(path), workers=1, limits=limits) as pool:
+        yield pool
+
+
+def test_pool_runs_generated_code(pool, fields) -> None:
+    ratio, mean = pool.map(
+        [("ratio", PANDAS_CODE), ("mean", dsl_code("mean", "ts_mean(close, 5)"))]
+    )
+
+    assert ratio.ok and mean.ok
+    np.testing.assert_allclose(ratio.values, fields["close"] / fields["volume"])
+    assert np.isnan(mean.values[:4]).all()
+    np.testing.assert_allclose(mean.values[4], fields["close"][:5].mean(axis=0))
+
+
+@pytest.mark.parametrize("alpha_id", ["alpha-1", "my alpha", "3day_reversal"])
+def test_dsl_code_compiles_for_any_alpha_id(pool, fields, alpha_id) -> None:
+    result = pool.run(alpha_id, dsl_code(alpha_id, "close / volume"))
+
+    assert result.ok, result.error
+    np.testing.assert_allclose(result.values, fields["close"] / fields["volume"])
+
+
+def test_pool_reports_errors(pool) -> None:
+    failed = pool.run("broken", "def calculate_broken(df):\n    raise ValueError('bad')")
+    assert not failed.ok
+    assert "ValueError: bad" in failed.error
+
+    missing = pool.run("missing", "x = 1")
+    assert "No calculate_missing function" in missing.error
+
+    too_big = pool.run(
+        "big", "import numpy as np\ndef calculate_big(df):\n    return np.ones(10**11)"
+    )
+    assert too_big.error == "Memory limit exceeded"
+
+
+def test_pool_kills_and_replaces_runaway_workers(pool) -> None:
+    spin = pool.run("spin", "def calculate_spin(df):\n    while True:\n        pass")
+    assert spin.error == "CPU time limit exceeded"
+
+    sleep = pool.run(
+        "sleep", "import time\ndef calculate_sleep(df):\n    time.sleep(30)"
+    )
+    assert sleep.error == "Wall time limit exceeded"
+
+    assert pool.run("ratio", PANDAS_CODE).ok
+
+
+def test_panel_frame_parses_iso_labels_without_warnings() -> None:
+    close = np.ones((3, 2))
+    for dates in (
+        np.array(["2021-01-04", "2021-01-05", "2021-01-06"]),
+        np.array([20210104, 20210105, 20210106]),
+        np.arange("2021-01-04", "2021-01-07", dtype="datetime64[D]"),
+    ):
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            frame = panel_frame(MarketPanel(dates, np.array(["A", "B"]), {"close": close}))
+        assert frame.index.levels[0][-1] == pd.Timestamp("2021-01-06")
+
+    periods = panel_frame(MarketPanel(np.arange(3), np.array(["A", "B"]), {"close": close}))
+    assert periods.index.levels[0].tolist() == [0, 1, 2]
@@ -0,0 +1,86 @@
+import asyncio
+import os
+
+import numpy as np
+
+from agent.agents import backtest_agent as backtest_module
+from agent.configuration import Configuration
+from agent.factors import FactorValueCache, factor_key, normalize_code
+from agent.market_data import MarketPanel
+
+CODE = """
+import pandas as pd
+
+def calculate_{name}(df):
+    # {comment}
+    return df["close"].pct_change()
+"""
+
+
+def test_code_keys_ignore_formatting_and_function_name() -> None:
+    first = CODE.format(name="alpha_1", comment="momentum")
+    second = CODE.format(name="other", comment="renamed").replace("(df):", "( df ):")
+
+    assert normalize_code(first) == normalize_code(second)
+    assert factor_key("v1", code=first) == factor_key("v1", code=second)
+    assert factor_key("v1", code=first) != factor_key("v2", code=first)
+    assert factor_key("v1", expression="close - open") == factor_key(
+        "v1", expression="-open + close"
+    )
+
+
+def test_cache_round_trip_is_memory_mapped(tmp_path) -> None:
+    cache = FactorValueCache(tmp_path)
+    values = np.arange(12.0).reshape(3, 4)
+
+    assert cache.get("ab" * 32) is None
+    cache.put("ab" * 32, values)
+    cached = cache.get("ab" * 32)
+
+    assert isinstance(cached, np.memmap)
+    np.testing.assert_array_equal(cached, values)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cache_evicts_least_recently_used(tmp_path) -> None:
+    panel = np.zeros((10, 10))  # 928 bytes per file with the .npy header
+    cache = FactorValueCache(tmp_path, max_bytes=3000)
+    keys = [f"{i:064x}" for i in range(3)]
+    for age, key in enumerate(keys):
+        cache.put(key, panel)
+        file = tmp_path / key[:2] / f"{key}.npy"
+        os.utime(file, ns=(age * 10**9, age * 10**9))
+
+    cache.get(keys[0])  # most recently used now
+    cache.put(f"{3:064x}", panel)
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    assert cache.size()["entries"] == 3
+
+
+def test_compute_factor_values_reads_cached_panels(tmp_path, monkeypatch) -> None:
+    rng = np.random.default_rng(0)
+    close = rng.normal(size=(20, 5)) + 10
+    panel = MarketPanel(
+        dates=np.arange(20), instruments=np.arange(5), fields={"close": close}
+    )
+    data_path = tmp_path / "panel.npz"
+    data_path.write_bytes(b"data")
+    configuration = Configuration(factor_cache_path=str(tmp_path / "factors"))
+    alphas = [{"alphaID": "a", "expr": "ts_delta(close, 2)"}]
+
+    first = asyncio.run(
+        backtest_module.compute_factor_values(alphas, panel, str(data_path), configuration)
+    )
+
+    def fail(*args, **kwargs):
+        raise AssertionError("cached factors must not be recomputed")
+
+    monkeypatch.setattr(backtest_module, "evaluate_batch", fail)
+    renamed = [{"alphaID": "b", "expr": "ts_delta(close, 2)"}]
+    second = asyncio.run(
+        backtest_module.compute_factor_values(renamed, panel, str(data_path), configuration)
+    )
+
+    np.testing.assert_array_equal(second["b"], first["a"])
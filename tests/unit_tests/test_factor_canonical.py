@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from agent.factors import canonicalize, evaluate, fingerprint, parse_expression
+
+
+@pytest.mark.parametrize(
+    "left,right",
+    [
+        ("close - open", "-open + close"),
+        ("volume * close", "close * volume"),
+        ("(close + open) + high", "high + (open + close)"),
+        ("close * 2 * 3", "6 * close"),
+        ("close / 1 + 0", "close"),
+        ("--rank(close)", "rank(close)"),
+        ("ts_corr(close, volume, 10)", "ts_corr(volume, close, 10)"),
+        ("max(close, open)", "maximum(open, close)"),
+        ("ts_mean(vol, 5) * (2 + 3)", "5 * ts_mean(volume, 5)"),
+        (r"\frac{R_t}{Q_t}", "r / q"),
+        ("Alpha = close / open", r"\frac{\text{close}}{\text{open}}"),
+        (r"\sum_{i=1}^{5} x_{t-i}", r"F = \sum_{i=1}^{5}  x_{t-i}"),
+    ],
+)
+def test_equivalent_formulations_share_a_fingerprint(left, right) -> None:
+    assert fingerprint(left).digest == fingerprint(right).digest
+
+
+@pytest.mark.parametrize(
+    "left,right",
+    [
+        ("close / open", "open / close"),
+        ("close - open", "open - close"),
+        ("ts_mean(close, 5)", "ts_mean(close, 10)"),
+        ("r / q", "q / r"),
+    ],
+)
+def test_different_formulations_differ(left, right) -> None:
+    assert fingerprint(left).digest != fingerprint(right).digest
+
+
+def test_canonical_form_evaluates_like_the_original() -> None:
+    rng = np.random.default_rng(0)
+    fields = {
+        name: rng.normal(size=(30, 8)) + 5.0
+        for name in ("open", "high", "low", "close", "volume")
+    }
+    node = parse_expression(
+        "rank(close - open) * (2 + 1) - ts_corr(volume, close, 5) / 1 + --high"
+    )
+
+    np.testing.assert_allclose(
+        evaluate(canonicalize(node), fields),
+        evaluate(node, fields),
+        equal_nan=True,
+    )
+
+
+def test_unparseable_formulation_falls_back_to_text() -> None:
+    result = fingerprint(r"\mathbb{E}[r_t \mid \mathcal{F}_{t-1}]")
+
+    assert result.kind == "text"
+    assert result.digest == fingerprint(r"\mathbb{E}[r_t\mid\mathcal{F}_{t-1}]").digest
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from agent.factors import IncrementalEvaluator, evaluate_batch, evaluate_incremental
+
+EXPRESSIONS = {
+    "mean": "ts_mean(close, 5)",
+    "std_over_sum": "ts_std(close, 10) / ts_sum(volume, 3)",
+    "delta": "ts_delta(close, 3) + ts_delay(open, 0)",
+    "range": "ts_min(low, 4) - ts_max(high, 6)",
+    "rank": "rank(ts_rank(close, 8))",
+    "corr": "ts_corr(close, volume, 12)",
+    "nested": "ts_mean(ts_std(close, 5), 7)",
+    "elementwise": "-log(volume) * 2",
+    "extremes": "maximum(close - open, 0) + minimum(high, ts_max(low, 3))",
+}
+
+
+@pytest.fixture
+def panel():
+    rng = np.random.default_rng(1)
+    data = {
+        name: rng.normal(size=(80, 7)) + 10
+        for name in ("open", "high", "low", "close", "volume")
+    }
+    data["close"][5, 2] = np.nan
+    data["volume"][40, 3] = np.nan
+    data["volume"][:, 4] = 3.0  # constant series: degenerate correlation
+    return data
+
+
+def test_incremental_matches_batch_evaluation(panel) -> None:
+    batch = evaluate_batch(EXPRESSIONS, panel)
+    incremental = evaluate_incremental(EXPRESSIONS, panel)
+
+    for name in EXPRESSIONS:
+        np.testing.assert_allclose(
+            incremental[name], batch[name], rtol=1e-9, atol=1e-12, equal_nan=True
+        )
+
+
+def test_warmup_reads_only_the_lookback_window(panel) -> None:
+    evaluator = IncrementalEvaluator(EXPRESSIONS, n_instruments=7)
+    tail = {name: values[-(evaluator.lookback + 1) :] for name, values in panel.items()}
+
+    last = evaluator.warmup(tail)
+
+    batch = evaluate_batch(EXPRESSIONS, panel)
+    for name in EXPRESSIONS:
+        np.testing.assert_allclose(last[name], batch[name][-1], rtol=1e-9, equal_nan=True)
+
+
+def test_state_round_trip_continues_the_series(panel, tmp_path) -> None:
+    head = {name: values[:50] for name, values in panel.items()}
+    evaluator = IncrementalEvaluator(EXPRESSIONS, n_instruments=7)
+    evaluate_incremental(EXPRESSIONS, head, state=evaluator)
+    evaluator.save(tmp_path / "state.npz")
+
+    restored = IncrementalEvaluator.load(tmp_path / "state.npz")
+    results = restored.update({name: values[50] for name, values in panel.items()})
+
+    batch = evaluate_batch(EXPRESSIONS, {name: values[:51] for name, values in panel.items()})
+    assert restored.bars == 51
+    for name in EXPRESSIONS:
+        np.testing.assert_allclose(results[name], batch[name][-1], rtol=1e-9, equal_nan=True)
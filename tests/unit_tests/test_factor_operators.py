@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from agent.factors import evaluate, is_dsl_expression
+from agent.factors import operators as ops
+
+
+def _panel(seed: int = 0, shape=(60, 7)) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    x = rng.normal(100.0, 5.0, shape)
+    x[rng.random(shape) < 0.05] = np.nan
+    return x
+
+
+def _rolling_reference(x: np.ndarray, window: int, reducer) -> np.ndarray:
+    out = np.full_like(x, np.nan)
+    for t in range(window - 1, len(x)):
+        block = x[t - window + 1 : t + 1]
+        for j in range(x.shape[1]):
+            column = block[:, j]
+            if not np.isnan(column).any():
+                out[t, j] = reducer(column)
+    return out
+
+
+@pytest.mark.parametrize(
+    "name,reducer",
+    [
+        ("ts_mean", np.mean),
+        ("ts_sum", np.sum),
+        ("ts_std", lambda c: np.std(c, ddof=1)),
+        ("ts_min", np.min),
+        ("ts_max", np.max),
+        (
+            "ts_rank",
+            lambda c: ((c < c[-1]).sum() + ((c == c[-1]).sum() + 1) / 2) / len(c),
+        ),
+    ],
+)
+def test_rolling_operators_match_reference(name, reducer) -> None:
+    x = np.round(_panel(), 0)
+    expected = _rolling_reference(x, 5, reducer)
+    np.testing.assert_allclose(getattr(ops, name)(x, 5), expected, atol=1e-9)
+
+
+def test_ts_corr_matches_reference_and_handles_constant_windows() -> None:
+    x, y = _panel(1), _panel(2)
+    x[:, 0] = 3.0
+    result = ops.ts_corr(x, y, 6)
+    for t in range(5, len(x)):
+        for j in range(1, x.shape[1]):
+            xs, ys = x[t - 5 : t + 1, j], y[t - 5 : t + 1, j]
+            if np.isnan(xs).any() or np.isnan(ys).any():
+                assert np.isnan(result[t, j])
+            else:
+                assert result[t, j] == pytest.approx(np.corrcoef(xs, ys)[0, 1])
+    assert np.isnan(result[:, 0]).all()
+
+
+def test_rank_averages_ties_and_keeps_nans() -> None:
+    x = np.array([[3.0, 1.0, 3.0, np.nan, 2.0]])
+    np.testing.assert_allclose(
+        ops.rank(x), [[0.875, 0.25, 0.875, np.nan, 0.5]], equal_nan=True
+    )
+
+
+def test_evaluate_expression() -> None:
+    data = {"close": _panel(3), "volume": np.abs(_panel(4))}
+    result = evaluate("rank(ts_mean(volume, 5)) / log(close) - 1", data)
+    expected = ops.rank(ops.ts_mean(data["volume"], 5)) / ops.log(data["close"]) - 1
+    np.testing.assert_allclose(result, expected, equal_nan=True)
+
+
+def test_is_dsl_expression() -> None:
+    assert is_dsl_expression("ts_corr(close, volume, 10)")
+    assert not is_dsl_expression("ts_corr(close, volume)")
+    assert is_dsl_expression("\\frac{close}{open}")
+    assert not is_dsl_expression("\\sum_{i=1}^{5} r_{t-i}")
+    assert not is_dsl_expression("__import__('os')")
@@ -0,0 +1,147 @@
+import numpy as np
+import pytest
+
+from agent.factors import (
+    DSLError,
+    evaluate,
+    evaluate_batch,
+    parse_expression,
+    parse_formulation,
+    topological_order,
+)
+from agent.factors import evaluator
+from agent.factors import operators as ops
+
+
+@pytest.mark.parametrize(
+    "formulation,expected",
+    [
+        ("ts_mean(volume, 20) / close", "div(ts_mean(volume, 20), close)"),
+        ("-close ^ 2 + 1", "add(neg(pow(close, 2)), 1)"),
+        (
+            r"\frac{\log(\text{volume})}{\text{close} - \text{open}}",
+            "div(log(volume), sub(close, open))",
+        ),
+        (
+            r"\frac{\text{close}_t - \text{close}_{t-5}}{\text{close}_{t-5}}",
+            "div(sub(close, ts_delay(close, 5)), ts_delay(close, 5))",
+        ),
+        (
+            r"\text{rank}\left(\text{ts\_corr}(\text{close}, \text{volume}, 10)\right) \cdot -1",
+            "mul(rank(ts_corr(close, volume, 10)), -1)",
+        ),
+        # \max/\min of two values are element-wise, not rolling extremes
+        (r"\max(\text{close} - \text{open}, 0)", "maximum(sub(close, open), 0)"),
+        ("min(close, 1)", "minimum(close, 1)"),
+    ],
+)
+def test_parse_formulation(formulation, expected) -> None:
+    assert parse_formulation(formulation).to_text() == expected
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "ts_mean(volume)",
+        "ts_mean(volume, close)",
+        "foo(close)",
+        "close +",
+        "returns",
+        "ts_mean(close, 0)",
+        "ts_max(close, -2)",
+        "ts_delay(close, -1)",
+        "ts_delta(close, -5)",
+    ],
+)
+def test_parse_rejects_invalid_expressions(text) -> None:
+    with pytest.raises(DSLError):
+        parse_expression(text)
+
+
+@pytest.mark.parametrize(
+    "formulation",
+    [
+        r"\frac{\text{close}_{t+1}}{\text{close}_t}",
+        r"\text{close}_{t} - \text{close}_{i}",
+        r"\text{close}_1",
+    ],
+)
+def test_parse_rejects_other_subscripts(formulation) -> None:
+    with pytest.raises(DSLError):
+        parse_formulation(formulation)
+
+
+def test_minus_after_subscript_is_not_a_delay() -> None:
+    assert parse_formulation(r"\text{close}_t-5").to_text() == "sub(close, 5)"
+
+
+def test_zero_delay_is_valid() -> None:
+    assert parse_expression("ts_delta(close, 0)").to_text() == "ts_delta(close, 0)"
+
+
+def test_shared_subexpressions_are_computed_once(monkeypatch) -> None:
+    rng = np.random.default_rng(0)
+    data = {f: rng.random((40, 6)) + 1 for f in ("close", "volume")}
+    factors = {
+        "a": "ts_mean(volume, 5) / close",
+        "b": "rank(ts_mean(volume, 5))",
+        "c": "ts_mean(volume, 5) - rank(close)",
+        "d": "rank(close)",
+    }
+
+    calls = []
+    original = evaluator._compute
+
+    def counting_compute(node, data, values):
+        calls.append(node.to_text())
+        return original(node, data, values)
+
+    monkeypatch.setattr(evaluator, "_compute", counting_compute)
+    results = evaluate_batch(factors, data)
+
+    assert calls.count("ts_mean(volume, 5)") == 1
+    assert calls.count("rank(close)") == 1
+    for name, expression in factors.items():
+        np.testing.assert_allclose(
+            results[name], evaluate(expression, data), equal_nan=True
+        )
+    np.testing.assert_allclose(results["d"], ops.rank(data["close"]))
+
+
+def test_cache_hits_skip_their_subtrees(monkeypatch) -> None:
+    rng = np.random.default_rng(1)
+    data = {f: rng.random((40, 6)) + 1 for f in ("close", "volume")}
+    cache = {}
+    evaluate_batch({"a": "ts_mean(volume, 5) / ts_std(close, 10)"}, data, cache=cache)
+
+    calls = []
+    original = evaluator._compute
+
+    def counting_compute(node, data, values):
+        calls.append(node.to_text())
+        return original(node, data, values)
+
+    monkeypatch.setattr(evaluator, "_compute", counting_compute)
+    factors = {
+        "b": "rank(ts_mean(volume, 5) / ts_std(close, 10))",
+        "c": "ts_mean(volume, 5) - close",
+    }
+    results = evaluate_batch(factors, data, cache=cache)
+
+    assert sorted(calls) == [
+        "close",
+        "rank(div(ts_mean(volume, 5), ts_std(close, 10)))",
+        "sub(ts_mean(volume, 5), close)",
+    ]
+    for name, expression in factors.items():
+        np.testing.assert_allclose(
+            results[name], evaluate(expression, data), equal_nan=True
+        )
+
+
+def test_topological_order_lists_children_first() -> None:
+    root = parse_expression("ts_corr(rank(close), volume, 3)")
+    order = [node.to_text() for node in topological_order([root])]
+    assert order.index("close") < order.index("rank(close)") < order.index(
+        root.to_text()
+    )
@@ -0,0 +1,53 @@
+import asyncio
+import json
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from agent.agents.alpha_coder_agent import extract_code
+from agent.agents.alpha_generator_agent import factor_to_seed_alpha, parse_factors
+from agent.llm import FakeChatModel
+from agent.prompts.alpha_coder_prompts import ALPHA_CODER_SYSTEM_PROMPT
+from agent.prompts.alpha_prompts import ALPHA_SYSTEM_PROMPT
+from agent.prompts.hypothesis_prompts import HYPOTHESIS_SYSTEM_PROMPT
+
+
+def prompt(system: str, user: str):
+    return [SystemMessage(content=system), HumanMessage(content=user)]
+
+
+def test_responses_parse_like_the_graph_nodes_expect() -> None:
+    model = FakeChatModel(latency=0, tokens_per_second=None, code_fraction=0.5)
+
+    hypothesis = json.loads(model.invoke(prompt(HYPOTHESIS_SYSTEM_PROMPT, "Momentum")).content)
+    assert hypothesis["hypothesis"] and hypothesis["concise_knowledge"]
+
+    factors = parse_factors(
+        model.invoke(prompt(ALPHA_SYSTEM_PROMPT, "Develop 6 alpha factors")).content
+    )
+    assert len(factors) == 6
+    seeds = [factor_to_seed_alpha(name, data) for name, data in factors.items()]
+    assert all(("dsl" in seed) == bool(factors[seed["alphaID"]]["expression"]) for seed in seeds)
+
+    code = extract_code(
+        model.invoke(prompt(ALPHA_CODER_SYSTEM_PROMPT, "Alpha ID: factor_x")).content
+    )
+    namespace = {}
+    exec(compile(code, "<fake>", "exec"), namespace)
+    assert callable(namespace["calculate_factor_x"])
+
+    assert model.calls == {"hypothesis": 1, "factors": 1, "code": 1}
+
+
+def test_responses_are_deterministic_and_streams_match() -> None:
+    messages = prompt(ALPHA_SYSTEM_PROMPT, "Develop 3 alpha factors")
+    model = FakeChatModel(latency=0, tokens_per_second=None, seed=7)
+
+    text = model.invoke(messages).content
+    assert FakeChatModel(latency=0, tokens_per_second=None, seed=7).invoke(messages).content == text
+    assert FakeChatModel(latency=0, tokens_per_second=None, seed=8).invoke(messages).content != text
+
+    async def stream() -> str:
+        return "".join([chunk.content async for chunk in model.astream(messages)])
+
+    assert asyncio.run(stream()) == text
+    assert model.calls == {"factors": 2}
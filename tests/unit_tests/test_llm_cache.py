@@ -0,0 +1,75 @@
+import asyncio
+
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from agent.configuration import Configuration
+from agent.llm import CacheStore, ResponseCache, cache_key, get_llm_cache
+from agent.llm.cache import sqlite_engine
+
+
+def _store(tmp_path, **kwargs) -> CacheStore:
+    return CacheStore(sqlite_engine(str(tmp_path / "cache.sqlite")), **kwargs)
+
+
+def test_identical_prompts_hit_the_cache(tmp_path) -> None:
+    cache = ResponseCache(_store(tmp_path))
+    llm = FakeListChatModel(responses=["first", "second"], cache=cache)
+    messages = [SystemMessage("You code alphas."), HumanMessage("Alpha ID: a1\n")]
+
+    assert llm.invoke(messages).content == "first"
+    # Trailing whitespace does not change the key
+    assert llm.invoke([messages[0], HumanMessage("Alpha ID: a1")]).content == "first"
+    assert asyncio.run(llm.ainvoke(messages)).content == "first"
+    assert llm.invoke([HumanMessage("Alpha ID: a2")]).content == "second"
+
+    assert cache.stats.hits == 2
+    assert cache.stats.misses == 2
+    assert cache.stats.hit_rate == 0.5
+
+    # A new process reads the same file
+    reopened = ResponseCache(_store(tmp_path))
+    replay = FakeListChatModel(responses=["first", "second"], cache=reopened)
+    replay.invoke(messages)
+    assert reopened.stats.hits == 1
+
+
+def test_cache_key_depends_on_model_parameters() -> None:
+    assert cache_key("prompt", "model=a") != cache_key("prompt", "model=b")
+    assert cache_key("prompt \r\n", "model=a") == cache_key("prompt", "model=a")
+
+
+def test_store_evicts_least_recently_used_and_expired(tmp_path) -> None:
+    store = _store(tmp_path, max_entries=2)
+    for key in ("a", "b", "c"):
+        store.put(key, "x" * 10)
+    store.get("a")
+
+    assert store.evict() == 1
+    assert store.get("b") is None
+    assert store.get("a") and store.get("c")
+
+    store.max_entries = None
+    store.max_bytes = 15
+    store.evict()
+    assert store.size() == {"entries": 1, "bytes": 10}
+
+    store.ttl = 1e-6
+    assert store.get("a") is None and store.get("c") is None
+    store.evict()
+    assert store.size()["entries"] == 0
+
+
+def test_nodes_opt_in_and_out(tmp_path) -> None:
+    configuration = Configuration(
+        llm_cache_path=str(tmp_path / "nodes.sqlite"),
+        llm_cache_nodes=("alpha_coder",),
+    )
+
+    coder_cache = get_llm_cache("alpha_coder", configuration)
+    assert isinstance(coder_cache, ResponseCache)
+    assert get_llm_cache("alpha_coder", configuration) is coder_cache
+    assert get_llm_cache("hypothesis_generator", configuration) is False
+    assert get_llm_cache("alpha_coder", Configuration(llm_cache_backend=None)) is False
+    # Nothing touches the disk until the cache is used
+    assert not (tmp_path / "nodes.sqlite").exists()
@@ -0,0 +1,114 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from langchain_openai import ChatOpenAI
+
+from agent.configuration import Configuration
+from agent.llm import (
+    RateLimiter,
+    create_async_http_client,
+    estimate_request_tokens,
+    get_chat_model,
+)
+from agent.llm.rate_limit import parse_reset
+
+COMPLETION = {
+    "id": "chatcmpl-1",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "gpt-4o",
+    "choices": [
+        {
+            "index": 0,
+            "message": {"role": "assistant", "content": "stub reply"},
+            "finish_reason": "stop",
+        }
+    ],
+    "usage": {"prompt_tokens": 5, "completion_tokens": 2, "total_tokens": 7},
+}
+
+
+def test_parse_reset() -> None:
+    assert parse_reset("1m30s") == 90.0
+    assert parse_reset("250ms") == 0.25
+    assert parse_reset("2") == 2.0
+    assert parse_reset(None) is None
+
+
+def test_limiter_spaces_requests_and_tokens_in_arrival_order() -> None:
+    requests = RateLimiter(rpm=600, burst=0)
+    delays = [requests.reserve() for _ in range(3)]
+    assert delays == pytest.approx([0.0, 0.1, 0.2], abs=0.01)
+
+    tokens = RateLimiter(tpm=6000, burst=0)
+    assert tokens.reserve(100) == pytest.approx(0.0, abs=0.01)
+    assert tokens.reserve(100) == pytest.approx(1.0, abs=0.01)
+    assert tokens.throttled == 1
+
+
+def test_limiter_adapts_to_rate_limit_headers() -> None:
+    limiter = RateLimiter(rpm=1000, tpm=100_000)
+    limiter.update_from_headers(429, {"Retry-After": "2"})
+    assert limiter.reserve() == pytest.approx(2.0, abs=0.05)
+
+    exhausted = RateLimiter(rpm=1000)
+    exhausted.update_from_headers(
+        200,
+        {"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "1.5s"},
+    )
+    assert exhausted.reserve() == pytest.approx(1.5, abs=0.05)
+
+
+def test_request_token_estimate() -> None:
+    payload = {
+        "model": "gpt-4o",
+        "messages": [{"role": "user", "content": "x" * 400}],
+        "max_tokens": 50,
+    }
+    assert 50 < estimate_request_tokens(payload) < 300
+
+
+def test_stub_endpoint_shares_limiter_and_connections(monkeypatch) -> None:
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(json.loads(request.content))
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"retry-after": "0.3"}, json={})
+        return httpx.Response(
+            200, headers={"x-ratelimit-remaining-requests": "99"}, json=COMPLETION
+        )
+
+    limiter = RateLimiter(rpm=600)
+    client = create_async_http_client(limiter, transport=httpx.MockTransport(handler))
+    llm = ChatOpenAI(model="gpt-4o", http_async_client=client, max_retries=2)
+
+    async def run():
+        first, second = await asyncio.gather(
+            llm.ainvoke("hello"), llm.ainvoke("hello again")
+        )
+        return first.content, second.content
+
+    assert asyncio.run(run()) == ("stub reply", "stub reply")
+    # The 429 paused the limiter for every caller, not only the rejected one
+    assert len(calls) == 3
+    assert limiter.throttled >= 1
+
+
+def test_get_chat_model_reuses_clients(monkeypatch) -> None:
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    configuration = Configuration(llm_cache_backend=None)
+
+    async def models():
+        first = get_chat_model("alpha_coder", configuration, temperature=0.1)
+        second = get_chat_model("alpha_coder", configuration, temperature=0.1)
+        other = get_chat_model("alpha_generator", configuration, temperature=0.4)
+        return first, second, other
+
+    first, second, other = asyncio.run(models())
+    assert first is second
+    assert other is not first
+    assert other.http_async_client is first.http_async_client
@@ -0,0 +1,74 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from agent.factors import evaluate
+from agent.market_data import is_store, load_panel, open_store, write_store
+
+
+def _fields(shape=(30, 4), seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.cumprod(1 + rng.normal(0, 0.01, shape), axis=0)
+    return {"close": close, "volume": rng.uniform(1e5, 1e6, shape)}
+
+
+def test_store_round_trip_is_memory_mapped(tmp_path) -> None:
+    fields = _fields()
+    dates = np.array([f"2020-01-{d:02d}" for d in range(1, 31)])
+    store = write_store(tmp_path / "store", dates, ["A", "B", "C", "D"], fields)
+
+    assert is_store(tmp_path / "store")
+    assert store.shape == (30, 4)
+    assert list(store.fields) == ["close", "volume"]
+    assert list(store.instruments) == ["A", "B", "C", "D"]
+
+    close = store.fields["close"]
+    assert isinstance(close, np.memmap)
+    assert not close.flags.writeable
+    np.testing.assert_array_equal(close, fields["close"])
+
+    # Factors evaluate directly on the mapped arrays
+    np.testing.assert_allclose(
+        evaluate("close / volume", store.fields), fields["close"] / fields["volume"]
+    )
+
+
+def test_store_float32_and_version(tmp_path) -> None:
+    fields = _fields()
+    first = write_store(tmp_path / "store", range(30), range(4), fields, dtype=np.float32)
+    assert first.fields["close"].dtype == np.float32
+
+    same = write_store(tmp_path / "other", range(30), range(4), fields, dtype=np.float32)
+    assert same.version == first.version
+
+    fields["close"][0, 0] += 1.0
+    changed = write_store(tmp_path / "store", range(30), range(4), fields, dtype=np.float32)
+    assert changed.version != first.version
+    assert open_store(tmp_path / "store").version == changed.version
+
+
+def test_store_pickles_as_path(tmp_path) -> None:
+    store = write_store(tmp_path / "store", range(30), range(4), _fields())
+    payload = pickle.dumps(store)
+
+    assert len(payload) < 1024
+    restored = pickle.loads(payload)
+    np.testing.assert_array_equal(restored.fields["volume"], store.fields["volume"])
+
+
+def test_write_store_rejects_misaligned_fields(tmp_path) -> None:
+    with pytest.raises(ValueError):
+        write_store(tmp_path / "store", range(3), range(2), {"close": np.ones((2, 2))})
+    assert not is_store(tmp_path / "store")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_load_panel_accepts_store_and_npz(tmp_path) -> None:
+    fields = _fields()
+    write_store(tmp_path / "store", range(30), range(4), fields)
+    np.savez(tmp_path / "panel.npz", dates=np.arange(30), instruments=np.arange(4), **fields)
+
+    from_store = load_panel(tmp_path / "store")
+    from_npz = load_panel(tmp_path / "panel.npz")
+    np.testing.assert_array_equal(from_store.fields["close"], from_npz.fields["close"])
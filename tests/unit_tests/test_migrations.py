@@ -0,0 +1,35 @@
+import io
+
+from alembic import command
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+
+from agent.database.models import Base
+from agent.database.operations.db_connection import MIGRATIONS_PATH
+
+
+def offline_config(buffer: io.StringIO) -> Config:
+    config = Config(output_buffer=buffer)
+    config.set_main_option("script_location", MIGRATIONS_PATH)
+    config.set_main_option("sqlalchemy.url", "postgresql://")
+    return config
+
+
+def test_migrations_form_a_single_history() -> None:
+    script = ScriptDirectory.from_config(offline_config(io.StringIO()))
+    revisions = list(script.walk_revisions())
+
+    assert len(script.get_heads()) == 1
+    assert revisions[-1].revision == "0001"
+
+
+def test_migrations_create_every_model_index() -> None:
+    buffer = io.StringIO()
+    command.upgrade(offline_config(buffer), "head", sql=True)
+    sql = buffer.getvalue()
+
+    assert "CREATE INDEX ix_alphas_thread_alpha ON alphas (thread_id, alpha_id)" in sql
+    for table in Base.metadata.sorted_tables:
+        assert f"CREATE TABLE {table.name} " in sql
+        for index in table.indexes:
+            assert f" {index.name} ON {table.name} " in sql
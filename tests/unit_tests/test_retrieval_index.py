@@ -0,0 +1,163 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from agent.retrieval import (
+    PriorAttemptIndex,
+    VectorIndex,
+    decode_id,
+    encode_id,
+    format_prior_attempts,
+)
+from agent.retrieval import prior_attempts
+
+
+def _vectors(n: int, dim: int = 16, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+
+
+def test_search_finds_vectors_across_base_and_delta(tmp_path) -> None:
+    vectors = _vectors(60)
+    index = VectorIndex(tmp_path / "index", dim=16, compact_every=40)
+
+    index.add([encode_id("alpha", i) for i in range(40)], vectors[:40])
+    index.save()  # compacts the first 40 into the base segment
+    index.add([encode_id("alpha", i) for i in range(40, 60)], vectors[40:])
+
+    for row_id in (3, 45):
+        (vector_id, score), *_ = index.search(vectors[row_id], k=3)
+        assert decode_id(vector_id) == ("alpha", row_id)
+        assert score > 0.99
+
+
+def test_index_reloads_and_skips_known_ids(tmp_path) -> None:
+    vectors = _vectors(30)
+    index = VectorIndex(tmp_path / "index", dim=16, compact_every=20)
+    index.add([encode_id("hypothesis", i) for i in range(25)], vectors[:25])
+    index.save()
+    index.add([encode_id("hypothesis", i) for i in range(25, 30)], vectors[25:])
+    index.set_meta(last_ids={"hypothesis": 29})
+    index.save()
+
+    reloaded = VectorIndex(tmp_path / "index", dim=16)
+
+    assert len(reloaded) == 30
+    assert reloaded.meta["last_ids"] == {"hypothesis": 29}
+    assert reloaded.add([encode_id("hypothesis", 0)], vectors[:1]) == 0
+    (vector_id, _), *_ = reloaded.search(vectors[27], k=1)
+    assert decode_id(vector_id) == ("hypothesis", 27)
+
+
+def test_replaced_vectors_leave_base_and_delta(tmp_path) -> None:
+    vectors = _vectors(12)
+    index = VectorIndex(tmp_path / "index", dim=16, compact_every=8)
+    index.add([encode_id("alpha", i) for i in range(8)], vectors[:8])
+    index.save()  # rows 0-7 in the base
+    index.add([encode_id("alpha", 8)], vectors[8:9])
+
+    # Row 2 (base) and row 8 (delta) change
+    changed = [encode_id("alpha", 2), encode_id("alpha", 8)]
+    assert index.add(changed, vectors[9:11], replace=True) == 2
+    index.save()
+
+    reloaded = VectorIndex(tmp_path / "index", dim=16, compact_every=8)
+    for old, new, row_id in ((2, 9, 2), (8, 10, 8)):
+        hits = dict(reloaded.search(vectors[old], k=9))
+        assert hits.get(encode_id("alpha", row_id), 0.0) < 0.99
+        (vector_id, score), *_ = reloaded.search(vectors[new], k=1)
+        assert decode_id(vector_id) == ("alpha", row_id) and score > 0.99
+
+    reloaded.compact()
+    assert len(reloaded) == 9
+    (vector_id, _), *_ = reloaded.search(vectors[9], k=1)
+    assert decode_id(vector_id) == ("alpha", 2)
+
+
+class _Embeddings:
+    """Deterministic embeddings: one random vector per distinct text"""
+
+    def __init__(self) -> None:
+        self.embedded = []
+
+    def _vector(self, text: str) -> list:
+        seed = sum(ord(c) * (i + 1) for i, c in enumerate(text))
+        return np.random.default_rng(seed).normal(size=16).tolist()
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+def _fake_table(monkeypatch):
+    """Alpha rows as ``{row_id: (text, updated_at)}``, served like get_rows_to_index"""
+    rows = {}
+
+    def get_rows_to_index(kind, since=None, after_id=0, limit=256, session=None):
+        if kind != "alpha":
+            return []
+        page = sorted(
+            (version, row_id, text)
+            for row_id, (text, version) in rows.items()
+            if since is None or (version, row_id) > (since, after_id)
+        )
+        return [(row_id, text, version) for version, row_id, text in page[:limit]]
+
+    monkeypatch.setattr(prior_attempts, "get_rows_to_index", get_rows_to_index)
+    return rows
+
+
+def test_sync_picks_up_late_commits_and_changed_rows(tmp_path, monkeypatch) -> None:
+    rows = _fake_table(monkeypatch)
+    embeddings = _Embeddings()
+    index = PriorAttemptIndex(tmp_path / "index", embeddings, "fake", batch_size=2)
+    start = datetime(2026, 1, 1, 12, 0)
+
+    rows.update({1: ("momentum", start), 3: ("reversal", start + timedelta(seconds=2))})
+    assert index.sync() == 2
+
+    # Row 2 began before row 3 but committed after the sync
+    rows[2] = ("volume surge", start + timedelta(seconds=1))
+    # Row 1 was upserted with a new description
+    rows[1] = ("momentum over 20 days", start + timedelta(seconds=5))
+    assert index.sync() == 2
+    assert index.sync() == 0
+    assert embeddings.embedded == ["momentum", "reversal", "volume surge", "momentum over 20 days"]
+
+    reopened = PriorAttemptIndex(tmp_path / "index", embeddings, "fake")
+    assert reopened.sync() == 0
+    (key, score), *_ = reopened._hits(embeddings.embed_query("momentum over 20 days"), 3, None)
+    assert key == ("alpha", 1) and score > 0.99
+    stale = reopened._hits(embeddings.embed_query("momentum"), 3, None)
+    assert all(score < 0.99 for _, score in stale)
+    assert len(reopened) == 3
+
+
+def test_search_filters_by_kind(tmp_path) -> None:
+    vectors = _vectors(10)
+    index = VectorIndex(tmp_path / "index", dim=16)
+    index.add([encode_id("hypothesis", 1)], vectors[:1])
+    index.add([encode_id("alpha", 1)], vectors[:1] * 0.5)
+
+    hits = index.search(vectors[0], k=5, kind="alpha")
+
+    assert [decode_id(vector_id) for vector_id, _ in hits] == [("alpha", 1)]
+
+
+def test_format_prior_attempts() -> None:
+    text = format_prior_attempts(
+        [
+            {
+                "kind": "alpha",
+                "description": "Volume surge",
+                "expression": "rank(volume)",
+                "metrics": {"information_ratio": 0.5, "ic": 0.02},
+            },
+            {"kind": "hypothesis", "hypothesis": "Momentum persists", "metrics": None},
+        ]
+    )
+
+    assert "Volume surge [rank(volume)] -> IR=0.5000, IC=0.0200" in text
+    assert "(hypothesis) Momentum persists -> not backtested" in text